@@ -0,0 +1,101 @@
+"""3x3 convolution throughput, im2col + GEMM against a direct loop
+
+Usage:
+    python -m lml_python.benchmarks.bench_conv [--sizes 8 16 32 ...]
+
+Runs a (1, C, size, size) input through C filters of 3x3 with padding 1.
+The direct loop is the nested loop convolution over the input's storage
+and is only timed up to --reference-max since it scales very poorly.
+"""
+import argparse
+import time
+from lml_python.core.conv import conv2d
+from lml_python.core.tensor import Tensor
+
+
+def gflops(channels: int, size: int, seconds: float) -> float:
+    return 2 * channels * 9 * channels * size * size / seconds / 1e9
+
+
+def direct(x: Tensor, w: Tensor, out: Tensor):
+    """Nested loop 3x3 convolution with padding 1, stride 1"""
+    _, c, h, width = x.shape
+    o = w.shape[0]
+    xs, ws, ys = x.data, w.data, out.data
+    for f in range(o):
+        for y in range(h):
+            for z in range(width):
+                acc = 0.0
+                for ch in range(c):
+                    for i in range(3):
+                        r = y + i - 1
+                        if not 0 <= r < h:
+                            continue
+                        row = (ch * h + r) * width
+                        taps = ((f * c + ch) * 3 + i) * 3
+                        for j in range(3):
+                            q = z + j - 1
+                            if 0 <= q < width:
+                                acc += xs[row + q] * ws[taps + j]
+                ys[(f * h + y) * width + z] = acc
+
+
+def bench(kernel, channels: int, size: int, repeats: int) -> float:
+    """Best wall time of 'repeats' runs of a convolution
+
+    Args:
+        kernel: Called as kernel(x, w, out)
+        channels (int): Input and output channels
+        size (int): Height and width of the input
+        repeats (int): Number of timed runs
+
+    Returns:
+        float: Best run time in seconds
+    """
+    x = Tensor.with_uniform((1, channels, size, size), (-1.0, 1.0))
+    w = Tensor.with_uniform((channels, channels, 3, 3), (-1.0, 1.0))
+    out = Tensor.with_zeros((1, channels, size, size))
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        kernel(x, w, out)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+KERNELS = {
+    "direct": direct,
+    "im2col": lambda x, w, out: conv2d(x, w, padding=1, out=out),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[8, 16, 32, 64])
+    parser.add_argument("--channels", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--reference-max", type=int, default=32)
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'kernel':>8} {'seconds':>10} {'GFLOP/s':>9} "
+          f"{'speedup':>8}")
+    for size in args.sizes:
+        reference = None
+        for name, kernel in KERNELS.items():
+            if name == "direct" and size > args.reference_max:
+                continue
+            repeats = 1 if name == "direct" else args.repeats
+            seconds = bench(kernel, args.channels, size, repeats)
+            if name == "direct":
+                reference = seconds
+            speedup = "-"
+            if reference is not None and name != "direct":
+                speedup = f"{reference / seconds:.1f}x"
+            print(f"{size:>6} {name:>8} {seconds:>10.4f} "
+                  f"{gflops(args.channels, size, seconds):>9.4f} "
+                  f"{speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Square matmul throughput of the tmath kernels
+
+Usage:
+    python -m lml_python.benchmarks.bench_matmul [--sizes 64 128 ...]
+
+The generic kernel is the element-by-element reference implementation and
+is only timed up to --reference-max since it scales very poorly.
+"""
+import argparse
+import time
+from lml_python.core.tensor import Tensor
+from lml_python.core.python_backend import (
+    _matmul_packed,
+    _matmul_ikj,
+    _matmul_generic,
+)
+
+KERNELS = {
+    "generic": _matmul_generic,
+    "ikj": _matmul_ikj,
+    "packed": _matmul_packed,
+}
+
+
+def gflops(size: int, seconds: float) -> float:
+    return 2 * size ** 3 / seconds / 1e9
+
+
+def bench(kernel, size: int, repeats: int) -> float:
+    """Best wall time of 'repeats' runs of a kernel on square operands
+
+    Args:
+        kernel: One of the tmath matmul kernels
+        size (int): Edge length of the square operands
+        repeats (int): Number of timed runs
+
+    Returns:
+        float: Best run time in seconds
+    """
+    a = Tensor.with_uniform((size, size), (-1.0, 1.0))
+    b = Tensor.with_uniform((size, size), (-1.0, 1.0))
+    out = Tensor.with_zeros((size, size))
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        kernel(a, b, out)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[64, 128, 256, 512, 1024])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--reference-max", type=int, default=128)
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'kernel':>8} {'seconds':>10} {'GFLOP/s':>9} "
+          f"{'speedup':>8}")
+    for size in args.sizes:
+        reference = None
+        for name, kernel in KERNELS.items():
+            if name == "generic" and size > args.reference_max:
+                continue
+            repeats = 1 if name == "generic" else args.repeats
+            seconds = bench(kernel, size, repeats)
+            if name == "generic":
+                reference = seconds
+            speedup = "-"
+            if reference is not None and name != "generic":
+                speedup = f"{reference / seconds:.1f}x"
+            print(f"{size:>6} {name:>8} {seconds:>10.4f} "
+                  f"{gflops(size, seconds):>9.4f} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""Micro-benchmarks of the core tensor ops, with regression checks
+
+Usage:
+    python -m lml_python.benchmarks.suite [--output results.json]
+        [--baseline baseline.json] [--threshold 0.25] [--filter matmul]
+
+Every case is timed as the best of --repeats runs, each run calling it
+enough times to take at least --min-time seconds. With --baseline the
+run is compared to a stored result file and the command exits with
+status 1 if any case got slower by more than --threshold.
+"""
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+from collections.abc import Callable
+from typing import Optional
+from lml_python.core.autograd import no_grad
+from lml_python.core.backend import get_backend
+from lml_python.core.conv import conv2d
+from lml_python.core.layer import Linear
+from lml_python.core.sparse import SparseTensor
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import matadd, matmul, softmax, tsum
+from lml_python.core.vmath import dot
+from lml_python.optim.adam import Adam
+from lml_python.quant.layer import QuantizedLinear
+
+type Case = Callable[[], object]
+# Name -> builds the operands and returns the callable to time
+type CaseFactory = Callable[[], Case]
+
+DEFAULT_THRESHOLD = 0.25
+
+
+def _nested(shape: tuple[int, ...]) -> list:
+    values = [float(i) for i in range(math.prod(shape))]
+    for dim in reversed(shape[1:]):
+        values = [values[i:i + dim] for i in range(0, len(values), dim)]
+    return values
+
+
+def _construction(size: int) -> dict[str, CaseFactory]:
+    shape = (size, size)
+
+    def with_list() -> Case:
+        nested = _nested(shape)
+        return lambda: Tensor.with_list(nested, shape)
+
+    return {
+        f"with_list_nested/{size}": with_list,
+        f"with_uniform/{size}":
+            lambda: lambda: Tensor.with_uniform(shape, (-1.0, 1.0)),
+        f"with_normal/{size}":
+            lambda: lambda: Tensor.with_normal(shape, 0.0, 0.1),
+        f"with_zeros/{size}": lambda: lambda: Tensor.with_zeros(shape),
+        f"linear_init/{size}": lambda: lambda: Linear(size, size),
+    }
+
+
+def _indexing(size: int) -> dict[str, CaseFactory]:
+    def get() -> Case:
+        t = Tensor.with_uniform((size, size), (-1.0, 1.0))
+        keys = [(i, j) for i in range(size) for j in range(size)]
+        return lambda: [t[key] for key in keys]
+
+    def assign() -> Case:
+        t = Tensor.with_zeros((size, size))
+        keys = [(i, j) for i in range(size) for j in range(size)]
+
+        def run():
+            for key in keys:
+                t[key] = 1.0
+        return run
+
+    def take() -> Case:
+        t = Tensor.with_uniform((size, size), (-1.0, 1.0))
+        rows = list(range(0, size, 2))
+        return lambda: t.take(rows, axis=0)
+
+    return {
+        f"getitem/{size}": get,
+        f"setitem/{size}": assign,
+        f"take_rows/{size}": take,
+    }
+
+
+def _reshape(size: int) -> dict[str, CaseFactory]:
+    def contiguous() -> Case:
+        t = Tensor.with_uniform((size, size), (-1.0, 1.0))
+        return lambda: t.reshape((size * size,))
+
+    def transposed() -> Case:
+        t = Tensor.with_uniform((size, size), (-1.0, 1.0)).T
+        return lambda: t.reshape((size * size,))
+
+    return {
+        f"reshape_view/{size}": contiguous,
+        f"reshape_copy/{size}": transposed,
+    }
+
+
+def _binary(size: int) -> dict[str, CaseFactory]:
+    def operands() -> tuple[Tensor, Tensor]:
+        return (Tensor.with_uniform((size, size), (-1.0, 1.0)),
+                Tensor.with_uniform((size, size), (-1.0, 1.0)))
+
+    def mm() -> Case:
+        a, b = operands()
+        return lambda: matmul(a, b)
+
+    def add() -> Case:
+        a, b = operands()
+        return lambda: matadd(a, b)
+
+    def add_broadcast() -> Case:
+        a = Tensor.with_uniform((size, size), (-1.0, 1.0))
+        b = Tensor.with_uniform((size,), (-1.0, 1.0))
+        return lambda: matadd(a, b)
+
+    return {
+        f"matmul/{size}": mm,
+        f"matadd/{size}": add,
+        f"matadd_broadcast/{size}": add_broadcast,
+    }
+
+
+def _sparse(size: int) -> dict[str, CaseFactory]:
+    def spmm() -> Case:
+        a = SparseTensor.random((size, size), 0.05)
+        b = Tensor.with_uniform((size, size), (-1.0, 1.0))
+        return lambda: matmul(a, b)
+
+    return {f"spmm_5pct/{size}": spmm}
+
+
+def _conv(size: int) -> dict[str, CaseFactory]:
+    def forward() -> Case:
+        x = Tensor.with_uniform((1, 8, size, size), (-1.0, 1.0))
+        w = Tensor.with_uniform((8, 8, 3, 3), (-1.0, 1.0))
+        return lambda: conv2d(x, w, padding=1)
+
+    return {f"conv2d/{size}": forward}
+
+
+def _reductions(size: int) -> dict[str, CaseFactory]:
+    def sum_rows() -> Case:
+        t = Tensor.with_uniform((size, size), (-1.0, 1.0))
+        return lambda: tsum(t, axis=0)
+
+    def rows_softmax() -> Case:
+        t = Tensor.with_uniform((size, size), (-1.0, 1.0))
+        return lambda: softmax(t)
+
+    return {
+        f"tsum_axis0/{size}": sum_rows,
+        f"softmax/{size}": rows_softmax,
+    }
+
+
+def _dot(size: int) -> dict[str, CaseFactory]:
+    def lists() -> Case:
+        a = [float(i) for i in range(size)]
+        b = [float(-i) for i in range(size)]
+        return lambda: dot(a, b)
+
+    return {f"dot/{size}": lists}
+
+
+def _linear(batch: int, size: int) -> dict[str, CaseFactory]:
+    def forward() -> Case:
+        layer = Linear(size, size, activation="relu")
+        x = Tensor.with_uniform((batch, size), (-1.0, 1.0))
+
+        def run():
+            with no_grad():
+                layer.forward(x)
+        return run
+
+    def quantized() -> Case:
+        layer = QuantizedLinear.from_linear(Linear(size, size, "relu"))
+        x = Tensor.with_uniform((batch, size), (-1.0, 1.0))
+        return lambda: layer.forward(x)
+
+    return {
+        f"linear_forward/{batch}x{size}": forward,
+        f"qlinear_forward/{batch}x{size}": quantized,
+    }
+
+
+def _optim(size: int) -> dict[str, CaseFactory]:
+    def adam() -> Case:
+        layers = [Linear(size, size) for _ in range(4)]
+        optimizer = Adam([p for layer in layers for p in layer.parameters()])
+        return optimizer.step
+
+    return {f"adam_step/{size}": adam}
+
+
+def default_cases(quick: bool = False) -> dict[str, CaseFactory]:
+    """Every benchmark case of the suite
+
+    Args:
+        quick (bool, optional): Only the smallest sizes, for smoke tests.
+            Defaults to False.
+
+    Returns:
+        dict[str, CaseFactory]: Case name, as "op/size", to its factory
+    """
+    sizes = [8] if quick else [8, 32, 128]
+    cases: dict[str, CaseFactory] = {}
+    for size in sizes:
+        cases.update(_construction(size))
+        cases.update(_indexing(min(size, 64)))
+        cases.update(_reshape(size))
+        cases.update(_binary(size))
+        cases.update(_sparse(size))
+        cases.update(_conv(min(size, 32)))
+        cases.update(_reductions(size))
+        cases.update(_dot(size * size))
+        cases.update(_linear(size, size))
+        cases.update(_optim(size))
+    return cases
+
+
+def time_case(case: Case,
+              repeats: int = 5,
+              min_time: float = 0.05) -> dict[str, float | int]:
+    """Time a benchmark case
+
+    Args:
+        case (Case): Callable to time
+        repeats (int, optional): Number of timed runs. Defaults to 5.
+        min_time (float, optional): Shortest duration of a run in
+            seconds, cheap cases are called several times per run.
+            Defaults to 0.05.
+
+    Returns:
+        dict[str, float | int]: Best and median seconds per call, and the
+            number of calls per run
+    """
+    # Calls per run doubles until one run is long enough to time reliably
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            case()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+
+    times = [elapsed / number]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            case()
+        times.append((time.perf_counter() - start) / number)
+    times.sort()
+    return {"best": times[0], "median": times[len(times) // 2],
+            "number": number}
+
+
+def run(cases: dict[str, CaseFactory],
+        repeats: int = 5,
+        min_time: float = 0.05) -> dict:
+    """Time a set of cases
+
+    Args:
+        cases (dict[str, CaseFactory]): Cases to run, by name
+        repeats (int, optional): Number of timed runs per case. Defaults
+            to 5.
+        min_time (float, optional): Shortest duration of a run in
+            seconds. Defaults to 0.05.
+
+    Returns:
+        dict: JSON serialisable results, with the environment they were
+            measured in
+    """
+    results = {name: time_case(factory(), repeats, min_time)
+               for name, factory in cases.items()}
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": get_backend().name,
+        "results": results,
+    }
+
+
+def compare(current: dict,
+            baseline: dict,
+            threshold: float = DEFAULT_THRESHOLD) -> list[tuple[str, float]]:
+    """Find the cases that got slower than a baseline
+
+    Best times are compared, they are the least sensitive to noise from
+    other processes. Cases missing from either run are ignored.
+
+    Args:
+        current (dict): Results of `run`
+        baseline (dict): Results of an earlier `run`
+        threshold (float, optional): Allowed slowdown, 0.25 fails cases
+            more than 25% slower. Defaults to DEFAULT_THRESHOLD.
+
+    Returns:
+        list[tuple[str, float]]: Name and time ratio, current over
+            baseline, of each regressed case
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        ratio = result["best"] / reference["best"]
+        if ratio > 1 + threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def _report(results: dict, baseline: Optional[dict]):
+    print(f"{'case':<28} {'best':>12} {'median':>12} {'vs baseline':>12}")
+    for name, result in results["results"].items():
+        change = "-"
+        if baseline is not None and name in baseline["results"]:
+            ratio = result["best"] / baseline["results"][name]["best"]
+            change = f"{ratio:.2f}x"
+        print(f"{name:<28} {result['best'] * 1e6:>10.1f}us "
+              f"{result['median'] * 1e6:>10.1f}us {change:>12}")
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--baseline", help="Results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--filter", default="",
+                        help="Only run cases whose name contains this")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05)
+    parser.add_argument("--quick", action="store_true",
+                        help="Smallest sizes only")
+    args = parser.parse_args(argv)
+
+    cases = {name: factory
+             for name, factory in default_cases(args.quick).items()
+             if args.filter in name}
+    results = run(cases, args.repeats, args.min_time)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    _report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline, args.threshold)
+    for name, ratio in regressions:
+        print(f"REGRESSION {name}: {ratio:.2f}x slower than baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+import itertools
+import math
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from lml_python.core.backend import get_backend
+from lml_python.core.dtype import promote_types
+from lml_python.core.memory import no_pool
+from lml_python.core.interfaces import (
+    ITensor,
+    Scalar,
+    TensorShape,
+)
+
+type Gradients = Sequence[Optional[ITensor]]
+type BackwardFn = Callable[[ITensor], Gradients]
+
+_grad_enabled: ContextVar[bool] = ContextVar("lml_grad_enabled",
+                                             default=True)
+
+
+class Node:
+    """Recorded op in the autograd graph
+
+    A node only holds what its backward needs. Tensors saved for the
+    backward live in the closure, which is dropped as soon as the node has
+    run, and inputs are referenced through their own node (or, for
+    leaves, the leaf tensor itself) rather than as tensors. Intermediate
+    results are therefore freed as the backward pass walks past them.
+    """
+    __slots__ = ("name", "next", "shapes", "_backward")
+
+    def __init__(self,
+                 name: str,
+                 inputs: Sequence[ITensor | Scalar],
+                 backward: BackwardFn):
+        self.name = name
+        self.next: tuple['Node | ITensor | None', ...] = tuple(
+            _edge(x) for x in inputs)
+        self.shapes: tuple[Optional[TensorShape], ...] = tuple(
+            x.shape if isinstance(x, ITensor) else None for x in inputs)
+        self._backward: Optional[BackwardFn] = backward
+
+    def __repr__(self) -> str:
+        return f"Node({self.name})"
+
+    def apply(self, gradient: ITensor) -> Gradients:
+        """Gradients of the inputs given the gradient of the output
+
+        Args:
+            gradient (ITensor): Gradient of the recorded op's output
+
+        Returns:
+            Gradients: One gradient per input, None where not required.
+                Gradients may still have the broadcast output shape.
+        """
+        if self._backward is None:
+            raise RuntimeError(f"Saved tensors of {self.name} were freed "
+                               "by a previous backward, pass "
+                               "retain_graph=True to backward through "
+                               "the graph more than once")
+        return self._backward(gradient)
+
+    def release(self):
+        """Drop the tensors saved for the backward"""
+        self._backward = None
+
+
+def is_grad_enabled() -> bool:
+    """Whether ops on tensors requiring gradients are being recorded"""
+    return _grad_enabled.get()
+
+
+@contextmanager
+def no_grad() -> Iterator[None]:
+    """Skip recording entirely, e.g. for inference
+
+    Ops inside the block return tensors without a graph, so nothing is
+    saved for a backward pass.
+    """
+    token = _grad_enabled.set(False)
+    try:
+        yield
+    finally:
+        _grad_enabled.reset(token)
+
+
+@contextmanager
+def enable_grad() -> Iterator[None]:
+    """Re-enable recording inside a no_grad block"""
+    token = _grad_enabled.set(True)
+    try:
+        yield
+    finally:
+        _grad_enabled.reset(token)
+
+
+def needs_grad(*operands: ITensor | Scalar) -> bool:
+    """Whether an op on these operands has to be recorded
+
+    Args:
+        operands (ITensor | Scalar): Inputs of the op
+
+    Returns:
+        bool: True if recording is enabled and any input requires grad
+    """
+    return _grad_enabled.get() and any(
+        isinstance(x, ITensor) and x.requires_grad for x in operands)
+
+
+def requires_grad(x: ITensor | Scalar) -> bool:
+    """Whether a single op input needs a gradient"""
+    return isinstance(x, ITensor) and x.requires_grad
+
+
+def record(name: str,
+           out: ITensor,
+           inputs: Sequence[ITensor | Scalar],
+           backward: BackwardFn):
+    """Attach a node to the output of an op
+
+    Args:
+        name (str): Name of the op, for debugging
+        out (ITensor): Output of the op
+        inputs (Sequence[ITensor | Scalar]): Inputs of the op, in the
+            order 'backward' returns their gradients
+        backward (BackwardFn): Maps the output gradient to the input
+            gradients. Whatever it closes over is freed once it has run.
+    """
+    out.grad_fn = Node(name, inputs, backward)
+
+
+def backward(tensor: ITensor,
+             gradient: Optional[ITensor] = None,
+             retain_graph: bool = False):
+    """Accumulate the gradient of 'tensor' into every leaf it depends on
+
+    Nodes run in reverse topological order, each exactly once, after the
+    gradients from all of its consumers have been summed. Leaf gradients
+    are accumulated in place into their 'grad' buffer, which is allocated
+    on first use only.
+
+    Args:
+        tensor (ITensor): Output to differentiate
+        gradient (Optional[ITensor], optional): Gradient of 'tensor'.
+            Defaults to ones, only allowed for single element outputs.
+        retain_graph (bool, optional): Keep saved tensors around to
+            backward through the graph again. Defaults to False, which
+            frees them as soon as each node has run.
+    """
+    if not tensor.requires_grad:
+        raise RuntimeError("Tensor does not require grad")
+    if gradient is None:
+        if math.prod(tensor.shape) != 1:
+            raise RuntimeError("A gradient can only be implied for single "
+                               "element outputs")
+        gradient = tensor.__class__.with_list([1.0], tensor.shape,
+                                              tensor.dtype)
+    elif gradient.shape != tensor.shape:
+        raise ValueError(f"Gradient shape {gradient.shape} does not match "
+                         f"{tensor.shape}")
+
+    root = tensor.grad_fn
+    if root is None:
+        accumulate_grad(tensor, gradient)
+        return
+
+    # Gradients waiting for their node to run, with a flag telling whether
+    # the buffer belongs to the engine and may be accumulated into
+    pending: dict[Node, tuple[ITensor, bool]] = {root: (gradient, False)}
+    with no_grad():
+        for node in _topological_order(root):
+            if node not in pending:
+                continue
+            grads = node.apply(pending.pop(node)[0])
+            if not retain_graph:
+                node.release()
+            for edge, shape, grad in zip(node.next, node.shapes, grads):
+                if edge is None or grad is None:
+                    continue
+                grad = sum_to_shape(grad, shape)
+                if isinstance(edge, Node):
+                    if edge in pending:
+                        pending[edge] = (_accumulate(*pending[edge], grad),
+                                         True)
+                    else:
+                        pending[edge] = (grad, False)
+                else:
+                    accumulate_grad(edge, grad)
+
+
+def sum_to_shape(gradient: ITensor, shape: TensorShape) -> ITensor:
+    """Sum a broadcast gradient back down to the shape of an input
+
+    Args:
+        gradient (ITensor): Gradient with the broadcast shape
+        shape (TensorShape): Shape the input had before broadcasting
+
+    Returns:
+        ITensor: Gradient of shape 'shape'
+    """
+    if gradient.shape == shape:
+        return gradient
+
+    lead = gradient.rank - len(shape)
+    reduced = [i for i, dim in enumerate(gradient.shape)
+               if i < lead or (shape[i - lead] == 1 and dim != 1)]
+    kept = [i for i in range(lead, gradient.rank) if i not in reduced]
+
+    out = gradient.__class__.with_zeros(shape, gradient.dtype)
+    backend = get_backend()
+    if not kept:
+        flat = gradient.contiguous()
+        values = flat.data[flat.offset:flat.offset + math.prod(flat.shape)]
+        out.data[0] = (math.fsum(values) if gradient.dtype.is_floating
+                       else sum(values))
+        return out
+
+    # Each slice over the reduced dimensions is added into the output as
+    # a whole, so the work stays in the backend kernels. The kept
+    # dimensions are the only ones of 'out' longer than 1.
+    out_view = out.reshape(tuple(gradient.shape[i] for i in kept))
+    slices = gradient.permute(*reduced, *kept)
+    for idx in itertools.product(*(range(gradient.shape[i])
+                                   for i in reduced)):
+        backend.elementwise("add", (out_view, slices[idx]), out_view)
+    return out
+
+
+def accumulate_grad(leaf: ITensor, grad: ITensor):
+    """Add a gradient into a leaf's 'grad' buffer, in place
+
+    The buffer is allocated on first use and reused afterwards.
+
+    Args:
+        leaf (ITensor): Tensor owning the gradient, e.g. a parameter
+        grad (ITensor): Gradient of the same shape to add
+    """
+    if leaf.grad is None:
+        # Gradient buffers outlive any step, keep them out of the pool
+        with no_pool():
+            leaf.grad = leaf.__class__.with_zeros(leaf.shape, leaf.dtype)
+    get_backend().elementwise("add", (leaf.grad, grad), leaf.grad)
+
+
+def _edge(x: ITensor | Scalar) -> 'Node | ITensor | None':
+    if not isinstance(x, ITensor) or not x.requires_grad:
+        return None
+    return x.grad_fn if x.grad_fn is not None else x
+
+
+def _topological_order(root: Node) -> list[Node]:
+    # Iterative post-order DFS, deep graphs would overflow recursion
+    order: list[Node] = []
+    visited = {root}
+    stack = [(root, iter(root.next))]
+    while stack:
+        node, edges = stack[-1]
+        for edge in edges:
+            if isinstance(edge, Node) and edge not in visited:
+                visited.add(edge)
+                stack.append((edge, iter(edge.next)))
+                break
+        else:
+            stack.pop()
+            order.append(node)
+    order.reverse()
+    return order
+
+
+def _accumulate(acc: ITensor, owned: bool, grad: ITensor) -> ITensor:
+    # Only buffers the engine allocated are written to, gradients handed
+    # out by backward functions may alias other gradients
+    if not owned:
+        out = acc.__class__.empty(acc.shape,
+                                  promote_types(acc.dtype, grad.dtype))
+        get_backend().elementwise("add", (acc, grad), out)
+        return out
+    get_backend().elementwise("add", (acc, grad), acc)
+    return acc
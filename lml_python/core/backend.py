@@ -0,0 +1,124 @@
+import os
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from lml_python.core.interfaces import IBackend
+from lml_python.core.python_backend import PythonBackend
+
+ENV_VAR = "LML_BACKEND"
+DEFAULT_BACKEND = PythonBackend.name
+
+type BackendFactory = Callable[[], IBackend]
+
+
+def _numpy_factory() -> IBackend:
+    # Imported lazily so NumPy stays an optional dependency
+    from lml_python.core.numpy_backend import NumpyBackend
+    return NumpyBackend()
+
+
+def _parallel_factory() -> IBackend:
+    # Imported lazily, the parallel backend builds on Tensor which itself
+    # depends on this module
+    from lml_python.core.parallel import ParallelBackend
+    return ParallelBackend()
+
+
+_factories: dict[str, BackendFactory] = {
+    PythonBackend.name: PythonBackend,
+    "numpy": _numpy_factory,
+    "parallel": _parallel_factory,
+}
+_instances: dict[str, IBackend] = {}
+# The environment is read once, set_backend overrides it afterwards
+_process_backend: Optional[str] = os.environ.get(ENV_VAR)
+_context_backend: ContextVar[Optional[str]] = ContextVar(
+    "lml_backend", default=None)
+
+
+def register_backend(name: str, factory: BackendFactory):
+    """Make a backend available for selection
+
+    Args:
+        name (str): Name the backend is selected by
+        factory (BackendFactory): Called once, on first use, to build the
+            backend instance
+    """
+    _factories[name] = factory
+    _instances.pop(name, None)
+
+
+def available_backends() -> list[str]:
+    """Names of all registered backends
+
+    Returns:
+        list[str]: Registered backend names. Being registered does not
+            guarantee the backend's dependencies are installed.
+    """
+    return list(_factories)
+
+
+def load_backend(name: str) -> IBackend:
+    """Get the instance of a registered backend, building it if needed
+
+    Args:
+        name (str): Registered backend name
+
+    Returns:
+        IBackend: Backend instance
+    """
+    backend = _instances.get(name)
+    if backend is None:
+        if name not in _factories:
+            raise ValueError(f"Unknown backend '{name}', "
+                             f"available: {available_backends()}")
+        backend = _instances[name] = _factories[name]()
+    return backend
+
+
+def get_backend() -> IBackend:
+    """The backend ops should dispatch to
+
+    Resolution order is the innermost `use_backend` context, then
+    `set_backend` (initialised from the LML_BACKEND environment variable)
+    and finally the pure Python reference backend.
+
+    Returns:
+        IBackend: Active backend
+    """
+    name = _context_backend.get() or _process_backend or DEFAULT_BACKEND
+    return load_backend(name)
+
+
+def set_backend(name: Optional[str]):
+    """Select the backend for the whole process
+
+    Args:
+        name (Optional[str]): Registered backend name. None restores the
+            default backend.
+    """
+    global _process_backend
+    if name is not None:
+        load_backend(name)
+    _process_backend = name
+
+
+@contextmanager
+def use_backend(name: str) -> Iterator[IBackend]:
+    """Select a backend for the current context only
+
+    Nests, and is local to the current thread/asyncio task.
+
+    Args:
+        name (str): Registered backend name
+
+    Yields:
+        IBackend: The selected backend
+    """
+    backend = load_backend(name)
+    token = _context_backend.set(name)
+    try:
+        yield backend
+    finally:
+        _context_backend.reset(token)
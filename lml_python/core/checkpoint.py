@@ -0,0 +1,268 @@
+import math
+from collections.abc import Sequence
+from typing import NamedTuple, Optional
+from lml_python.core.autograd import (
+    enable_grad,
+    is_grad_enabled,
+    needs_grad,
+    no_grad,
+    record,
+    requires_grad,
+)
+from lml_python.core.dtype import DType
+from lml_python.core.interfaces import ILayer, ITensor, TensorShape
+from lml_python.core.layer import Sequential, _flatten
+from lml_python.core.memory import TensorPool
+from lml_python.core.tensor import Tensor
+
+
+class Checkpoint(ILayer):
+    """Runs a segment of layers without keeping its activations
+
+    The forward pass runs the segment under no_grad, so none of its
+    layers cache their input or output, and only the segment's input is
+    kept. Backward runs the segment forward again, this time caching, and
+    then backward through it. This trades one extra forward of the
+    segment for its activation memory.
+
+        model = Sequential(Checkpoint(*blocks[:4]), Checkpoint(*blocks[4:]),
+                           head)
+
+    Works with both `backward` of the layers and autograd on the output.
+    The layers must compute the same output when run twice, see
+    `plan_checkpoints` to choose the segments for a memory budget.
+    """
+    segment: Sequential
+    _input: Optional[ITensor]
+
+    def __init__(self, *layers: ILayer):
+        """Checkpoint a chain of layers
+
+        Args:
+            layers (ILayer): Layers of the segment, in order
+        """
+        self.segment = Sequential(*layers)
+        self._input = None
+
+    def forward(self, input: ITensor) -> ITensor:
+        if not is_grad_enabled():
+            return self.segment.forward(input)
+        with no_grad():
+            output = self.segment.forward(input)
+        self._input = input
+        if needs_grad(input, *self.parameters()):
+            def backward(g: ITensor) -> tuple[Optional[ITensor]]:
+                dx = self._recompute(input, g)
+                return (dx if requires_grad(input) else None,)
+
+            record("checkpoint", output, (input,), backward)
+        return output
+
+    def backward(self, gradient: ITensor) -> ITensor:
+        """Recompute the segment's activations and backward through it
+
+        Args:
+            gradient (ITensor): Gradient of the segment output
+
+        Returns:
+            ITensor: Gradient of the segment input
+        """
+        if self._input is None:
+            raise RuntimeError("backward() called without a forward() "
+                               "recording gradients")
+        return self._recompute(self._input, gradient)
+
+    def update(self, lr: float):
+        self.segment.update(lr)
+
+    def parameters(self) -> list[ITensor]:
+        return self.segment.parameters()
+
+    def _recompute(self, input: ITensor, gradient: ITensor) -> ITensor:
+        # Activations live only until the segment's backward has consumed
+        # them. The input is detached so the rerun does not extend the
+        # graph it came from.
+        self._input = None
+        with enable_grad():
+            self.segment.forward(input.detach())
+            return self.segment.backward(gradient)
+
+
+class CheckpointPlan(NamedTuple):
+    """Segments to checkpoint and the activation memory they need
+
+    Byte counts model what the layers keep alive for backward: the input
+    and the output of every layer, as traced for one input shape.
+    Temporaries inside a layer are not counted, see `measure_peak_bytes`.
+    """
+    # (start, stop) ranges of the flattened layers, each one checkpointed
+    segments: tuple[tuple[int, int], ...]
+    # Peak activation bytes without and with the checkpoints
+    baseline_bytes: int
+    peak_bytes: int
+    # Layers run twice per training step
+    recomputed_layers: int
+
+    def apply(self, model: Sequential) -> Sequential:
+        """Model running the same layers with the planned checkpoints
+
+        Layers are shared with 'model', not copied.
+
+        Args:
+            model (Sequential): Model the plan was made for
+
+        Returns:
+            Sequential: Flattened model with Checkpoint segments
+        """
+        layers = _flatten(model.layers)
+        out: list[ILayer] = []
+        position = 0
+        for start, stop in self.segments:
+            out.extend(layers[position:start])
+            out.append(Checkpoint(*layers[start:stop]))
+            position = stop
+        out.extend(layers[position:])
+        return Sequential(*out)
+
+    def summary(self) -> str:
+        """Peak activation memory with and without checkpointing"""
+        saved = 1 - self.peak_bytes / self.baseline_bytes
+        return (f"activations: {self.baseline_bytes / 1e6:.3f} MB without "
+                f"checkpoints, {self.peak_bytes / 1e6:.3f} MB with "
+                f"{len(self.segments)} ({saved:.0%} less, "
+                f"{self.recomputed_layers} layers recomputed)")
+
+
+def activation_bytes(model: Sequential,
+                     input_shape: TensorShape,
+                     dtype: Optional[DType] = None) -> list[int]:
+    """Bytes of the input and of every layer's output for one input shape
+
+    Traced by running the flattened layers once on zeros, under no_grad.
+
+    Args:
+        model (Sequential): Model to trace
+        input_shape (TensorShape): Shape of the input, with the batch
+        dtype (Optional[DType], optional): Element type of the input.
+            Defaults to DEFAULT_DTYPE.
+
+    Returns:
+        list[int]: Input bytes, then one entry per flattened layer
+    """
+    x = Tensor.with_zeros(tuple(input_shape), dtype)
+    sizes = [_nbytes(x)]
+    with no_grad():
+        for layer in _flatten(model.layers):
+            x = layer.forward(x)
+            sizes.append(_nbytes(x))
+    return sizes
+
+
+def peak_activation_bytes(sizes: Sequence[int],
+                          segments: Sequence[tuple[int, int]] = ()) -> int:
+    """Modelled peak of the activations kept for backward
+
+    A layer outside of any segment keeps its output until its backward
+    ran. A checkpointed segment keeps only its last output until its
+    backward recomputes the others. Backward visits the segments last
+    to first, so the peak is reached while recomputing one of them on
+    top of everything kept before it.
+
+    Args:
+        sizes (Sequence[int]): Output of `activation_bytes`
+        segments (Sequence[tuple[int, int]], optional): Sorted, disjoint
+            (start, stop) ranges of checkpointed layers. Defaults to none.
+
+    Returns:
+        int: Peak bytes
+    """
+    outputs = sizes[1:]
+    # (kept during forward, live while its backward runs) per unit
+    units: list[tuple[int, int]] = []
+    position = 0
+    for start, stop in segments:
+        units.extend((n, n) for n in outputs[position:start])
+        units.append((outputs[stop - 1], sum(outputs[start:stop])))
+        position = stop
+    units.extend((n, n) for n in outputs[position:])
+
+    peak = kept = sizes[0]
+    for forward, backward in units:
+        peak = max(peak, kept + backward)
+        kept += forward
+    return peak
+
+
+def plan_checkpoints(model: Sequential,
+                     input_shape: TensorShape,
+                     budget: int,
+                     dtype: Optional[DType] = None) -> CheckpointPlan:
+    """Choose the segments to checkpoint to fit an activation budget
+
+    Tries splitting the flattened layers into equal length segments, the
+    last one left as is since its backward runs first, and keeps the
+    split that fits 'budget' with the fewest recomputed layers. Segments
+    of about sqrt(layers) layers give the lowest peak.
+
+    Args:
+        model (Sequential): Model to plan for
+        input_shape (TensorShape): Shape of the input, with the batch
+        budget (int): Most bytes of activations to keep alive
+        dtype (Optional[DType], optional): Element type of the input.
+            Defaults to DEFAULT_DTYPE.
+
+    Raises:
+        ValueError: If no split fits the budget
+
+    Returns:
+        CheckpointPlan: Segments and their modelled peak
+    """
+    sizes = activation_bytes(model, input_shape, dtype)
+    count = len(sizes) - 1
+    baseline = peak_activation_bytes(sizes)
+    best = CheckpointPlan((), baseline, baseline, 0)
+    lowest = best
+    for length in range(2, count):
+        segments = tuple((start, start + length)
+                         for start in range(0, count - length, length))
+        peak = peak_activation_bytes(sizes, segments)
+        plan = CheckpointPlan(segments, baseline, peak,
+                              sum(stop - start for start, stop in segments))
+        if peak < lowest.peak_bytes:
+            lowest = plan
+        if peak <= budget and (best.peak_bytes > budget
+                               or plan.recomputed_layers
+                               < best.recomputed_layers):
+            best = plan
+    if best.peak_bytes > budget:
+        raise ValueError(f"No checkpointing fits {budget} bytes of "
+                         f"activations, the lowest peak is "
+                         f"{lowest.peak_bytes} bytes")
+    return best
+
+
+def measure_peak_bytes(model: ILayer, input: ITensor) -> int:
+    """Peak bytes allocated during one forward and backward pass
+
+    Runs the step with a fresh `TensorPool`, backward from a gradient of
+    ones through the layers' `backward`. Unlike the modelled peak this
+    includes temporaries, but not parameter gradients.
+
+    Args:
+        model (ILayer): Model to run
+        input (ITensor): Input batch
+
+    Returns:
+        int: Highest number of bytes live in the pool
+    """
+    pool = TensorPool()
+    with pool:
+        output = model.forward(input)
+        gradient = Tensor.full(output.shape, 1.0, output.dtype)
+        model.backward(gradient)
+        del output, gradient
+    return pool.peak_bytes
+
+
+def _nbytes(t: ITensor) -> int:
+    return math.prod(t.shape) * t.dtype.itemsize
@@ -0,0 +1,385 @@
+import itertools
+import math
+from collections.abc import Callable, Sequence
+from operator import add
+from typing import NamedTuple, Optional
+from lml_python.core.autograd import needs_grad, no_grad, record, requires_grad
+from lml_python.core.interfaces import UNARY_OPS, ITensor, TensorShape
+from lml_python.core.profiler import conv2d_flops, profiled
+from lml_python.core.tmath import (
+    activation_grad,
+    argmax,
+    fused,
+    matadd,
+    matdiv,
+    tdot,
+    tmax,
+    tmean,
+    tsum,
+)
+
+# Kernel, stride, padding or dilation: one value for both spatial
+# dimensions or a (height, width) pair
+type Size2d = int | tuple[int, int]
+
+
+class Window(NamedTuple):
+    """Geometry of a sliding window over NCHW inputs"""
+    kernel: tuple[int, int]
+    stride: tuple[int, int]
+    padding: tuple[int, int]
+    dilation: tuple[int, int]
+
+    @classmethod
+    def of(cls,
+           kernel: Size2d,
+           stride: Size2d = 1,
+           padding: Size2d = 0,
+           dilation: Size2d = 1) -> 'Window':
+        window = cls(*map(_pair, (kernel, stride, padding, dilation)))
+        if min(*window.kernel, *window.stride, *window.dilation) < 1:
+            raise ValueError("Kernel, stride and dilation must be positive")
+        if min(window.padding) < 0:
+            raise ValueError("Padding must not be negative")
+        return window
+
+    def output_size(self, height: int, width: int) -> tuple[int, int]:
+        """Spatial size of the output for an input of 'height' x 'width'"""
+        size = tuple(
+            (n + 2 * p - d * (k - 1) - 1) // s + 1
+            for n, k, s, p, d in zip((height, width), self.kernel,
+                                     self.stride, self.padding,
+                                     self.dilation))
+        if min(size) < 1:
+            raise ValueError(f"Window {self.kernel} does not fit an input "
+                             f"of {height}x{width} with padding "
+                             f"{self.padding}")
+        return size
+
+
+def im2col(x: ITensor, window: Window, fill: float = 0.0) -> ITensor:
+    """Every window position of an NCHW input, as a strided view
+
+    The result has shape (N, C, KH, KW, OH, OW): element
+    [n, c, i, j, y, x] is the input pixel under kernel tap (i, j) when the
+    window is at output position (y, x). No data is copied, overlapping
+    windows share the input's elements, unless the input is padded first.
+
+    Args:
+        x (ITensor): Input of shape (N, C, H, W)
+        window (Window): Kernel size, stride, padding and dilation
+        fill (float, optional): Value of the padding. Defaults to 0.0.
+
+    Returns:
+        ITensor: View of the windows
+    """
+    if x.rank != 4:
+        raise ValueError(f"Expected an NCHW input, got shape {x.shape}")
+    n, c, h, w = x.shape
+    oh, ow = window.output_size(h, w)
+    x = _pad(x, window.padding, fill)
+    s_n, s_c, s_h, s_w = x.strides
+    (sh, sw), (dh, dw) = window.stride, window.dilation
+    return x.as_strided((n, c, *window.kernel, oh, ow),
+                        (s_n, s_c, s_h * dh, s_w * dw, s_h * sh, s_w * sw))
+
+
+@profiled(conv2d_flops)
+def conv2d(x: ITensor,
+           w: ITensor,
+           b: Optional[ITensor] = None,
+           stride: Size2d = 1,
+           padding: Size2d = 0,
+           dilation: Size2d = 1,
+           activation: Optional[str] = None,
+           out: Optional[ITensor] = None) -> ITensor:
+    """2D convolution (cross-correlation) of NCHW inputs
+
+    Lowered to a single matrix multiplication through `im2col`: the
+    (C * KH * KW, N * OH * OW) matrix of windows is a view of the input,
+    which `tdot` only copies when its strides cannot be merged, e.g. for
+    kernels larger than 1x1. The product then runs on the matmul kernels
+    of the active backend. Bias and activation are applied in the single
+    pass that writes the NCHW output.
+
+    Args:
+        x (ITensor): Input of shape (N, C, H, W)
+        w (ITensor): Weights of shape (O, C, KH, KW)
+        b (Optional[ITensor], optional): Bias of shape (O,). Defaults to
+            None.
+        stride (Size2d, optional): Step of the window. Defaults to 1.
+        padding (Size2d, optional): Zeros added on every side. Defaults to
+            0.
+        dilation (Size2d, optional): Spacing of the kernel taps. Defaults
+            to 1.
+        activation (Optional[str], optional): Name of a unary op to apply,
+            e.g. "relu". Defaults to None.
+        out (Optional[ITensor], optional): Output of shape (N, O, OH, OW).
+            Defaults to None.
+
+    Returns:
+        ITensor: Output of shape (N, O, OH, OW)
+    """
+    if x.rank != 4 or w.rank != 4:
+        raise ValueError(f"Expected NCHW input and OCHW weights, got "
+                         f"shapes {x.shape} and {w.shape}")
+    if x.shape[1] != w.shape[1]:
+        raise ValueError(f"Input has {x.shape[1]} channels, weights "
+                         f"expect {w.shape[1]}")
+    if b is not None and b.shape != (w.shape[0],):
+        raise ValueError(f"Bias shape {b.shape} does not match "
+                         f"({w.shape[0]},)")
+    if activation is not None and activation not in UNARY_OPS:
+        raise ValueError(f"Unknown activation '{activation}'")
+    window = Window.of(w.shape[2:], stride, padding, dilation)
+
+    with no_grad():
+        cols = im2col(x, window)
+        # (O, N, OH, OW), written out as NCHW by the pass applying the
+        # bias and activation
+        y = tdot(w, cols, ([1, 2, 3], [1, 2, 3]))
+        y = y.permute(1, 0, 2, 3)
+        stages = []
+        if b is not None:
+            stages.append(("add", b.reshape((w.shape[0], 1, 1))))
+        if activation is not None:
+            stages.append(activation)
+        out = fused(y, *stages, out=out)
+
+    if needs_grad(x, w, b):
+        saved = out.detach() if activation is not None else None
+
+        def backward(g: ITensor) -> Sequence[Optional[ITensor]]:
+            if activation is not None:
+                g = activation_grad(activation, saved, g)
+            return conv2d_grads(x, w, g, window, b is not None,
+                                requires_grad(x))
+
+        record("conv2d", out, (x, w, b), backward)
+    return out
+
+
+def conv2d_grads(x: ITensor,
+                 w: ITensor,
+                 g: ITensor,
+                 window: Window,
+                 bias: bool = True,
+                 input: bool = True
+                 ) -> tuple[Optional[ITensor], ITensor, Optional[ITensor]]:
+    """Gradients of a convolution's input, weights and bias
+
+    Both products are single GEMMs over the windows of `im2col`, the
+    input gradient is scattered back onto the overlapping windows.
+
+    Args:
+        x (ITensor): Input of the convolution
+        w (ITensor): Its weights
+        g (ITensor): Gradient of its output, before any activation
+        window (Window): Its geometry
+        bias (bool, optional): Whether to compute the bias gradient.
+            Defaults to True.
+        input (bool, optional): Whether to compute the input gradient,
+            not needed for the first layer. Defaults to True.
+
+    Returns:
+        tuple[Optional[ITensor], ITensor, Optional[ITensor]]: dx, dw and
+            db
+    """
+    with no_grad():
+        cols = im2col(x, window)
+        dw = tdot(g, cols, ([0, 2, 3], [0, 4, 5]))
+        dx = None
+        if input:
+            # (C, KH, KW, N, OH, OW), one gradient per window element
+            dcols = tdot(w, g, ([0], [1]))
+            dx = _col2im(lambda i, j: dcols[:, i, j].permute(1, 0, 2, 3),
+                         x, window)
+        db = tsum(g, axis=(0, 2, 3)) if bias else None
+    return dx, dw, db
+
+
+@profiled()
+def max_pool2d(x: ITensor,
+               kernel: Size2d,
+               stride: Optional[Size2d] = None,
+               padding: Size2d = 0,
+               return_indices: bool = False
+               ) -> ITensor | tuple[ITensor, ITensor]:
+    """Largest element of every window of an NCHW input
+
+    Args:
+        x (ITensor): Input of shape (N, C, H, W)
+        kernel (Size2d): Window size
+        stride (Optional[Size2d], optional): Step of the window. Defaults
+            to the kernel size.
+        padding (Size2d, optional): Padding on every side, never the
+            maximum. Defaults to 0.
+        return_indices (bool, optional): Also return the position of the
+            maximum within every window, for `max_pool2d_grad`. Defaults
+            to False.
+
+    Returns:
+        ITensor | tuple[ITensor, ITensor]: Output of shape
+            (N, C, OH, OW), and the INT32 positions if requested
+    """
+    window = Window.of(kernel, kernel if stride is None else stride,
+                       padding)
+    fill = (-math.inf if x.dtype.is_floating
+            else -(1 << (8 * x.dtype.itemsize - 1)))
+    grad = needs_grad(x)
+    with no_grad():
+        # Windows flattened into the last axis, positions index them
+        cols = im2col(x, window, fill).permute(0, 1, 4, 5, 2, 3)
+        cols = cols.reshape((*cols.shape[:4], -1))
+        out = tmax(cols, axis=-1)
+        positions = None
+        if return_indices or grad:
+            positions = argmax(cols, axis=-1)
+    if grad:
+        def backward(g: ITensor) -> tuple[ITensor]:
+            return (max_pool2d_grad(x, positions, g, window),)
+
+        record("max_pool2d", out, (x,), backward)
+    if return_indices:
+        return out, positions
+    return out
+
+
+def max_pool2d_grad(x: ITensor,
+                    positions: ITensor,
+                    g: ITensor,
+                    window: Window) -> ITensor:
+    """Gradient of a max pooling's input
+
+    Args:
+        x (ITensor): Input of the pooling
+        positions (ITensor): Row-major position of the maximum within
+            every window, of the output's shape
+        g (ITensor): Gradient of the output
+        window (Window): Geometry of the pooling
+
+    Returns:
+        ITensor: Gradient routed to the maximum of every window
+    """
+    n, c, h, w = x.shape
+    oh, ow = g.shape[2:]
+    (kh, kw), (sh, sw), (ph, pw), (dh, dw) = window
+    width = w + 2 * pw
+    plane = (h + 2 * ph) * width
+    with no_grad():
+        grad = x.__class__.with_zeros((n, c, h + 2 * ph, width),
+                                      g.dtype)
+        # Flat index of every window's top left element, then of the tap
+        # holding its maximum
+        corners = [i * sh * width + j * sw
+                   for i in range(oh) for j in range(ow)]
+        starts = [p * plane + corner for p in range(n * c)
+                  for corner in corners]
+        taps = [i * dh * width + j * dw
+                for i in range(kh) for j in range(kw)]
+        positions = positions.contiguous()
+        index = positions.data[positions.offset:
+                               positions.offset + len(starts)]
+        grad.put(list(map(add, starts, map(taps.__getitem__, index))), g,
+                 accumulate=True)
+        return _crop(grad, x.shape, window.padding)
+
+
+@profiled()
+def avg_pool2d(x: ITensor,
+               kernel: Size2d,
+               stride: Optional[Size2d] = None,
+               padding: Size2d = 0) -> ITensor:
+    """Mean of every window of an NCHW input
+
+    Padding counts as zeros in the mean.
+
+    Args:
+        x (ITensor): Input of shape (N, C, H, W)
+        kernel (Size2d): Window size
+        stride (Optional[Size2d], optional): Step of the window. Defaults
+            to the kernel size.
+        padding (Size2d, optional): Zeros added on every side. Defaults
+            to 0.
+
+    Returns:
+        ITensor: Floating point output of shape (N, C, OH, OW)
+    """
+    window = Window.of(kernel, kernel if stride is None else stride,
+                       padding)
+    with no_grad():
+        cols = im2col(x, window).permute(0, 1, 4, 5, 2, 3)
+        out = tmean(cols, axis=(4, 5))
+    if needs_grad(x):
+        def backward(g: ITensor) -> tuple[ITensor]:
+            return (avg_pool2d_grad(x, g, window),)
+
+        record("avg_pool2d", out, (x,), backward)
+    return out
+
+
+def avg_pool2d_grad(x: ITensor, g: ITensor, window: Window) -> ITensor:
+    """Gradient of an average pooling's input
+
+    Args:
+        x (ITensor): Input of the pooling
+        g (ITensor): Gradient of the output
+        window (Window): Geometry of the pooling
+
+    Returns:
+        ITensor: Gradient shared evenly by the elements of every window
+    """
+    with no_grad():
+        share = matdiv(g, math.prod(window.kernel))
+        return _col2im(lambda i, j: share, x, window)
+
+
+def _pair(value: int | Sequence[int]) -> tuple[int, int]:
+    if isinstance(value, int):
+        return value, value
+    pair = tuple(value)
+    if len(pair) != 2:
+        raise ValueError(f"Expected an int or a pair, got {value}")
+    return pair
+
+
+def _pad(x: ITensor, padding: tuple[int, int], fill: float) -> ITensor:
+    # Copy of 'x' with 'fill' around its spatial dimensions
+    ph, pw = padding
+    if not ph and not pw:
+        return x
+    n, c, h, w = x.shape
+    padded = x.__class__.full((n, c, h + 2 * ph, w + 2 * pw), fill,
+                              x.dtype)
+    padded[:, :, ph:ph + h, pw:pw + w] = x
+    return padded
+
+
+def _crop(t: ITensor,
+          shape: TensorShape,
+          padding: tuple[int, int]) -> ITensor:
+    (ph, pw), (h, w) = padding, shape[2:]
+    if not ph and not pw:
+        return t
+    return t[:, :, ph:ph + h, pw:pw + w].contiguous()
+
+
+def _col2im(grad_of: Callable[[int, int], ITensor],
+            x: ITensor,
+            window: Window) -> ITensor:
+    # Adjoint of im2col: sums the gradient of every window element onto
+    # the input pixel it was read from. grad_of(i, j) is the (N, C, OH,
+    # OW) gradient of kernel tap (i, j), one add per tap.
+    n, c, h, w = x.shape
+    oh, ow = window.output_size(h, w)
+    (kh, kw), (sh, sw), (ph, pw), (dh, dw) = window
+    first = grad_of(0, 0)
+    grad = x.__class__.with_zeros((n, c, h + 2 * ph, w + 2 * pw),
+                                  first.dtype)
+    s_n, s_c, s_h, s_w = grad.strides
+    for i, j in itertools.product(range(kh), range(kw)):
+        taps = grad.as_strided((n, c, oh, ow),
+                               (s_n, s_c, s_h * sh, s_w * sw),
+                               i * dh * s_h + j * dw * s_w)
+        matadd(taps, first if i == j == 0 else grad_of(i, j), out=taps)
+    return _crop(grad, x.shape, window.padding)
@@ -0,0 +1,68 @@
+import array
+from enum import Enum
+
+
+class DType(Enum):
+    """Element type of a tensor's storage
+
+    Each member maps onto an `array.array` typecode so tensor data can be
+    held in a single contiguous, typed buffer instead of a list of boxed
+    Python objects.
+    """
+    FLOAT32 = "f"
+    FLOAT64 = "d"
+    INT32 = "i"
+    # Storage of quantized values, see lml_python.quant
+    INT8 = "b"
+
+    @property
+    def typecode(self) -> str:
+        return self.value
+
+    @property
+    def itemsize(self) -> int:
+        return array.array(self.value).itemsize
+
+    @property
+    def is_floating(self) -> bool:
+        return self in (DType.FLOAT32, DType.FLOAT64)
+
+    @classmethod
+    def from_typecode(cls, typecode: str) -> 'DType':
+        """Look up the dtype for an `array.array` typecode or buffer format
+
+        Args:
+            typecode (str): Typecode or struct format character
+
+        Returns:
+            DType: Matching dtype
+        """
+        try:
+            return cls(typecode.lstrip("@=<"))
+        except ValueError:
+            raise TypeError(f"Unsupported typecode '{typecode}'") from None
+
+
+DEFAULT_DTYPE = DType.FLOAT64
+
+
+def promote_types(a: DType, b: DType) -> DType:
+    """Result dtype of a binary operation between two dtypes
+
+    Floating point wins over integer and the wider type wins over the
+    narrower one.
+
+    Args:
+        a (DType): Left operand dtype
+        b (DType): Right operand dtype
+
+    Returns:
+        DType: Promoted dtype
+    """
+    if a == b:
+        return a
+    if DType.FLOAT64 in (a, b):
+        return DType.FLOAT64
+    if DType.FLOAT32 in (a, b):
+        return DType.FLOAT32
+    return DType.INT32
@@ -0,0 +1,293 @@
+import itertools
+import math
+from collections.abc import Sequence
+from typing import Optional
+from lml_python.core.autograd import needs_grad, record, sum_to_shape
+from lml_python.core.interfaces import ITensor, TensorShape
+from lml_python.core.profiler import profiled
+from lml_python.core.tmath import fused, matmul, _grouped_view
+
+# Expressions with up to this many operands get an exhaustive search of
+# contraction orders, larger ones a greedy one
+OPTIMAL_PATH_LIMIT = 6
+
+type ContractionPath = list[tuple[int, int]]
+
+
+@profiled()
+def einsum(subscripts: str,
+           *operands: ITensor,
+           optimize: bool = True,
+           out: Optional[ITensor] = None) -> ITensor:
+    """Einstein summation over any number of tensors
+
+    Subscripts name the axes of each operand, e.g. "bij,bjk->bik" is a
+    batched matrix product and "ij,jk,kl->il" a chain of them. Letters
+    shared by operands are multiplied together, letters missing from the
+    output are summed over and a letter repeated within one operand takes
+    the diagonal. Without "->" the output has every letter used exactly
+    once, in alphabetical order.
+
+    Operands are contracted two at a time, each contraction runs as one
+    (batched) matrix multiplication over strided views. With 3 or more
+    operands the order of contractions is planned by `einsum_path`.
+
+    Args:
+         subscripts (str): Axis labels, e.g. "ij,jk->ik"
+         operands (Tensor): One tensor per comma separated term
+         optimize (bool, optional): Plan the contraction order. Otherwise
+            operands are contracted left to right. Defaults to True.
+         out (Optional[Tensor], optional): Output tensor to store the
+            result in. Defaults to None.
+
+    Returns:
+         Tensor: Tensor containing the result.
+         If 'out' is provided it is overwritten and also returned.
+    """
+    inputs, output = _parse(subscripts, len(operands))
+    sizes = _label_sizes(inputs, [t.shape for t in operands])
+
+    if optimize and len(operands) > 2:
+        path, _ = _plan(inputs, output, sizes)
+    elif len(operands) > 1:
+        # Left to right, each result is appended at the end
+        path = [(0, 1)] + [(0, k) for k in range(len(operands) - 2, 0, -1)]
+    else:
+        path = []
+
+    terms = list(zip(operands, inputs))
+    for i, j in path:
+        (a, a_labels), (b, b_labels) = terms[i], terms[j]
+        rest = [labels for k, (_, labels) in enumerate(terms)
+                if k not in (i, j)]
+        keep = set(output).union(*rest)
+        terms = [t for k, t in enumerate(terms) if k not in (i, j)]
+        terms.append(_contract_pair(a, a_labels, b, b_labels, keep))
+
+    result, labels = terms[0]
+    result, labels = _reduce(result, labels, set(output))
+    result = result.permute(*(labels.index(label) for label in output))
+
+    if out is not None:
+        if out.shape != result.shape:
+            raise ValueError("Output tensor shape is not aligned")
+        return fused(result, out=out)
+    return result if result.is_contiguous() else result.contiguous()
+
+
+def einsum_path(subscripts: str,
+                *shapes: TensorShape) -> tuple[ContractionPath, int]:
+    """Plan the order in which einsum contracts its operands
+
+    Picks the pairwise contraction order with the fewest multiply-adds,
+    breaking ties on the total size of the intermediates. Every order is
+    tried for up to OPTIMAL_PATH_LIMIT operands, larger expressions
+    greedily contract the cheapest pair first.
+
+    e.g. for "ij,jk,k->i" with a (1000, 1000) and b (1000, 1000), (a @ b)
+    @ c costs 10^9 multiply-adds while a @ (b @ c) costs 2 * 10^6.
+
+    Args:
+         subscripts (str): Axis labels, as for `einsum`
+         shapes (TensorShape): Shape of each operand
+
+    Returns:
+         tuple[ContractionPath, int]: Pairs of positions to contract, in
+            order. After each step the pair is removed and the result is
+            appended to the operand list. The second element is the
+            total number of multiply-adds.
+    """
+    inputs, output = _parse(subscripts, len(shapes))
+    return _plan(inputs, output, _label_sizes(inputs, shapes))
+
+
+def _parse(subscripts: str, count: int) -> tuple[list[str], str]:
+    subscripts = subscripts.replace(" ", "")
+    if "->" in subscripts:
+        lhs, output = subscripts.split("->")
+    else:
+        lhs = subscripts
+        letters = lhs.replace(",", "")
+        output = "".join(sorted(c for c in set(letters)
+                                if letters.count(c) == 1))
+    inputs = lhs.split(",")
+
+    if len(inputs) != count:
+        raise ValueError(f"'{subscripts}' has {len(inputs)} terms but "
+                         f"{count} operands were given")
+    for label in subscripts.replace(",", "").replace("->", ""):
+        if not label.isalpha():
+            raise ValueError(f"Invalid subscript '{label}'")
+    if len(set(output)) != len(output):
+        raise ValueError(f"Output '{output}' repeats a subscript")
+    missing = set(output) - set(lhs)
+    if missing:
+        raise ValueError(f"Output subscripts {sorted(missing)} do not "
+                         "appear in any operand")
+    return inputs, output
+
+
+def _label_sizes(inputs: list[str],
+                 shapes: Sequence[TensorShape]) -> dict[str, int]:
+    sizes: dict[str, int] = {}
+    for labels, shape in zip(inputs, shapes):
+        if len(labels) != len(shape):
+            raise ValueError(f"'{labels}' does not match shape {shape}")
+        for label, dim in zip(labels, shape):
+            if sizes.setdefault(label, dim) != dim:
+                raise ValueError(f"Subscript '{label}' has sizes "
+                                 f"{sizes[label]} and {dim}")
+    return sizes
+
+
+def _plan(inputs: list[str],
+          output: str,
+          sizes: dict[str, int]) -> tuple[ContractionPath, int]:
+    terms = [frozenset(labels) for labels in inputs]
+    if len(terms) < 2:
+        return [], 0
+    if len(terms) <= OPTIMAL_PATH_LIMIT:
+        (flops, _), path = _optimal(tuple(terms), frozenset(output), sizes,
+                                    {})
+        return path, flops
+    return _greedy(terms, frozenset(output), sizes)
+
+
+def _pair_cost(terms: Sequence[frozenset],
+               i: int,
+               j: int,
+               output: frozenset,
+               sizes: dict[str, int]) -> tuple[int, int, frozenset]:
+    # Multiply-adds of contracting terms i and j, size of the result and
+    # its labels, which are those still needed by the output or another
+    # term
+    keep = output.union(*(t for k, t in enumerate(terms) if k not in (i, j)))
+    labels = terms[i] | terms[j]
+    result = labels & keep
+    return (math.prod(sizes[label] for label in labels),
+            math.prod(sizes[label] for label in result),
+            result)
+
+
+def _optimal(terms: tuple[frozenset, ...],
+             output: frozenset,
+             sizes: dict[str, int],
+             memo: dict) -> tuple[tuple[int, int], ContractionPath]:
+    # Exhaustive search, memoised on the remaining terms
+    if len(terms) == 1:
+        return (0, 0), []
+    if terms in memo:
+        return memo[terms]
+
+    best = None
+    for i, j in itertools.combinations(range(len(terms)), 2):
+        flops, size, result = _pair_cost(terms, i, j, output, sizes)
+        rest = tuple(t for k, t in enumerate(terms) if k not in (i, j))
+        (sub_flops, sub_size), sub_path = _optimal(rest + (result,),
+                                                   output, sizes, memo)
+        cost = (flops + sub_flops, size + sub_size)
+        if best is None or cost < best[0]:
+            best = (cost, [(i, j)] + sub_path)
+    memo[terms] = best
+    return best
+
+
+def _greedy(terms: list[frozenset],
+            output: frozenset,
+            sizes: dict[str, int]) -> tuple[ContractionPath, int]:
+    path = []
+    total = 0
+    while len(terms) > 1:
+        best = min(((_pair_cost(terms, i, j, output, sizes), (i, j))
+                    for i, j in itertools.combinations(range(len(terms)),
+                                                       2)),
+                   key=lambda c: c[0][:2])
+        (flops, _, result), (i, j) = best
+        path.append((i, j))
+        total += flops
+        terms = [t for k, t in enumerate(terms) if k not in (i, j)]
+        terms.append(result)
+    return path, total
+
+
+def _contract_pair(a: ITensor,
+                   a_labels: str,
+                   b: ITensor,
+                   b_labels: str,
+                   keep: set[str]) -> tuple[ITensor, str]:
+    # Labels only one side uses are summed out first, the rest becomes
+    # a single batched matrix product:
+    # (batch, free_a, contracted) @ (batch, contracted, free_b)
+    a, a_labels = _reduce(a, a_labels, keep | set(b_labels))
+    b, b_labels = _reduce(b, b_labels, keep | set(a_labels))
+
+    shared = [label for label in a_labels if label in b_labels]
+    batch = [label for label in shared if label in keep]
+    contracted = [label for label in shared if label not in keep]
+    free_a = [label for label in a_labels if label not in shared]
+    free_b = [label for label in b_labels if label not in shared]
+
+    a = a.permute(*(a_labels.index(label)
+                    for label in batch + free_a + contracted))
+    b = b.permute(*(b_labels.index(label)
+                    for label in batch + contracted + free_b))
+    groups = [1] * len(batch)
+    a_3d = _grouped_view(a, groups + [len(free_a), len(contracted)])
+    b_3d = _grouped_view(b, groups + [len(contracted), len(free_b)])
+
+    result = matmul(a_3d, b_3d)
+    shape = (*a.shape[:len(batch) + len(free_a)],
+             *b.shape[len(batch) + len(contracted):])
+    return result.reshape(shape), "".join(batch + free_a + free_b)
+
+
+def _reduce(t: ITensor, labels: str, keep: set[str]) -> tuple[ITensor, str]:
+    # Takes diagonals of repeated labels, then sums over labels not in
+    # 'keep'
+    for label in set(labels):
+        while labels.count(label) > 1:
+            first = labels.index(label)
+            second = labels.index(label, first + 1)
+            t = _diagonal(t, first, second)
+            labels = labels[:second] + labels[second + 1:]
+
+    summed = [i for i, label in enumerate(labels) if label not in keep]
+    if not summed:
+        return t, labels
+    kept = "".join(label for label in labels if label in keep)
+    return _sum_dims(t, summed), kept
+
+
+def _diagonal(t: ITensor, first: int, second: int) -> ITensor:
+    # Zero-copy view of the elements where both axes have the same index,
+    # kept in place of the first axis
+    if t.shape[first] != t.shape[second]:
+        raise ValueError("Repeated subscripts need axes of the same size")
+    shape = [d for i, d in enumerate(t.shape) if i != second]
+    strides = [s for i, s in enumerate(t.strides) if i != second]
+    strides[first] += t.strides[second]
+    view = t.as_strided(tuple(shape), strides)
+    if needs_grad(t):
+        cls, full_shape, dtype = t.__class__, t.shape, t.dtype
+
+        def backward(g: ITensor) -> tuple[ITensor]:
+            full = cls.with_zeros(full_shape, dtype)
+            fused(g, out=_diagonal(full, first, second))
+            return (full,)
+
+        record("diagonal", view, (t,), backward)
+    return view
+
+
+def _sum_dims(t: ITensor, dims: list[int]) -> ITensor:
+    keepdims = tuple(1 if i in dims else d for i, d in enumerate(t.shape))
+    summed = sum_to_shape(t, keepdims)
+    if summed is t:
+        summed = summed.as_strided(t.shape, t.strides)
+    shape = tuple(d for i, d in enumerate(t.shape) if i not in dims)
+    result = summed.reshape(shape)
+    if needs_grad(t):
+        full_shape = t.shape
+        record("sum", result, (t,),
+               lambda g: (g.reshape(keepdims).expand(full_shape),))
+    return result
@@ -0,0 +1,158 @@
+import math
+from collections.abc import Callable
+from typing import Optional
+from lml_python.core.dtype import DType
+from lml_python.core.interfaces import TensorShape
+from lml_python.core.rng import Generator
+from lml_python.core.tensor import Tensor
+
+# (shape, dtype, generator) -> initialised tensor, e.g. for Linear
+type Initializer = Callable[[TensorShape, Optional[DType],
+                             Optional[Generator]], Tensor]
+
+# Gain recommended for each activation, keeps the variance of the
+# activations steady from layer to layer
+_GAINS = {
+    None: 1.0,
+    "linear": 1.0,
+    "sigmoid": 1.0,
+    "tanh": 5.0 / 3.0,
+    "relu": math.sqrt(2.0),
+}
+
+
+def gain(activation: Optional[str] = None) -> float:
+    """Recommended scaling of the initial weights for an activation
+
+    Args:
+        activation (Optional[str], optional): Unary op following the
+            layer, None for no activation. Defaults to None.
+
+    Returns:
+        float: Gain
+    """
+    try:
+        return _GAINS[activation]
+    except KeyError:
+        raise ValueError(f"No gain known for activation '{activation}'") \
+            from None
+
+
+def fans(shape: TensorShape) -> tuple[int, int]:
+    """Number of inputs and outputs of each unit of a weight tensor
+
+    Rank 2 weights are (inputs, outputs) as in Linear. Higher ranks follow
+    the convolution layout (out_channels, in_channels, *kernel), every
+    kernel element counting as an input or output connection.
+
+    Args:
+        shape (TensorShape): Shape of the weights
+
+    Returns:
+        tuple[int, int]: fan_in and fan_out
+    """
+    if len(shape) < 2:
+        raise ValueError(f"Fans need at least 2 dimensions, got {shape}")
+    if len(shape) == 2:
+        return shape[0], shape[1]
+    receptive = math.prod(shape[2:])
+    return shape[1] * receptive, shape[0] * receptive
+
+
+def xavier_uniform(shape: TensorShape,
+                   dtype: Optional[DType] = None,
+                   generator: Optional[Generator] = None,
+                   activation: Optional[str] = None) -> Tensor:
+    """Glorot uniform initialisation
+
+    U(-a, a) with a = gain * sqrt(6 / (fan_in + fan_out)), suited to
+    symmetric activations like tanh.
+
+    Args:
+        shape (TensorShape): Shape of the weights
+        dtype (Optional[DType], optional): Element type. Defaults to
+            DEFAULT_DTYPE.
+        generator (Optional[Generator], optional): Source of the values.
+            Defaults to the default generator.
+        activation (Optional[str], optional): Activation the gain is
+            chosen for. Defaults to None.
+
+    Returns:
+        Tensor: Initialised weights
+    """
+    fan_in, fan_out = fans(shape)
+    bound = gain(activation) * math.sqrt(6.0 / (fan_in + fan_out))
+    return Tensor.with_uniform(shape, (-bound, bound), dtype, generator)
+
+
+def xavier_normal(shape: TensorShape,
+                  dtype: Optional[DType] = None,
+                  generator: Optional[Generator] = None,
+                  activation: Optional[str] = None) -> Tensor:
+    """Glorot normal initialisation
+
+    N(0, std^2) with std = gain * sqrt(2 / (fan_in + fan_out)).
+
+    Args:
+        shape (TensorShape): Shape of the weights
+        dtype (Optional[DType], optional): Element type. Defaults to
+            DEFAULT_DTYPE.
+        generator (Optional[Generator], optional): Source of the values.
+            Defaults to the default generator.
+        activation (Optional[str], optional): Activation the gain is
+            chosen for. Defaults to None.
+
+    Returns:
+        Tensor: Initialised weights
+    """
+    fan_in, fan_out = fans(shape)
+    std = gain(activation) * math.sqrt(2.0 / (fan_in + fan_out))
+    return Tensor.with_normal(shape, 0.0, std, dtype, generator)
+
+
+def kaiming_uniform(shape: TensorShape,
+                    dtype: Optional[DType] = None,
+                    generator: Optional[Generator] = None,
+                    activation: Optional[str] = "relu") -> Tensor:
+    """He uniform initialisation
+
+    U(-a, a) with a = gain * sqrt(3 / fan_in), suited to ReLU networks.
+
+    Args:
+        shape (TensorShape): Shape of the weights
+        dtype (Optional[DType], optional): Element type. Defaults to
+            DEFAULT_DTYPE.
+        generator (Optional[Generator], optional): Source of the values.
+            Defaults to the default generator.
+        activation (Optional[str], optional): Activation the gain is
+            chosen for. Defaults to "relu".
+
+    Returns:
+        Tensor: Initialised weights
+    """
+    bound = gain(activation) * math.sqrt(3.0 / fans(shape)[0])
+    return Tensor.with_uniform(shape, (-bound, bound), dtype, generator)
+
+
+def kaiming_normal(shape: TensorShape,
+                   dtype: Optional[DType] = None,
+                   generator: Optional[Generator] = None,
+                   activation: Optional[str] = "relu") -> Tensor:
+    """He normal initialisation
+
+    N(0, std^2) with std = gain / sqrt(fan_in).
+
+    Args:
+        shape (TensorShape): Shape of the weights
+        dtype (Optional[DType], optional): Element type. Defaults to
+            DEFAULT_DTYPE.
+        generator (Optional[Generator], optional): Source of the values.
+            Defaults to the default generator.
+        activation (Optional[str], optional): Activation the gain is
+            chosen for. Defaults to "relu".
+
+    Returns:
+        Tensor: Initialised weights
+    """
+    std = gain(activation) / math.sqrt(fans(shape)[0])
+    return Tensor.with_normal(shape, 0.0, std, dtype, generator)
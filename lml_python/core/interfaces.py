@@ -1,21 +1,38 @@
+import array
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Sequence
+from typing import Optional
+from lml_python.core.dtype import DType
+from lml_python.core.rng import Generator
 
-type TensorData = list[float]
+type TensorData = array.array | memoryview
 type TensorShape = tuple[int, ...]
 type TensorTarget = tuple[int, ...]
+type TensorKey = int | slice | tuple[int | slice, ...]
+type Scalar = float | int
+# Many indices at once, an integer tensor or a flat sequence of ints
+type TensorIndices = ITensor | Sequence[int]
+# (backend, input, out), see ILayer.inference_kernel
+type InferenceKernel = Callable[[IBackend, ITensor, ITensor], None]
 
 
 class ITensor(ABC):
+    # Storage holds only the non-zero elements, see core.sparse
+    is_sparse: bool = False
+
     @abstractmethod
-    def __init__(self, data: TensorData, shape: TensorShape):
+    def __init__(self,
+                 data: TensorData,
+                 shape: TensorShape,
+                 dtype: Optional[DType] = None):
         pass
 
     @abstractmethod
-    def __getitem__(self, key: TensorTarget) -> float:
+    def __getitem__(self, key: TensorKey) -> 'float | ITensor':
         pass
 
     @abstractmethod
-    def __setitem__(self, key: TensorTarget, value: float):
+    def __setitem__(self, key: TensorKey, value: 'float | ITensor'):
         pass
 
     @abstractmethod
@@ -27,7 +44,19 @@ class ITensor(ABC):
         pass
 
     @abstractmethod
-    def __add__(self, other: 'ITensor') -> 'ITensor':
+    def __add__(self, other: 'ITensor | Scalar') -> 'ITensor':
+        pass
+
+    @abstractmethod
+    def __sub__(self, other: 'ITensor | Scalar') -> 'ITensor':
+        pass
+
+    @abstractmethod
+    def __mul__(self, other: 'ITensor | Scalar') -> 'ITensor':
+        pass
+
+    @abstractmethod
+    def __truediv__(self, other: 'ITensor | Scalar') -> 'ITensor':
         pass
 
     @abstractmethod
@@ -49,27 +78,194 @@ class ITensor(ABC):
     def rank(self) -> int:
         pass
 
+    @property
+    @abstractmethod
+    def dtype(self) -> DType:
+        pass
+
+    @property
+    @abstractmethod
+    def strides(self) -> tuple[int, ...]:
+        pass
+
+    @property
+    @abstractmethod
+    def offset(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def requires_grad(self) -> bool:
+        pass
+
+    @requires_grad.setter
+    @abstractmethod
+    def requires_grad(self, value: bool):
+        pass
+
+    @property
+    @abstractmethod
+    def grad(self) -> Optional['ITensor']:
+        pass
+
+    @grad.setter
+    @abstractmethod
+    def grad(self, value: Optional['ITensor']):
+        pass
+
+    @property
+    @abstractmethod
+    def grad_fn(self):
+        pass
+
+    @grad_fn.setter
+    @abstractmethod
+    def grad_fn(self, node):
+        pass
+
+    @abstractmethod
+    def backward(self,
+                 gradient: Optional['ITensor'] = None,
+                 retain_graph: bool = False):
+        pass
+
     @abstractmethod
     def reshape(self, shape: TensorShape) -> 'ITensor':
         pass
 
+    @abstractmethod
+    def transpose(self, dim0: int = -2, dim1: int = -1) -> 'ITensor':
+        pass
+
+    @abstractmethod
+    def permute(self, *dims: int) -> 'ITensor':
+        pass
+
+    @abstractmethod
+    def expand(self, shape: TensorShape) -> 'ITensor':
+        pass
+
+    @abstractmethod
+    def as_strided(self,
+                   shape: TensorShape,
+                   strides: Sequence[int],
+                   offset: Optional[int] = None) -> 'ITensor':
+        pass
+
+    @abstractmethod
+    def take(self,
+             indices: TensorIndices,
+             axis: Optional[int] = None) -> 'ITensor':
+        pass
+
+    @abstractmethod
+    def put(self,
+            indices: TensorIndices,
+            values: 'ITensor | Scalar',
+            accumulate: bool = False):
+        pass
+
+    @abstractmethod
+    def gather(self, axis: int, index: TensorIndices) -> 'ITensor':
+        pass
+
+    @abstractmethod
+    def scatter(self,
+                axis: int,
+                index: TensorIndices,
+                src: 'ITensor | Scalar',
+                accumulate: bool = False):
+        pass
+
+    @abstractmethod
+    def set_storage(self,
+                    data: TensorData,
+                    offset: int = 0,
+                    strides: Optional[Sequence[int]] = None):
+        pass
+
+    @abstractmethod
+    def is_contiguous(self) -> bool:
+        pass
+
+    @abstractmethod
+    def contiguous(self) -> 'ITensor':
+        pass
+
+    @classmethod
+    @abstractmethod
+    def with_list(cls,
+                  data: list,
+                  shape: TensorShape,
+                  dtype: Optional[DType] = None) -> 'ITensor':
+        pass
+
+    @classmethod
+    @abstractmethod
+    def with_zeros(cls,
+                   shape: TensorShape,
+                   dtype: Optional[DType] = None) -> 'ITensor':
+        pass
+
+    @classmethod
+    @abstractmethod
+    def empty(cls,
+              shape: TensorShape,
+              dtype: Optional[DType] = None) -> 'ITensor':
+        pass
+
     @classmethod
     @abstractmethod
-    def with_list(cls, data: TensorData, shape: TensorShape) -> 'ITensor':
+    def full(cls,
+             shape: TensorShape,
+             value: Scalar,
+             dtype: Optional[DType] = None) -> 'ITensor':
         pass
 
     @classmethod
     @abstractmethod
-    def with_zeros(cls, shape: TensorShape) -> 'ITensor':
+    def arange(cls,
+               start: Scalar,
+               stop: Optional[Scalar] = None,
+               step: Scalar = 1,
+               dtype: Optional[DType] = None) -> 'ITensor':
         pass
 
     @classmethod
     @abstractmethod
-    def with_uniform(cls, shape: TensorShape, low: float, high: float) -> 'ITensor':
+    def eye(cls,
+            n: int,
+            m: Optional[int] = None,
+            dtype: Optional[DType] = None) -> 'ITensor':
+        pass
+
+    @classmethod
+    @abstractmethod
+    def with_uniform(cls,
+                     shape: TensorShape,
+                     uniform_range: tuple[float, float],
+                     dtype: Optional[DType] = None,
+                     generator: Optional[Generator] = None) -> 'ITensor':
+        pass
+
+    @classmethod
+    @abstractmethod
+    def with_normal(cls,
+                    shape: TensorShape,
+                    mean: float = 0.0,
+                    std: float = 1.0,
+                    dtype: Optional[DType] = None,
+                    generator: Optional[Generator] = None) -> 'ITensor':
         pass
 
 
 class ILayer(ABC):
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Imported here, the profiler itself builds on these interfaces
+        from lml_python.core.profiler import instrument_layer
+        instrument_layer(cls)
+
     @abstractmethod
     def __init__(self):
         pass
@@ -81,3 +277,126 @@ class ILayer(ABC):
     @abstractmethod
     def backward(self, gradient: ITensor) -> ITensor:
         pass
+
+    @abstractmethod
+    def parameters(self) -> list[ITensor]:
+        pass
+
+    # Whether the inference kernel may write its output over its input
+    in_place: bool = False
+
+    def inference_kernel(self) -> Optional[InferenceKernel]:
+        """Inference forward pass writing into a preallocated output
+
+        Used by compiled models, which run the kernel with the active
+        backend, the input and the output tensor. Layers without a kernel
+        run `forward` instead.
+
+        Returns:
+            Optional[InferenceKernel]: Kernel, or None
+        """
+        return None
+
+
+# Element-wise op vocabulary shared by tmath and every backend
+UNARY_OPS = frozenset({"neg", "relu", "tanh", "sigmoid", "heaviside",
+                       "sqrt", "exp", "log"})
+BINARY_OPS = frozenset({"add", "sub", "mul", "div"})
+# Reductions over the last dimension, arg* ops produce indices
+REDUCE_OPS = frozenset({"sum", "max", "min", "argmax", "argmin"})
+
+
+class IBackend(ABC):
+    """Compute kernels that the tmath and vmath entry points dispatch to
+
+    Entry points validate their arguments and allocate outputs, backends
+    only ever receive well formed operands and write into 'out'.
+    """
+    name: str
+
+    @abstractmethod
+    def matmul(self, a: ITensor, b: ITensor, out: ITensor, pack_b: bool):
+        """Matrix product of 2D operands
+
+        Products accumulate in the type of 'out', which may be wider than
+        that of the operands, e.g. int8 operands into int32.
+        """
+        pass
+
+    @abstractmethod
+    def batched_matmul(self, a: ITensor, b: ITensor, out: ITensor):
+        """Matrix product over the last two dimensions of every batch
+
+        Operands already share the batch dimensions of 'out', broadcast
+        ones have a stride of 0.
+        """
+        pass
+
+    @abstractmethod
+    def spmm(self,
+             indptr: Sequence[int],
+             indices: Sequence[int],
+             values: TensorData,
+             b: ITensor,
+             out: ITensor):
+        """Product of a CSR matrix and a dense 2D operand
+
+        Row i of the sparse matrix holds values[indptr[i]:indptr[i + 1]]
+        in the columns indices[indptr[i]:indptr[i + 1]]. Work and memory
+        must be proportional to the non-zeros, not the sparse shape.
+        """
+        pass
+
+    @abstractmethod
+    def elementwise(self,
+                    op: str,
+                    operands: Sequence['ITensor | Scalar'],
+                    out: ITensor):
+        """Apply a named element-wise op, broadcasting operands to 'out'
+
+        Operands are already validated to broadcast to the shape of 'out'.
+        """
+        pass
+
+    @abstractmethod
+    def fused(self,
+              ops: Sequence[str],
+              operands: Sequence['ITensor | Scalar'],
+              out: ITensor):
+        """Apply a chain of element-wise ops in a single pass
+
+        The first operand feeds the first op, every binary op consumes the
+        next operand as its right hand side.
+        """
+        pass
+
+    @abstractmethod
+    def linear(self,
+               x: ITensor,
+               w: ITensor,
+               bias: Optional[ITensor],
+               activation: Optional[str],
+               out: ITensor):
+        """x @ w + bias followed by an optional unary activation"""
+        pass
+
+    @abstractmethod
+    def reduce(self, op: str, a: ITensor, out: ITensor):
+        """Reduce the last dimension of 'a' with one of REDUCE_OPS
+
+        'a' has the shape of 'out' plus the reduced dimension, which is
+        never empty for "max", "min", "argmax" and "argmin". Floating
+        point sums must not lose accuracy as the dimension grows.
+        """
+        pass
+
+    @abstractmethod
+    def softmax(self, a: ITensor, log: bool, out: ITensor):
+        """Numerically stable softmax, or log-softmax, over the last
+        dimension of 'a', which has the shape of 'out'
+        """
+        pass
+
+    @abstractmethod
+    def dot(self, a: Sequence, b: Sequence) -> float | int:
+        pass
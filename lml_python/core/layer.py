@@ -1,39 +1,560 @@
-from tensor import Tensor
+import math
+from collections.abc import Sequence
+from typing import NamedTuple, Optional
+from lml_python.core.autograd import (
+    accumulate_grad,
+    is_grad_enabled,
+    no_grad,
+    sum_to_shape,
+)
+from lml_python.core.conv import (
+    Size2d,
+    Window,
+    avg_pool2d,
+    avg_pool2d_grad,
+    conv2d,
+    conv2d_grads,
+    max_pool2d,
+    max_pool2d_grad,
+)
+from lml_python.core.init import Initializer, kaiming_uniform
+from lml_python.core.tensor import Tensor
 from lml_python.core.tmath import (
+    activation_grad,
+    fused,
+    linear,
     matmul,
-    matadd
+    relu,
 )
+from lml_python.core.backend import get_backend
+from lml_python.core.dtype import DType
 from lml_python.core.interfaces import (
     ILayer,
     ITensor,
+    InferenceKernel,
+    TensorShape,
 )
+from lml_python.core.layout import contiguous_strides
+from lml_python.core.memory import no_pool
+from lml_python.core.profiler import profiled
+from lml_python.core.rng import Generator
 
 
 class Linear(ILayer):
     _weights: ITensor
     _bias: ITensor
+    _activation: Optional[str]
+    _input: Optional[ITensor]
+    _output: Optional[ITensor]
+
+    def __init__(self,
+                 input_size: int,
+                 output_size: int,
+                 activation: Optional[str] = None,
+                 initializer: Optional[Initializer] = None,
+                 generator: Optional[Generator] = None):
+        """Fully connected layer, y = activation(x @ W + b)
+
+        Args:
+            input_size (int): Number of input features
+            output_size (int): Number of output features
+            activation (Optional[str], optional): Unary op fused into the
+                output write, e.g. "relu". Defaults to None.
+            initializer (Optional[Initializer], optional): Creates the
+                weights, e.g. `init.kaiming_uniform`, the bias then starts
+                at zero. Defaults to None, weights and bias drawn from
+                U(-1, 1).
+            generator (Optional[Generator], optional): Source of the
+                initial values. Defaults to the default generator.
+        """
+        if initializer is not None:
+            self._weights = initializer((input_size, output_size), None,
+                                        generator)
+            self._bias = Tensor.full((output_size,), 0.0)
+        else:
+            self._weights = Tensor.with_uniform(
+                (input_size, output_size), (-1.0, 1.0), generator=generator)
+            self._bias = Tensor.with_uniform((output_size,), (-1.0, 1.0),
+                                             generator=generator)
+        self._weights.requires_grad = True
+        self._bias.requires_grad = True
+        self._activation = activation
+        self._input = None
+        self._output = None
+
+    def forward(self, input: ITensor) -> ITensor:
+        output = linear(input, self._weights, self._bias, self._activation)
+        if is_grad_enabled():
+            # Kept for backward(), nothing is cached under no_grad()
+            self._input = input
+            self._output = output
+        return output
+
+    def backward(self, gradient: ITensor) -> ITensor:
+        """Accumulate parameter gradients and return the input gradient
+
+        Uses the input and output cached by the last forward, and frees
+        them.
+
+        Args:
+            gradient (ITensor): Gradient of the layer output
+
+        Returns:
+            ITensor: Gradient of the layer input
+        """
+        if self._input is None:
+            raise RuntimeError("backward() called without a forward() "
+                               "recording gradients")
+        x, output = self._input, self._output
+        self._input = self._output = None
+        with no_grad():
+            if self._activation is not None:
+                gradient = activation_grad(self._activation, output,
+                                           gradient)
+            accumulate_grad(self._weights,
+                            matmul(x.transpose(), gradient))
+            accumulate_grad(self._bias,
+                            sum_to_shape(gradient, self._bias.shape))
+            return matmul(gradient, self._weights.transpose())
+
+    def update(self, lr: float):
+        """Take a gradient descent step and zero the gradients
 
-    def __init__(self, input_size: int, output_size: int):
-        self._weights = Tensor.with_uniform(
-            (input_size, output_size), (-1.0, 1.0))
-        self._bias = Tensor.with_uniform((output_size,), (-1.0, 1.0))
+        Args:
+            lr (float): Learning rate
+        """
+        _descend(self.parameters(), lr)
+
+    def parameters(self) -> list[ITensor]:
+        return [self._weights, self._bias]
+
+    def inference_kernel(self) -> InferenceKernel:
+        w, b, activation = self._weights, self._bias, self._activation
+        return lambda backend, x, out: backend.linear(x, w, b, activation,
+                                                      out)
+
+
+class ReLU(ILayer):
+    _output: Optional[ITensor]
+    in_place = True
+
+    def __init__(self):
+        self._output = None
 
     def forward(self, input: ITensor) -> ITensor:
-        out = Tensor.with_zeros((input.shape[0], self._bias.shape[0]))
-        return matadd(matmul(input, self._weights, out), self._bias, out)
+        output = relu(input)
+        if is_grad_enabled():
+            self._output = output
+        return output
 
     def backward(self, gradient: ITensor) -> ITensor:
+        if self._output is None:
+            raise RuntimeError("backward() called without a forward() "
+                               "recording gradients")
+        output, self._output = self._output, None
+        with no_grad():
+            return activation_grad("relu", output, gradient)
+
+    def update(self, lr: float):
         pass
 
+    def parameters(self) -> list[ITensor]:
+        return []
+
+    def inference_kernel(self) -> InferenceKernel:
+        return lambda backend, x, out: backend.elementwise("relu", (x,), out)
+
+
+class Conv2d(ILayer):
+    _weights: ITensor
+    _bias: Optional[ITensor]
+    _activation: Optional[str]
+    _window: Window
+    _input: Optional[ITensor]
+    _output: Optional[ITensor]
+
+    def __init__(self,
+                 in_channels: int,
+                 out_channels: int,
+                 kernel_size: Size2d,
+                 stride: Size2d = 1,
+                 padding: Size2d = 0,
+                 dilation: Size2d = 1,
+                 activation: Optional[str] = None,
+                 bias: bool = True,
+                 initializer: Optional[Initializer] = None,
+                 generator: Optional[Generator] = None):
+        """2D convolution over NCHW inputs, see `conv.conv2d`
+
+        Args:
+            in_channels (int): Channels of the input
+            out_channels (int): Channels of the output, one filter each
+            kernel_size (Size2d): Height and width of the filters
+            stride (Size2d, optional): Step of the filters. Defaults to 1.
+            padding (Size2d, optional): Zeros added on every side of the
+                input. Defaults to 0.
+            dilation (Size2d, optional): Spacing of the filter taps.
+                Defaults to 1.
+            activation (Optional[str], optional): Unary op fused into the
+                output write, e.g. "relu". Defaults to None.
+            bias (bool, optional): Add a learned bias per output channel.
+                Defaults to True.
+            initializer (Optional[Initializer], optional): Creates the
+                (out, in, KH, KW) weights. Defaults to
+                `init.kaiming_uniform`, U(-1, 1) would saturate the large
+                fan-in of a convolution.
+            generator (Optional[Generator], optional): Source of the
+                initial values. Defaults to the default generator.
+        """
+        self._window = Window.of(kernel_size, stride, padding, dilation)
+        initializer = initializer or kaiming_uniform
+        self._weights = initializer(
+            (out_channels, in_channels, *self._window.kernel), None,
+            generator)
+        self._weights.requires_grad = True
+        self._bias = None
+        if bias:
+            self._bias = Tensor.full((out_channels,), 0.0)
+            self._bias.requires_grad = True
+        self._activation = activation
+        self._input = None
+        self._output = None
+
+    def forward(self, input: ITensor) -> ITensor:
+        output = self._run(input, None)
+        if is_grad_enabled():
+            self._input = input
+            self._output = output
+        return output
+
+    def backward(self, gradient: ITensor) -> ITensor:
+        """Accumulate parameter gradients and return the input gradient
+
+        Args:
+            gradient (ITensor): Gradient of the layer output
+
+        Returns:
+            ITensor: Gradient of the layer input
+        """
+        if self._input is None:
+            raise RuntimeError("backward() called without a forward() "
+                               "recording gradients")
+        x, output = self._input, self._output
+        self._input = self._output = None
+        with no_grad():
+            if self._activation is not None:
+                gradient = activation_grad(self._activation, output,
+                                           gradient)
+            dx, dw, db = conv2d_grads(x, self._weights, gradient,
+                                      self._window, self._bias is not None)
+            accumulate_grad(self._weights, dw)
+            if db is not None:
+                accumulate_grad(self._bias, db)
+            return dx
+
+    def update(self, lr: float):
+        """Take a gradient descent step and zero the gradients
+
+        Args:
+            lr (float): Learning rate
+        """
+        _descend(self.parameters(), lr)
+
+    def parameters(self) -> list[ITensor]:
+        if self._bias is None:
+            return [self._weights]
+        return [self._weights, self._bias]
+
+    def inference_kernel(self) -> InferenceKernel:
+        return lambda backend, x, out: self._run(x, out)
+
+    def _run(self, x: ITensor, out: Optional[ITensor]) -> ITensor:
+        _, (sh, sw), (ph, pw), (dh, dw) = self._window
+        return conv2d(x, self._weights, self._bias, (sh, sw), (ph, pw),
+                      (dh, dw), self._activation, out)
+
+
+class MaxPool2d(ILayer):
+    _window: Window
+    _input: Optional[ITensor]
+    _positions: Optional[ITensor]
+
+    def __init__(self,
+                 kernel_size: Size2d,
+                 stride: Optional[Size2d] = None,
+                 padding: Size2d = 0):
+        """Largest element of every window, see `conv.max_pool2d`
+
+        Args:
+            kernel_size (Size2d): Height and width of the windows
+            stride (Optional[Size2d], optional): Step of the windows.
+                Defaults to the kernel size, windows do not overlap.
+            padding (Size2d, optional): Padding on every side of the
+                input. Defaults to 0.
+        """
+        self._window = Window.of(kernel_size,
+                                 kernel_size if stride is None else stride,
+                                 padding)
+        self._input = None
+        self._positions = None
+
+    def forward(self, input: ITensor) -> ITensor:
+        kernel, stride, padding, _ = self._window
+        if not is_grad_enabled():
+            return max_pool2d(input, kernel, stride, padding)
+        output, self._positions = max_pool2d(input, kernel, stride,
+                                             padding, return_indices=True)
+        self._input = input
+        return output
+
+    def backward(self, gradient: ITensor) -> ITensor:
+        if self._input is None:
+            raise RuntimeError("backward() called without a forward() "
+                               "recording gradients")
+        x, positions = self._input, self._positions
+        self._input = self._positions = None
+        return max_pool2d_grad(x, positions, gradient, self._window)
+
     def update(self, lr: float):
         pass
 
-class ReLU(ILayer):
+    def parameters(self) -> list[ITensor]:
+        return []
+
+
+class AvgPool2d(ILayer):
+    _window: Window
+    _input: Optional[ITensor]
+
+    def __init__(self,
+                 kernel_size: Size2d,
+                 stride: Optional[Size2d] = None,
+                 padding: Size2d = 0):
+        """Mean of every window, see `conv.avg_pool2d`
+
+        Args:
+            kernel_size (Size2d): Height and width of the windows
+            stride (Optional[Size2d], optional): Step of the windows.
+                Defaults to the kernel size, windows do not overlap.
+            padding (Size2d, optional): Zeros added on every side of the
+                input. Defaults to 0.
+        """
+        self._window = Window.of(kernel_size,
+                                 kernel_size if stride is None else stride,
+                                 padding)
+        self._input = None
+
     def forward(self, input: ITensor) -> ITensor:
+        kernel, stride, padding, _ = self._window
+        if is_grad_enabled():
+            self._input = input
+        return avg_pool2d(input, kernel, stride, padding)
+
+    def backward(self, gradient: ITensor) -> ITensor:
+        if self._input is None:
+            raise RuntimeError("backward() called without a forward() "
+                               "recording gradients")
+        x, self._input = self._input, None
+        return avg_pool2d_grad(x, gradient, self._window)
+
+    def update(self, lr: float):
         pass
 
+    def parameters(self) -> list[ITensor]:
+        return []
+
+
+class Flatten(ILayer):
+    """Merges every dimension after the batch, e.g. from Conv2d to Linear"""
+    _shape: Optional[TensorShape]
+
+    def __init__(self):
+        self._shape = None
+
+    def forward(self, input: ITensor) -> ITensor:
+        if is_grad_enabled():
+            self._shape = input.shape
+        return input.reshape((input.shape[0], math.prod(input.shape[1:])))
+
     def backward(self, gradient: ITensor) -> ITensor:
+        if self._shape is None:
+            raise RuntimeError("backward() called without a forward() "
+                               "recording gradients")
+        shape, self._shape = self._shape, None
+        return gradient.reshape(shape)
+
+    def update(self, lr: float):
         pass
 
+    def parameters(self) -> list[ITensor]:
+        return []
+
+
+class Sequential(ILayer):
+    layers: list[ILayer]
+
+    def __init__(self, *layers: ILayer):
+        """Chain of layers, each one's output is the next one's input
+
+        Args:
+            layers (ILayer): Layers in the order they are applied
+        """
+        self.layers = list(layers)
+
+    def forward(self, input: ITensor) -> ITensor:
+        for layer in self.layers:
+            input = layer.forward(input)
+        return input
+
+    def backward(self, gradient: ITensor) -> ITensor:
+        for layer in reversed(self.layers):
+            gradient = layer.backward(gradient)
+        return gradient
+
     def update(self, lr: float):
-        pass
\ No newline at end of file
+        for layer in self.layers:
+            # Not every layer has parameters to update, e.g. Pooled
+            update = getattr(layer, "update", None)
+            if update is not None:
+                update(lr)
+
+    def parameters(self) -> list[ITensor]:
+        return [p for layer in self.layers for p in layer.parameters()]
+
+    def compile(self,
+                input_shape: TensorShape,
+                dtype: Optional[DType] = None) -> 'CompiledModel':
+        """Plan inference for a fixed input shape
+
+        See `CompiledModel`.
+
+        Args:
+            input_shape (TensorShape): Shape of every input
+            dtype (Optional[DType], optional): Element type of every
+                input. Defaults to DEFAULT_DTYPE.
+
+        Returns:
+            CompiledModel: Model running inference without allocating
+        """
+        return CompiledModel(self, input_shape, dtype)
+
+
+class _Step(NamedTuple):
+    layer: ILayer
+    kernel: Optional[InferenceKernel]
+    # Arena view the step writes to, None for layers without a kernel
+    out: Optional[ITensor]
+
+
+class CompiledModel:
+    """Inference plan of a Sequential for one input shape
+
+    The layers are traced once to find the shape of every intermediate.
+    Layers with an inference kernel write into views of a static arena
+    allocated up front. Activations of a chain are only live until the
+    next layer has read them, so two buffers taking turns (ping-pong)
+    hold all of them, and in-place layers such as ReLU write over their
+    input. Forward passes then do no shape checks and no allocations
+    beyond those of layers without a kernel.
+
+    The returned tensor is a view of the arena, overwritten by the next
+    forward pass. Parameters are captured when compiling, compile again
+    after replacing (not updating) a parameter tensor.
+    """
+
+    def __init__(self,
+                 model: Sequential,
+                 input_shape: TensorShape,
+                 dtype: Optional[DType] = None):
+        self.input_shape = tuple(input_shape)
+        self.steps: list[_Step] = []
+
+        layers = _flatten(model.layers)
+        with no_grad():
+            trace = [Tensor.with_zeros(self.input_shape, dtype)]
+            for layer in layers:
+                trace.append(layer.forward(trace[-1]))
+        self.dtype = trace[0].dtype
+
+        # Arena slot (0 or 1) written by each step, None when the output
+        # is not in the arena, e.g. the caller's input
+        slots: list[Optional[int]] = []
+        current = None
+        for layer in layers:
+            if layer.inference_kernel() is None:
+                # Its output may be a view of its input, e.g. Flatten, so
+                # the next layer writes to the other slot
+                slots.append(None)
+                continue
+            if not (layer.in_place and current is not None):
+                current = 1 if current == 0 else 0
+            slots.append(current)
+
+        sizes: dict[tuple[int, DType], int] = {}
+        for slot, t in zip(slots, trace[1:]):
+            if slot is not None:
+                key = (slot, t.dtype)
+                sizes[key] = max(sizes.get(key, 0), math.prod(t.shape))
+        with no_pool():
+            self._arena = {key: Tensor.empty((n,), key[1])
+                           for key, n in sizes.items()}
+
+        for layer, slot, t in zip(layers, slots, trace[1:]):
+            out = None
+            if slot is not None:
+                out = self._arena[(slot, t.dtype)].as_strided(
+                    t.shape, contiguous_strides(t.shape), 0)
+            self.steps.append(_Step(layer, layer.inference_kernel(), out))
+
+    @property
+    def arena_bytes(self) -> int:
+        """Size of the activation buffers"""
+        return sum(math.prod(t.shape) * t.dtype.itemsize
+                   for t in self._arena.values())
+
+    @profiled(name="CompiledModel.forward", category="layer")
+    def forward(self, input: ITensor) -> ITensor:
+        """Run inference
+
+        Args:
+            input (ITensor): Input of the shape compiled for
+
+        Returns:
+            ITensor: Output, a view of the arena valid until the next call
+        """
+        if input.shape != self.input_shape:
+            raise ValueError(f"Compiled for input shape {self.input_shape}, "
+                             f"got {input.shape}")
+        backend = get_backend()
+        with no_grad():
+            for layer, kernel, out in self.steps:
+                if kernel is None:
+                    input = layer.forward(input)
+                else:
+                    kernel(backend, input, out)
+                    input = out
+        return input
+
+    __call__ = forward
+
+
+def _flatten(layers: Sequence[ILayer]) -> list[ILayer]:
+    # Nested Sequentials are planned as part of the outer chain
+    flat = []
+    for layer in layers:
+        if isinstance(layer, Sequential):
+            flat.extend(_flatten(layer.layers))
+        else:
+            flat.append(layer)
+    return flat
+
+
+def _descend(params: Sequence[ITensor], lr: float):
+    # Plain gradient descent step that also zeroes the gradients
+    with no_grad():
+        for param in params:
+            if param.grad is None:
+                continue
+            fused(param.grad, ("mul", -lr), ("add", param), out=param)
+            # Overwritten, a multiply by 0 keeps inf and NaN as NaN
+            param.grad[()] = 0
@@ -0,0 +1,192 @@
+import math
+from collections.abc import Sequence
+from typing import Optional
+from lml_python.core.interfaces import TensorShape
+
+type TensorStrides = tuple[int, ...] | list[int]
+
+
+def contiguous_strides(shape: TensorShape) -> list[int]:
+    """Strides of a densely packed, row-major tensor
+
+    Args:
+        shape (TensorShape): Shape of the tensor
+
+    Returns:
+        list[int]: Element strides, one per dimension
+    """
+    num_dims = len(shape)
+    strides = [1] * num_dims
+    for i in range(1, num_dims):
+        prev_dim = shape[num_dims - i]
+        prev_stride = strides[num_dims - i]
+        # reverse order the strides for row-major order
+        strides[num_dims - i - 1] = prev_stride * prev_dim
+    return strides
+
+
+def is_contiguous(shape: TensorShape, strides: TensorStrides) -> bool:
+    """Whether a shape/strides pair describes a dense row-major block
+
+    Dimensions of size 1 are never stepped over so their stride is
+    irrelevant.
+
+    Args:
+        shape (TensorShape): Shape of the tensor
+        strides (TensorStrides): Element strides of the tensor
+
+    Returns:
+        bool: True if element i of the row-major order sits at offset + i
+    """
+    expected = 1
+    for dim, stride in zip(reversed(shape), reversed(strides)):
+        if dim != 1 and stride != expected:
+            return False
+        expected *= dim
+    return True
+
+
+def element_offsets(shape: TensorShape,
+                    strides: TensorStrides,
+                    offset: int = 0) -> list[int]:
+    """Storage offsets of every element, in row-major order
+
+    Args:
+        shape (TensorShape): Shape of the tensor
+        strides (TensorStrides): Element strides of the tensor
+        offset (int, optional): Offset of the first element. Defaults to 0.
+
+    Returns:
+        list[int]: One storage offset per element
+    """
+    offsets = [offset]
+    for dim, stride in zip(shape, strides):
+        steps = [i * stride for i in range(dim)]
+        offsets = [base + step for base in offsets for step in steps]
+    return offsets
+
+
+def broadcast_shapes(*shapes: TensorShape) -> TensorShape:
+    """Shape resulting from broadcasting shapes against each other
+
+    Follows NumPy rules: shapes are right aligned and each dimension must
+    either match or be 1.
+
+    Args:
+        shapes (TensorShape): Shapes to broadcast
+
+    Returns:
+        TensorShape: Broadcast shape
+    """
+    rank = max((len(shape) for shape in shapes), default=0)
+    result = [1] * rank
+    for shape in shapes:
+        for i, dim in enumerate(shape, rank - len(shape)):
+            if dim == result[i] or dim == 1:
+                continue
+            if result[i] != 1:
+                raise ValueError(f"Shapes {shapes} cannot be broadcast "
+                                 "together")
+            result[i] = dim
+    return tuple(result)
+
+
+def broadcast_strides(shape: TensorShape,
+                      strides: TensorStrides,
+                      target: TensorShape) -> list[int]:
+    """Strides that view a tensor as if broadcast to a larger shape
+
+    Broadcast dimensions get a stride of 0, so nothing is materialised.
+
+    Args:
+        shape (TensorShape): Shape of the tensor
+        strides (TensorStrides): Element strides of the tensor
+        target (TensorShape): Shape to broadcast to, as returned by
+            broadcast_shapes
+
+    Returns:
+        list[int]: Element strides, one per dimension of 'target'
+    """
+    lead = len(target) - len(shape)
+    result = [0] * len(target)
+    for i, (dim, stride) in enumerate(zip(shape, strides), lead):
+        result[i] = 0 if dim == 1 and target[i] != 1 else stride
+    return result
+
+
+def coalesce(shape: TensorShape,
+             strides: list[TensorStrides]) -> tuple[TensorShape,
+                                                    list[list[int]]]:
+    """Merge dimensions that every strided operand walks uniformly
+
+    Two neighbouring dimensions can be merged when, for every operand,
+    stepping the outer one is the same as stepping the inner one 'dim'
+    times. Kernels iterating rows then get the longest possible rows, a
+    fully contiguous operation becomes a single row.
+
+    Args:
+        shape (TensorShape): Shape shared by all operands
+        strides (list[TensorStrides]): Strides of each operand
+
+    Returns:
+        tuple[TensorShape, list[list[int]]]: Merged shape and the strides
+            of each operand for it
+    """
+    if not shape:
+        return (), [[] for _ in strides]
+
+    new_shape = [shape[-1]]
+    new_strides = [[s[-1]] for s in strides]
+    for i in range(len(shape) - 2, -1, -1):
+        dim = shape[i]
+        if dim == 1:
+            continue
+        inner = new_shape[0]
+        if all(s[i] == ns[0] * inner for s, ns in zip(strides, new_strides)):
+            new_shape[0] = dim * inner
+        else:
+            new_shape.insert(0, dim)
+            for s, ns in zip(strides, new_strides):
+                ns.insert(0, s[i])
+    return tuple(new_shape), new_strides
+
+
+def merge_dims(shape: TensorShape,
+               strides: TensorStrides,
+               groups: Sequence[int]) -> Optional[tuple[TensorShape,
+                                                        list[int]]]:
+    """View consecutive groups of dimensions as single dimensions
+
+    A group can be merged when stepping its outer dimensions is the same
+    as stepping the inner ones a whole dimension's worth, i.e. when it can
+    be walked with a single stride. Unlike `reshape` this also holds for
+    many strided views, e.g. the leading dimensions of a permuted tensor.
+
+    Args:
+        shape (TensorShape): Shape of the tensor
+        strides (TensorStrides): Element strides of the tensor
+        groups (Sequence[int]): Number of dimensions in each group, in
+            order. Must add up to the rank, a group may be empty.
+
+    Returns:
+        Optional[tuple[TensorShape, list[int]]]: Shape and strides with one
+            dimension per group, None if some group cannot be merged
+    """
+    if sum(groups) != len(shape):
+        raise ValueError(f"Groups {groups} do not cover {len(shape)} "
+                         "dimensions")
+    new_shape = []
+    new_strides = []
+    start = 0
+    for count in groups:
+        dims = [(shape[i], strides[i]) for i in range(start, start + count)
+                if shape[i] != 1]
+        start += count
+        size = math.prod(dim for dim, _ in dims)
+        stride = dims[-1][1] if dims else 0
+        for (_, outer), (dim, inner) in zip(dims, dims[1:]):
+            if outer != inner * dim:
+                return None
+        new_shape.append(size)
+        new_strides.append(stride)
+    return tuple(new_shape), new_strides
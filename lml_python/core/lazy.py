@@ -0,0 +1,461 @@
+from collections.abc import Sequence
+from functools import reduce
+from typing import Any, Optional
+from lml_python.core.autograd import needs_grad
+from lml_python.core.dtype import DType, promote_types
+from lml_python.core.interfaces import (
+    BINARY_OPS,
+    UNARY_OPS,
+    ITensor,
+    Scalar,
+    TensorKey,
+    TensorShape,
+)
+from lml_python.core.layout import broadcast_shapes
+from lml_python.core.profiler import profiled
+from lml_python.core.tmath import fused, matdiv, matmul, _op_dtype
+
+type LazyOperand = 'LazyTensor | Scalar'
+
+_ELEMENTWISE_OPS = UNARY_OPS | BINARY_OPS
+
+
+class LazyTensor:
+    """Tensor expression evaluated on demand
+
+    Arithmetic on a LazyTensor records the op in an expression graph
+    instead of running it. The graph is evaluated by `realize`, or when
+    the elements are first read, which lets the evaluator:
+    - fold chains of element-wise ops into a single `fused` pass
+    - evaluate repeated subexpressions once, and skip nodes no result
+      depends on
+    - write a fused chain into the buffer of the intermediate it consumes
+    - associate chains of matrix products in the cheapest order, e.g.
+      (A @ B) @ x as A @ (B @ x)
+
+        x, w = lazy(x), lazy(w)
+        y = ((x @ w) * 2 + 1).relu().realize()
+
+    Shape and dtype are known without evaluating anything. Tensors mix
+    freely with LazyTensors in expressions, gradients are recorded when
+    the expression is evaluated.
+    """
+
+    def __init__(self,
+                 op: str,
+                 inputs: tuple[Any, ...],
+                 shape: TensorShape,
+                 dtype: DType,
+                 value: Optional[ITensor] = None):
+        """Create an expression node, see `lazy` to wrap a tensor
+
+        Args:
+            op (str): Name of the op, "leaf" for an evaluated tensor
+            inputs (tuple[Any, ...]): Operands and arguments of the op
+            shape (TensorShape): Shape of the result
+            dtype (DType): Element type of the result
+            value (Optional[ITensor], optional): The result, once
+                evaluated. Defaults to None.
+        """
+        self.op = op
+        self.inputs = inputs
+        self.shape = shape
+        self.dtype = dtype
+        self._value = value
+
+    @property
+    def rank(self) -> int:
+        return len(self.shape)
+
+    @property
+    def is_realized(self) -> bool:
+        """Whether the expression has been evaluated"""
+        return self._value is not None
+
+    def realize(self) -> ITensor:
+        """Evaluate the expression, once
+
+        Returns:
+            ITensor: The result, later calls return the same tensor
+        """
+        if self._value is None:
+            evaluate(self)
+        return self._value
+
+    @property
+    def data(self):
+        return self.realize().data
+
+    def __getitem__(self, key: TensorKey) -> 'float | ITensor':
+        return self.realize()[key]
+
+    def __repr__(self) -> str:
+        if self._value is not None:
+            return f"LazyTensor({self._value!r})"
+        return f"LazyTensor({self.op}, shape={self.shape}, " \
+               f"dtype={self.dtype.name})"
+
+    def __add__(self, other: 'LazyOperand | ITensor') -> 'LazyTensor':
+        return _binary("add", self, other)
+
+    def __radd__(self, other: 'Scalar | ITensor') -> 'LazyTensor':
+        return _binary("add", other, self)
+
+    def __sub__(self, other: 'LazyOperand | ITensor') -> 'LazyTensor':
+        return _binary("sub", self, other)
+
+    def __rsub__(self, other: 'Scalar | ITensor') -> 'LazyTensor':
+        return _binary("sub", other, self)
+
+    def __mul__(self, other: 'LazyOperand | ITensor') -> 'LazyTensor':
+        return _binary("mul", self, other)
+
+    def __rmul__(self, other: 'Scalar | ITensor') -> 'LazyTensor':
+        return _binary("mul", other, self)
+
+    def __truediv__(self, other: 'LazyOperand | ITensor') -> 'LazyTensor':
+        return _binary("div", self, other)
+
+    def __rtruediv__(self, other: 'Scalar | ITensor') -> 'LazyTensor':
+        return _binary("div", other, self)
+
+    def __neg__(self) -> 'LazyTensor':
+        return _unary("neg", self)
+
+    def __matmul__(self, other: 'LazyTensor | ITensor') -> 'LazyTensor':
+        return _matmul(self, other)
+
+    def __rmatmul__(self, other: ITensor) -> 'LazyTensor':
+        return _matmul(other, self)
+
+    def relu(self) -> 'LazyTensor':
+        return _unary("relu", self)
+
+    def tanh(self) -> 'LazyTensor':
+        return _unary("tanh", self)
+
+    def sigmoid(self) -> 'LazyTensor':
+        return _unary("sigmoid", self)
+
+    def sqrt(self) -> 'LazyTensor':
+        return _unary("sqrt", self)
+
+    def exp(self) -> 'LazyTensor':
+        return _unary("exp", self)
+
+    def log(self) -> 'LazyTensor':
+        return _unary("log", self)
+
+    def transpose(self, dim0: int = -2, dim1: int = -1) -> 'LazyTensor':
+        """Swap two dimensions, evaluated as a view"""
+        shape = list(self.shape)
+        shape[dim0], shape[dim1] = shape[dim1], shape[dim0]
+        return LazyTensor("transpose", (self, dim0, dim1), tuple(shape),
+                          self.dtype)
+
+    @property
+    def T(self) -> 'LazyTensor':
+        return self.transpose()
+
+
+def lazy(t: ITensor) -> LazyTensor:
+    """Defer the arithmetic done on a tensor
+
+    Args:
+        t (ITensor): Tensor to wrap, it is not copied
+
+    Returns:
+        LazyTensor: Evaluated leaf of new expressions
+    """
+    return LazyTensor("leaf", (), t.shape, t.dtype, t)
+
+
+@profiled(category="lazy")
+def evaluate(*tensors: LazyTensor) -> tuple[ITensor, ...]:
+    """Evaluate several expressions together
+
+    Subexpressions shared between them are evaluated once. Only the
+    results asked for are kept, intermediates are released as soon as
+    the last op reading them has run.
+
+    Args:
+        tensors (LazyTensor): Expressions to evaluate
+
+    Returns:
+        tuple[ITensor, ...]: Their results, in order
+    """
+    return _Evaluation(tensors).run()
+
+
+def _operand(x: Any) -> 'LazyOperand':
+    if isinstance(x, LazyTensor):
+        return x
+    if isinstance(x, ITensor):
+        return lazy(x)
+    if isinstance(x, (int, float)):
+        return x
+    raise TypeError(f"Unsupported operand type {type(x).__name__}")
+
+
+def _unary(op: str, a: LazyTensor) -> LazyTensor:
+    return LazyTensor(op, (a,), a.shape, _op_dtype(op, a.dtype, ()))
+
+
+def _binary(op: str, a: Any, b: Any) -> LazyTensor:
+    operands = (_operand(a), _operand(b))
+    tensors = [x for x in operands if isinstance(x, LazyTensor)]
+    shape = broadcast_shapes(*(t.shape for t in tensors))
+    dtype = reduce(promote_types, (t.dtype for t in tensors))
+    return LazyTensor(op, operands, shape, _op_dtype(op, dtype, operands))
+
+
+def _matmul(a: Any, b: Any) -> LazyTensor:
+    a, b = _operand(a), _operand(b)
+    if not isinstance(a, LazyTensor) or not isinstance(b, LazyTensor):
+        raise TypeError("Both operands of @ must be tensors")
+    # Same checks as tmath.matmul, so errors surface where they are made
+    if a.rank < 2 or b.rank < 2:
+        raise ValueError("Both tensors must be at least 2D")
+    if a.shape[-1] != b.shape[-2]:
+        raise ValueError(f"Shapes {a.shape} and {b.shape} are not aligned")
+    batch = broadcast_shapes(a.shape[:-2], b.shape[:-2])
+    return LazyTensor("matmul", (a, b), (*batch, a.shape[-2], b.shape[-1]),
+                      promote_types(a.dtype, b.dtype))
+
+
+class _Evaluation:
+    # One evaluation of a set of expressions. Nodes are evaluated in
+    # topological order after three rewrites: structurally equal nodes
+    # are merged, then every node used exactly once by a fusable consumer
+    # is absorbed into it, a chain of element-wise ops or of 2D matrix
+    # products.
+
+    def __init__(self, outputs: Sequence[LazyTensor]):
+        self.outputs = outputs
+        self.order = _topological(outputs)
+        self.canonical: dict[int, LazyTensor] = {}
+        self._merge_equal()
+        self.pinned = {id(self.canon(t)) for t in outputs}
+        self.uses: dict[int, int] = {}
+        for node in self.order:
+            if self.canon(node) is node:
+                for x in self.pending_inputs(node):
+                    self.uses[id(x)] = self.uses.get(id(x), 0) + 1
+        self.absorbed: set[int] = set()
+        self.plans: dict[int, tuple] = {}
+        for node in reversed(self.order):
+            if self.canon(node) is node and id(node) not in self.absorbed:
+                self.plans[id(node)] = self._plan(node)
+        self.values: dict[int, ITensor] = {}
+
+    def canon(self, x: LazyTensor) -> LazyTensor:
+        return self.canonical.get(id(x), x)
+
+    def pending_inputs(self, node: LazyTensor) -> list[LazyTensor]:
+        return [self.canon(x) for x in node.inputs
+                if isinstance(x, LazyTensor) and x._value is None]
+
+    def _merge_equal(self):
+        seen: dict[tuple, LazyTensor] = {}
+        for node in self.order:
+            key = (node.op, *map(self._key, node.inputs))
+            first = seen.setdefault(key, node)
+            if first is not node:
+                self.canonical[id(node)] = first
+
+    def _key(self, x: Any) -> tuple:
+        if not isinstance(x, LazyTensor):
+            # 1, 1.0 and True must stay distinct
+            return (type(x), x)
+        if x._value is not None:
+            return ("value", id(x._value))
+        return ("node", id(self.canon(x)))
+
+    def _inlinable(self, x: Any) -> bool:
+        # Computed by this evaluation and needed by a single op only
+        if not isinstance(x, LazyTensor) or x._value is not None:
+            return False
+        x = self.canon(x)
+        return self.uses.get(id(x)) == 1 and id(x) not in self.pinned
+
+    def _fusable(self, x: Any) -> bool:
+        return (self._inlinable(x) and x.op in _ELEMENTWISE_OPS
+                and not _is_rdiv(x))
+
+    def _plan(self, node: LazyTensor) -> tuple:
+        if node.op == "matmul" and node.rank == 2:
+            factors = self._factors(node)
+            if len(factors) > 2:
+                return ("chain", factors, _chain_order(factors))
+        if node.op in _ELEMENTWISE_OPS and not _is_rdiv(node):
+            return ("fused", *self._fused_chain(node))
+        return ("op",)
+
+    def _factors(self, node: LazyTensor) -> list[LazyTensor]:
+        factors = []
+        for x in node.inputs:
+            if self._inlinable(x) and x.op == "matmul":
+                x = self.canon(x)
+                self.absorbed.add(id(x))
+                factors.extend(self._factors(x))
+            else:
+                factors.append(x)
+        return factors
+
+    def _fused_chain(self, node: LazyTensor) -> tuple[LazyTensor, list]:
+        # Walks from the last op of the chain back to its first operand.
+        # The running value is always the left operand of a fused stage,
+        # right hand side chains of add and mul are swapped over and
+        # a - chain becomes -chain + a.
+        stages: list = []
+        current = self.canon(node)
+        while True:
+            if current.op in UNARY_OPS:
+                (previous,) = current.inputs
+                stages.append(current.op)
+            else:
+                op, (a, b) = current.op, current.inputs
+                if isinstance(a, LazyTensor) and (
+                        self._fusable(a) or not self._fusable(b)
+                        or op == "div"):
+                    previous = a
+                    stages.append((op, b))
+                elif op == "sub":
+                    previous = b
+                    stages.extend([("add", a), "neg"])
+                else:
+                    previous = b
+                    stages.append((op, a))
+            if not self._fusable(previous):
+                stages.reverse()
+                return previous, stages
+            current = self.canon(previous)
+            self.absorbed.add(id(current))
+
+    def run(self) -> tuple[ITensor, ...]:
+        remaining = dict(self.uses)
+        for node in self.order:
+            if self.canon(node) is not node or id(node) in self.absorbed:
+                continue
+            consumed: list[LazyTensor] = []
+            self.values[id(node)] = self._evaluate(node, consumed)
+            # Intermediates are dropped after their last use, so the
+            # memory pool can hand their storage to later ops
+            for x in consumed:
+                remaining[id(x)] -= 1
+                if remaining[id(x)] == 0 and id(x) not in self.pinned:
+                    del self.values[id(x)]
+
+        results = tuple(self.value(t) for t in self.outputs)
+        for t, result in zip(self.outputs, results):
+            # The graph below a result is no longer needed
+            t._value, t.inputs = result, ()
+        return results
+
+    def value(self, x: Any) -> 'ITensor | Scalar':
+        if not isinstance(x, LazyTensor):
+            return x
+        if x._value is not None:
+            return x._value
+        return self.values[id(self.canon(x))]
+
+    def _evaluate(self,
+                  node: LazyTensor,
+                  consumed: list[LazyTensor]) -> ITensor:
+        plan = self.plans[id(node)]
+        if plan[0] == "chain":
+            factors, order = plan[1], plan[2]
+            consumed.extend(x for x in factors if x._value is None)
+            values = [self.value(x) for x in factors]
+            return _multiply(values, order, 0, len(values) - 1)
+
+        if plan[0] == "fused":
+            base, stages = plan[1], plan[2]
+            operands = [s[1] for s in stages if isinstance(s, tuple)]
+            consumed.extend(self.canon(x) for x in [base, *operands]
+                            if isinstance(x, LazyTensor)
+                            and x._value is None)
+            a = self.value(base)
+            stages = [(s[0], self.value(s[1])) if isinstance(s, tuple)
+                      else s for s in stages]
+            out = None
+            if self._reusable(base, node) and not needs_grad(
+                    a, *(s[1] for s in stages if isinstance(s, tuple))):
+                out = a
+            return fused(a, *stages, out=out)
+
+        consumed.extend(self.pending_inputs(node))
+        inputs = [self.value(x) for x in node.inputs]
+        if node.op == "matmul":
+            return matmul(*inputs)
+        if node.op == "transpose":
+            return inputs[0].transpose(inputs[1], inputs[2])
+        if _is_rdiv(node):
+            return matdiv(*inputs)
+        raise ValueError(f"Unknown lazy op '{node.op}'")
+
+    def _reusable(self, base: LazyTensor, node: LazyTensor) -> bool:
+        # The chain may overwrite its first operand if nothing else reads
+        # it and it was allocated by this evaluation, not a view of a
+        # caller's tensor
+        if not self._inlinable(base):
+            return False
+        base = self.canon(base)
+        return (base.op != "transpose" and base.shape == node.shape
+                and base.dtype == node.dtype)
+
+
+def _is_rdiv(node: LazyTensor) -> bool:
+    # scalar / tensor has no fused form, the running value of a chain is
+    # always a tensor
+    return node.op == "div" and not isinstance(node.inputs[0], LazyTensor)
+
+
+def _topological(outputs: Sequence[LazyTensor]) -> list[LazyTensor]:
+    # Unevaluated nodes, every one after its inputs. Iterative, long
+    # chains of ops must not hit the recursion limit.
+    order: list[LazyTensor] = []
+    seen: set[int] = set()
+    stack: list[tuple[LazyTensor, bool]] = [(t, False)
+                                            for t in reversed(outputs)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            order.append(node)
+            continue
+        if id(node) in seen or node._value is not None:
+            continue
+        seen.add(id(node))
+        stack.append((node, True))
+        stack.extend((x, False) for x in reversed(node.inputs)
+                     if isinstance(x, LazyTensor) and id(x) not in seen)
+    return order
+
+
+def _chain_order(factors: Sequence[LazyTensor]) -> list[list[int]]:
+    # Classic matrix chain ordering by dynamic programming over the
+    # multiply-adds of every sub-chain. split[i][j] is where the product
+    # of factors i..j is split in two.
+    dims = [factors[0].shape[0], *(f.shape[1] for f in factors)]
+    n = len(factors)
+    cost = [[0] * n for _ in range(n)]
+    split = [[0] * n for _ in range(n)]
+    for length in range(2, n + 1):
+        for i in range(n - length + 1):
+            j = i + length - 1
+            cost[i][j], split[i][j] = min(
+                (cost[i][k] + cost[k + 1][j]
+                 + dims[i] * dims[k + 1] * dims[j + 1], k)
+                for k in range(i, j))
+    return split
+
+
+def _multiply(values: list[ITensor],
+              split: list[list[int]],
+              i: int,
+              j: int) -> ITensor:
+    if i == j:
+        return values[i]
+    k = split[i][j]
+    return matmul(_multiply(values, split, i, k),
+                  _multiply(values, split, k + 1, j))
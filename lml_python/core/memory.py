@@ -0,0 +1,196 @@
+import array
+import ctypes
+import sys
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+from lml_python.core.dtype import DType
+from lml_python.core.interfaces import (
+    ILayer,
+    ITensor,
+)
+
+
+def _refcount(buf: array.array) -> int:
+    return sys.getrefcount(buf)
+
+
+def _free_refcount() -> Optional[int]:
+    # Reference counts are a CPython implementation detail, and what the
+    # interpreter adds for loop variables and call arguments changed
+    # between versions. The count of a buffer only its bucket holds is
+    # measured once, the same way the pool reads it. None where counts
+    # do not tell whether a buffer is used.
+    if sys.implementation.name != "cpython":
+        return None
+    bucket = [array.array("b")]
+    for buf in bucket:
+        return _refcount(buf)
+    raise AssertionError
+
+
+# References held on a pooled buffer while the pool inspects it: the
+# bucket list, the loop variable and the call arguments. Anything above
+# that means a tensor (or view) still uses the buffer.
+_FREE_REFCOUNT = _free_refcount()
+
+_active_pool: ContextVar[Optional['TensorPool']] = ContextVar(
+    "lml_tensor_pool", default=None)
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    hits: int
+    misses: int
+    bytes_live: int
+    bytes_reserved: int
+    peak_bytes: int
+
+
+class TensorPool:
+    """Caching allocator for tensor storage
+
+    Buffers are bucketed by element type and size. A buffer returns to
+    its bucket on its own as soon as no tensor references it any more, so
+    a loop running the same shapes every step stops allocating once every
+    bucket holds as many buffers as a step keeps alive at once.
+
+    Tensor factories draw from the pool while it is active:
+
+        pool = TensorPool()
+        with pool:
+            y = model.forward(x)
+    """
+
+    def __init__(self):
+        if _FREE_REFCOUNT is None:
+            raise RuntimeError("TensorPool relies on CPython reference "
+                               "counting to find unused buffers")
+        self._buckets: dict[tuple[str, int], list[array.array]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.peak_bytes = 0
+
+    def __enter__(self) -> 'TensorPool':
+        tokens = self._local.__dict__.setdefault("tokens", [])
+        tokens.append(_active_pool.set(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        _active_pool.reset(self._local.tokens.pop())
+
+    def allocate(self, dtype: DType, numel: int, zero: bool = True
+                 ) -> array.array:
+        """Get a buffer from the pool, allocating only on a miss
+
+        Args:
+            dtype (DType): Element type of the buffer
+            numel (int): Number of elements
+            zero (bool, optional): Zero out a reused buffer. Fresh buffers
+                are always zeroed. Defaults to True.
+
+        Returns:
+            array.array: Buffer owned by the pool until the caller drops it
+        """
+        with self._lock:
+            bucket = self._buckets.setdefault((dtype.typecode, numel), [])
+            for buf in bucket:
+                if _refcount(buf) == _FREE_REFCOUNT:
+                    self.hits += 1
+                    if zero and numel:
+                        ctypes.memset(buf.buffer_info()[0], 0,
+                                      numel * buf.itemsize)
+                    self._update_peak(buf)
+                    return buf
+
+            self.misses += 1
+            buf = array.array(dtype.typecode, [0]) * numel
+            bucket.append(buf)
+            self._update_peak(buf)
+            return buf
+
+    @property
+    def bytes_live(self) -> int:
+        """Bytes held in buffers that are currently in use"""
+        return self._bytes_live()
+
+    def _bytes_live(self, handed_out: Optional[array.array] = None) -> int:
+        # 'handed_out' is about to be returned by allocate, counted as in
+        # use whatever its reference count says at this point
+        return sum(len(buf) * buf.itemsize
+                   for bucket in self._buckets.values()
+                   for buf in bucket
+                   if buf is handed_out or _refcount(buf) > _FREE_REFCOUNT)
+
+    def _update_peak(self, handed_out: array.array):
+        self.peak_bytes = max(self.peak_bytes, self._bytes_live(handed_out))
+
+    @property
+    def bytes_reserved(self) -> int:
+        """Bytes held by the pool, in use or not"""
+        return sum(len(buf) * buf.itemsize
+                   for bucket in self._buckets.values()
+                   for buf in bucket)
+
+    def stats(self) -> PoolStats:
+        return PoolStats(hits=self.hits,
+                         misses=self.misses,
+                         bytes_live=self.bytes_live,
+                         bytes_reserved=self.bytes_reserved,
+                         peak_bytes=self.peak_bytes)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.peak_bytes = self.bytes_live
+
+    def release_cached(self):
+        """Drop every buffer not currently in use"""
+        with self._lock:
+            for key, bucket in list(self._buckets.items()):
+                bucket[:] = [buf for buf in bucket
+                             if _refcount(buf) > _FREE_REFCOUNT]
+                if not bucket:
+                    del self._buckets[key]
+
+
+def active_pool() -> Optional[TensorPool]:
+    """The pool tensor factories currently allocate from, if any"""
+    return _active_pool.get()
+
+
+@contextmanager
+def no_pool() -> Iterator[None]:
+    """Allocate outside of any active pool, e.g. for long lived tensors"""
+    token = _active_pool.set(None)
+    try:
+        yield
+    finally:
+        _active_pool.reset(token)
+
+
+class Pooled(ILayer):
+    """Runs a layer (or a whole model) with its own pool active
+
+    Scopes a pool to a model instead of to a block of code.
+    """
+
+    def __init__(self, layer: ILayer, pool: Optional[TensorPool] = None):
+        self.layer = layer
+        self.pool = pool or TensorPool()
+
+    def forward(self, input: ITensor) -> ITensor:
+        with self.pool:
+            return self.layer.forward(input)
+
+    def backward(self, gradient: ITensor) -> ITensor:
+        with self.pool:
+            return self.layer.backward(gradient)
+
+    def parameters(self) -> list[ITensor]:
+        return self.layer.parameters()
@@ -0,0 +1,199 @@
+import math
+from collections.abc import Sequence
+from typing import Optional
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from lml_python.core.dtype import DType
+from lml_python.core.interfaces import (
+    BINARY_OPS,
+    ITensor,
+    Scalar,
+    TensorData,
+)
+from lml_python.core.python_backend import PythonBackend
+
+_NP_DTYPES = {
+    DType.FLOAT32: np.float32,
+    DType.FLOAT64: np.float64,
+    DType.INT32: np.int32,
+    DType.INT8: np.int8,
+}
+
+
+def _relu(x, out):
+    return np.maximum(x, 0, out=out)
+
+
+def _sigmoid(x, out):
+    # Overflow in exp() saturates to inf, whose reciprocal is the right 0
+    with np.errstate(over="ignore"):
+        np.negative(x, out=out)
+        np.exp(out, out=out)
+        np.add(out, 1, out=out)
+        return np.reciprocal(out, out=out)
+
+
+def _heaviside(x, out):
+    return np.greater(x, 0, out=out)
+
+
+_UFUNCS = {
+    "add": np.add,
+    "sub": np.subtract,
+    "mul": np.multiply,
+    "div": np.true_divide,
+    "neg": np.negative,
+    "relu": _relu,
+    "tanh": np.tanh,
+    "sigmoid": _sigmoid,
+    "heaviside": _heaviside,
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "log": np.log,
+}
+
+_REDUCTIONS = {
+    "max": np.max,
+    "min": np.min,
+    "argmax": np.argmax,
+    "argmin": np.argmin,
+}
+
+
+def as_ndarray(t: ITensor) -> np.ndarray:
+    """Wrap tensor storage in an ndarray without copying
+
+    Strided views map onto ndarray strides, so transposed or sliced
+    tensors are wrapped without copying too. Writes through the returned
+    array land in the tensor.
+
+    Args:
+        t (ITensor): Tensor to wrap
+
+    Returns:
+        np.ndarray: Array sharing the tensor's storage
+    """
+    flat = np.frombuffer(t.data, dtype=_NP_DTYPES[t.dtype])
+    if t.is_contiguous():
+        n = math.prod(t.shape)
+        return flat[t.offset:t.offset + n].reshape(t.shape)
+    itemsize = flat.itemsize
+    return as_strided(flat[t.offset:], shape=t.shape,
+                      strides=[s * itemsize for s in t.strides])
+
+
+def _matmul(a: ITensor, b: ITensor, out: ITensor):
+    o = as_ndarray(out)
+    # NumPy computes in the operands' type, integer products must
+    # accumulate in the wider type of 'out', e.g. int8 into int32
+    dtype = None if out.dtype.is_floating else o.dtype
+    np.matmul(as_ndarray(a), as_ndarray(b), out=o, dtype=dtype)
+
+
+class NumpyBackend(PythonBackend):
+    """Backend running kernels through NumPy on zero-copy array views
+
+    Ops without a NumPy implementation fall back to the pure Python ones.
+    """
+    name = "numpy"
+
+    def matmul(self, a: ITensor, b: ITensor, out: ITensor, pack_b: bool):
+        _matmul(a, b, out)
+
+    def batched_matmul(self, a: ITensor, b: ITensor, out: ITensor):
+        _matmul(a, b, out)
+
+    def spmm(self,
+             indptr: Sequence[int],
+             indices: Sequence[int],
+             values: TensorData,
+             b: ITensor,
+             out: ITensor):
+        o = as_ndarray(out)
+        o.fill(0)
+        ptr = np.asarray(indptr)
+        if ptr[-1] == 0:
+            return
+        # Scaled rows of 'b', one per non-zero, summed per sparse row.
+        # reduceat needs a non-empty segment for every start.
+        scale = np.asarray(values)[:, None]
+        rows = as_ndarray(b)[np.asarray(indices)] * scale
+        filled = ptr[1:] > ptr[:-1]
+        o[filled] = np.add.reduceat(rows, ptr[:-1][filled], axis=0)
+
+    def elementwise(self,
+                    op: str,
+                    operands: Sequence[ITensor | Scalar],
+                    out: ITensor):
+        args = [as_ndarray(o) if isinstance(o, ITensor) else o
+                for o in operands]
+        _UFUNCS[op](*args, out=as_ndarray(out))
+
+    def fused(self,
+              ops: Sequence[str],
+              operands: Sequence[ITensor | Scalar],
+              out: ITensor):
+        # Each op is a vectorised pass writing in place into 'out', so no
+        # intermediates are allocated
+        args = [as_ndarray(o) if isinstance(o, ITensor) else o
+                for o in operands]
+        o = as_ndarray(out)
+        target = o
+        if any(np.may_share_memory(o, arg) for arg in args[1:]
+               if isinstance(arg, np.ndarray)):
+            # A later stage reads 'out', so it must not be overwritten
+            # before the last stage
+            o = np.empty_like(o)
+        src = args[0]
+        if not ops:
+            np.copyto(o, src, casting="unsafe")
+        operand = 1
+        for op in ops:
+            if op in BINARY_OPS:
+                _UFUNCS[op](src, args[operand], out=o)
+                operand += 1
+            else:
+                _UFUNCS[op](src, out=o)
+            src = o
+        if o is not target:
+            np.copyto(target, o)
+
+    def linear(self,
+               x: ITensor,
+               w: ITensor,
+               bias: Optional[ITensor],
+               activation: Optional[str],
+               out: ITensor):
+        o = as_ndarray(out)
+        np.matmul(as_ndarray(x), as_ndarray(w), out=o)
+        if bias is not None:
+            np.add(o, as_ndarray(bias), out=o)
+        if activation is not None:
+            _UFUNCS[activation](o, out=o)
+
+    def reduce(self, op: str, a: ITensor, out: ITensor):
+        x = as_ndarray(a)
+        if op == "sum":
+            # NumPy only sums pairwise along contiguous rows, accumulating
+            # in float64 keeps long float32 sums accurate either way
+            dtype = np.float64 if a.dtype.is_floating else None
+            result = np.sum(x, axis=-1, dtype=dtype)
+        else:
+            result = _REDUCTIONS[op](x, axis=-1)
+        np.copyto(as_ndarray(out), result, casting="unsafe")
+
+    def softmax(self, a: ITensor, log: bool, out: ITensor):
+        if a.shape[-1] == 0 or math.prod(a.shape) == 0:
+            return
+        x, o = as_ndarray(a), as_ndarray(out)
+        # Shifting by the maximum keeps exp() from overflowing
+        np.subtract(x, x.max(axis=-1, keepdims=True), out=o)
+        if log:
+            total = np.exp(o).sum(axis=-1, keepdims=True)
+            np.subtract(o, np.log(total), out=o)
+        else:
+            np.exp(o, out=o)
+            np.divide(o, o.sum(axis=-1, keepdims=True), out=o)
+
+    def dot(self, a: Sequence, b: Sequence) -> float | int:
+        return np.dot(np.asarray(a), np.asarray(b)).item()
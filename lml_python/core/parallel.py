@@ -0,0 +1,331 @@
+import math
+import multiprocessing
+import os
+import weakref
+from collections import OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from multiprocessing.context import BaseContext
+from typing import NamedTuple, Optional
+from lml_python.core.autograd import no_grad
+from lml_python.core.dtype import DType, DEFAULT_DTYPE
+from lml_python.core.interfaces import ITensor, Scalar, TensorShape
+from lml_python.core.layout import broadcast_strides
+from lml_python.core.python_backend import PythonBackend
+from lml_python.core.tensor import Tensor
+
+WORKERS_ENV_VAR = "LML_NUM_WORKERS"
+# Below these sizes the cost of dispatching to workers outweighs the
+# gain and ops run serially
+DEFAULT_MIN_FLOPS = 1 << 21
+DEFAULT_MIN_ELEMENTS = 1 << 17
+# Shared memory segments a worker keeps attached between tasks
+_WORKER_CACHE_SIZE = 32
+
+# Storage buffer id -> name of the segment backing it
+_segments: dict[int, str] = {}
+
+
+class SharedRef(NamedTuple):
+    """Picklable description of a tensor view over shared memory"""
+    name: str
+    typecode: str
+    shape: TensorShape
+    strides: tuple[int, ...]
+    offset: int
+
+
+def shared_empty(shape: TensorShape,
+                 dtype: Optional[DType] = None) -> Tensor:
+    """Create an uninitialised tensor stored in shared memory
+
+    Worker processes read and write shared tensors in place, so the
+    parallel backend never has to copy them. The segment is released once
+    the tensor and all of its views are gone.
+
+    Args:
+        shape (TensorShape): Shape of the tensor
+        dtype (Optional[DType], optional): Element type. Defaults to
+            DEFAULT_DTYPE.
+
+    Returns:
+        Tensor: Tensor backed by a shared memory segment
+    """
+    dtype = dtype or DEFAULT_DTYPE
+    shm = shared_memory.SharedMemory(
+        create=True, size=max(math.prod(shape), 1) * dtype.itemsize)
+    data = shm.buf.cast(dtype.typecode)
+    _segments[id(data)] = shm.name
+    weakref.finalize(data, _release, shm, id(data))
+    return Tensor(data, shape, dtype)
+
+
+def to_shared(t: ITensor) -> Tensor:
+    """Copy a tensor into shared memory
+
+    Args:
+        t (ITensor): Tensor to copy
+
+    Returns:
+        Tensor: Contiguous shared copy, or 't' if already shared
+    """
+    if is_shared(t):
+        return t
+    shared = shared_empty(t.shape, t.dtype)
+    n = math.prod(t.shape)
+    t = t.contiguous()
+    shared.data[:n] = memoryview(t.data)[t.offset:t.offset + n]
+    return shared
+
+
+def is_shared(t: ITensor) -> bool:
+    """Whether a tensor's storage lives in shared memory"""
+    return id(t.data) in _segments
+
+
+class ParallelBackend(PythonBackend):
+    """Backend splitting large ops across a pool of worker processes
+
+    matmul and linear are split into blocks of output rows, element-wise
+    and fused ops into blocks along the first output dimension. Operands
+    reach the workers as shared memory segments, only small descriptors
+    are pickled. Tensors created with `shared_empty`/`to_shared` are used
+    in place, others are staged through a temporary segment.
+
+    Ops smaller than the thresholds, and ops without a parallel
+    implementation, run on the calling process with the Python kernels.
+    """
+    name = "parallel"
+
+    def __init__(self,
+                 workers: Optional[int] = None,
+                 min_flops: int = DEFAULT_MIN_FLOPS,
+                 min_elements: int = DEFAULT_MIN_ELEMENTS,
+                 mp_context: Optional[BaseContext] = None):
+        """Create a parallel backend, workers start on first use
+
+        Args:
+            workers (Optional[int], optional): Number of worker processes.
+                Defaults to LML_NUM_WORKERS, or the number of CPUs.
+            min_flops (int, optional): Smallest matmul, in multiply-adds,
+                worth splitting. Defaults to DEFAULT_MIN_FLOPS.
+            min_elements (int, optional): Smallest element-wise output
+                worth splitting. Defaults to DEFAULT_MIN_ELEMENTS.
+            mp_context (Optional[BaseContext], optional): multiprocessing
+                context the workers are started with. Defaults to
+                forkserver where available, forking a process that may
+                already run threads can deadlock.
+        """
+        self.workers = workers or int(os.environ.get(WORKERS_ENV_VAR, 0)) \
+            or os.cpu_count() or 1
+        self.min_flops = min_flops
+        self.min_elements = min_elements
+        if mp_context is None and \
+                "forkserver" in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context("forkserver")
+        self._mp_context = mp_context
+        self._executor: Optional[Executor] = None
+
+    def close(self):
+        """Shut the worker pool down, it restarts on next use"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def matmul(self, a: ITensor, b: ITensor, out: ITensor, pack_b: bool):
+        m, k = a.shape
+        if m * k * b.shape[1] < self.min_flops or m < 2:
+            return super().matmul(a, b, out, pack_b)
+        with _Staging(self, out) as staging:
+            a, b = staging.stage(a), staging.stage(b)
+            staging.run("matmul", [
+                [a[lo:hi], b, staging.out[lo:hi], pack_b]
+                for lo, hi in _blocks(m, self.workers)])
+
+    def linear(self,
+               x: ITensor,
+               w: ITensor,
+               bias: Optional[ITensor],
+               activation: Optional[str],
+               out: ITensor):
+        m, k = x.shape
+        if m * k * w.shape[1] < self.min_flops or m < 2:
+            return super().linear(x, w, bias, activation, out)
+        with _Staging(self, out) as staging:
+            x, w = staging.stage(x), staging.stage(w)
+            bias = staging.stage(bias) if bias is not None else None
+            staging.run("linear", [
+                [x[lo:hi], w, bias, activation, staging.out[lo:hi]]
+                for lo, hi in _blocks(m, self.workers)])
+
+    def elementwise(self,
+                    op: str,
+                    operands: Sequence[ITensor | Scalar],
+                    out: ITensor):
+        if not self._splittable(out):
+            return super().elementwise(op, operands, out)
+        self._split_elementwise("elementwise", op, operands, out)
+
+    def fused(self,
+              ops: Sequence[str],
+              operands: Sequence[ITensor | Scalar],
+              out: ITensor):
+        if not self._splittable(out):
+            return super().fused(ops, operands, out)
+        self._split_elementwise("fused", list(ops), operands, out)
+
+    def _splittable(self, out: ITensor) -> bool:
+        return (math.prod(out.shape) >= self.min_elements
+                and out.rank > 0 and out.shape[0] > 1)
+
+    def _split_elementwise(self,
+                           method: str,
+                           op: str | list[str],
+                           operands: Sequence[ITensor | Scalar],
+                           out: ITensor):
+        shape = out.shape
+        with _Staging(self, out) as staging:
+            # Broadcast every operand to the output shape up front, so the
+            # blocks of all of them line up along the first dimension
+            views = []
+            for operand in operands:
+                if isinstance(operand, ITensor):
+                    operand = staging.stage(operand)
+                    operand = operand.as_strided(
+                        shape, broadcast_strides(operand.shape,
+                                                 operand.strides, shape))
+                views.append(operand)
+            staging.run(method, [
+                [op,
+                 [v[lo:hi] if isinstance(v, ITensor) else v for v in views],
+                 staging.out[lo:hi]]
+                for lo, hi in _blocks(shape[0], self.workers)])
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=self._mp_context)
+        return self._executor
+
+
+class _Staging:
+    # Copies operands that are not in shared memory into temporary
+    # segments for the duration of one op, and the result back into a
+    # non shared output
+    def __init__(self, backend: ParallelBackend, out: ITensor):
+        self.backend = backend
+        self.target = out
+        self.out = out if is_shared(out) else shared_empty(out.shape,
+                                                           out.dtype)
+
+    def __enter__(self) -> '_Staging':
+        # Slicing blocks must not record autograd nodes
+        self._no_grad = no_grad()
+        self._no_grad.__enter__()
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        try:
+            if exc_type is None and self.out is not self.target:
+                PythonBackend.fused(self.backend, (), (self.out,),
+                                    self.target)
+        finally:
+            self._no_grad.__exit__(exc_type, *exc_info)
+
+    def stage(self, t: ITensor) -> ITensor:
+        return to_shared(t)
+
+    def run(self, method: str, blocks: list[list]):
+        pool = self.backend._pool()
+        futures = [pool.submit(_run_task, method, _to_refs(args))
+                   for args in blocks]
+        for future in futures:
+            future.result()
+
+
+def _blocks(n: int, workers: int) -> list[tuple[int, int]]:
+    # Contiguous, evenly sized ranges, one per worker
+    count = min(n, workers)
+    bounds = [n * i // count for i in range(count + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def _to_refs(value):
+    # Replaces tensors, also inside lists, by their shared descriptors
+    if isinstance(value, ITensor):
+        return SharedRef(_segments[id(value.data)], value.dtype.typecode,
+                         value.shape, value.strides, value.offset)
+    if isinstance(value, list):
+        return [_to_refs(v) for v in value]
+    return value
+
+
+def _release(shm: shared_memory.SharedMemory, key: int):
+    _segments.pop(key, None)
+    # Unlinked first, the name must not leak even if closing fails
+    shm.unlink()
+    try:
+        shm.close()
+    except BufferError:
+        # A slice of the storage outlived the tensor, e.g. from
+        # _values(). The mapping goes away with the last slice, drop our
+        # reference so SharedMemory.__del__ does not try again and report
+        # the same BufferError. This relies on the private attribute of
+        # CPython's SharedMemory, covered by
+        # test_segment_unlinked_while_a_storage_slice_lives.
+        shm._mmap = None
+
+
+# Worker side
+
+_serial = PythonBackend()
+_attached: OrderedDict[str, shared_memory.SharedMemory] = OrderedDict()
+
+
+def _run_task(method: str, args: list):
+    views = []
+
+    def attach(value):
+        if isinstance(value, SharedRef):
+            tensor = _attach(value)
+            views.append(tensor.data)
+            return tensor
+        if isinstance(value, list):
+            return [attach(v) for v in value]
+        return value
+
+    try:
+        getattr(_serial, method)(*(attach(arg) for arg in args))
+    finally:
+        # Views must be released before a cached segment can be closed
+        del attach
+        for view in views:
+            _try_release(view)
+
+
+def _attach(ref: SharedRef) -> Tensor:
+    shm = _attached.get(ref.name)
+    if shm is None:
+        shm = _attached[ref.name] = shared_memory.SharedMemory(ref.name)
+        while len(_attached) > _WORKER_CACHE_SIZE:
+            _, old = _attached.popitem(last=False)
+            _try_close(old)
+    else:
+        _attached.move_to_end(ref.name)
+    return Tensor(shm.buf.cast(ref.typecode), ref.shape,
+                  DType.from_typecode(ref.typecode), ref.strides, ref.offset)
+
+
+def _try_release(view: memoryview):
+    try:
+        view.release()
+    except BufferError:
+        pass
+
+
+def _try_close(shm: shared_memory.SharedMemory):
+    try:
+        shm.close()
+    except BufferError:
+        pass
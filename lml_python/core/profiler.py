@@ -0,0 +1,291 @@
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, NamedTuple, Optional
+from lml_python.core.interfaces import ITensor, TensorShape
+
+# Estimates the floating point operations of one call from its arguments
+# and result
+type FlopCounter = Callable[[tuple, dict, Any], int]
+
+
+class Event(NamedTuple):
+    """One profiled call of an op or layer method"""
+    name: str
+    category: str
+    start_ns: int
+    duration_ns: int
+    # Time spent in profiled calls made by this one
+    children_ns: int
+    inputs: tuple[TensorShape, ...]
+    output: Optional[TensorShape]
+    flops: int
+    bytes_allocated: int
+    depth: int
+    thread: int
+
+
+class OpStats(NamedTuple):
+    """Totals over all calls of one op or layer method"""
+    calls: int
+    total_ns: int
+    self_ns: int
+    flops: int
+    bytes_allocated: int
+
+
+class Profile:
+    """Events recorded by a `profile` context"""
+
+    def __init__(self):
+        self.events: list[Event] = []
+        self._stacks: dict[int, list[list[int]]] = {}
+
+    def summary(self) -> dict[str, OpStats]:
+        """Aggregate the events by name
+
+        Returns:
+            dict[str, OpStats]: Totals per op, most total time first
+        """
+        totals: dict[str, list[int]] = {}
+        for e in self.events:
+            t = totals.setdefault(e.name, [0, 0, 0, 0, 0])
+            t[0] += 1
+            t[1] += e.duration_ns
+            t[2] += e.duration_ns - e.children_ns
+            t[3] += e.flops
+            t[4] += e.bytes_allocated
+        return {name: OpStats(*t) for name, t in
+                sorted(totals.items(), key=lambda item: -item[1][1])}
+
+    def table(self, limit: Optional[int] = None) -> str:
+        """Summary formatted as a text table
+
+        Self time excludes the time spent in nested profiled calls, e.g.
+        the matmul inside a Linear.forward.
+
+        Args:
+            limit (Optional[int], optional): Only show this many rows.
+                Defaults to all.
+
+        Returns:
+            str: One row per op, most total time first
+        """
+        rows = [f"{'name':<24} {'calls':>7} {'total ms':>10} "
+                f"{'self ms':>10} {'MFLOP':>10} {'MB alloc':>10}"]
+        for name, s in list(self.summary().items())[:limit]:
+            rows.append(f"{name:<24} {s.calls:>7} {s.total_ns / 1e6:>10.3f} "
+                        f"{s.self_ns / 1e6:>10.3f} {s.flops / 1e6:>10.3f} "
+                        f"{s.bytes_allocated / 1e6:>10.3f}")
+        return "\n".join(rows)
+
+    def chrome_trace(self) -> dict:
+        """Events in the Chrome trace event format
+
+        Returns:
+            dict: Loadable by chrome://tracing and Perfetto once saved
+                as JSON
+        """
+        pid = os.getpid()
+        return {"traceEvents": [
+            {"name": e.name, "cat": e.category, "ph": "X",
+             "ts": e.start_ns / 1e3, "dur": e.duration_ns / 1e3,
+             "pid": pid, "tid": e.thread,
+             "args": {"inputs": e.inputs, "output": e.output,
+                      "flops": e.flops, "bytes": e.bytes_allocated}}
+            for e in self.events]}
+
+    def export_chrome_trace(self, path: str):
+        """Save the events as a Chrome trace event JSON file
+
+        Args:
+            path (str): File to write
+        """
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def _call(self,
+              name: str,
+              category: str,
+              fn: Callable,
+              flops: Optional[FlopCounter],
+              args: tuple,
+              kwargs: dict) -> Any:
+        thread = threading.get_ident()
+        # Time and FLOPs of the profiled calls nested in each open call
+        stack = self._stacks.setdefault(thread, [])
+        stack.append([0, 0])
+        start = time.perf_counter_ns()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            duration = time.perf_counter_ns() - start
+            children_ns, children_flops = stack.pop()
+
+        # Without an estimate of its own, a call does the work of the
+        # calls it makes, e.g. a layer's forward
+        count = (flops(args, kwargs, result) if flops is not None
+                 else children_flops)
+        if stack:
+            stack[-1][0] += duration
+            stack[-1][1] += count
+        tensors = [a for a in (*args, *kwargs.values())
+                   if isinstance(a, ITensor)]
+        output = result.shape if isinstance(result, ITensor) else None
+        self.events.append(Event(
+            name, category, start, duration, children_ns,
+            tuple(t.shape for t in tensors), output, count,
+            _new_bytes(result, tensors), len(stack), thread))
+        return result
+
+
+_active: Optional[Profile] = None
+
+
+@contextmanager
+def profile() -> Iterator[Profile]:
+    """Record every profiled op and layer call made inside the context
+
+    e.g.
+        with profile() as prof:
+            model.forward(x)
+        print(prof.table())
+
+    Contexts nest, the innermost one receives the events. Recording is
+    process wide, calls from other threads are recorded too.
+
+    Yields:
+        Profile: Receives the events
+    """
+    global _active
+    previous, _active = _active, Profile()
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+
+def is_profiling() -> bool:
+    """Whether a `profile` context is active"""
+    return _active is not None
+
+
+def profiled(flops: Optional[FlopCounter] = None,
+             name: Optional[str] = None,
+             category: str = "op") -> Callable[[Callable], Callable]:
+    """Decorator recording calls of a function while profiling
+
+    Without an active `profile` context the only cost is one check.
+
+    Args:
+        flops (Optional[FlopCounter], optional): Estimates the floating
+            point operations of a call. Defaults to None, counting those
+            of the profiled calls it makes.
+        name (Optional[str], optional): Name of the events. Defaults to
+            the function name.
+        category (str, optional): Category of the events. Defaults to
+            "op".
+    """
+    def decorate(fn: Callable) -> Callable:
+        event_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            active = _active
+            if active is None:
+                return fn(*args, **kwargs)
+            return active._call(event_name, category, fn, flops, args,
+                                kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def instrument_layer(cls: type):
+    """Profile the forward and backward methods a layer class defines
+
+    Called for every ILayer subclass as it is created.
+
+    Args:
+        cls (type): Layer class
+    """
+    for method in ("forward", "backward"):
+        fn = cls.__dict__.get(method)
+        if fn is None or getattr(fn, "__isabstractmethod__", False):
+            continue
+        setattr(cls, method, profiled(name=f"{cls.__name__}.{method}",
+                                      category="layer")(fn))
+
+
+def elementwise_flops(args: tuple, kwargs: dict, result: Any) -> int:
+    """One operation per output element"""
+    return _numel(result)
+
+
+def reduction_flops(args: tuple, kwargs: dict, result: Any) -> int:
+    """One operation per input element"""
+    return _numel(args[0])
+
+
+def matmul_flops(args: tuple, kwargs: dict, result: Any) -> int:
+    """A multiply and an add per output element and contracted index"""
+    if args[0].is_sparse or args[1].is_sparse:
+        # Counted by the spmm call matmul dispatches to
+        return 0
+    return 2 * args[0].shape[-1] * _numel(result)
+
+
+def conv2d_flops(args: tuple, kwargs: dict, result: Any) -> int:
+    """A multiply and an add per output element and kernel element"""
+    return 2 * _numel(args[1]) // args[1].shape[0] * _numel(result)
+
+
+def spmm_flops(args: tuple, kwargs: dict, result: Any) -> int:
+    """A multiply and an add per non-zero and dense output column"""
+    a, b = args[:2]
+    if a.is_sparse:
+        return 2 * a.nnz * b.shape[1]
+    return 2 * b.nnz * a.shape[0]
+
+
+def fused_flops(args: tuple, kwargs: dict, result: Any) -> int:
+    """One operation per stage and output element"""
+    return max(len(args) - 1, 1) * _numel(result)
+
+
+def linear_flops(args: tuple, kwargs: dict, result: Any) -> int:
+    """The matrix product, then one operation per output element for
+    each of the bias and the activation"""
+    bias = args[2] if len(args) > 2 else kwargs.get("b")
+    activation = args[3] if len(args) > 3 else kwargs.get("activation")
+    epilogue = (bias is not None) + (activation is not None)
+    return (2 * args[0].shape[-1] + epilogue) * _numel(result)
+
+
+def tdot_flops(args: tuple, kwargs: dict, result: Any) -> int:
+    """A multiply and an add per output element and contracted index"""
+    # numel(a) * numel(b) = numel(result) * contracted size ** 2
+    n = _numel(result)
+    if n == 0:
+        return 0
+    return 2 * n * math.isqrt(_numel(args[0]) * _numel(args[1]) // n)
+
+
+def _numel(t: Any) -> int:
+    return math.prod(t.shape) if isinstance(t, ITensor) else 1
+
+
+def _new_bytes(result: Any, inputs: list[ITensor]) -> int:
+    # Size of the result if its storage was allocated by the call, as
+    # opposed to written into an 'out' argument or a view of an input
+    if not isinstance(result, ITensor):
+        return 0
+    if any(t.data is result.data for t in inputs):
+        return 0
+    return _numel(result) * result.dtype.itemsize
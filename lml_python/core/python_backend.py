@@ -0,0 +1,343 @@
+import array
+import itertools
+import math
+import operator
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from functools import partial
+from itertools import repeat
+from operator import add, mul, sub
+from typing import Optional
+from lml_python.core.layout import broadcast_strides, coalesce
+from lml_python.core.interfaces import (
+    BINARY_OPS,
+    IBackend,
+    ITensor,
+    Scalar,
+    TensorData,
+)
+
+# Rows longer than this are processed in chunks so element-wise ops never
+# hold more than a chunk's worth of temporaries.
+ELEMENTWISE_CHUNK = 4096
+
+
+def _sigmoid(x: float) -> float:
+    # Branching keeps exp() from overflowing for large magnitudes
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    e = math.exp(x)
+    return e / (1.0 + e)
+
+
+ELEMENTWISE_OPS: dict[str, Callable] = {
+    "add": operator.add,
+    "sub": operator.sub,
+    "mul": operator.mul,
+    "div": operator.truediv,
+    "neg": operator.neg,
+    "relu": partial(max, 0),
+    "tanh": math.tanh,
+    "sigmoid": _sigmoid,
+    # 1 for positive inputs, 0 otherwise. The derivative of relu.
+    "heaviside": partial(operator.lt, 0),
+    "sqrt": math.sqrt,
+    "exp": math.exp,
+    "log": math.log,
+}
+
+# Reduce a whole row at once. Floating point sums use math.fsum instead,
+# see PythonBackend.reduce.
+REDUCTIONS: dict[str, Callable[[Sequence], Scalar]] = {
+    "sum": sum,
+    "max": max,
+    "min": min,
+    # First position of the extreme value. Rows are array or memoryview
+    # slices depending on the storage, only indexing works on both.
+    "argmax": lambda row: max(range(len(row)), key=row.__getitem__),
+    "argmin": lambda row: min(range(len(row)), key=row.__getitem__),
+}
+
+
+class PythonBackend(IBackend):
+    """Reference backend written in pure Python
+
+    Works on any ITensor and has no dependencies. Other backends inherit
+    from it so ops they do not accelerate fall back to these kernels.
+    """
+    name = "python"
+
+    def matmul(self, a: ITensor, b: ITensor, out: ITensor, pack_b: bool):
+        if pack_b:
+            _matmul_packed(a, b, out)
+        else:
+            _matmul_ikj(a, b, out)
+
+    def batched_matmul(self, a: ITensor, b: ITensor, out: ITensor):
+        for idx in itertools.product(*map(range, out.shape[:-2])):
+            _matmul_packed(a[idx], b[idx], out[idx])
+
+    def spmm(self,
+             indptr: Sequence[int],
+             indices: Sequence[int],
+             values: TensorData,
+             b: ITensor,
+             out: ITensor):
+        _spmm(indptr, indices, values, b, out)
+
+    def linear(self,
+               x: ITensor,
+               w: ITensor,
+               bias: Optional[ITensor],
+               activation: Optional[str],
+               out: ITensor):
+        _matmul_packed(x, w, out, bias,
+                       ELEMENTWISE_OPS[activation] if activation else None)
+
+    def elementwise(self,
+                    op: str,
+                    operands: Sequence[ITensor | Scalar],
+                    out: ITensor):
+        _map_broadcast(partial(map, ELEMENTWISE_OPS[op]), operands, out)
+
+    def fused(self,
+              ops: Sequence[str],
+              operands: Sequence[ITensor | Scalar],
+              out: ITensor):
+        fns = [(ELEMENTWISE_OPS[op], op in BINARY_OPS) for op in ops]
+
+        def chain(*rows: Iterable) -> Iterable:
+            # Nested lazy maps, every element flows through the whole
+            # chain before the next one is read
+            it = rows[0]
+            operand = 1
+            for fn, binary in fns:
+                if binary:
+                    it = map(fn, it, rows[operand])
+                    operand += 1
+                else:
+                    it = map(fn, it)
+            return it
+
+        _map_broadcast(chain, operands, out)
+
+    def reduce(self, op: str, a: ITensor, out: ITensor):
+        # math.fsum is exactly rounded, so long float32 reductions are as
+        # accurate as short ones
+        fn = math.fsum if op == "sum" and a.dtype.is_floating \
+            else REDUCTIONS[op]
+        n, step = a.shape[-1], a.strides[-1]
+        data, out_data = a.data, out.data
+        for out_start, start in _row_starts(
+                out.shape, [out.offset, a.offset],
+                [list(out.strides), list(a.strides[:-1])]):
+            out_data[out_start] = fn(_strided(data, start, n, step))
+
+    def softmax(self, a: ITensor, log: bool, out: ITensor):
+        n, step = a.shape[-1], a.strides[-1]
+        if n == 0:
+            return
+        exp = math.exp
+        typecode = out.dtype.typecode
+        data, out_data, out_step = a.data, out.data, out.strides[-1]
+        for out_start, start in _row_starts(
+                a.shape[:-1], [out.offset, a.offset],
+                [list(out.strides[:-1]), list(a.strides[:-1])]):
+            row = _strided(data, start, n, step)
+            # Shifting by the maximum keeps exp() from overflowing, and
+            # the row is copied before 'out', possibly 'a', is written
+            shifted = list(map(sub, row, repeat(max(row), n)))
+            if log:
+                total = math.log(math.fsum(map(exp, shifted)))
+                result = map(sub, shifted, repeat(total, n))
+            else:
+                e = list(map(exp, shifted))
+                result = map(mul, e, repeat(1 / math.fsum(e), n))
+            _write_strided(out_data, out_start, out_step,
+                           array.array(typecode, result))
+
+    def dot(self, a: Sequence, b: Sequence) -> float | int:
+        return math.sumprod(a, b)
+
+
+def _strided(data: TensorData, start: int, n: int, step: int) -> Sequence:
+    # 'n' elements 'step' apart. Slicing copies at C speed and keeps the
+    # element type, stride 0 (expanded dimensions) repeats one element.
+    if step == 1:
+        return data[start:start + n]
+    if step == 0:
+        return [data[start]] * n
+    if n == 0:
+        return data[0:0]
+    return data[start:start + (n - 1) * step + 1:step]
+
+
+def _write_strided(data: TensorData, start: int, step: int, values: Sequence):
+    n = len(values)
+    if step == 1:
+        data[start:start + n] = values
+    elif n:
+        data[start:start + (n - 1) * step + 1:step] = values
+
+
+def _map_broadcast(combine: Callable[..., Iterable],
+                   operands: Sequence[ITensor | Scalar],
+                   out: ITensor):
+    # Broadcasting element-wise engine. Operands are walked through zero
+    # strided views so smaller operands are never tiled in memory, and
+    # dimensions are coalesced so contiguous operands become long rows.
+    # 'combine' receives one row per operand and returns an iterable of
+    # results, typically a 'map' that runs through them at C speed.
+    shape = out.shape
+    views = [memoryview(out.data)]
+    offsets = [out.offset]
+    strides = [list(out.strides)]
+    for operand in operands:
+        if isinstance(operand, ITensor):
+            views.append(memoryview(operand.data))
+            offsets.append(operand.offset)
+            strides.append(broadcast_strides(operand.shape, operand.strides,
+                                             shape))
+        else:
+            views.append([operand])
+            offsets.append(0)
+            strides.append([0] * len(shape))
+
+    shape, strides = coalesce(shape, strides)
+    if not shape:
+        shape, strides = (1,), [[1] for _ in strides]
+    if 0 in shape:
+        return
+
+    n = shape[-1]
+    steps = [s[-1] for s in strides]
+    outer_strides = [s[:-1] for s in strides]
+    typecode = out.dtype.typecode
+    out_view, in_views = views[0], views[1:]
+
+    for starts in _row_starts(shape[:-1], offsets, outer_strides):
+        for chunk in range(0, n, ELEMENTWISE_CHUNK):
+            m = min(ELEMENTWISE_CHUNK, n - chunk)
+            rows = [_row(view, start + chunk * step, m, step)
+                    for view, start, step in zip(in_views, starts[1:],
+                                                 steps[1:])]
+            _write_strided(out_view, starts[0] + chunk * steps[0], steps[0],
+                           array.array(typecode, combine(*rows)))
+
+
+def _row_starts(shape: tuple[int, ...],
+                offsets: list[int],
+                strides: list[list[int]]) -> Iterator[list[int]]:
+    # Start offset of every row, for each operand. Generated lazily so the
+    # outer index space is never materialised.
+    if not shape:
+        yield offsets
+        return
+    steps = [s[0] for s in strides]
+    inner = [s[1:] for s in strides]
+    for i in range(shape[0]):
+        yield from _row_starts(shape[1:],
+                               [off + i * step
+                                for off, step in zip(offsets, steps)],
+                               inner)
+
+
+def _row(view: Sequence, start: int, n: int, step: int) -> Iterable:
+    # Zero-copy row of a memoryview, stride 0 repeats a single element
+    if step == 0:
+        return repeat(view[start], n)
+    return view[start:start + (n - 1) * step + 1:step]
+
+
+def _matmul_packed(a: ITensor,
+                   b: ITensor,
+                   out: ITensor,
+                   bias: Optional[ITensor] = None,
+                   activation: Optional[Callable] = None):
+    # Packs the columns of 'b' once so every output element is a single
+    # C level dot product between two contiguous buffers. Strided
+    # operands (e.g. transposed views) are packed just the same. Bias and
+    # activation are applied lazily while the output row is written, so
+    # the output is only ever walked once.
+    m, k = a.shape
+    n = b.shape[1]
+    a_data, b_data, out_data = a.data, b.data, out.data
+    a_s0, a_s1 = a.strides
+    b_s0, b_s1 = b.strides
+    out_s0, out_s1 = out.strides
+    typecode = out.dtype.typecode
+    sumprod = math.sumprod
+
+    b_cols = [_strided(b_data, b.offset + j * b_s1, k, b_s0)
+              for j in range(n)]
+    bias_row = None
+    if bias is not None:
+        bias_row = _strided(bias.data, bias.offset, n, bias.strides[-1])
+
+    for i in range(m):
+        a_row = _strided(a_data, a.offset + i * a_s0, k, a_s1)
+        row = map(sumprod, repeat(a_row, n), b_cols)
+        if bias_row is not None:
+            row = map(add, row, bias_row)
+        if activation is not None:
+            row = map(activation, row)
+        _write_strided(out_data, out.offset + i * out_s0, out_s1,
+                       array.array(typecode, row))
+
+
+def _matmul_ikj(a: ITensor, b: ITensor, out: ITensor):
+    # i-k-j order streams rows of 'b' into a row accumulator, so no
+    # packed copy of 'b' is needed.
+    m, k = a.shape
+    n = b.shape[1]
+    a_data, b_data, out_data = a.data, b.data, out.data
+    a_s0, a_s1 = a.strides
+    b_s0, b_s1 = b.strides
+    out_s0, out_s1 = out.strides
+    typecode = out.dtype.typecode
+    zero = 0.0 if out.dtype.is_floating else 0
+
+    for i in range(m):
+        acc = [zero] * n
+        a_row = _strided(a_data, a.offset + i * a_s0, k, a_s1)
+        for p, a_ip in enumerate(a_row):
+            if a_ip == 0:
+                continue
+            b_row = _strided(b_data, b.offset + p * b_s0, n, b_s1)
+            acc = list(map(add, acc, map(mul, b_row, repeat(a_ip, n))))
+        _write_strided(out_data, out.offset + i * out_s0, out_s1,
+                       array.array(typecode, acc))
+
+
+def _spmm(indptr: Sequence[int],
+          indices: Sequence[int],
+          values: TensorData,
+          b: ITensor,
+          out: ITensor):
+    # Row i of the output is the sum of the rows of 'b' picked by the
+    # non-zeros of row i, each scaled by its value. Like _matmul_ikj, but
+    # zeros are never visited at all.
+    n = b.shape[1]
+    b_data, out_data = b.data, out.data
+    b_s0, b_s1 = b.strides
+    out_s0, out_s1 = out.strides
+    typecode = out.dtype.typecode
+    zero = 0.0 if out.dtype.is_floating else 0
+
+    for i in range(out.shape[0]):
+        acc = [zero] * n
+        for p in range(indptr[i], indptr[i + 1]):
+            b_row = _strided(b_data, b.offset + indices[p] * b_s0, n, b_s1)
+            acc = list(map(add, acc, map(mul, b_row, repeat(values[p], n))))
+        _write_strided(out_data, out.offset + i * out_s0, out_s1,
+                       array.array(typecode, acc))
+
+
+def _matmul_generic(a: ITensor, b: ITensor, out: ITensor):
+    # Reference kernel, only relies on element access
+    zero = 0.0 if out.dtype.is_floating else 0
+    for i in range(a.shape[0]):
+        for k in range(b.shape[1]):
+            acc = zero
+            for j in range(a.shape[1]):
+                acc += a[i, j] * b[j, k]
+            out[i, k] = acc
@@ -0,0 +1,188 @@
+import array
+import hashlib
+import math
+import os
+import sys
+import threading
+from itertools import repeat
+from operator import add, mul, sub
+from typing import Optional
+
+# Top two bytes of the little endian double 1.0 are 0x3ff0: the sign,
+# the exponent and then the first 4 of the 52 mantissa bits
+_ONE_HIGH = b"\x3f"
+_ONE_NEXT = bytes(0xf0 | (b & 0x0f) for b in range(256))
+
+
+class Generator:
+    """Counter-based pseudo random number generator
+
+    Draws are produced in bulk: the SHAKE-128 extendable output function
+    of (seed, counter) fills a whole buffer of random bytes at C speed,
+    then each 64 bit word becomes a number. The same seed gives the same
+    stream on every platform and Python version, and generators never
+    share state with the `random` module or each other.
+
+        gen = Generator(seed=0)
+        weights = Tensor.with_normal((784, 256), std=0.05, generator=gen)
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        """Create a generator
+
+        Args:
+            seed (Optional[int], optional): Non-negative seed. Defaults to
+                None, seeding from the operating system.
+        """
+        if seed is None:
+            seed = int.from_bytes(os.urandom(16), "little")
+        if seed < 0:
+            raise ValueError("seed must not be negative")
+        self.seed = seed
+        self._key = seed.to_bytes((seed.bit_length() + 7) // 8 or 1,
+                                  "little")
+        # Number of blocks drawn so far, each draw hashes a new counter
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def randbytes(self, n: int) -> bytes:
+        """Random bytes
+
+        Args:
+            n (int): Number of bytes
+
+        Returns:
+            bytes: 'n' random bytes
+        """
+        with self._lock:
+            counter = self._counter
+            self._counter += 1
+        block = hashlib.shake_128(self._key + b"/"
+                                  + counter.to_bytes(8, "little"))
+        return block.digest(n)
+
+    def random(self, n: int) -> array.array:
+        """Uniform doubles in [0, 1)
+
+        Args:
+            n (int): Number of values
+
+        Returns:
+            array.array: 'n' doubles, typecode 'd'
+        """
+        return self.uniform(n, 0.0, 1.0)
+
+    def uniform(self, n: int, low: float, high: float) -> array.array:
+        """Uniform doubles in [low, high)
+
+        Args:
+            n (int): Number of values
+            low (float): Lower bound, inclusive
+            high (float): Upper bound, exclusive
+
+        Returns:
+            array.array: 'n' doubles, typecode 'd'
+        """
+        # Random mantissas under the exponent of 1.0 are doubles in
+        # [1, 2), built with slice assignments on the raw bytes instead of
+        # converting every word from an integer
+        raw = bytearray(self.randbytes(8 * n))
+        raw[7::8] = _ONE_HIGH * n
+        raw[6::8] = raw[6::8].translate(_ONE_NEXT)
+        values = array.array("d")
+        values.frombytes(raw)
+        if sys.byteorder == "big":
+            values.byteswap()
+        span = high - low
+        return array.array("d", map(add, map(mul, values, repeat(span)),
+                                    repeat(low - span)))
+
+    def normal(self, n: int, mean: float = 0.0, std: float = 1.0
+               ) -> array.array:
+        """Normally distributed doubles
+
+        Uses the Box-Muller transform, every pair of uniform draws gives
+        two independent normal values.
+
+        Args:
+            n (int): Number of values
+            mean (float, optional): Mean. Defaults to 0.0.
+            std (float, optional): Standard deviation. Defaults to 1.0.
+
+        Returns:
+            array.array: 'n' doubles, typecode 'd'
+        """
+        pairs = (n + 1) // 2
+        u = self.uniform(2 * pairs, 0.0, 1.0)
+        # 1 - u is in (0, 1], so the log never sees 0
+        radius = array.array("d", map(math.sqrt, map(
+            mul, map(math.log, map(sub, repeat(1.0), u[:pairs])),
+            repeat(-2.0 * std * std))))
+        angle = array.array("d", map(mul, u[pairs:], repeat(2 * math.pi)))
+        values = array.array("d", map(mul, radius, map(math.cos, angle)))
+        values.extend(map(mul, radius, map(math.sin, angle)))
+        del values[n:]
+        if mean:
+            values = array.array("d", map(add, values, repeat(mean)))
+        return values
+
+    def integers(self, n: int, low: int, high: int) -> array.array:
+        """Uniform integers in [low, high)
+
+        Args:
+            n (int): Number of values
+            low (int): Lower bound, inclusive
+            high (int): Upper bound, exclusive
+
+        Returns:
+            array.array: 'n' integers, typecode 'q'
+        """
+        if high <= low:
+            raise ValueError(f"Empty range [{low}, {high})")
+        span = high - low
+        # The modulo bias of a 64 bit word is below 2^-32 for any span
+        # that fits 32 bits
+        return array.array("q", map(add, map(
+            span.__rmod__, self._words(n)), repeat(low)))
+
+    def spawn(self) -> 'Generator':
+        """Independent generator derived from this one
+
+        e.g. one per worker thread, reproducible from the parent's seed.
+
+        Returns:
+            Generator: New generator
+        """
+        return Generator(int.from_bytes(self.randbytes(16), "little"))
+
+    def _words(self, n: int) -> array.array:
+        words = array.array("Q")
+        words.frombytes(self.randbytes(n * words.itemsize))
+        if sys.byteorder == "big":
+            # The stream is defined little endian
+            words.byteswap()
+        return words
+
+
+_default = Generator()
+_default_lock = threading.Lock()
+
+
+def default_generator() -> Generator:
+    """Generator used by factories and initialisers given none"""
+    return _default
+
+
+def manual_seed(seed: int) -> Generator:
+    """Reseed the default generator
+
+    Args:
+        seed (int): Non-negative seed
+
+    Returns:
+        Generator: The new default generator
+    """
+    global _default
+    with _default_lock:
+        _default = Generator(seed)
+    return _default
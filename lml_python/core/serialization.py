@@ -0,0 +1,227 @@
+import array
+import json
+import math
+import mmap
+import struct
+import sys
+from collections.abc import Iterator, Mapping
+from typing import Any, Optional
+from lml_python.core.autograd import no_grad
+from lml_python.core.dtype import DType
+from lml_python.core.interfaces import ILayer, ITensor
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import fused
+
+# File layout:
+#   MAGIC | header length (uint64, little endian) | JSON header | padding
+#   | data section
+# Every storage block in the data section starts on an ALIGNMENT byte
+# boundary, relative to the start of the file.
+MAGIC = b"LMLTENS1"
+ALIGNMENT = 64
+_LENGTH = struct.Struct("<Q")
+
+
+def save(tensors: Mapping[str, ITensor],
+         path: str,
+         metadata: Optional[dict[str, Any]] = None):
+    """Write tensors to a checkpoint file
+
+    Tensors sharing storage, e.g. a weight and its transpose, are saved
+    as views of a single block, only the span of storage they reach is
+    written.
+
+    Args:
+        tensors (Mapping[str, ITensor]): Tensors to save, by name
+        path (str): File to write
+        metadata (Optional[dict[str, Any]], optional): JSON serialisable
+            values stored in the header. Defaults to None.
+    """
+    # Storage id -> [first, end) element span reached by its tensors
+    spans: dict[int, list[int]] = {}
+    sources: dict[int, ITensor] = {}
+    for t in tensors.values():
+        lo, hi = _span(t)
+        if hi == lo:
+            continue
+        span = spans.setdefault(id(t.data), [lo, hi])
+        span[0], span[1] = min(span[0], lo), max(span[1], hi)
+        sources[id(t.data)] = t
+
+    blocks = []
+    block_of: dict[int, int] = {}
+    position = 0
+    for key, (lo, hi) in spans.items():
+        position = _aligned(position)
+        itemsize = sources[key].dtype.itemsize
+        block_of[key] = len(blocks)
+        blocks.append({"start": position, "nbytes": (hi - lo) * itemsize})
+        position += (hi - lo) * itemsize
+
+    entries = {}
+    for name, t in tensors.items():
+        entry = {"dtype": t.dtype.typecode, "shape": list(t.shape),
+                 "strides": list(t.strides), "block": None, "offset": 0}
+        if id(t.data) in block_of:
+            entry["block"] = block_of[id(t.data)]
+            entry["offset"] = t.offset - spans[id(t.data)][0]
+        entries[name] = entry
+
+    header = json.dumps({"byteorder": sys.byteorder, "blocks": blocks,
+                         "tensors": entries,
+                         "metadata": metadata or {}}).encode()
+    data_start = _aligned(len(MAGIC) + _LENGTH.size + len(header))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header)))
+        f.write(header)
+        for key, block in zip(spans, blocks):
+            f.write(bytes(data_start + block["start"] - f.tell()))
+            lo, hi = spans[key]
+            f.write(memoryview(sources[key].data)[lo:hi])
+
+
+def load(path: str, lazy: bool = False) -> 'Checkpoint':
+    """Open a checkpoint file written by `save`
+
+    Tensors are backed directly by a memory mapping of the file, nothing
+    is read until their elements are. The mapping is copy-on-write,
+    tensors may be modified without changing the file.
+
+    Args:
+        path (str): File to read
+        lazy (bool, optional): Map the storage of each tensor only when
+            it is first accessed, rather than the whole file at once.
+            Defaults to False.
+
+    Returns:
+        Checkpoint: Read-only mapping of names to tensors
+    """
+    return Checkpoint(path, lazy)
+
+
+class Checkpoint(Mapping[str, Tensor]):
+    """Tensors of a checkpoint file, by name"""
+
+    def __init__(self, path: str, lazy: bool = False):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a tensor checkpoint")
+            (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+            header = json.loads(f.read(length))
+            self._data_start = _aligned(len(MAGIC) + _LENGTH.size + length)
+            self._map = None if lazy else _map(f, 0, 0)
+
+        self.metadata: dict[str, Any] = header["metadata"]
+        self._swap = header["byteorder"] != sys.byteorder
+        self._blocks: list[dict] = header["blocks"]
+        self._entries: dict[str, dict] = header["tensors"]
+        # Block index -> typed view of its bytes, shared by its tensors
+        self._storage: dict[int, memoryview] = {}
+        self._tensors: dict[str, Tensor] = {}
+
+    def __getitem__(self, name: str) -> Tensor:
+        tensor = self._tensors.get(name)
+        if tensor is None:
+            entry = self._entries[name]
+            dtype = DType.from_typecode(entry["dtype"])
+            if entry["block"] is None:
+                data = array.array(dtype.typecode)
+            else:
+                data = self._block(entry["block"], dtype)
+            tensor = self._tensors[name] = Tensor(
+                data, tuple(entry["shape"]), dtype, entry["strides"],
+                entry["offset"])
+        return tensor
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _block(self, index: int, dtype: DType) -> memoryview:
+        view = self._storage.get(index)
+        if view is not None:
+            return view
+        block = self._blocks[index]
+        start = self._data_start + block["start"]
+        if self._map is not None:
+            buffer = memoryview(self._map)[start:start + block["nbytes"]]
+        else:
+            # mmap offsets must be multiples of the allocation granularity
+            base = start - start % mmap.ALLOCATIONGRANULARITY
+            with open(self.path, "rb") as f:
+                mapping = _map(f, base, start - base + block["nbytes"])
+            buffer = memoryview(mapping)[start - base:]
+        if self._swap:
+            # Written on a machine of the other byte order, a converted
+            # copy replaces the mapping
+            swapped = array.array(dtype.typecode, bytes(buffer))
+            swapped.byteswap()
+            buffer = memoryview(swapped).cast("B")
+        view = self._storage[index] = buffer.cast(dtype.typecode)
+        return view
+
+
+def state_dict(layer: ILayer) -> dict[str, ITensor]:
+    """Parameters of a layer, named by their position in `parameters()`
+
+    Args:
+        layer (ILayer): Layer to take the parameters of
+
+    Returns:
+        dict[str, ITensor]: Parameters by name, the tensors themselves
+    """
+    return {str(i): p for i, p in enumerate(layer.parameters())}
+
+
+def load_state_dict(layer: ILayer, state: Mapping[str, ITensor]):
+    """Copy saved parameters into a layer, in place
+
+    Args:
+        layer (ILayer): Layer to update
+        state (Mapping[str, ITensor]): Parameters as returned by
+            `state_dict`, or a loaded checkpoint of them
+    """
+    own = state_dict(layer)
+    if set(own) != set(state):
+        raise KeyError(f"Expected parameters {sorted(own)}, got "
+                       f"{sorted(state)}")
+    for name, param in own.items():
+        if state[name].shape != param.shape:
+            raise ValueError(f"Parameter {name} has shape {param.shape}, "
+                             f"saved shape is {state[name].shape}")
+    with no_grad():
+        for name, param in own.items():
+            fused(state[name], out=param)
+
+
+def save_layer(layer: ILayer, path: str):
+    """Save the parameters of a layer, see `save`"""
+    save(state_dict(layer), path)
+
+
+def load_layer(layer: ILayer, path: str):
+    """Load parameters saved by `save_layer` into a layer"""
+    load_state_dict(layer, load(path))
+
+
+def _span(t: ITensor) -> tuple[int, int]:
+    # [first, end) storage elements a tensor can reach
+    if math.prod(t.shape) == 0:
+        return t.offset, t.offset
+    last = t.offset + sum((d - 1) * s for d, s in zip(t.shape, t.strides))
+    return t.offset, last + 1
+
+
+def _aligned(position: int) -> int:
+    return -(-position // ALIGNMENT) * ALIGNMENT
+
+
+def _map(f, offset: int, length: int) -> mmap.mmap:
+    # Copy-on-write, writes to the tensors never reach the file
+    return mmap.mmap(f.fileno(), length, access=mmap.ACCESS_COPY,
+                     offset=offset)
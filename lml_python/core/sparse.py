@@ -0,0 +1,608 @@
+import array
+import bisect
+import itertools
+import math
+from collections.abc import Sequence
+from itertools import repeat
+from operator import mul, truediv
+from typing import Optional
+from lml_python.core.autograd import needs_grad, record, requires_grad
+from lml_python.core.backend import get_backend
+from lml_python.core.dtype import DType, DEFAULT_DTYPE, promote_types
+from lml_python.core.interfaces import (
+    ITensor,
+    Scalar,
+    TensorData,
+    TensorIndices,
+    TensorKey,
+    TensorShape,
+)
+from lml_python.core.profiler import profiled, spmm_flops
+from lml_python.core.rng import Generator, default_generator
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import matmul
+
+
+class SparseTensor(ITensor):
+    """2D tensor storing only its non-zero elements, in CSR format
+
+    Compressed sparse row storage keeps three flat buffers: the non-zero
+    values row by row, the column of each value, and 'indptr', where row
+    i's values start. Memory is proportional to the number of non-zeros
+    (nnz) plus the number of rows, and a product with a dense matrix only
+    does work for the non-zeros, see `spmm`.
+
+    Build one from coordinates (COO) or from a dense tensor:
+
+        s = SparseTensor.from_coo([0, 2], [1, 0], [5.0, 7.0], (3, 2))
+        s = SparseTensor.from_dense(features)
+        y = matmul(s, weights)              # dispatches to spmm
+
+    The structure is immutable. Element-wise ops other than scaling by a
+    scalar, and views, work on `to_dense()`. Sparse tensors are treated
+    as constants by autograd, gradients flow to their dense operands.
+    """
+    is_sparse = True
+    _values: TensorData
+    _indices: array.array
+    _indptr: array.array
+    _shape: TensorShape
+    _dtype: DType
+
+    def __init__(self,
+                 data: TensorData | list,
+                 shape: TensorShape,
+                 dtype: Optional[DType] = None,
+                 indices: Optional[Sequence[int]] = None,
+                 indptr: Optional[Sequence[int]] = None):
+        """Create a tensor from CSR buffers, see `from_coo`
+
+        Args:
+            data (TensorData | list): Non-zero values, row by row
+            shape (TensorShape): (rows, columns)
+            dtype (Optional[DType], optional): Element type. Defaults to
+                DEFAULT_DTYPE.
+            indices (Optional[Sequence[int]], optional): Column of every
+                value, ascending within a row. Defaults to none.
+            indptr (Optional[Sequence[int]], optional): rows + 1 offsets
+                into the values. Defaults to all rows empty.
+        """
+        if len(shape) != 2:
+            raise ValueError(f"Sparse tensors are 2D, got shape {shape}")
+        rows, cols = shape
+        dtype = dtype or (DType.from_typecode(data.format)
+                          if isinstance(data, memoryview) else
+                          DType.from_typecode(data.typecode)
+                          if isinstance(data, array.array) else
+                          DEFAULT_DTYPE)
+        self._shape = tuple(shape)
+        self._dtype = dtype
+        self._values = (data if isinstance(data, array.array)
+                        and data.typecode == dtype.typecode
+                        else array.array(dtype.typecode, data))
+        self._indices = array.array("i", indices or ())
+        self._indptr = array.array("q", indptr if indptr is not None
+                                   else [0] * (rows + 1))
+        nnz = len(self._values)
+        if len(self._indptr) != rows + 1 or self._indptr[-1] != nnz:
+            raise ValueError(f"indptr must hold {rows + 1} offsets ending "
+                             f"at the {nnz} values")
+        if len(self._indices) != nnz:
+            raise ValueError(f"Expected {nnz} column indices, got "
+                             f"{len(self._indices)}")
+        if nnz and not 0 <= min(self._indices) <= max(self._indices) < cols:
+            raise IndexError(f"Column index out of range for {cols} "
+                             "columns")
+
+    @classmethod
+    def from_coo(cls,
+                 rows: Sequence[int],
+                 cols: Sequence[int],
+                 values: Sequence[Scalar],
+                 shape: TensorShape,
+                 dtype: Optional[DType] = None) -> 'SparseTensor':
+        """Create a tensor from (row, column, value) triplets
+
+        Triplets may come in any order, duplicates are summed.
+
+        Args:
+            rows (Sequence[int]): Row of every value
+            cols (Sequence[int]): Column of every value
+            values (Sequence[Scalar]): The values
+            shape (TensorShape): (rows, columns)
+            dtype (Optional[DType], optional): Element type. Defaults to
+                DEFAULT_DTYPE.
+
+        Returns:
+            SparseTensor: Tensor in CSR storage
+        """
+        if not len(rows) == len(cols) == len(values):
+            raise ValueError("rows, cols and values must have the same "
+                             "length")
+        n, m = shape
+        if rows and not (0 <= min(rows) and max(rows) < n):
+            raise IndexError(f"Row index out of range for {n} rows")
+        if cols and not (0 <= min(cols) and max(cols) < m):
+            raise IndexError(f"Column index out of range for {m} columns")
+        # Row major position of every triplet, sorting by it orders the
+        # triplets by row, then column
+        keys = list(map(int.__add__, map(mul, rows, repeat(m)), cols))
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        dtype = dtype or DEFAULT_DTYPE
+        out_values = array.array(dtype.typecode)
+        out_keys: list[int] = []
+        for i in order:
+            if out_keys and out_keys[-1] == keys[i]:
+                out_values[-1] += values[i]
+            else:
+                out_keys.append(keys[i])
+                out_values.append(values[i])
+        counts = [0] * n
+        for key in out_keys:
+            counts[key // m] += 1
+        return cls(out_values, shape, dtype,
+                   [key % m for key in out_keys],
+                   [0, *itertools.accumulate(counts)])
+
+    @classmethod
+    def from_dense(cls, t: ITensor) -> 'SparseTensor':
+        """Sparse copy of the non-zero elements of a 2D tensor
+
+        Args:
+            t (ITensor): Dense tensor
+
+        Returns:
+            SparseTensor: Tensor with the same elements
+        """
+        if t.rank != 2:
+            raise ValueError(f"Sparse tensors are 2D, got shape {t.shape}")
+        t = t.contiguous()
+        n, m = t.shape
+        values = array.array(t.dtype.typecode)
+        indices = array.array("i")
+        indptr = array.array("q", [0])
+        columns = range(m)
+        for i in range(n):
+            start = t.offset + i * m
+            row = t.data[start:start + m]
+            # compress() keeps the truthy entries, i.e. the non-zeros
+            values.extend(itertools.compress(row, row))
+            indices.extend(itertools.compress(columns, row))
+            indptr.append(len(values))
+        return cls(values, t.shape, t.dtype, indices, indptr)
+
+    @classmethod
+    def random(cls,
+               shape: TensorShape,
+               density: float,
+               uniform_range: tuple[float, float] = (-1.0, 1.0),
+               dtype: Optional[DType] = None,
+               generator: Optional[Generator] = None) -> 'SparseTensor':
+        """Tensor with uniform random values at random positions
+
+        Positions are drawn with replacement, so the actual density is
+        slightly below 'density' for dense tensors.
+
+        Args:
+            shape (TensorShape): (rows, columns)
+            density (float): Fraction of non-zero elements, in [0, 1]
+            uniform_range (tuple[float, float], optional): Range of the
+                values. Defaults to (-1.0, 1.0).
+            dtype (Optional[DType], optional): Element type. Defaults to
+                DEFAULT_DTYPE.
+            generator (Optional[Generator], optional): Source of positions
+                and values. Defaults to the default generator.
+
+        Returns:
+            SparseTensor: Newly created tensor
+        """
+        if not 0.0 <= density <= 1.0:
+            raise ValueError("density must be in [0, 1]")
+        generator = generator or default_generator()
+        n, m = shape
+        total = n * m
+        draws = round(density * total)
+        keys = sorted(set(generator.integers(draws, 0, total))
+                      if draws else ())
+        values = generator.uniform(len(keys), *uniform_range)
+        return cls.from_coo([k // m for k in keys], [k % m for k in keys],
+                            values, shape, dtype)
+
+    def to_dense(self) -> Tensor:
+        """Dense copy
+
+        Returns:
+            Tensor: Tensor with the same elements, zeros included
+        """
+        n, m = self._shape
+        d = array.array(self._dtype.typecode, [0]) * (n * m)
+        indptr, indices, values = self._indptr, self._indices, self._values
+        for i in range(n):
+            base = i * m
+            for p in range(indptr[i], indptr[i + 1]):
+                d[base + indices[p]] = values[p]
+        return Tensor(d, self._shape, self._dtype)
+
+    def to_coo(self) -> tuple[array.array, array.array, TensorData]:
+        """(row, column, value) triplets of the non-zeros, row by row"""
+        rows = array.array("i")
+        for i in range(self._shape[0]):
+            rows.extend(repeat(i, self._indptr[i + 1] - self._indptr[i]))
+        return rows, array.array("i", self._indices), self._values[:]
+
+    @property
+    def nnz(self) -> int:
+        """Number of stored elements"""
+        return len(self._values)
+
+    @property
+    def density(self) -> float:
+        """Fraction of the elements that are stored"""
+        total = math.prod(self._shape)
+        return self.nnz / total if total else 0.0
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the three buffers"""
+        return sum(len(buf) * buf.itemsize for buf in
+                   (self._values, self._indices, self._indptr))
+
+    @property
+    def indices(self) -> array.array:
+        return self._indices
+
+    @property
+    def indptr(self) -> array.array:
+        return self._indptr
+
+    def __getitem__(self, key: TensorKey) -> 'float | Tensor':
+        """Element (i, j) or dense row i, slices need `to_dense()`"""
+        if isinstance(key, int):
+            i = self._check_row(key)
+            row = Tensor.with_zeros((self._shape[1],), self._dtype)
+            for p in range(self._indptr[i], self._indptr[i + 1]):
+                row.data[self._indices[p]] = self._values[p]
+            return row
+        if (isinstance(key, tuple) and len(key) == 2
+                and all(isinstance(k, int) for k in key)):
+            i = self._check_row(key[0])
+            j = key[1] + self._shape[1] if key[1] < 0 else key[1]
+            if not 0 <= j < self._shape[1]:
+                raise IndexError(f"Index {key[1]} out of range for "
+                                 f"{self._shape[1]} columns")
+            start, end = self._indptr[i], self._indptr[i + 1]
+            p = bisect.bisect_left(self._indices, j, start, end)
+            if p < end and self._indices[p] == j:
+                return self._values[p]
+            return 0.0 if self._dtype.is_floating else 0
+        raise TypeError("Sparse tensors support element and row access "
+                        "only, use to_dense() for slices")
+
+    def __setitem__(self, key: TensorKey, value: 'float | ITensor'):
+        raise TypeError("Sparse tensors are immutable, build a new one "
+                        "with from_coo()")
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ITensor):
+            return NotImplemented
+        if isinstance(other, SparseTensor):
+            other = other.to_dense()
+        return self.to_dense() == other
+
+    def __repr__(self) -> str:
+        return (f"SparseTensor(shape={self._shape}, nnz={self.nnz}, "
+                f"dtype={self._dtype})")
+
+    def __matmul__(self, other: ITensor) -> ITensor:
+        if not isinstance(other, ITensor):
+            return NotImplemented
+        return matmul(self, other)
+
+    def __rmatmul__(self, other: ITensor) -> ITensor:
+        if not isinstance(other, ITensor):
+            return NotImplemented
+        return matmul(other, self)
+
+    def __add__(self, other: ITensor | Scalar) -> ITensor:
+        return self.to_dense() + other
+
+    __radd__ = __add__
+
+    def __sub__(self, other: ITensor | Scalar) -> ITensor:
+        return self.to_dense() - other
+
+    def __rsub__(self, other: ITensor | Scalar) -> ITensor:
+        return other - self.to_dense()
+
+    def __mul__(self, other: ITensor | Scalar) -> ITensor:
+        if isinstance(other, (int, float)):
+            return self._scaled(mul, other)
+        return self.to_dense() * other
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other: ITensor | Scalar) -> ITensor:
+        if isinstance(other, (int, float)):
+            return self._scaled(truediv, other)
+        return self.to_dense() / other
+
+    def __neg__(self) -> 'SparseTensor':
+        return self._scaled(mul, -1)
+
+    @property
+    def shape(self) -> TensorShape:
+        return self._shape
+
+    @property
+    def data(self) -> TensorData:
+        """The non-zero values, row by row"""
+        return self._values
+
+    @property
+    def rank(self) -> int:
+        return 2
+
+    @property
+    def dtype(self) -> DType:
+        return self._dtype
+
+    @property
+    def strides(self) -> tuple[int, ...]:
+        raise TypeError("Sparse tensors have no strides, use to_dense()")
+
+    @property
+    def offset(self) -> int:
+        return 0
+
+    @property
+    def requires_grad(self) -> bool:
+        return False
+
+    @requires_grad.setter
+    def requires_grad(self, value: bool):
+        if value:
+            raise ValueError("Sparse tensors do not track gradients")
+
+    @property
+    def grad(self) -> None:
+        return None
+
+    @grad.setter
+    def grad(self, value: Optional[ITensor]):
+        if value is not None:
+            raise ValueError("Sparse tensors do not track gradients")
+
+    @property
+    def grad_fn(self) -> None:
+        return None
+
+    @grad_fn.setter
+    def grad_fn(self, node):
+        if node is not None:
+            raise ValueError("Sparse tensors do not track gradients")
+
+    def backward(self,
+                 gradient: Optional[ITensor] = None,
+                 retain_graph: bool = False):
+        raise RuntimeError("Sparse tensors do not track gradients")
+
+    def transpose(self, dim0: int = -2, dim1: int = -1) -> 'SparseTensor':
+        """Transposed copy, also in CSR storage
+
+        The columns of this tensor become rows: a counting sort by column
+        in O(nnz + columns).
+        """
+        if dim0 % 2 == dim1 % 2:
+            return self
+        n, m = self._shape
+        counts = [0] * m
+        for j in self._indices:
+            counts[j] += 1
+        indptr = [0, *itertools.accumulate(counts)]
+        # Next free slot of every transposed row
+        slots = indptr[:-1]
+        values = array.array(self._dtype.typecode, self._values)
+        indices = array.array("i", self._indices)
+        for i in range(n):
+            for p in range(self._indptr[i], self._indptr[i + 1]):
+                j = self._indices[p]
+                q = slots[j]
+                slots[j] = q + 1
+                values[q] = self._values[p]
+                indices[q] = i
+        return SparseTensor(values, (m, n), self._dtype, indices, indptr)
+
+    @property
+    def T(self) -> 'SparseTensor':
+        return self.transpose()
+
+    def permute(self, *dims: int) -> 'SparseTensor':
+        if sorted(d % 2 for d in dims) != [0, 1]:
+            raise ValueError(f"Invalid permutation {dims} for 2 dims")
+        return self.transpose() if dims[0] % 2 == 1 else self
+
+    def reshape(self, shape: TensorShape) -> ITensor:
+        raise _dense_only("reshape")
+
+    def expand(self, shape: TensorShape) -> ITensor:
+        raise _dense_only("expand")
+
+    def as_strided(self,
+                   shape: TensorShape,
+                   strides: Sequence[int],
+                   offset: int = 0) -> ITensor:
+        raise _dense_only("as_strided")
+
+    def take(self,
+             indices: TensorIndices,
+             axis: Optional[int] = None) -> ITensor:
+        raise _dense_only("take")
+
+    def put(self,
+            indices: TensorIndices,
+            values: 'ITensor | Scalar',
+            accumulate: bool = False):
+        raise _dense_only("put")
+
+    def gather(self, axis: int, index: TensorIndices) -> ITensor:
+        raise _dense_only("gather")
+
+    def scatter(self,
+                axis: int,
+                index: TensorIndices,
+                src: 'ITensor | Scalar',
+                accumulate: bool = False):
+        raise _dense_only("scatter")
+
+    def set_storage(self,
+                    data: TensorData,
+                    offset: int = 0,
+                    strides: Optional[Sequence[int]] = None):
+        raise _dense_only("set_storage")
+
+    def is_contiguous(self) -> bool:
+        return False
+
+    def contiguous(self) -> Tensor:
+        """Dense copy, what kernels walking strided storage need"""
+        return self.to_dense()
+
+    @classmethod
+    def with_list(cls,
+                  data: list,
+                  shape: TensorShape,
+                  dtype: Optional[DType] = None) -> 'SparseTensor':
+        return cls.from_dense(Tensor.with_list(data, shape, dtype))
+
+    @classmethod
+    def with_zeros(cls,
+                   shape: TensorShape,
+                   dtype: Optional[DType] = None) -> 'SparseTensor':
+        return cls((), shape, dtype)
+
+    @classmethod
+    def empty(cls,
+              shape: TensorShape,
+              dtype: Optional[DType] = None) -> 'SparseTensor':
+        return cls.with_zeros(shape, dtype)
+
+    @classmethod
+    def full(cls,
+             shape: TensorShape,
+             value: Scalar,
+             dtype: Optional[DType] = None) -> 'SparseTensor':
+        return cls.from_dense(Tensor.full(shape, value, dtype))
+
+    @classmethod
+    def arange(cls,
+               start: Scalar,
+               stop: Optional[Scalar] = None,
+               step: Scalar = 1,
+               dtype: Optional[DType] = None) -> 'SparseTensor':
+        raise TypeError("Sparse tensors are 2D, arange() makes vectors")
+
+    @classmethod
+    def eye(cls,
+            n: int,
+            m: Optional[int] = None,
+            dtype: Optional[DType] = None) -> 'SparseTensor':
+        m = n if m is None else m
+        k = min(n, m)
+        dtype = dtype or DEFAULT_DTYPE
+        return cls(array.array(dtype.typecode, [1]) * k, (n, m), dtype,
+                   range(k), [*range(k + 1), *repeat(k, n - k)])
+
+    @classmethod
+    def with_uniform(cls,
+                     shape: TensorShape,
+                     uniform_range: tuple[float, float],
+                     dtype: Optional[DType] = None,
+                     generator: Optional[Generator] = None
+                     ) -> 'SparseTensor':
+        # Every element is drawn, see `random` for a sparse pattern
+        return cls.from_dense(Tensor.with_uniform(shape, uniform_range,
+                                                  dtype, generator))
+
+    @classmethod
+    def with_normal(cls,
+                    shape: TensorShape,
+                    mean: float = 0.0,
+                    std: float = 1.0,
+                    dtype: Optional[DType] = None,
+                    generator: Optional[Generator] = None
+                    ) -> 'SparseTensor':
+        return cls.from_dense(Tensor.with_normal(shape, mean, std, dtype,
+                                                 generator))
+
+    def _check_row(self, i: int) -> int:
+        n = self._shape[0]
+        if not -n <= i < n:
+            raise IndexError(f"Index {i} out of range for {n} rows")
+        return i + n if i < 0 else i
+
+    def _scaled(self, op, scalar: Scalar) -> 'SparseTensor':
+        # Scaling keeps the sparsity pattern, zeros stay zeros
+        values = list(map(op, self._values, repeat(scalar)))
+        dtype = self._dtype
+        if not dtype.is_floating and (isinstance(scalar, float)
+                                      or op is truediv):
+            dtype = DEFAULT_DTYPE
+        return SparseTensor(values, self._shape, dtype, self._indices,
+                            self._indptr)
+
+
+def _dense_only(op: str) -> TypeError:
+    return TypeError(f"{op}() is not supported on sparse tensors, use "
+                     "to_dense()")
+
+
+@profiled(spmm_flops, category="sparse")
+def spmm(a: ITensor,
+         b: ITensor,
+         out: Optional[ITensor] = None) -> Tensor:
+    """Product of 2D operands of which at least one is sparse
+
+    `tmath.matmul` dispatches here for sparse operands. A sparse left
+    operand runs the backend's CSR kernel directly. For a sparse right
+    operand the product is computed transposed, (b^T @ a^T)^T, writing
+    through a transposed view of the output. Either way the work is
+    proportional to the non-zeros times the dense operand's other
+    dimension. Gradients flow to the dense operand.
+
+    Args:
+        a (ITensor): Left operand
+        b (ITensor): Right operand
+        out (Optional[ITensor], optional): Dense output. Defaults to None.
+
+    Returns:
+        Tensor: Dense result
+    """
+    if a.rank != 2 or b.rank != 2:
+        raise ValueError("Sparse products need 2D operands, got shapes "
+                         f"{a.shape} and {b.shape}")
+    if a.shape[1] != b.shape[0]:
+        raise ValueError(f"Shapes {a.shape} and {b.shape} are not aligned")
+    shape = (a.shape[0], b.shape[1])
+    if out is None:
+        out = Tensor.empty(shape, promote_types(a.dtype, b.dtype))
+    elif out.shape != shape:
+        raise ValueError("Output tensor shape is not aligned")
+
+    if a.is_sparse:
+        if b.is_sparse:
+            b = b.to_dense()
+        sparse, dense, target = a, b, out
+    else:
+        sparse, dense, target = b.transpose(), a.transpose(), out.transpose()
+    get_backend().spmm(sparse.indptr, sparse.indices, sparse.data, dense,
+                       target)
+
+    if needs_grad(a, b):
+        def backward(g: ITensor) -> Sequence[Optional[ITensor]]:
+            if a.is_sparse:
+                return None, (spmm(a.transpose(), g)
+                              if requires_grad(b) else None)
+            return spmm(g, b.transpose()), None
+
+        record("spmm", out, (a, b), backward)
+    return out
@@ -1,67 +1,130 @@
-import random
+import array
 import itertools
 import math
-import lml_python.core.vmath as vmath
-from lml_python.core.tmath import matmul, matadd
+import operator
+from collections.abc import Sequence
+from typing import Optional
+from lml_python.core.autograd import Node, backward, needs_grad, record
+from lml_python.core.tmath import matmul, matadd, matsub, hadamard, matdiv
+from lml_python.core.dtype import DType, DEFAULT_DTYPE
+from lml_python.core.memory import active_pool
+from lml_python.core.rng import Generator, default_generator
+from lml_python.core.layout import (
+    TensorStrides,
+    contiguous_strides,
+    element_offsets,
+    is_contiguous,
+)
 from lml_python.core.interfaces import (
+    Scalar,
     TensorData,
+    TensorIndices,
+    TensorKey,
     TensorShape,
     TensorTarget,
     ITensor,
 )
 
+# Operand types of the arithmetic operators. Others get NotImplemented, so
+# e.g. a LazyTensor on the right hand side handles the expression.
+_OPERANDS = (ITensor, int, float)
+
 
 class Tensor(ITensor):
     _data: TensorData
+    _dtype: DType
     _shape: TensorShape
     _rank: int
     _strides: list[int]
+    _offset: int
+    # Autograd state, class level defaults keep construction cheap
+    _requires_grad: bool = False
+    _grad: Optional['Tensor'] = None
+    _grad_fn: Optional[Node] = None
 
-    def __init__(self, data: TensorData, shape: TensorShape):
+    def __init__(self,
+                 data: TensorData | list,
+                 shape: TensorShape,
+                 dtype: Optional[DType] = None,
+                 strides: Optional[TensorStrides] = None,
+                 offset: int = 0):
         """Base constructor for a Tensor
 
         Infers strides for row major order by default
         Infers rank from inbound shape
 
+        Buffers (`array.array` or `memoryview`) whose element type already
+        matches the dtype are adopted without copying. Anything else is
+        copied into a new typed buffer. Tensors sharing a buffer are views
+        of each other, element (i, j, ...) lives at
+        offset + i * strides[0] + j * strides[1] + ...
+
         Args:
-            data (TensorData): Raw tensor data
+            data (TensorData | list): Raw tensor data
             shape (TensorShape): Shape of the tensor. Used to infer rank and strides
+            dtype (Optional[DType], optional): Element type. Inferred from
+                buffer data, otherwise defaults to DEFAULT_DTYPE.
+            strides (Optional[TensorStrides], optional): Element strides.
+                Defaults to row-major strides for the shape.
+            offset (int, optional): Index of the first element in the
+                data. Defaults to 0.
         """
         # TODO: Implement dedicated viewer/iterator for a tensor
-        # TODO: [C/C++] Implement dtype akin to numpy and pytorch
 
-        self._data = data
-        self._shape = shape
+        self._data, self._dtype = self._as_storage(data, dtype)
+        self._shape = tuple(shape)
         self._rank = len(shape)
-        self._strides = self._calculate_strides(shape)
+        self._strides = (list(strides) if strides is not None
+                         else contiguous_strides(shape))
+        self._offset = offset
 
-    def __getitem__(self, key: TensorTarget) -> float:
-        assert len(self.shape) == len(key)
-        fi = self._flat_idx(key)
-        if fi >= len(self._data):
-            raise IndexError("Index out of bounds")
-        return self._data[self._flat_idx(key)]
+    def __getitem__(self, key: TensorKey) -> 'float | Tensor':
+        """Read a single element or take a view
 
-    def __setitem__(self, key: TensorTarget, value: float):
-        assert len(self.shape) == len(key)
-        fi = self._flat_idx(key)
-        if fi >= len(self._data):
-            raise IndexError("Index out of bounds")
-        self._data[self._flat_idx(key)] = value
+        A full tuple of integer indices reads one element. Anything else
+        (slices, fewer indices than dimensions) returns a view sharing
+        this tensor's data.
+        """
+        offset = self._element_offset(key)
+        if offset is None:
+            return self._view_for_key(key if isinstance(key, tuple)
+                                      else (key,))
+        return self._data[offset]
+
+    def __setitem__(self, key: TensorKey, value: 'float | ITensor'):
+        offset = self._element_offset(key)
+        if offset is None:
+            self._view_for_key(key if isinstance(key, tuple)
+                               else (key,))._assign(value)
+        else:
+            self._data[offset] = value
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Tensor):
             return NotImplemented
-        return self._data == other._data and self.shape == other.shape
+        return (self.shape == other.shape
+                and self._values() == other._values())
 
     def __repr__(self) -> str:
         return f"""Tensor(
     shape={self.shape},
+    dtype={self._dtype.name.lower()},
     rank={self._rank},
     strides={self._strides},
-    data={self._data})
+    offset={self._offset},
+    data={self._values().tolist()})
 """
 
+    def __buffer__(self, flags: int) -> memoryview:
+        if not self.is_contiguous():
+            raise BufferError("Tensor is not contiguous, "
+                              "call contiguous() first")
+        n = math.prod(self._shape)
+        view = memoryview(self._data)[self._offset:self._offset + n]
+        if self._rank > 0:
+            view = view.cast("B").cast(self._dtype.typecode, self._shape)
+        return view
+
     def __matmul__(self, other: ITensor) -> ITensor:
         """Multiplies two tensors together.
 
@@ -73,19 +136,79 @@ class Tensor(ITensor):
         Returns:
             ITensor: Product of the two tensors
         """
+        if not isinstance(other, _OPERANDS):
+            return NotImplemented
         return matmul(self, other)
 
-    def __add__(self, other: ITensor) -> ITensor:
+    def __add__(self, other: ITensor | Scalar) -> ITensor:
         """Adds two tensors together
 
+        Shapes are broadcast, see `tmath.matadd`
+
         Args:
-            other (ITensor): Other tensor
+            other (ITensor | Scalar): Other tensor
 
         Returns:
             ITensor: Sum of the two tensors
         """
+        if not isinstance(other, _OPERANDS):
+            return NotImplemented
         return matadd(self, other)
 
+    def __radd__(self, other: Scalar) -> ITensor:
+        return matadd(other, self)
+
+    def __sub__(self, other: ITensor | Scalar) -> ITensor:
+        """Subtracts another tensor from this one
+
+        Args:
+            other (ITensor | Scalar): Other tensor
+
+        Returns:
+            ITensor: Difference of the two tensors
+        """
+        if not isinstance(other, _OPERANDS):
+            return NotImplemented
+        return matsub(self, other)
+
+    def __rsub__(self, other: Scalar) -> ITensor:
+        return matsub(other, self)
+
+    def __mul__(self, other: ITensor | Scalar) -> ITensor:
+        """Multiplies two tensors element-wise
+
+        Args:
+            other (ITensor | Scalar): Other tensor
+
+        Returns:
+            ITensor: Element-wise product of the two tensors
+        """
+        if not isinstance(other, _OPERANDS):
+            return NotImplemented
+        return hadamard(self, other)
+
+    def __rmul__(self, other: Scalar) -> ITensor:
+        return hadamard(other, self)
+
+    def __truediv__(self, other: ITensor | Scalar) -> ITensor:
+        """Divides this tensor by another element-wise
+
+        Args:
+            other (ITensor | Scalar): Other tensor
+
+        Returns:
+            ITensor: Element-wise quotient of the two tensors
+        """
+        if not isinstance(other, _OPERANDS):
+            return NotImplemented
+        return matdiv(self, other)
+
+    def __rtruediv__(self, other: Scalar) -> ITensor:
+        return matdiv(other, self)
+
+    def __neg__(self) -> ITensor:
+        return hadamard(self, -1)
+
     @property
     def shape(self) -> TensorShape:
         return self._shape
@@ -98,82 +221,872 @@ class Tensor(ITensor):
     def rank(self) -> int:
         return self._rank
 
+    @property
+    def dtype(self) -> DType:
+        return self._dtype
+
+    @property
+    def strides(self) -> tuple[int, ...]:
+        return tuple(self._strides)
+
+    @property
+    def offset(self) -> int:
+        return self._offset
+
+    @property
+    def requires_grad(self) -> bool:
+        """Whether gradients flow to this tensor
+
+        Set it on leaves such as parameters. Results of recorded ops
+        require grad on their own.
+        """
+        return self._requires_grad or self._grad_fn is not None
+
+    @requires_grad.setter
+    def requires_grad(self, value: bool):
+        if value and not self._dtype.is_floating:
+            raise TypeError("Only floating point tensors can require "
+                            "gradients")
+        self._requires_grad = value
+
+    @property
+    def grad(self) -> Optional['Tensor']:
+        """Gradient accumulated by backward passes, None until the first"""
+        return self._grad
+
+    @grad.setter
+    def grad(self, value: Optional['Tensor']):
+        self._grad = value
+
+    @property
+    def grad_fn(self) -> Optional[Node]:
+        """Recorded op that produced this tensor, None for leaves"""
+        return self._grad_fn
+
+    @grad_fn.setter
+    def grad_fn(self, node: Optional[Node]):
+        self._grad_fn = node
+
+    def backward(self,
+                 gradient: Optional['Tensor'] = None,
+                 retain_graph: bool = False):
+        """Accumulate gradients of this tensor into the leaves it uses
+
+        See `autograd.backward`.
+
+        Args:
+            gradient (Optional[Tensor], optional): Gradient of this
+                tensor. Defaults to 1 for single element tensors.
+            retain_graph (bool, optional): Keep the graph to backward
+                through it again. Defaults to False.
+        """
+        backward(self, gradient, retain_graph)
+
+    def detach(self) -> 'Tensor':
+        """View sharing this tensor's data but not its graph
+
+        Returns:
+            Tensor: View that does not require grad
+        """
+        return self.as_strided(self._shape, self._strides)
+
+    @property
+    def T(self) -> 'Tensor':
+        """View with the order of all dimensions reversed"""
+        return self.permute(*reversed(range(self._rank)))
+
     def reshape(self, shape: TensorShape) -> 'Tensor':
         """Reshape the tensor
 
+        Contiguous tensors are reshaped as a view sharing the same data,
+        anything else is copied first. One dimension may be -1, in which
+        case it is inferred.
+
         Args:
             shape (TensorShape): New shape for the tensor
 
         Returns:
             Tensor: Newly reshaped tensor
         """
-        if math.prod(shape) != math.prod(self.shape):
+        shape = tuple(shape)
+        numel = math.prod(self.shape)
+        if -1 in shape:
+            known = -math.prod(shape)
+            if shape.count(-1) > 1 or known == 0 or numel % known:
+                raise ValueError(f"Cannot infer shape {shape} for {numel} "
+                                 "elements")
+            shape = tuple(numel // known if d == -1 else d for d in shape)
+
+        if math.prod(shape) != numel:
             raise ValueError("New shape must have the same number of elements")
 
-        self._shape = shape
-        self._rank = len(shape)
-        self._strides = self._calculate_strides(shape)
-        return self
+        if not self.is_contiguous():
+            return self.contiguous().reshape(shape)
+        view = self.as_strided(shape, contiguous_strides(shape))
+        if needs_grad(self):
+            old_shape = self._shape
+            record("reshape", view, (self,),
+                   lambda g: (g.reshape(old_shape),))
+        return view
+
+    def transpose(self, dim0: int = -2, dim1: int = -1) -> 'Tensor':
+        """View with two dimensions swapped
+
+        Args:
+            dim0 (int, optional): First dimension. Defaults to -2.
+            dim1 (int, optional): Second dimension. Defaults to -1.
+
+        Returns:
+            Tensor: Transposed view, no data is copied
+        """
+        dims = list(range(self._rank))
+        dims[dim0], dims[dim1] = dims[dim1], dims[dim0]
+        return self.permute(*dims)
+
+    def permute(self, *dims: int) -> 'Tensor':
+        """View with the dimensions reordered
+
+        Args:
+            dims (int): New order of the dimensions, e.g. permute(2, 0, 1)
+
+        Returns:
+            Tensor: Permuted view, no data is copied
+        """
+        if len(dims) == 1 and isinstance(dims[0], (tuple, list)):
+            dims = tuple(dims[0])
+        dims = tuple(d % self._rank for d in dims) if self._rank else dims
+        if sorted(dims) != list(range(self._rank)):
+            raise ValueError(f"{dims} is not a permutation of the "
+                             f"dimensions of a rank {self._rank} tensor")
+        view = self.as_strided(tuple(self._shape[d] for d in dims),
+                               [self._strides[d] for d in dims])
+        if needs_grad(self):
+            inverse = sorted(range(len(dims)), key=dims.__getitem__)
+            record("permute", view, (self,),
+                   lambda g: (g.permute(*inverse),))
+        return view
+
+    def expand(self, shape: TensorShape) -> 'Tensor':
+        """View broadcasting size 1 dimensions to a larger shape
+
+        New leading dimensions may be added. Expanded dimensions get a
+        stride of 0 so every index along them reads the same element. A
+        size of -1 keeps the existing dimension.
+
+        Args:
+            shape (TensorShape): Shape to expand to
+
+        Returns:
+            Tensor: Expanded view, no data is copied
+        """
+        shape = tuple(shape)
+        lead = len(shape) - self._rank
+        if lead < 0:
+            raise ValueError(f"Cannot expand {self.shape} to fewer "
+                             f"dimensions {shape}")
+
+        new_shape = list(shape[:lead])
+        strides = [0] * lead
+        for size, dim, stride in zip(shape[lead:], self._shape,
+                                     self._strides):
+            if size == -1 or size == dim:
+                new_shape.append(dim)
+                strides.append(stride)
+            elif dim == 1:
+                new_shape.append(size)
+                strides.append(0)
+            else:
+                raise ValueError(f"Cannot expand {self.shape} to {shape}")
+        view = self.as_strided(tuple(new_shape), strides)
+        if needs_grad(self):
+            # The engine sums broadcast gradients back to the input shape
+            record("expand", view, (self,), lambda g: (g,))
+        return view
+
+    def as_strided(self,
+                   shape: TensorShape,
+                   strides: TensorStrides,
+                   offset: Optional[int] = None) -> 'Tensor':
+        """Arbitrary view over this tensor's data
+
+        No bounds checking is done, the caller is responsible for keeping
+        every reachable element inside the data.
+
+        Args:
+            shape (TensorShape): Shape of the view
+            strides (TensorStrides): Element strides of the view
+            offset (Optional[int], optional): Offset of the first element.
+                Defaults to this tensor's offset.
+
+        Returns:
+            Tensor: View sharing this tensor's data
+        """
+        if offset is None:
+            offset = self._offset
+        return self.__class__(self._data, shape, self._dtype, strides, offset)
+
+    def set_storage(self,
+                    data: TensorData,
+                    offset: int = 0,
+                    strides: Optional[TensorStrides] = None):
+        """Point this tensor at other storage, in place
+
+        The shape and dtype are kept, e.g. to move parameters into one
+        shared buffer while every reference to the tensor stays valid.
+        Views taken before keep the old storage.
+
+        Args:
+            data (TensorData): Buffer of this tensor's element type
+            offset (int, optional): Index of the first element in the
+                data. Defaults to 0.
+            strides (Optional[TensorStrides], optional): Element strides.
+                Defaults to row-major strides for the shape.
+        """
+        storage, _ = self._as_storage(data, self._dtype)
+        if storage is not data:
+            raise TypeError(f"Storage must hold {self._dtype} elements")
+        self._data = storage
+        self._offset = offset
+        self._strides = (list(strides) if strides is not None
+                         else contiguous_strides(self._shape))
+
+    def is_contiguous(self) -> bool:
+        """Whether the tensor data is laid out densely in row-major order
+
+        Returns:
+            bool: True if kernels can walk the flat data directly, starting
+                at the tensor offset
+        """
+        return is_contiguous(self._shape, self._strides)
+
+    def contiguous(self) -> 'Tensor':
+        """Densely packed version of the tensor
+
+        Returns:
+            Tensor: This tensor if already contiguous, otherwise a copy
+        """
+        if self.is_contiguous():
+            return self
+        copy = self.__class__(self._values(), self._shape, self._dtype)
+        if needs_grad(self):
+            record("contiguous", copy, (self,), lambda g: (g,))
+        return copy
+
+    def take(self,
+             indices: TensorIndices,
+             axis: Optional[int] = None) -> 'Tensor':
+        """Read many elements, or slices along an axis, at once
+
+        Without an axis the indices address the elements in row-major
+        order and the result has the shape of the indices. With an axis
+        they select slices along it, e.g. rows of an embedding table with
+        axis=0, and the result has shape
+        shape[:axis] + indices.shape + shape[axis + 1:].
+
+        Args:
+            indices (TensorIndices): Integer tensor or sequence of
+                indices. Negative indices count from the end.
+            axis (Optional[int], optional): Axis to select along. Defaults
+                to None.
+
+        Returns:
+            Tensor: Newly created tensor with the selected elements
+        """
+        idx, idx_shape = self._as_indices(indices)
+        if axis is None:
+            idx = self._bounded(idx, math.prod(self._shape))
+            offsets = self._logical_offsets(idx)
+            shape = idx_shape
+        else:
+            axis = self._axis(axis)
+            idx = self._bounded(idx, self._shape[axis])
+            offsets = self._take_offsets(idx, axis)
+            shape = self._shape[:axis] + idx_shape + self._shape[axis + 1:]
+
+        data = self._data
+        result = self.__class__(
+            array.array(self._dtype.typecode, map(data.__getitem__, offsets)),
+            shape, self._dtype)
+        if needs_grad(self):
+            cls, base_shape, dtype = self.__class__, self._shape, self._dtype
+
+            def backward(g: 'Tensor') -> tuple['Tensor']:
+                full = cls.with_zeros(base_shape, dtype)
+                offsets = (idx if axis is None
+                           else full._take_offsets(idx, axis))
+                full._write(offsets, g._values(), accumulate=True)
+                return (full,)
+
+            record("take", result, (self,), backward)
+        return result
+
+    def put(self,
+            indices: TensorIndices,
+            values: 'ITensor | Scalar',
+            accumulate: bool = False):
+        """Write many elements at once, in place
+
+        Indices address the elements in row-major order, as for `take`
+        without an axis. Not recorded by autograd.
+
+        Args:
+            indices (TensorIndices): Integer tensor or sequence of
+                indices. Negative indices count from the end.
+            values (ITensor | Scalar): One value per index, or a single
+                value written to all of them
+            accumulate (bool, optional): Add to the elements instead of
+                overwriting them, repeated indices add up. Defaults to
+                False.
+        """
+        idx, _ = self._as_indices(indices)
+        idx = self._bounded(idx, math.prod(self._shape))
+        self._write(self._logical_offsets(idx),
+                    self._values_for(values, len(idx)), accumulate)
+
+    def gather(self, axis: int, index: TensorIndices) -> 'Tensor':
+        """Pick one element along an axis for every position of an index
+
+        For axis=1, result[i][j] = self[i][index[i][j]], e.g. the
+        probability of each sample's target class. The index has the
+        rank of this tensor and no dimension larger than it, except along
+        'axis'.
+
+        Args:
+            axis (int): Axis the index selects along
+            index (TensorIndices): Integer tensor of indices. Negative
+                indices count from the end.
+
+        Returns:
+            Tensor: Newly created tensor with the shape of the index
+        """
+        axis = self._axis(axis)
+        idx, idx_shape = self._as_indices(index)
+        offsets = self._gather_offsets(axis, idx, idx_shape)
+        data = self._data
+        result = self.__class__(
+            array.array(self._dtype.typecode, map(data.__getitem__, offsets)),
+            idx_shape, self._dtype)
+        if needs_grad(self):
+            cls, base_shape, dtype = self.__class__, self._shape, self._dtype
+
+            def backward(g: 'Tensor') -> tuple['Tensor']:
+                full = cls.with_zeros(base_shape, dtype)
+                full._write(full._gather_offsets(axis, idx, idx_shape),
+                            g._values(), accumulate=True)
+                return (full,)
+
+            record("gather", result, (self,), backward)
+        return result
+
+    def scatter(self,
+                axis: int,
+                index: TensorIndices,
+                src: 'ITensor | Scalar',
+                accumulate: bool = False):
+        """Write values to the positions picked by an index, in place
+
+        The inverse of `gather`, for axis=1
+        self[i][index[i][j]] = src[i][j]. Not recorded by autograd.
+
+        Args:
+            axis (int): Axis the index selects along
+            index (TensorIndices): Integer tensor of indices. Negative
+                indices count from the end.
+            src (ITensor | Scalar): Values with the shape of the index, or
+                a single value written to every position
+            accumulate (bool, optional): Add to the elements instead of
+                overwriting them, repeated positions add up. Defaults to
+                False.
+        """
+        axis = self._axis(axis)
+        idx, idx_shape = self._as_indices(index)
+        if isinstance(src, ITensor) and src.shape != idx_shape:
+            raise ValueError(f"Source shape {src.shape} does not match "
+                             f"index shape {idx_shape}")
+        self._write(self._gather_offsets(axis, idx, idx_shape),
+                    self._values_for(src, math.prod(idx_shape)), accumulate)
 
     @classmethod
-    def with_list(cls, data: list, shape: TensorShape) -> 'Tensor':
+    def with_list(cls,
+                  data: list,
+                  shape: TensorShape,
+                  dtype: Optional[DType] = None) -> 'Tensor':
         """Create a tensor from a list
 
-        Flattening is done row first
+        Flattening is done row first, in a single pass straight into the
+        typed buffer. Every level of a nested list must match its
+        dimension; the innermost lists may also hold several trailing
+        dimensions, e.g. a list of 2 lists of 6 for shape (2, 3, 2).
 
         Args:
-            data (list): Flat or nested list of data. base data type should be float
+            data (list): Flat or nested list of data, tuples, ranges and
+                arrays work too. base data type should be float
             shape (TensorShape): Shape of the tensor
+            dtype (Optional[DType], optional): Element type. Defaults to
+                DEFAULT_DTYPE.
 
         Returns:
             Tensor: Newly created trensor
         """
-        flattened = data
-        while isinstance(flattened[0], list):
-            flattened = list(itertools.chain.from_iterable(flattened))
-
-        return cls(flattened, shape)
+        dtype = dtype or DEFAULT_DTYPE
+        d = array.array(dtype.typecode)
+        depth = 0
+        row = data
+        while row and isinstance(row[0], _ROWS):
+            row = row[0]
+            depth += 1
+        if depth >= len(shape) and depth:
+            raise ValueError(f"List nested {depth + 1} deep does not match "
+                             f"shape {tuple(shape)}")
+        _fill(d, data, shape, 0, depth, math.prod(shape[depth:]))
+        return cls(d, shape, dtype)
 
     @classmethod
-    def with_uniform(cls, shape: TensorShape, uniform_range: tuple[float, float], ) -> 'Tensor':
+    def with_uniform(cls,
+                     shape: TensorShape,
+                     uniform_range: tuple[float, float],
+                     dtype: Optional[DType] = None,
+                     generator: Optional[Generator] = None) -> 'Tensor':
         """Create a tensor of the desired shape with random values in a uniform distribution
 
         Args:
             shape (TensorShape): Shape of the tensor
             uniform_range (tuple[float, float]): The range of values to generate
+            dtype (Optional[DType], optional): Element type. Defaults to
+                DEFAULT_DTYPE.
+            generator (Optional[Generator], optional): Source of the
+                values. Defaults to the default generator, see
+                `rng.manual_seed`.
+
+        Returns:
+            Tensor: Newly created tensor
+        """
+        generator = generator or default_generator()
+        return cls._with_doubles(generator.uniform(math.prod(shape),
+                                                   *uniform_range),
+                                 shape, dtype)
+
+    @classmethod
+    def with_normal(cls,
+                    shape: TensorShape,
+                    mean: float = 0.0,
+                    std: float = 1.0,
+                    dtype: Optional[DType] = None,
+                    generator: Optional[Generator] = None) -> 'Tensor':
+        """Create a tensor of the desired shape with normally distributed values
+
+        Args:
+            shape (TensorShape): Shape of the tensor
+            mean (float, optional): Mean. Defaults to 0.0.
+            std (float, optional): Standard deviation. Defaults to 1.0.
+            dtype (Optional[DType], optional): Element type. Defaults to
+                DEFAULT_DTYPE.
+            generator (Optional[Generator], optional): Source of the
+                values. Defaults to the default generator.
 
         Returns:
             Tensor: Newly created tensor
         """
-        num_elems = math.prod(shape)
-        d = [random.uniform(*uniform_range) for _ in range(num_elems)]
-        return cls(d, shape)
+        generator = generator or default_generator()
+        return cls._with_doubles(generator.normal(math.prod(shape), mean,
+                                                  std), shape, dtype)
 
     @classmethod
-    def with_zeros(cls, shape: TensorShape) -> 'Tensor':
+    def full(cls,
+             shape: TensorShape,
+             value: Scalar,
+             dtype: Optional[DType] = None) -> 'Tensor':
+        """Create a tensor of the desired shape filled with one value
+
+        Args:
+            shape (TensorShape): Shape of the tensor
+            value (Scalar): Value of every element
+            dtype (Optional[DType], optional): Element type. Defaults to
+                DEFAULT_DTYPE.
+
+        Returns:
+            Tensor: Newly created tensor
+        """
+        dtype = dtype or DEFAULT_DTYPE
+        return cls(array.array(dtype.typecode, [value]) * math.prod(shape),
+                   shape, dtype)
+
+    @classmethod
+    def arange(cls,
+               start: Scalar,
+               stop: Optional[Scalar] = None,
+               step: Scalar = 1,
+               dtype: Optional[DType] = None) -> 'Tensor':
+        """Create a vector of evenly spaced values in [start, stop)
+
+        Like `range`, with a single argument it is the stop and the start
+        is 0.
+
+        Args:
+            start (Scalar): First value
+            stop (Optional[Scalar], optional): End, exclusive. Defaults to
+                None.
+            step (Scalar, optional): Spacing. Defaults to 1.
+            dtype (Optional[DType], optional): Element type. Defaults to
+                INT32 if all arguments are ints, otherwise DEFAULT_DTYPE.
+
+        Returns:
+            Tensor: Newly created tensor
+        """
+        if stop is None:
+            start, stop = 0, start
+        if step == 0:
+            raise ValueError("step must not be 0")
+        integral = all(isinstance(v, int) for v in (start, stop, step))
+        dtype = dtype or (DType.INT32 if integral else DEFAULT_DTYPE)
+        if integral:
+            values = range(start, stop, step)
+        else:
+            # start + i * step rather than a running sum, which would
+            # accumulate rounding errors
+            n = max(0, math.ceil((stop - start) / step))
+            values = map(operator.add,
+                         map(operator.mul, range(n), itertools.repeat(step)),
+                         itertools.repeat(start))
+        d = array.array(dtype.typecode, values)
+        return cls(d, (len(d),), dtype)
+
+    @classmethod
+    def eye(cls,
+            n: int,
+            m: Optional[int] = None,
+            dtype: Optional[DType] = None) -> 'Tensor':
+        """Create a matrix with ones on the diagonal and zeros elsewhere
+
+        Args:
+            n (int): Number of rows
+            m (Optional[int], optional): Number of columns. Defaults to n.
+            dtype (Optional[DType], optional): Element type. Defaults to
+                DEFAULT_DTYPE.
+
+        Returns:
+            Tensor: Newly created tensor
+        """
+        m = n if m is None else m
+        dtype = dtype or DEFAULT_DTYPE
+        d = array.array(dtype.typecode, [0]) * (n * m)
+        k = min(n, m)
+        # Diagonal elements are m + 1 apart in row major storage
+        d[:k * (m + 1):m + 1] = array.array(dtype.typecode, [1]) * k
+        return cls(d, (n, m), dtype)
+
+    @classmethod
+    def with_zeros(cls,
+                   shape: TensorShape,
+                   dtype: Optional[DType] = None) -> 'Tensor':
         """Create a tensor of the desired shape filled with zeros
 
+        Draws its storage from the active TensorPool, if any.
+
+        Args:
+            shape (TensorShape): Shape of the tensor
+            dtype (Optional[DType], optional): Element type. Defaults to
+                DEFAULT_DTYPE.
+
+        Returns:
+            Tensor: Newly created tensor
+        """
+        dtype = dtype or DEFAULT_DTYPE
+        pool = active_pool()
+        if pool is not None:
+            d = pool.allocate(dtype, math.prod(shape))
+        else:
+            # Repeating a one element array fills the buffer in C without
+            # any intermediate allocation
+            d = array.array(dtype.typecode, [0]) * math.prod(shape)
+        return cls(d, shape, dtype)
+
+    @classmethod
+    def empty(cls,
+              shape: TensorShape,
+              dtype: Optional[DType] = None) -> 'Tensor':
+        """Create a tensor of the desired shape without initialising it
+
+        For outputs a kernel fully overwrites. Storage reused from the
+        active TensorPool keeps whatever it last held.
+
         Args:
             shape (TensorShape): Shape of the tensor
+            dtype (Optional[DType], optional): Element type. Defaults to
+                DEFAULT_DTYPE.
 
         Returns:
             Tensor: Newly created tensor
         """
-        d = [0.0] * math.prod(shape)
-        return cls(d, shape)
+        dtype = dtype or DEFAULT_DTYPE
+        pool = active_pool()
+        if pool is None:
+            return cls.with_zeros(shape, dtype)
+        return cls(pool.allocate(dtype, math.prod(shape), zero=False),
+                   shape, dtype)
+
+    @classmethod
+    def _with_doubles(cls,
+                      d: array.array,
+                      shape: TensorShape,
+                      dtype: Optional[DType]) -> 'Tensor':
+        # Generators produce doubles, adopted as is for FLOAT64
+        dtype = dtype or DEFAULT_DTYPE
+        if dtype.typecode != d.typecode:
+            d = array.array(dtype.typecode, d)
+        return cls(d, shape, dtype)
+
+    def _element_offset(self, key: TensorKey) -> Optional[int]:
+        # Storage offset of the element 'key' addresses, None if it
+        # addresses a view. Ranks 1 and 2 are unrolled, element access
+        # is by far most common on vectors and matrices.
+        # Deliberately not dispatched through a backend, this is called
+        # for every element access.
+        rank = self._rank
+        if type(key) is int:
+            if rank != 1:
+                return None
+            dim = self._shape[0]
+            if key < 0:
+                key += dim
+            if not 0 <= key < dim:
+                raise IndexError("Index out of bounds")
+            return self._offset + key * self._strides[0]
+        if type(key) is not tuple or len(key) != rank:
+            return None
+        if rank == 2:
+            i, j = key
+            if type(i) is not int or type(j) is not int:
+                return None
+            d0, d1 = self._shape
+            if i < 0:
+                i += d0
+            if j < 0:
+                j += d1
+            if not (0 <= i < d0 and 0 <= j < d1):
+                raise IndexError("Index out of bounds")
+            s0, s1 = self._strides
+            return self._offset + i * s0 + j * s1
+        for k in key:
+            if type(k) is not int:
+                return None
+        return self._flat_idx(key)
 
     def _flat_idx(self, key: TensorTarget) -> int:
         # TODO: This might not hold true for non-rectangular tensors
-        return vmath.dot(key, self._strides)  # type: ignore
-
-    def _calculate_strides(self, shape: TensorShape) -> list[int]:
-        # TODO: Fairly self contained and does not really need to be a
-        # member function
-        num_dims = len(shape)
-        strides = [1] * num_dims
-        for i in range(1, num_dims):
-            prev_dim = shape[num_dims - i]
-            prev_stride = strides[num_dims - i]
-            # reverse order the strides for row-major order
-            strides[num_dims - i - 1] = prev_stride * prev_dim
-        return strides
+        offset = self._offset
+        for idx, dim, stride in zip(key, self._shape, self._strides):
+            if idx < 0:
+                idx += dim
+            if not 0 <= idx < dim:
+                raise IndexError("Index out of bounds")
+            offset += idx * stride
+        return offset
+
+    def _axis(self, axis: int) -> int:
+        if not -self._rank <= axis < self._rank:
+            raise IndexError(f"Axis {axis} out of range for a rank "
+                             f"{self._rank} tensor")
+        return axis % self._rank
+
+    def _logical_offsets(self, idx: Sequence[int]) -> Sequence[int]:
+        # Storage offsets of elements given by row-major position
+        if self.is_contiguous():
+            if self._offset == 0:
+                return idx
+            return [self._offset + i for i in idx]
+        flat = element_offsets(self._shape, self._strides, self._offset)
+        return [flat[i] for i in idx]
+
+    def _take_offsets(self, idx: Sequence[int], axis: int) -> list[int]:
+        # Storage offsets of the slices 'idx' selects along 'axis'
+        stride = self._strides[axis]
+        outer = element_offsets(self._shape[:axis], self._strides[:axis],
+                                self._offset)
+        inner = element_offsets(self._shape[axis + 1:],
+                                self._strides[axis + 1:])
+        steps = [i * stride for i in idx]
+        return [o + s + i for o in outer for s in steps for i in inner]
+
+    def _gather_offsets(self,
+                        axis: int,
+                        idx: Sequence[int],
+                        idx_shape: TensorShape) -> list[int]:
+        # Storage offsets of the elements 'idx' picks along 'axis', one
+        # per position of the index
+        if len(idx_shape) != self._rank:
+            raise ValueError(f"Index of rank {len(idx_shape)} does not "
+                             f"match a rank {self._rank} tensor")
+        for d, (size, dim) in enumerate(zip(idx_shape, self._shape)):
+            if d != axis and size > dim:
+                raise ValueError(f"Index shape {idx_shape} does not fit "
+                                 f"shape {self._shape}")
+        idx = self._bounded(idx, self._shape[axis])
+        # Every other axis follows the position in the index, 'axis'
+        # follows the index value
+        strides = list(self._strides)
+        stride, strides[axis] = strides[axis], 0
+        base = element_offsets(idx_shape, strides, self._offset)
+        return [b + i * stride for b, i in zip(base, idx)]
+
+    def _write(self,
+               offsets: Sequence[int],
+               values: Sequence[Scalar],
+               accumulate: bool):
+        data = self._data
+        if accumulate:
+            for o, v in zip(offsets, values):
+                data[o] += v
+        else:
+            for o, v in zip(offsets, values):
+                data[o] = v
+
+    def _values_for(self, values: 'ITensor | Scalar', n: int) -> TensorData:
+        # Values to write to 'n' elements, in this tensor's element type
+        if not isinstance(values, ITensor):
+            return array.array(self._dtype.typecode, [values]) * n
+        if math.prod(values.shape) != n:
+            raise ValueError(f"Expected {n} values, got shape {values.shape}")
+        data = values.contiguous()
+        data = data.data[data.offset:data.offset + n]
+        if values.dtype != self._dtype:
+            data = array.array(self._dtype.typecode, data)
+        return data
+
+    def _view_for_key(self, key: tuple) -> 'Tensor':
+        if len(key) > self._rank:
+            raise IndexError(f"Too many indices for a rank {self._rank} "
+                             "tensor")
+
+        shape = []
+        strides = []
+        offset = self._offset
+        key = key + (slice(None),) * (self._rank - len(key))
+        for k, dim, stride in zip(key, self._shape, self._strides):
+            if isinstance(k, slice):
+                start, stop, step = k.indices(dim)
+                if step < 0:
+                    raise ValueError("Negative slice steps are not supported")
+                offset += start * stride
+                shape.append(len(range(start, stop, step)))
+                strides.append(stride * step)
+            else:
+                k = operator.index(k)
+                if k < 0:
+                    k += dim
+                if not 0 <= k < dim:
+                    raise IndexError("Index out of bounds")
+                offset += k * stride
+
+        view = self.as_strided(tuple(shape), strides, offset)
+        if needs_grad(self):
+            cls, base_shape, dtype = self.__class__, self._shape, self._dtype
+
+            def scatter(g: 'Tensor') -> tuple['Tensor']:
+                full = cls.with_zeros(base_shape, dtype)
+                full[key] = g
+                return (full,)
+
+            record("slice", view, (self,), scatter)
+        return view
+
+    def _values(self) -> TensorData:
+        # Logical elements in row-major order, shares data when possible
+        n = math.prod(self._shape)
+        if self.is_contiguous():
+            return self._data[self._offset:self._offset + n]
+        data = self._data
+        return array.array(self._dtype.typecode,
+                           [data[o] for o in element_offsets(
+                               self._shape, self._strides, self._offset)])
+
+    def _assign(self, value: 'float | ITensor'):
+        n = math.prod(self._shape)
+        if isinstance(value, Tensor):
+            if value.shape != self._shape:
+                raise ValueError(f"Cannot assign shape {value.shape} to "
+                                 f"shape {self._shape}")
+            values = value._values()
+            if value._dtype != self._dtype:
+                values = array.array(self._dtype.typecode, values)
+        else:
+            values = array.array(self._dtype.typecode, [value]) * n
+
+        if self.is_contiguous():
+            self._data[self._offset:self._offset + n] = values
+        else:
+            data = self._data
+            for o, v in zip(element_offsets(self._shape, self._strides,
+                                            self._offset), values):
+                data[o] = v
+
+    @staticmethod
+    def _as_indices(indices: TensorIndices) -> tuple[Sequence[int],
+                                                     TensorShape]:
+        # Flat index values and the shape they are laid out in
+        if isinstance(indices, ITensor):
+            if indices.dtype.is_floating:
+                raise TypeError("Indices must be an integer tensor, got "
+                                f"{indices.dtype}")
+            n = math.prod(indices.shape)
+            t = indices.contiguous()
+            return t.data[t.offset:t.offset + n], indices.shape
+        # Converting validates every index is an integer, in C
+        idx = array.array("q", indices)
+        return idx, (len(idx),)
+
+    @staticmethod
+    def _bounded(idx: Sequence[int], dim: int) -> Sequence[int]:
+        # Checks indices against a dimension, wrapping negative ones
+        if not idx:
+            return idx
+        lowest = min(idx)
+        if lowest < -dim or max(idx) >= dim:
+            raise IndexError("Index out of bounds")
+        if lowest < 0:
+            return [i + dim if i < 0 else i for i in idx]
+        return idx
+
+    @staticmethod
+    def _as_storage(data: TensorData | list,
+                    dtype: Optional[DType]) -> tuple[TensorData, DType]:
+        if isinstance(data, array.array):
+            buf_dtype = DType.from_typecode(data.typecode)
+        elif isinstance(data, memoryview):
+            buf_dtype = DType.from_typecode(data.format)
+        else:
+            buf_dtype = None
+
+        dtype = dtype or buf_dtype or DEFAULT_DTYPE
+        if buf_dtype == dtype:
+            return data, dtype  # type: ignore
+        return array.array(dtype.typecode, data), dtype
+
+
+# Sequence types with_list takes at any nesting level
+_ROWS = (list, tuple, range, array.array)
+
+
+def _fill(out: array.array,
+          rows: Sequence,
+          shape: TensorShape,
+          level: int,
+          depth: int,
+          inner: int):
+    # Appends a nested list to 'out', checking each level against 'shape'.
+    # Levels below 'depth' are lists of lists, the lists at 'depth' hold
+    # the 'inner' trailing elements.
+    if level == depth:
+        if len(rows) != inner:
+            raise ValueError(f"Expected a list of {inner} values, got "
+                             f"{len(rows)}")
+        out.fromlist(rows if isinstance(rows, list) else list(rows))
+        return
+    if len(rows) != shape[level]:
+        raise ValueError(f"Expected {shape[level]} lists at depth {level}, "
+                         f"got {len(rows)}")
+    for row in rows:
+        if not isinstance(row, _ROWS):
+            raise ValueError(f"Expected a list at depth {level + 1}, got "
+                             f"{type(row).__name__}")
+        _fill(out, row, shape, level + 1, depth, inner)
@@ -1,100 +1,1021 @@
+import itertools
+import math
+from collections.abc import Callable, Sequence
+from functools import reduce
 from typing import Optional
+from lml_python.core.autograd import (
+    BackwardFn,
+    needs_grad,
+    no_grad,
+    record,
+    requires_grad,
+)
+from lml_python.core.backend import get_backend
+from lml_python.core.dtype import DType, DEFAULT_DTYPE, promote_types
+from lml_python.core.layout import (
+    broadcast_shapes,
+    broadcast_strides,
+    merge_dims,
+)
 from lml_python.core.interfaces import (
-    ITensor
+    BINARY_OPS,
+    UNARY_OPS,
+    ITensor,
+    Scalar,
+)
+from lml_python.core.profiler import (
+    elementwise_flops,
+    fused_flops,
+    linear_flops,
+    matmul_flops,
+    profiled,
+    reduction_flops,
+    tdot_flops,
 )
 
+# Ops whose result is fractional even for integer inputs
+_FLOAT_OPS = frozenset({"div", "tanh", "sigmoid", "sqrt", "exp", "log"})
 
-def matadd(a: ITensor, b: ITensor, out: Optional[ITensor] = None) -> ITensor:
+
+@profiled(elementwise_flops)
+def matadd(a: ITensor | Scalar,
+           b: ITensor | Scalar,
+           out: Optional[ITensor] = None) -> ITensor:
     """Simple element-wise addition of two tensors
 
-    Demands tensors of the same shape, can optionally be provided with an
-    output tensor.
-    TODO: Broadcast support
+    Shapes are broadcast following NumPy rules, a scalar acts as a rank 0
+    tensor. Can optionally be provided with an output tensor.
 
     Args:
-         a (Tensor): Left tensor to add
-         b (Tensor): Right tensor to add
+         a (Tensor | Scalar): Left tensor to add
+         b (Tensor | Scalar): Right tensor to add
          out (Optional[Tensor], optional): Output tensor to store the 
-            result in. At present out tensor shape and data length must
-            be aligned with the expected output shape and data length.
+            result in. Its shape must match the broadcast shape of the
+            operands, it may be a view of one of them.
             Defaults to None.
 
     Returns:
          Tensor: Tensor containing the result of the addition.
          If 'out' is provided it is mutated and also returned.
     """
+    return _elementwise("add", (a, b), out)
+
+
+@profiled(elementwise_flops)
+def matsub(a: ITensor | Scalar,
+           b: ITensor | Scalar,
+           out: Optional[ITensor] = None) -> ITensor:
+    """Element-wise subtraction of two tensors, a - b
+
+    Broadcasts like `matadd`.
+
+    Args:
+         a (Tensor | Scalar): Tensor to subtract from
+         b (Tensor | Scalar): Tensor to subtract
+         out (Optional[Tensor], optional): Output tensor to store the
+            result in. Defaults to None.
+
+    Returns:
+         Tensor: Tensor containing the difference.
+         If 'out' is provided it is mutated and also returned.
+    """
+    return _elementwise("sub", (a, b), out)
+
+
+@profiled(elementwise_flops)
+def hadamard(a: ITensor | Scalar,
+             b: ITensor | Scalar,
+             out: Optional[ITensor] = None) -> ITensor:
+    """Element-wise (Hadamard) product of two tensors
+
+    Broadcasts like `matadd`.
+
+    Args:
+         a (Tensor | Scalar): Left tensor to multiply
+         b (Tensor | Scalar): Right tensor to multiply
+         out (Optional[Tensor], optional): Output tensor to store the
+            result in. Defaults to None.
+
+    Returns:
+         Tensor: Tensor containing the product.
+         If 'out' is provided it is mutated and also returned.
+    """
+    return _elementwise("mul", (a, b), out)
+
+
+@profiled(elementwise_flops)
+def matdiv(a: ITensor | Scalar,
+           b: ITensor | Scalar,
+           out: Optional[ITensor] = None) -> ITensor:
+    """Element-wise true division of two tensors, a / b
+
+    Broadcasts like `matadd`. Integer operands produce a floating point
+    result.
+
+    Args:
+         a (Tensor | Scalar): Dividend
+         b (Tensor | Scalar): Divisor
+         out (Optional[Tensor], optional): Output tensor to store the
+            result in. Defaults to None.
+
+    Returns:
+         Tensor: Tensor containing the quotient.
+         If 'out' is provided it is mutated and also returned.
+    """
+    return _elementwise("div", (a, b), out)
+
+
+@profiled(elementwise_flops)
+def relu(a: ITensor, out: Optional[ITensor] = None) -> ITensor:
+    """Element-wise rectified linear unit, max(a, 0)
+
+    Args:
+         a (Tensor): Input tensor
+         out (Optional[Tensor], optional): Output tensor to store the
+            result in, may be 'a' itself. Defaults to None.
+
+    Returns:
+         Tensor: Tensor containing the result.
+         If 'out' is provided it is mutated and also returned.
+    """
+    return _elementwise("relu", (a,), out)
+
+
+@profiled(elementwise_flops)
+def tanh(a: ITensor, out: Optional[ITensor] = None) -> ITensor:
+    """Element-wise hyperbolic tangent
+
+    Args:
+         a (Tensor): Input tensor
+         out (Optional[Tensor], optional): Output tensor to store the
+            result in, may be 'a' itself. Defaults to None.
+
+    Returns:
+         Tensor: Tensor containing the result.
+         If 'out' is provided it is mutated and also returned.
+    """
+    return _elementwise("tanh", (a,), out)
+
+
+@profiled(elementwise_flops)
+def sigmoid(a: ITensor, out: Optional[ITensor] = None) -> ITensor:
+    """Element-wise logistic sigmoid, 1 / (1 + exp(-a))
+
+    Args:
+         a (Tensor): Input tensor
+         out (Optional[Tensor], optional): Output tensor to store the
+            result in, may be 'a' itself. Defaults to None.
+
+    Returns:
+         Tensor: Tensor containing the result.
+         If 'out' is provided it is mutated and also returned.
+    """
+    return _elementwise("sigmoid", (a,), out)
+
+
+@profiled(elementwise_flops)
+def heaviside(a: ITensor, out: Optional[ITensor] = None) -> ITensor:
+    """Element-wise step function, 1 where a > 0 and 0 elsewhere
+
+    This is the derivative of `relu`.
+
+    Args:
+         a (Tensor): Input tensor
+         out (Optional[Tensor], optional): Output tensor to store the
+            result in, may be 'a' itself. Defaults to None.
+
+    Returns:
+         Tensor: Tensor containing the result.
+         If 'out' is provided it is mutated and also returned.
+    """
+    return _elementwise("heaviside", (a,), out)
+
+
+@profiled(elementwise_flops)
+def sqrt(a: ITensor, out: Optional[ITensor] = None) -> ITensor:
+    """Element-wise square root
+
+    Args:
+         a (Tensor): Input tensor, with no negative elements
+         out (Optional[Tensor], optional): Output tensor to store the
+            result in, may be 'a' itself. Defaults to None.
+
+    Returns:
+         Tensor: Tensor containing the result.
+         If 'out' is provided it is mutated and also returned.
+    """
+    return _elementwise("sqrt", (a,), out)
+
+
+@profiled(elementwise_flops)
+def exp(a: ITensor, out: Optional[ITensor] = None) -> ITensor:
+    """Element-wise exponential
+
+    Args:
+         a (Tensor): Input tensor
+         out (Optional[Tensor], optional): Output tensor to store the
+            result in, may be 'a' itself. Defaults to None.
+
+    Returns:
+         Tensor: Tensor containing the result.
+         If 'out' is provided it is mutated and also returned.
+    """
+    return _elementwise("exp", (a,), out)
+
+
+@profiled(elementwise_flops)
+def log(a: ITensor, out: Optional[ITensor] = None) -> ITensor:
+    """Element-wise natural logarithm
+
+    Args:
+         a (Tensor): Input tensor, with only positive elements
+         out (Optional[Tensor], optional): Output tensor to store the
+            result in, may be 'a' itself. Defaults to None.
+
+    Returns:
+         Tensor: Tensor containing the result.
+         If 'out' is provided it is mutated and also returned.
+    """
+    return _elementwise("log", (a,), out)
+
+
+@profiled(elementwise_flops)
+def activation_grad(activation: str,
+                    output: ITensor,
+                    gradient: ITensor) -> ITensor:
+    """Gradient of an activation's input, computed from its output
+
+    Every supported activation has a derivative expressible in terms of
+    its output, so the input never has to be kept around.
+
+    Args:
+         activation (str): Name of the unary op, e.g. "relu"
+         output (Tensor): Output of the activation
+         gradient (Tensor): Gradient of the output
+
+    Returns:
+         Tensor: Gradient of the activation's input
+    """
+    if activation == "relu":
+        return fused(output, "heaviside", ("mul", gradient))
+    if activation == "tanh":
+        # 1 - tanh(x)^2
+        return fused(output, ("mul", output), "neg", ("add", 1),
+                     ("mul", gradient))
+    if activation == "sigmoid":
+        # sigmoid(x) * (1 - sigmoid(x))
+        return fused(output, "neg", ("add", 1), ("mul", output),
+                     ("mul", gradient))
+    if activation == "neg":
+        return hadamard(gradient, -1)
+    if activation == "heaviside":
+        return gradient.__class__.with_zeros(output.shape, gradient.dtype)
+    if activation == "sqrt":
+        # 1 / (2 * sqrt(x))
+        return fused(gradient, ("div", output), ("mul", 0.5))
+    if activation == "exp":
+        return hadamard(output, gradient)
+    if activation == "log":
+        # 1 / x = exp(-log(x))
+        return fused(output, "neg", "exp", ("mul", gradient))
+    raise ValueError(f"Unknown activation '{activation}'")
+
+
+type Axes = int | Sequence[int] | None
+
+
+@profiled(reduction_flops)
+def tsum(a: ITensor, axis: Axes = None, keepdims: bool = False) -> ITensor:
+    """Sum of the elements of a tensor, over all or some axes
+
+    Floating point sums do not lose accuracy as the reduced axes grow,
+    the Python backend rounds them exactly with `math.fsum`.
+
+    Args:
+         a (Tensor): Tensor to sum
+         axis (Axes, optional): Axis or axes to reduce. Defaults to None,
+            reducing all of them.
+         keepdims (bool, optional): Keep reduced axes as size 1
+            dimensions, so the result broadcasts against 'a'. Defaults to
+            False.
+
+    Returns:
+         Tensor: Sums, rank 0 if every axis is reduced
+    """
+    lanes, axes = _lanes(a, axis)
+    out = _reduce("sum", lanes, a.dtype)
+    if needs_grad(a):
+        shape, kept = a.shape, _kept_shape(a.shape, axes)
+        record("sum", out, (a,), lambda g: (g.reshape(kept).expand(shape),))
+    return _keepdims(out, a.shape, axes) if keepdims else out
+
+
+@profiled(reduction_flops)
+def tmean(a: ITensor, axis: Axes = None, keepdims: bool = False) -> ITensor:
+    """Mean of the elements of a tensor, over all or some axes
+
+    Args:
+         a (Tensor): Tensor to average
+         axis (Axes, optional): Axis or axes to reduce. Defaults to None,
+            reducing all of them.
+         keepdims (bool, optional): Keep reduced axes as size 1
+            dimensions. Defaults to False.
+
+    Returns:
+         Tensor: Floating point means, rank 0 if every axis is reduced
+    """
+    lanes, axes = _lanes(a, axis)
+    n = lanes.shape[-1]
+    if n == 0:
+        raise ValueError("Mean of an empty tensor")
+    out = _reduce("sum", lanes, _op_dtype("div", a.dtype, ()))
+    with no_grad():
+        matdiv(out, n, out=out)
+    if needs_grad(a):
+        shape, kept = a.shape, _kept_shape(a.shape, axes)
+        record("mean", out, (a,),
+               lambda g: (matdiv(g, n).reshape(kept).expand(shape),))
+    return _keepdims(out, a.shape, axes) if keepdims else out
+
+
+@profiled(reduction_flops)
+def tmax(a: ITensor, axis: Axes = None, keepdims: bool = False) -> ITensor:
+    """Largest element of a tensor, over all or some axes
+
+    The gradient flows to the first largest element of every reduced
+    slice.
+
+    Args:
+         a (Tensor): Tensor to reduce, with no empty reduced slices
+         axis (Axes, optional): Axis or axes to reduce. Defaults to None,
+            reducing all of them.
+         keepdims (bool, optional): Keep reduced axes as size 1
+            dimensions. Defaults to False.
+
+    Returns:
+         Tensor: Maxima, rank 0 if every axis is reduced
+    """
+    return _extreme("max", a, axis, keepdims)
+
+
+@profiled(reduction_flops)
+def tmin(a: ITensor, axis: Axes = None, keepdims: bool = False) -> ITensor:
+    """Smallest element of a tensor, over all or some axes, see `tmax`"""
+    return _extreme("min", a, axis, keepdims)
+
 
-    if a.shape != b.shape:
-        raise ValueError("Shapes are not aligned")
+@profiled(reduction_flops)
+def argmax(a: ITensor,
+           axis: Optional[int] = None,
+           keepdims: bool = False) -> ITensor:
+    """Position of the largest element along an axis
+
+    Args:
+         a (Tensor): Tensor to search, with no empty slices along 'axis'
+         axis (Optional[int], optional): Axis to search along. Defaults
+            to None, searching the flattened tensor.
+         keepdims (bool, optional): Keep the searched axis as a size 1
+            dimension. Defaults to False.
+
+    Returns:
+         Tensor: INT32 indices of the first largest elements
+    """
+    return _arg("argmax", a, axis, keepdims)
+
+
+@profiled(reduction_flops)
+def argmin(a: ITensor,
+           axis: Optional[int] = None,
+           keepdims: bool = False) -> ITensor:
+    """Position of the smallest element along an axis, see `argmax`"""
+    return _arg("argmin", a, axis, keepdims)
+
+
+@profiled(elementwise_flops)
+def softmax(a: ITensor, axis: int = -1) -> ITensor:
+    """Softmax along an axis, exp(a) / sum(exp(a))
+
+    Computed from a - max(a), so large inputs never overflow, in a single
+    kernel call without materialising exp(a) as a tensor.
+
+    Args:
+         a (Tensor): Input tensor
+         axis (int, optional): Axis the probabilities sum to 1 along.
+            Defaults to -1.
 
+    Returns:
+         Tensor: Floating point tensor with the shape of 'a'
+    """
+    return _softmax(a, axis, log=False)
+
+
+@profiled(elementwise_flops)
+def log_softmax(a: ITensor, axis: int = -1) -> ITensor:
+    """Logarithm of `softmax`, a - max(a) - log(sum(exp(a - max(a))))
+
+    More accurate than log(softmax(a)), which underflows to -inf for
+    small probabilities.
+
+    Args:
+         a (Tensor): Input tensor
+         axis (int, optional): Axis to normalise along. Defaults to -1.
+
+    Returns:
+         Tensor: Floating point tensor with the shape of 'a'
+    """
+    return _softmax(a, axis, log=True)
+
+
+@profiled(reduction_flops)
+def cross_entropy(logits: ITensor,
+                  target: 'ITensor | Sequence[int]',
+                  reduction: str = "mean") -> ITensor:
+    """Cross-entropy loss between unnormalised scores and class indices
+
+    Fuses `log_softmax` with picking the target's log-probability, the
+    gradient (softmax(logits) - one_hot(target)) is computed directly
+    instead of through both ops.
+
+    Args:
+         logits (Tensor): Scores of shape (batch, classes)
+         target (ITensor | Sequence[int]): Class index of every sample,
+            an integer tensor or sequence of length batch
+         reduction (str, optional): "mean" or "sum" over the batch, or
+            "none" for the loss of every sample. Defaults to "mean".
+
+    Returns:
+         Tensor: Rank 0 loss, or of shape (batch,) for "none"
+    """
+    if logits.rank != 2:
+        raise ValueError(f"Expected logits of shape (batch, classes), got "
+                         f"{logits.shape}")
+    if reduction not in ("mean", "sum", "none"):
+        raise ValueError(f"Unknown reduction '{reduction}'")
+    batch = logits.shape[0]
+    if isinstance(target, ITensor):
+        index = target.reshape((batch, 1))
+    else:
+        index = logits.__class__.with_list(list(target), (batch, 1),
+                                           DType.INT32)
+
+    with no_grad():
+        log_probs = log_softmax(logits)
+        losses = hadamard(log_probs.gather(1, index), -1).reshape((batch,))
+        if reduction == "none":
+            out = losses
+        else:
+            out = tsum(losses)
+            if reduction == "mean":
+                matdiv(out, max(batch, 1), out=out)
+
+    if needs_grad(logits):
+        scale = batch if reduction == "mean" else 1
+
+        def backward(g: ITensor) -> Sequence[Optional[ITensor]]:
+            grad = fused(log_probs, "exp")
+            grad.scatter(1, index, -1.0, accumulate=True)
+            g = g.reshape((batch, 1)) if reduction == "none" else g
+            return (fused(grad, ("mul", g), ("div", scale), out=grad),)
+
+        record("cross_entropy", out, (logits,), backward)
+    return out
+
+
+def _checked_axis(rank: int, axis: int) -> int:
+    # Non-negative index of 'axis', counting from the end if negative
+    if not -rank <= axis < rank:
+        raise IndexError(f"Axis {axis} out of range for a rank {rank} "
+                         "tensor")
+    return axis % rank
+
+
+def _reduced_axes(rank: int, axis: Axes) -> tuple[int, ...]:
+    if axis is None:
+        return tuple(range(rank))
+    axes = (axis,) if isinstance(axis, int) else tuple(axis)
+    axes = tuple(sorted(_checked_axis(rank, d) for d in axes))
+    if len(set(axes)) != len(axes):
+        raise ValueError(f"Repeated axis in {axis}")
+    return axes
+
+
+def _lanes(a: ITensor, axis: Axes) -> tuple[ITensor, tuple[int, ...]]:
+    # View of 'a' with the kept axes first and the reduced axes merged
+    # into one last dimension, the layout backends reduce. Only copied if
+    # the strides of the reduced axes cannot be merged.
+    axes = _reduced_axes(a.rank, axis)
+    kept = [d for d in range(a.rank) if d not in axes]
+    view = a.detach().permute(*kept, *axes)
+    groups = [1] * len(kept) + [len(axes)]
+    merged = merge_dims(view.shape, view.strides, groups)
+    if merged is None:
+        view = view.contiguous()
+        merged = merge_dims(view.shape, view.strides, groups)
+    return view.as_strided(*merged), axes
+
+
+def _reduce(op: str, lanes: ITensor, dtype: DType) -> ITensor:
+    out = lanes.__class__.empty(lanes.shape[:-1], dtype)
+    get_backend().reduce(op, lanes, out)
+    return out
+
+
+def _kept_shape(shape: Sequence[int], axes: tuple[int, ...]) -> tuple:
+    # Shape with the reduced axes as size 1 dimensions
+    return tuple(1 if d in axes else n for d, n in enumerate(shape))
+
+
+def _keepdims(out: ITensor,
+              shape: Sequence[int],
+              axes: tuple[int, ...]) -> ITensor:
+    return out.reshape(_kept_shape(shape, axes))
+
+
+def _extreme(op: str, a: ITensor, axis: Axes, keepdims: bool) -> ITensor:
+    lanes, axes = _lanes(a, axis)
+    if lanes.shape[-1] == 0:
+        raise ValueError(f"{op} of an empty slice")
+    out = _reduce(op, lanes, a.dtype)
+    if needs_grad(a):
+        # Routes the gradient through the position of every extreme,
+        # found again only if a backward pass needs it
+        cls, shape, dtype = a.__class__, a.shape, a.dtype
+        positions = _reduce("arg" + op, lanes, DType.INT32)
+        order = [d for d in range(len(shape)) if d not in axes] + list(axes)
+        inverse = sorted(range(len(order)), key=order.__getitem__)
+
+        def backward(g: ITensor) -> Sequence[Optional[ITensor]]:
+            grad = cls.with_zeros(lanes.shape, dtype)
+            index = positions.reshape((*positions.shape, 1))
+            grad.scatter(-1, index, g.reshape(index.shape))
+            return (grad.reshape(tuple(shape[d] for d in order))
+                    .permute(*inverse),)
+
+        record(op, out, (a,), backward)
+    return _keepdims(out, a.shape, axes) if keepdims else out
+
+
+def _arg(op: str, a: ITensor, axis: Optional[int], keepdims: bool) -> ITensor:
+    if axis is not None and not isinstance(axis, int):
+        raise TypeError(f"{op} takes a single axis, got {axis}")
+    lanes, axes = _lanes(a, axis)
+    if lanes.shape[-1] == 0:
+        raise ValueError(f"{op} of an empty slice")
+    out = _reduce(op, lanes, DType.INT32)
+    return _keepdims(out, a.shape, axes) if keepdims else out
+
+
+def _softmax(a: ITensor, axis: int, log: bool) -> ITensor:
+    axis = _reduced_axes(a.rank, axis)[0] if a.rank else None
+    if axis is None:
+        raise ValueError("softmax needs a tensor of rank 1 or more")
+    out = a.__class__.empty(a.shape, _op_dtype("div", a.dtype, ()))
+    # The backend normalises the last dimension, other axes are swapped
+    # into place as views
+    get_backend().softmax(a.detach().transpose(axis, -1), log,
+                          out.transpose(axis, -1))
+    if needs_grad(a):
+        saved = out.detach()
+
+        def backward(g: ITensor) -> Sequence[Optional[ITensor]]:
+            if log:
+                # g - softmax * sum(g)
+                total = tsum(g, axis, keepdims=True)
+                return (fused(saved, "exp", ("mul", total), "neg",
+                              ("add", g)),)
+            # softmax * (g - sum(g * softmax))
+            total = tsum(hadamard(g, saved), axis, keepdims=True)
+            return (fused(g, ("sub", total), ("mul", saved)),)
+
+        record("log_softmax" if log else "softmax", out, (a,), backward)
+    return out
+
+
+type FusedStage = str | tuple[str, ITensor | Scalar]
+
+
+@profiled(fused_flops)
+def fused(a: ITensor,
+          *stages: FusedStage,
+          out: Optional[ITensor] = None) -> ITensor:
+    """Chain of element-wise ops evaluated in a single pass over memory
+
+    Each stage is either the name of a unary op ("relu", "tanh",
+    "sigmoid", "neg", "sqrt", "exp", "log") or a (binary op name, operand)
+    pair with the op one of "add", "sub", "mul", "div". Operands broadcast
+    like `matadd`.
+
+    e.g. fused(x, ("mul", scale), ("add", shift), "relu") computes
+    relu(x * scale + shift) without materialising the intermediates.
+
+    Args:
+         a (Tensor): Input to the first stage
+         stages (FusedStage): Ops to apply, in order
+         out (Optional[Tensor], optional): Output tensor to store the
+            result in, may be 'a' itself. Defaults to None.
+
+    Returns:
+         Tensor: Tensor containing the result.
+         If 'out' is provided it is mutated and also returned.
+    """
+    if needs_grad(a, *(s[1] for s in stages if isinstance(s, tuple))):
+        # The chain is recorded op by op, every intermediate is needed
+        # for the backward pass anyway
+        _check_untracked_out(out)
+        for stage in stages:
+            if isinstance(stage, tuple):
+                op, operand = stage
+                if op not in BINARY_OPS:
+                    raise ValueError(f"Unknown binary op '{op}'")
+                a = _elementwise(op, (a, operand), None)
+            else:
+                if stage not in UNARY_OPS:
+                    raise ValueError(f"Unknown unary op '{stage}'")
+                a = (hadamard(a, -1) if stage == "neg"
+                     else _elementwise(stage, (a,), None))
+        return a
+
+    ops = []
+    operands: list[ITensor | Scalar] = [a]
+    dtype = a.dtype
+    for stage in stages:
+        if isinstance(stage, tuple):
+            op, operand = stage
+            if op not in BINARY_OPS:
+                raise ValueError(f"Unknown binary op '{op}'")
+            operands.append(operand)
+            if isinstance(operand, ITensor):
+                dtype = promote_types(dtype, operand.dtype)
+            dtype = _op_dtype(op, dtype, (operand,))
+        else:
+            op = stage
+            if op not in UNARY_OPS:
+                raise ValueError(f"Unknown unary op '{op}'")
+            dtype = _op_dtype(op, dtype, ())
+        ops.append(op)
+
+    out = _prepare_out(operands, out, dtype)
+    get_backend().fused(ops, operands, out)
+    return out
+
+
+@profiled(linear_flops)
+def linear(x: ITensor,
+           w: ITensor,
+           b: Optional[ITensor] = None,
+           activation: Optional[str] = None,
+           out: Optional[ITensor] = None) -> ITensor:
+    """Fused x @ w + b followed by an optional activation
+
+    Bias and activation are applied as the matrix product is written out,
+    so the output is only walked once.
+
+    Args:
+         x (Tensor): 2D input of shape (N, in)
+         w (Tensor): 2D weights of shape (in, out)
+         b (Optional[Tensor], optional): Bias of shape (out,).
+            Defaults to None.
+         activation (Optional[str], optional): Name of a unary op to
+            apply, e.g. "relu". Defaults to None.
+         out (Optional[Tensor], optional): Output tensor of shape
+            (N, out) to store the result in. Defaults to None.
+
+    Returns:
+         Tensor: Tensor containing the result.
+         If 'out' is provided it is mutated and also returned.
+    """
+    if x.rank != 2 or w.rank != 2:
+        raise ValueError("Both tensors must be 2D")
+    if x.shape[1] != w.shape[0]:
+        raise ValueError(f"Shapes {x.shape} and {w.shape} are not aligned")
+    if b is not None and b.shape != (w.shape[1],):
+        raise ValueError(f"Bias shape {b.shape} does not match "
+                         f"({w.shape[1]},)")
+    if activation is not None and activation not in UNARY_OPS:
+        raise ValueError(f"Unknown activation '{activation}'")
+
+    dtype = promote_types(x.dtype, w.dtype)
+    if b is not None:
+        dtype = promote_types(dtype, b.dtype)
+    if activation is not None:
+        dtype = _op_dtype(activation, dtype, ())
+
+    track = needs_grad(x, w, b)
+    if track:
+        _check_untracked_out(out)
+
+    shape = (x.shape[0], w.shape[1])
     if out is not None:
-        if out.shape != a.shape:
+        if out.shape != shape:
             raise ValueError("Output tensor shape is not aligned")
-        if len(out.data) != len(a.data):
-            raise ValueError("Output tensor data length is not aligned")
     else:
-        # TODO: Check for a better way to implement this
-        out = a.__class__.with_zeros(shape=a.shape)
+        out = x.__class__.empty(shape=shape, dtype=dtype)
 
-    for i in range(len(a.data)):
-        out.data[i] = a.data[i] + b.data[i]
+    get_backend().linear(x, w, b, activation, out)
+    if track:
+        saved = out.detach() if activation is not None else None
 
+        def backward(g: ITensor) -> Sequence[Optional[ITensor]]:
+            if activation is not None:
+                g = activation_grad(activation, saved, g)
+            dx = matmul(g, w.transpose()) if requires_grad(x) else None
+            dw = matmul(x.transpose(), g) if requires_grad(w) else None
+            # Summed over the batch by the engine, bias is broadcast
+            return dx, dw, g if requires_grad(b) else None
+
+        record("linear", out, (x, w, b), backward)
+    return out
+
+
+def _elementwise(op: str,
+                 operands: tuple[ITensor | Scalar, ...],
+                 out: Optional[ITensor]) -> ITensor:
+    track = needs_grad(*operands)
+    if track:
+        _check_untracked_out(out)
+    out = _prepare_out(operands, out, _result_dtype(op, operands))
+    get_backend().elementwise(op, operands, out)
+    if track:
+        record(op, out, operands, _ELEMENTWISE_GRADS[op](operands, out))
     return out
 
 
-def matmul(a: ITensor, b: ITensor, out: Optional[ITensor] = None) -> ITensor:
-    """Simple 2D matrix multiplication
+def _check_untracked_out(out: Optional[ITensor]):
+    # Writing into an existing tensor could overwrite something saved for
+    # the backward pass
+    if out is not None:
+        raise RuntimeError("'out' is not supported while recording "
+                           "gradients, use no_grad()")
+
+
+def _add_grad(operands, out) -> BackwardFn:
+    return lambda g: (g, g)
+
+
+def _sub_grad(operands, out) -> BackwardFn:
+    b = operands[1]
+    return lambda g: (g, hadamard(g, -1) if requires_grad(b) else None)
+
+
+def _mul_grad(operands, out) -> BackwardFn:
+    a, b = operands
+    return lambda g: (hadamard(g, b) if requires_grad(a) else None,
+                      hadamard(g, a) if requires_grad(b) else None)
+
+
+def _div_grad(operands, out) -> BackwardFn:
+    a, b = operands
+    # d(a / b)/db = -a / b^2
+    return lambda g: (
+        matdiv(g, b) if requires_grad(a) else None,
+        fused(g, ("mul", a), ("div", b), ("div", b), "neg")
+        if requires_grad(b) else None)
+
+
+def _activation_grad(op: str) -> Callable[..., BackwardFn]:
+    def make(operands, out) -> BackwardFn:
+        # Derivatives are taken from the output. A detached alias is saved
+        # rather than 'out' itself, which would form a reference cycle
+        # with its own node.
+        saved = out.detach()
+        return lambda g: (activation_grad(op, saved, g),)
+    return make
+
+
+_ELEMENTWISE_GRADS: dict[str, Callable[..., BackwardFn]] = {
+    "add": _add_grad,
+    "sub": _sub_grad,
+    "mul": _mul_grad,
+    "div": _div_grad,
+    **{op: _activation_grad(op) for op in UNARY_OPS},
+}
+
+
+def _prepare_out(operands: Sequence[ITensor | Scalar],
+                 out: Optional[ITensor],
+                 dtype: DType) -> ITensor:
+    # Validates broadcasting and allocates the output if needed
+    tensors = [x for x in operands if isinstance(x, ITensor)]
+    if not tensors:
+        raise TypeError("At least one operand must be a tensor")
+
+    shape = broadcast_shapes(*(t.shape for t in tensors))
+    if out is not None:
+        if out.shape != shape:
+            raise ValueError("Output tensor shape is not aligned")
+        return out
+    return tensors[0].__class__.empty(shape=shape, dtype=dtype)
+
+
+def _result_dtype(op: str, operands: Sequence[ITensor | Scalar]) -> DType:
+    dtype = reduce(promote_types,
+                   (x.dtype for x in operands if isinstance(x, ITensor)))
+    return _op_dtype(op, dtype, operands)
+
 
-    Demands 1D or 2D tensors (matrices), can optionally be provided with an
-    output tensor.
+def _op_dtype(op: str,
+              dtype: DType,
+              operands: Sequence[ITensor | Scalar]) -> DType:
+    # Integer inputs stay integer unless the op or a float scalar makes
+    # the result fractional
+    if dtype.is_floating:
+        return dtype
+    if op in _FLOAT_OPS or any(isinstance(x, float) for x in operands):
+        return DEFAULT_DTYPE
+    return dtype
+
+
+@profiled(matmul_flops)
+def matmul(a: ITensor,
+           b: ITensor,
+           out: Optional[ITensor] = None,
+           pack_b: bool = True) -> ITensor:
+    """Matrix multiplication, batched over any leading dimensions
+
+    2D tensors are multiplied as matrices. Higher rank tensors are stacks
+    of matrices in their last two dimensions, and the leading (batch)
+    dimensions broadcast like `matadd`. e.g. (8, 1, 4, 3) @ (5, 3, 2)
+    gives (8, 5, 4, 2). Broadcasting never copies the operands.
+
+    The work is done by the active backend, see `backend.get_backend`.
+
+    Sparse operands are multiplied by `sparse.spmm`, in time proportional
+    to their non-zeros.
 
     Note: For 1D tensors the shape currently must be (1, N) or (N, 1).
     TODO: Implement support for 1D tensors with shape (N,)
 
     Args:
-         a (Tensor): Left 2D tensor to multiply
-         b (Tensor): Right 2D tensor to multiply
+         a (Tensor): Left tensor to multiply, at least 2D
+         b (Tensor): Right tensor to multiply, at least 2D
          out (Optional[Tensor], optional): Output tensor to store the 
-            result in. At present out tensor shape and data length must
-            be aligned with the expected output shape and data length.
+            result in. Its shape must match the expected output shape,
+            it may be a view.
             Defaults to None.
+         pack_b (bool, optional): Hint that the backend may pack 'b'
+            into a layout friendlier to its kernel. Costs a copy of 'b'.
+            Defaults to True.
 
     Returns:
          Tensor: Tensor containing the result of the matrix multiplication.
-         If 'out' is provided it is mutated and also returned.
+         If 'out' is provided it is overwritten and also returned.
     """
 
-    if a.rank != 2 or b.rank != 2:
-        raise ValueError("Both tensors must be 2D")
+    if a.is_sparse or b.is_sparse:
+        # Imported here, sparse tensors are built on top of tmath
+        from lml_python.core.sparse import spmm
+        return spmm(a, b, out)
 
-    if a.shape[1] != b.shape[0]:
+    if a.rank < 2 or b.rank < 2:
+        raise ValueError("Both tensors must be at least 2D")
+
+    if a.shape[-1] != b.shape[-2]:
         raise ValueError(f"Shapes {a.shape} and {b.shape} are not aligned")
 
+    batch = broadcast_shapes(a.shape[:-2], b.shape[:-2])
+    shape = (*batch, a.shape[-2], b.shape[-1])
+
+    track = needs_grad(a, b)
+    if track:
+        _check_untracked_out(out)
+
     if out is not None:
-        if out.shape != (a.shape[0], b.shape[1]):
+        if out.shape != shape:
             raise ValueError("Output tensor shape is not aligned")
-        if len(out.data) != a.shape[0] * b.shape[1]:
-            raise ValueError("Output tensor data length is not aligned")
     else:
-        out = a.__class__.with_zeros(shape=(a.shape[0], b.shape[1]))
+        out = a.__class__.empty(
+            shape=shape,
+            dtype=promote_types(a.dtype, b.dtype))
+
+    if batch:
+        _batched_matmul(a, b, out, pack_b)
+    else:
+        get_backend().matmul(a, b, out, pack_b)
 
-    for i in range(a.shape[0]):
-        for j in range(a.shape[1]):
-            for k in range(b.shape[1]):
-                # TODO: Replace this with actual dot product function call
-                # Consider how to obtain iterators to non contiguous data
-                out[i, k] += a[i, j] * b[j, k]
+    if track:
+        # Gradients of broadcast batches are summed back by the engine
+        def backward(g: ITensor) -> Sequence[Optional[ITensor]]:
+            return (matmul(g, b.transpose()) if requires_grad(a) else None,
+                    matmul(a.transpose(), g) if requires_grad(b) else None)
 
+        record("matmul", out, (a, b), backward)
     return out
 
 
-# def tdot(a: Tensor,
-#          b: Tensor,
-#          axes: int | tuple[_TensorShape, _TensorShape],
-#          out: Tensor):
-#     # TODO: Next
-#     # Process the axes and ensure they are in the expected shape
-#     # Validate input tensor shapes are compatible
-#     # Calculate output shape and set up output tensor
-#     # Compute and set result either to output or as a return value
-#     raise NotImplementedError
+@profiled(tdot_flops)
+def tdot(a: ITensor,
+         b: ITensor,
+         axes: int | tuple[Sequence[int], Sequence[int]] = 2,
+         out: Optional[ITensor] = None) -> ITensor:
+    """Tensor dot product, contracting pairs of axes of two tensors
+
+    e.g. tdot(a, b, ([1, 2], [0, 1])) sums a[i, j, k] * b[j, k, l] over
+    j and k. The result has the remaining axes of 'a' followed by the
+    remaining axes of 'b'.
+
+    The contraction runs as a single matrix multiplication. Axes are
+    permuted and grouped into matrix dimensions through strides, so
+    operands are only copied when a group cannot be walked with a single
+    stride.
+
+    Args:
+         a (Tensor): Left tensor
+         b (Tensor): Right tensor
+         axes (int | tuple[Sequence[int], Sequence[int]], optional):
+            Either N, contracting the last N axes of 'a' with the first N
+            of 'b', or the axes of 'a' and the matching axes of 'b'.
+            Defaults to 2.
+         out (Optional[Tensor], optional): Output tensor to store the
+            result in. Defaults to None.
+
+    Returns:
+         Tensor: Tensor containing the contraction.
+         If 'out' is provided it is overwritten and also returned.
+    """
+    if isinstance(axes, int):
+        if not 0 <= axes <= min(a.rank, b.rank):
+            raise ValueError(f"Cannot contract {axes} axes of tensors of "
+                             f"rank {a.rank} and {b.rank}")
+        a_axes = list(range(a.rank - axes, a.rank))
+        b_axes = list(range(axes))
+    else:
+        a_axes = [_checked_axis(a.rank, axis) for axis in axes[0]]
+        b_axes = [_checked_axis(b.rank, axis) for axis in axes[1]]
+        if len(a_axes) != len(b_axes):
+            raise ValueError("Both tensors need the same number of axes")
+        if len(set(a_axes)) != len(a_axes) or \
+                len(set(b_axes)) != len(b_axes):
+            raise ValueError("Axes can only be contracted once")
+    for i, j in zip(a_axes, b_axes):
+        if a.shape[i] != b.shape[j]:
+            raise ValueError(f"Axis {i} of {a.shape} and axis {j} of "
+                             f"{b.shape} have different sizes")
+
+    free_a = [d for d in range(a.rank) if d not in a_axes]
+    free_b = [d for d in range(b.rank) if d not in b_axes]
+    shape = (*(a.shape[d] for d in free_a), *(b.shape[d] for d in free_b))
+
+    track = needs_grad(a, b)
+    if track:
+        _check_untracked_out(out)
+
+    out_2d = None
+    if out is not None:
+        if out.shape != shape:
+            raise ValueError("Output tensor shape is not aligned")
+        out_2d = _grouped_view(out, (len(free_a), len(free_b)), copy=False)
+
+    result = matmul(
+        _grouped_view(a.permute(*free_a, *a_axes),
+                      (len(free_a), len(a_axes))),
+        _grouped_view(b.permute(*b_axes, *free_b),
+                      (len(b_axes), len(free_b))),
+        out=out_2d)
+    if out is not None:
+        if out_2d is None:
+            fused(result.reshape(shape), out=out)
+        return out
+    return result.reshape(shape)
+
+
+def _batched_matmul(a: ITensor, b: ITensor, out: ITensor, pack_b: bool):
+    m, k = a.shape[-2:]
+    n = b.shape[-1]
+    batch = out.shape[:-2]
+    a = a.as_strided((*batch, m, k),
+                     broadcast_strides(a.shape, a.strides, (*batch, m, k)))
+    b = b.as_strided((*batch, k, n),
+                     broadcast_strides(b.shape, b.strides, (*batch, k, n)))
+
+    if all(stride == 0 for stride in b.strides[:-2]):
+        # Every batch shares 'b' (e.g. weights applied to a batch of
+        # sequences), folding the batch into the rows of 'a' makes it a
+        # single GEMM that packs 'b' only once
+        groups = (len(batch) + 1, 1)
+        a_2d = merge_dims(a.shape, a.strides, groups)
+        out_2d = merge_dims(out.shape, out.strides, groups)
+        if a_2d is not None and out_2d is not None:
+            get_backend().matmul(a.as_strided(*a_2d),
+                                 b[(0,) * len(batch)],
+                                 out.as_strided(*out_2d),
+                                 pack_b)
+            return
+
+    get_backend().batched_matmul(a, b, out)
+
+
+def _grouped_view(t: ITensor,
+                  groups: Sequence[int],
+                  copy: bool = True) -> Optional[ITensor]:
+    # View merging consecutive groups of dimensions. Falls back to a
+    # (recorded) reshape when gradients are tracked or strides do not
+    # allow it, unless 'copy' is False.
+    shape = tuple(math.prod(t.shape[i:i + n])
+                  for i, n in zip(itertools.accumulate(groups, initial=0),
+                                  groups))
+    merged = merge_dims(t.shape, t.strides, groups)
+    if merged is not None and not needs_grad(t):
+        return t.as_strided(*merged)
+    if not copy:
+        return None
+    return t.reshape(shape)
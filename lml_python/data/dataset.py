@@ -0,0 +1,110 @@
+import math
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from lml_python.core.dtype import DType, DEFAULT_DTYPE
+from lml_python.core.interfaces import ITensor, Scalar, TensorShape
+
+# One sample, a value per field, e.g. (features, label)
+type Sample = tuple[ITensor | Scalar, ...]
+
+
+class IDataset(ABC):
+    """Indexable collection of samples
+
+    Every sample has the same fields, of the same shape and type.
+    """
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def __getitem__(self, index: int) -> Sample:
+        pass
+
+    def fields(self) -> list[tuple[TensorShape, DType]]:
+        """Shape and element type of every field of a sample
+
+        Batch tensors are allocated with them. Inferred from the first
+        sample, Python ints and floats become INT32 and DEFAULT_DTYPE
+        scalars. Datasets knowing their storage types should override
+        this.
+
+        Returns:
+            list[tuple[TensorShape, DType]]: One entry per field
+        """
+        return [_field(value) for value in self[0]]
+
+    def collate(self, indices: Sequence[int], out: Sequence[ITensor]):
+        """Write samples into preallocated batch tensors
+
+        Row i of every batch tensor receives the matching field of sample
+        indices[i]. Datasets able to read several samples at once can
+        override this.
+
+        Args:
+            indices (Sequence[int]): Samples to read, in batch order
+            out (Sequence[ITensor]): One tensor per field, with the batch
+                as the first dimension
+        """
+        for row, index in enumerate(indices):
+            for batch, value in zip(out, self[index]):
+                batch[row] = value
+
+
+class TensorDataset(IDataset):
+    """Dataset over tensors holding all samples, one per row"""
+
+    def __init__(self, *tensors: ITensor):
+        """Create a dataset whose samples are the rows of tensors
+
+        Args:
+            tensors (ITensor): One tensor per field, all with the same
+                size in their first dimension
+        """
+        if not tensors:
+            raise ValueError("TensorDataset needs at least one tensor")
+        sizes = {t.shape[0] if t.rank else None for t in tensors}
+        if len(sizes) != 1 or None in sizes:
+            raise ValueError("Every tensor needs the same first dimension, "
+                             f"got shapes {[t.shape for t in tensors]}")
+        self.tensors = tensors
+
+    def __len__(self) -> int:
+        return self.tensors[0].shape[0]
+
+    def __getitem__(self, index: int) -> Sample:
+        return tuple(t[index] for t in self.tensors)
+
+    def fields(self) -> list[tuple[TensorShape, DType]]:
+        return [(t.shape[1:], t.dtype) for t in self.tensors]
+
+    def collate(self, indices: Sequence[int], out: Sequence[ITensor]):
+        for t, batch in zip(self.tensors, out):
+            if not (t.is_contiguous() and batch.is_contiguous()
+                    and t.dtype == batch.dtype):
+                for row, index in enumerate(indices):
+                    batch[row] = t[index]
+                continue
+            # Rows are copied slice to slice, without per row views
+            n = math.prod(t.shape[1:])
+            src, dst = memoryview(t.data), memoryview(batch.data)
+            offset = batch.offset
+            size = len(self)
+            for index in indices:
+                if index < 0:
+                    index += size
+                if not 0 <= index < size:
+                    raise IndexError("Index out of bounds")
+                start = t.offset + index * n
+                dst[offset:offset + n] = src[start:start + n]
+                offset += n
+
+
+def _field(value: ITensor | Scalar) -> tuple[TensorShape, DType]:
+    # Shape and element type of one field of a sample
+    if isinstance(value, ITensor):
+        return value.shape, value.dtype
+    if isinstance(value, int):
+        return (), DType.INT32
+    return (), DEFAULT_DTYPE
@@ -0,0 +1,139 @@
+import contextvars
+import math
+import queue
+import random
+import threading
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Optional
+from lml_python.core.autograd import no_grad
+from lml_python.core.dtype import DType
+from lml_python.core.interfaces import TensorShape
+from lml_python.core.tensor import Tensor
+from lml_python.data.dataset import IDataset
+
+type Batch = tuple[Tensor, ...]
+
+# Marks the end of the batches in the prefetch queue
+_DONE = object()
+
+
+class DataLoader:
+    """Iterates over a dataset in mini-batches
+
+    Every field of the samples becomes one batch tensor, with the batch
+    as the first dimension. Shuffling permutes sample indices, the data
+    itself is never copied to reorder it. Batch tensors are allocated
+    once per batch and samples are written straight into them, from the
+    active TensorPool if any.
+
+    With prefetch > 0 batches are assembled by a background thread, up
+    to 'prefetch' batches ahead of the consumer.
+
+        loader = DataLoader(TensorDataset(x, y), batch_size=32,
+                            shuffle=True)
+        for epoch in range(10):
+            for xb, yb in loader:
+                ...
+    """
+
+    def __init__(self,
+                 dataset: IDataset,
+                 batch_size: int = 1,
+                 shuffle: bool = False,
+                 drop_last: bool = False,
+                 prefetch: int = 2,
+                 seed: Optional[int] = None):
+        """Create a loader
+
+        Args:
+            dataset (IDataset): Samples to load
+            batch_size (int, optional): Samples per batch. Defaults to 1.
+            shuffle (bool, optional): Visit the samples in a new random
+                order every epoch. Defaults to False.
+            drop_last (bool, optional): Skip the last batch if it is
+                smaller than batch_size. Defaults to False.
+            prefetch (int, optional): Batches assembled ahead by a
+                background thread, 0 assembles them on demand. Defaults
+                to 2.
+            seed (Optional[int], optional): Seed of the shuffling order.
+                Defaults to None.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if prefetch < 0:
+            raise ValueError("prefetch must not be negative")
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.prefetch = prefetch
+        self._rng = random.Random(seed)
+        self._fields: Optional[list[tuple[TensorShape, DType]]] = None
+
+    def __len__(self) -> int:
+        """Number of batches per epoch"""
+        if self.drop_last:
+            return len(self.dataset) // self.batch_size
+        return math.ceil(len(self.dataset) / self.batch_size)
+
+    def __iter__(self) -> Iterator[Batch]:
+        batches = self._batch_indices()
+        if self.prefetch == 0:
+            return (self._collate(indices) for indices in batches)
+        return self._prefetched(batches)
+
+    def _batch_indices(self) -> list[Sequence[int]]:
+        order = list(range(len(self.dataset)))
+        if self.shuffle:
+            self._rng.shuffle(order)
+        return [order[i:i + self.batch_size]
+                for i in range(0, len(self) * self.batch_size,
+                               self.batch_size)]
+
+    def _collate(self, indices: Sequence[int]) -> Batch:
+        if self._fields is None:
+            self._fields = self.dataset.fields()
+        batch = tuple(Tensor.empty((len(indices), *shape), dtype)
+                      for shape, dtype in self._fields)
+        with no_grad():
+            self.dataset.collate(indices, batch)
+        return batch
+
+    def _prefetched(self, batches: Iterable[Sequence[int]]
+                    ) -> Iterator[Batch]:
+        ready: queue.Queue = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for indices in batches:
+                    if stop.is_set():
+                        return
+                    ready.put(self._collate(indices))
+                ready.put(_DONE)
+            except BaseException as e:
+                ready.put(e)
+
+        # The worker sees the backend, memory pool and grad mode of the
+        # thread iterating
+        context = contextvars.copy_context()
+        worker = threading.Thread(target=context.run, args=(produce,),
+                                  daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Stopped early, unblock the worker if it waits on a full queue
+            stop.set()
+            while worker.is_alive():
+                try:
+                    ready.get(timeout=0.01)
+                except queue.Empty:
+                    pass
+            worker.join()
@@ -0,0 +1,58 @@
+import math
+from collections.abc import Iterable
+from lml_python.core.interfaces import ITensor
+from lml_python.core.tmath import fused, hadamard
+from lml_python.optim.optimizer import Optimizer, ParameterGroup
+
+
+class Adam(Optimizer):
+    def __init__(self,
+                 parameters: Iterable[ITensor],
+                 lr: float = 1e-3,
+                 betas: tuple[float, float] = (0.9, 0.999),
+                 eps: float = 1e-8):
+        """Adam, gradient descent scaled by running moment estimates
+
+        m = b1 * m + (1 - b1) * g
+        v = b2 * v + (1 - b2) * g^2
+        p -= lr * m_hat / (sqrt(v_hat) + eps)
+
+        where m_hat and v_hat are m and v corrected for their zero
+        initialisation.
+
+        Args:
+            parameters (Iterable[ITensor]): Tensors to optimize
+            lr (float, optional): Learning rate. Defaults to 1e-3.
+            betas (tuple[float, float], optional): Decay rates of the
+                first and second moment estimates. Defaults to
+                (0.9, 0.999).
+            eps (float, optional): Added to the denominator for
+                stability. Defaults to 1e-8.
+        """
+        if not all(0.0 <= b < 1.0 for b in betas):
+            raise ValueError(f"Betas must be in [0, 1), got {betas}")
+        super().__init__(parameters)
+        self.lr = lr
+        self.betas = betas
+        self.eps = eps
+
+    def _update(self, group: ParameterGroup):
+        b1, b2 = self.betas
+        p, g = group.param, group.grad
+        m, v = group.buffer("exp_avg"), group.buffer("exp_avg_sq")
+        scratch = group.buffer("scratch")
+
+        # Scaling by 1 / (1 - b) first folds each moment update into a
+        # single pass
+        fused(m, ("mul", b1 / (1 - b1)), ("add", g), ("mul", 1 - b1),
+              out=m)
+        hadamard(g, g, out=scratch)
+        fused(v, ("mul", b2 / (1 - b2)), ("add", scratch), ("mul", 1 - b2),
+              out=v)
+
+        bias1 = 1 - b1 ** self.steps
+        bias2 = 1 - b2 ** self.steps
+        fused(v, "sqrt", ("div", math.sqrt(bias2)), ("add", self.eps),
+              out=scratch)
+        fused(m, ("div", scratch), ("mul", -self.lr / bias1), ("add", p),
+              out=p)
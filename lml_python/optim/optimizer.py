@@ -0,0 +1,134 @@
+import math
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from lml_python.core.autograd import no_grad
+from lml_python.core.dtype import DType
+from lml_python.core.interfaces import ITensor
+from lml_python.core.layout import contiguous_strides
+from lml_python.core.memory import no_pool
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import fused
+
+
+class ParameterGroup:
+    """Parameters of one element type sharing a flat buffer
+
+    Every parameter is a view of `param`, and its gradient a view of
+    `grad` at the same offset, so an update is a single pass over each
+    buffer whatever the number of parameters.
+    """
+
+    def __init__(self, params: list[ITensor], dtype: DType):
+        self.dtype = dtype
+        self.params = params
+        self.offsets = []
+        numel = 0
+        for p in params:
+            self.offsets.append(numel)
+            numel += math.prod(p.shape)
+
+        # Long lived, kept out of any active pool
+        with no_pool():
+            self.param = Tensor.with_zeros((numel,), dtype)
+            self.grad = Tensor.with_zeros((numel,), dtype)
+        self.grad_views = [self._view(self.grad, p, o)
+                           for p, o in zip(params, self.offsets)]
+        self.state: dict[str, Tensor] = {}
+
+        with no_grad():
+            for p, offset, grad in zip(params, self.offsets,
+                                       self.grad_views):
+                fused(p, out=self._view(self.param, p, offset))
+                p.set_storage(self.param.data, offset)
+                if p.grad is not None:
+                    fused(p.grad, out=grad)
+                p.grad = grad
+
+    def buffer(self, name: str) -> Tensor:
+        """Optimizer state laid out like the parameters, zero at first
+
+        Args:
+            name (str): Name of the buffer, e.g. "momentum"
+
+        Returns:
+            Tensor: Flat buffer, allocated on first use
+        """
+        buffer = self.state.get(name)
+        if buffer is None:
+            with no_pool():
+                buffer = self.state[name] = Tensor.with_zeros(
+                    self.param.shape, self.dtype)
+        return buffer
+
+    def zero_grad(self):
+        """Zero every gradient, in one pass over `grad`"""
+        for p, grad in zip(self.params, self.grad_views):
+            p.grad = grad
+        # Overwritten rather than multiplied by 0, inf * 0 would be NaN
+        self.grad[()] = 0
+
+    def sync_grads(self):
+        """Bring gradients replaced since the last step back into `grad`"""
+        for p, grad in zip(self.params, self.grad_views):
+            if p.grad is grad:
+                continue
+            if p.grad is None:
+                grad[()] = 0
+            else:
+                fused(p.grad, out=grad)
+            p.grad = grad
+
+    @staticmethod
+    def _view(flat: Tensor, like: ITensor, offset: int) -> Tensor:
+        return flat.as_strided(like.shape, contiguous_strides(like.shape),
+                               offset)
+
+
+class Optimizer(ABC):
+    """Updates parameters in place from their gradients
+
+    On creation the parameters are moved into one flat buffer per element
+    type, see `ParameterGroup`. The tensors themselves stay the same
+    objects, so layers keep using them, but views taken earlier no longer
+    share their storage.
+
+        optimizer = Adam(model.parameters(), lr=1e-3)
+        for xb, yb in loader:
+            optimizer.zero_grad()
+            loss(model.forward(xb), yb).backward()
+            optimizer.step()
+    """
+
+    def __init__(self, parameters: Iterable[ITensor]):
+        by_dtype: dict[DType, list[ITensor]] = {}
+        seen = set()
+        for p in parameters:
+            if id(p) in seen:
+                continue
+            seen.add(id(p))
+            if not p.dtype.is_floating:
+                raise TypeError(f"Cannot optimize a {p.dtype} parameter")
+            by_dtype.setdefault(p.dtype, []).append(p)
+        if not by_dtype:
+            raise ValueError("Optimizer got no parameters")
+        self.groups = [ParameterGroup(params, dtype)
+                       for dtype, params in by_dtype.items()]
+        self.steps = 0
+
+    def zero_grad(self):
+        """Zero every gradient in place"""
+        with no_grad():
+            for group in self.groups:
+                group.zero_grad()
+
+    def step(self):
+        """Update every parameter from its gradient"""
+        self.steps += 1
+        with no_grad():
+            for group in self.groups:
+                group.sync_grads()
+                self._update(group)
+
+    @abstractmethod
+    def _update(self, group: ParameterGroup):
+        pass
@@ -0,0 +1,44 @@
+from collections.abc import Iterable
+from lml_python.core.interfaces import ITensor
+from lml_python.core.tmath import fused
+from lml_python.optim.optimizer import Optimizer, ParameterGroup
+
+
+class SGD(Optimizer):
+    def __init__(self,
+                 parameters: Iterable[ITensor],
+                 lr: float,
+                 momentum: float = 0.0,
+                 nesterov: bool = False):
+        """Stochastic gradient descent, optionally with momentum
+
+        With momentum a velocity v = momentum * v + g is kept per
+        element and the step is p -= lr * v, or with Nesterov momentum
+        p -= lr * (g + momentum * v).
+
+        Args:
+            parameters (Iterable[ITensor]): Tensors to optimize
+            lr (float): Learning rate
+            momentum (float, optional): Momentum factor. Defaults to 0.0.
+            nesterov (bool, optional): Use Nesterov momentum. Defaults
+                to False.
+        """
+        if nesterov and momentum <= 0:
+            raise ValueError("Nesterov momentum needs a momentum above 0")
+        super().__init__(parameters)
+        self.lr = lr
+        self.momentum = momentum
+        self.nesterov = nesterov
+
+    def _update(self, group: ParameterGroup):
+        p, g = group.param, group.grad
+        if not self.momentum:
+            fused(g, ("mul", -self.lr), ("add", p), out=p)
+            return
+        v = group.buffer("momentum")
+        fused(v, ("mul", self.momentum), ("add", g), out=v)
+        if self.nesterov:
+            fused(v, ("mul", self.momentum), ("add", g), ("mul", -self.lr),
+                  ("add", p), out=p)
+        else:
+            fused(v, ("mul", -self.lr), ("add", p), out=p)
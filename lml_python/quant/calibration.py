@@ -0,0 +1,158 @@
+import math
+import time
+from collections.abc import Iterable
+from typing import NamedTuple
+from lml_python.core.autograd import no_grad
+from lml_python.core.interfaces import ILayer, ITensor
+from lml_python.core.layer import Linear, Sequential, _flatten
+from lml_python.core.tmath import fused
+from lml_python.quant.layer import QuantizedLinear
+from lml_python.quant.quantize import max_abs, scale_for
+
+
+class RangeObserver:
+    """Tracks the range of the values it is shown
+
+    With momentum 0 the range is the largest magnitude seen. Otherwise it
+    is an exponential moving average of every batch's largest magnitude,
+    which keeps a few outliers from stretching the scale for all values.
+    """
+
+    def __init__(self, momentum: float = 0.0):
+        """Create an observer
+
+        Args:
+            momentum (float, optional): Weight of the running range when
+                a batch is observed, 0 keeps the maximum. Defaults to 0.0.
+        """
+        if not 0.0 <= momentum < 1.0:
+            raise ValueError("momentum must be in [0, 1)")
+        self.momentum = momentum
+        self.max_abs = 0.0
+        self.batches = 0
+
+    def observe(self, t: ITensor):
+        value = max_abs(t)
+        if self.batches == 0 or self.momentum == 0.0:
+            self.max_abs = max(self.max_abs, value)
+        else:
+            self.max_abs = (self.momentum * self.max_abs
+                            + (1 - self.momentum) * value)
+        self.batches += 1
+
+    @property
+    def scale(self) -> float:
+        """int8 scale covering the observed range"""
+        return scale_for(self.max_abs)
+
+
+def calibrate(model: Sequential,
+              batches: Iterable[ITensor],
+              momentum: float = 0.0) -> list[RangeObserver]:
+    """Observe the input range of every Linear of a model
+
+    Args:
+        model (Sequential): Float model, nested Sequentials included
+        batches (Iterable[ITensor]): Representative inputs
+        momentum (float, optional): See `RangeObserver`. Defaults to 0.0.
+
+    Returns:
+        list[RangeObserver]: Input range of each Linear, in order
+    """
+    layers = _flatten(model.layers)
+    observers = {id(layer): RangeObserver(momentum) for layer in layers
+                 if isinstance(layer, Linear)}
+    with no_grad():
+        for x in batches:
+            for layer in layers:
+                observer = observers.get(id(layer))
+                if observer is not None:
+                    observer.observe(x)
+                x = layer.forward(x)
+    return list(observers.values())
+
+
+def quantize_model(model: Sequential,
+                   calibration: Iterable[ITensor] = (),
+                   momentum: float = 0.0) -> Sequential:
+    """Copy of a model with every Linear quantized to int8
+
+    Post-training quantization, the float model is left untouched. With
+    calibration inputs every layer quantizes its inputs with a fixed
+    scale, otherwise with a scale computed from each input.
+
+    e.g.
+        qmodel = quantize_model(model, calibration=(x for x, _ in loader))
+
+    Args:
+        model (Sequential): Trained float model
+        calibration (Iterable[ITensor], optional): Representative inputs.
+            Defaults to none.
+        momentum (float, optional): See `RangeObserver`. Defaults to 0.0.
+
+    Returns:
+        Sequential: Flat chain of the layers with Linear replaced by
+            QuantizedLinear, other layers are shared with 'model'
+    """
+    observers = iter(calibrate(model, calibration, momentum))
+    layers = []
+    for layer in _flatten(model.layers):
+        if isinstance(layer, Linear):
+            observer = next(observers)
+            scale = observer.scale if observer.batches else None
+            layer = QuantizedLinear.from_linear(layer, scale)
+        layers.append(layer)
+    return Sequential(*layers)
+
+
+class QuantizationReport(NamedTuple):
+    """Accuracy and cost of a quantized model next to the float one"""
+    max_abs_error: float
+    mean_abs_error: float
+    float_seconds: float
+    quantized_seconds: float
+    float_bytes: int
+    quantized_bytes: int
+
+    @property
+    def compression(self) -> float:
+        """Parameter memory of the float model over the quantized one"""
+        return self.float_bytes / self.quantized_bytes
+
+
+def compare(reference: ILayer,
+            quantized: ILayer,
+            inputs: Iterable[ITensor]) -> QuantizationReport:
+    """Run both models on the same inputs and compare their outputs
+
+    Args:
+        reference (ILayer): Float model
+        quantized (ILayer): Its quantized copy
+        inputs (Iterable[ITensor]): Inputs to evaluate on
+
+    Returns:
+        QuantizationReport: Errors of the quantized outputs and total
+            forward time of each model
+    """
+    worst = total = 0.0
+    count = 0
+    times = [0.0, 0.0]
+    with no_grad():
+        for x in inputs:
+            outputs = []
+            for i, model in enumerate((reference, quantized)):
+                start = time.perf_counter()
+                outputs.append(model.forward(x))
+                times[i] += time.perf_counter() - start
+            error = fused(outputs[1], ("sub", outputs[0]))
+            worst = max(worst, max_abs(error))
+            total += math.fsum(map(abs, error.data))
+            count += math.prod(error.shape)
+    return QuantizationReport(worst, total / count if count else 0.0,
+                              times[0], times[1], _nbytes(reference),
+                              _nbytes(quantized))
+
+
+def _nbytes(model: ILayer) -> int:
+    return sum(math.prod(p.shape) * p.dtype.itemsize
+               for p in model.parameters())
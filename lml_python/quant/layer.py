@@ -0,0 +1,119 @@
+import math
+from typing import Optional
+from lml_python.core.autograd import no_grad
+from lml_python.core.dtype import DType
+from lml_python.core.interfaces import ILayer, ITensor, InferenceKernel
+from lml_python.core.layer import Linear
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import fused, matmul
+from lml_python.quant.quantize import (
+    max_abs,
+    quantize,
+    quantize_per_channel,
+    scale_for,
+)
+
+
+class QuantizedLinear(ILayer):
+    """Inference only Linear with int8 weights
+
+    Weights are stored as int8 with one scale per output channel. Inputs
+    are quantized to int8 too, the product accumulates in int32 and one
+    fused pass requantizes it, per channel, back to floating point while
+    adding the bias and applying the activation:
+
+        y = activation((x_q @ w_q) * w_scale * x_scale + b)
+
+    The input scale is fixed when calibrated, see `quantize_model`,
+    otherwise it is taken from every input's own range.
+    """
+    weights: Tensor
+    scales: Tensor
+    bias: ITensor
+    input_scale: Optional[float]
+    activation: Optional[str]
+
+    def __init__(self,
+                 weights: Tensor,
+                 scales: Tensor,
+                 bias: ITensor,
+                 activation: Optional[str] = None,
+                 input_scale: Optional[float] = None):
+        """Create a layer from quantized weights, see `from_linear`
+
+        Args:
+            weights (Tensor): INT8 weights of shape (inputs, outputs)
+            scales (Tensor): Scale of every output channel
+            bias (ITensor): Floating point bias of every output channel
+            activation (Optional[str], optional): Unary op applied to the
+                output. Defaults to None.
+            input_scale (Optional[float], optional): Scale inputs are
+                quantized with. Defaults to None, a scale per input.
+        """
+        if weights.dtype != DType.INT8:
+            raise TypeError(f"Expected INT8 weights, got {weights.dtype}")
+        if scales.shape != weights.shape[1:] or bias.shape != scales.shape:
+            raise ValueError("Expected one scale and bias per output "
+                             "channel")
+        self.weights = weights
+        self.scales = scales
+        self.bias = bias
+        self.activation = activation
+        self.input_scale = input_scale
+
+    @classmethod
+    def from_linear(cls,
+                    layer: Linear,
+                    input_scale: Optional[float] = None
+                    ) -> 'QuantizedLinear':
+        """Quantize the weights of a trained Linear
+
+        Args:
+            layer (Linear): Layer to quantize, it is not modified
+            input_scale (Optional[float], optional): Scale of the inputs,
+                e.g. from calibration. Defaults to None.
+
+        Returns:
+            QuantizedLinear: Layer computing approximately the same
+        """
+        weights, scales = quantize_per_channel(layer._weights)
+        with no_grad():
+            bias = layer._bias.detach().contiguous()
+        return cls(weights, scales, bias, layer._activation, input_scale)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the parameters"""
+        return sum(math.prod(p.shape) * p.dtype.itemsize
+                   for p in self.parameters())
+
+    def forward(self, input: ITensor) -> ITensor:
+        return self._run(input, None)
+
+    def backward(self, gradient: ITensor) -> ITensor:
+        raise RuntimeError("QuantizedLinear is inference only, train the "
+                           "float Linear and quantize it again")
+
+    def update(self, lr: float):
+        pass
+
+    def parameters(self) -> list[ITensor]:
+        # Not trainable, listed so the layer can be saved and loaded
+        return [self.weights, self.scales, self.bias]
+
+    def inference_kernel(self) -> InferenceKernel:
+        return lambda backend, x, out: self._run(x, out)
+
+    def _run(self, x: ITensor, out: Optional[ITensor]) -> ITensor:
+        scale = self.input_scale
+        if scale is None:
+            scale = scale_for(max_abs(x))
+        with no_grad():
+            x_q = quantize(x, scale)
+            acc = matmul(x_q, self.weights, out=Tensor.empty(
+                (*x.shape[:-1], self.weights.shape[1]), DType.INT32))
+            stages = [("mul", self.scales), ("mul", scale),
+                      ("add", self.bias)]
+            if self.activation is not None:
+                stages.append(self.activation)
+            return fused(acc, *stages, out=out)
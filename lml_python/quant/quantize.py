@@ -0,0 +1,95 @@
+import array
+import math
+from collections.abc import Iterable
+from itertools import repeat
+from lml_python.core.autograd import no_grad
+from lml_python.core.dtype import DType
+from lml_python.core.interfaces import ITensor
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import fused, tmax, tmin
+
+# Symmetric int8 range. -128 is left out so that negating a value never
+# overflows and the range is the same on both sides of 0.
+QMAX = 127
+
+
+def scale_for(max_abs: float) -> float:
+    """Scale mapping [-max_abs, max_abs] onto the int8 range
+
+    Args:
+        max_abs (float): Largest magnitude to represent
+
+    Returns:
+        float: Value of one int8 step, 1.0 for an all zero range
+    """
+    return max_abs / QMAX if max_abs > 0 else 1.0
+
+
+def max_abs(t: ITensor) -> float:
+    """Largest magnitude of the elements of a tensor, 0 if empty"""
+    if math.prod(t.shape) == 0:
+        return 0.0
+    with no_grad():
+        return max(tmax(t)[()], -tmin(t)[()])
+
+
+def quantize(t: ITensor, scale: float) -> Tensor:
+    """Round a tensor to int8 multiples of a scale
+
+    Values beyond the int8 range saturate at +-QMAX.
+
+    Args:
+        t (ITensor): Floating point tensor
+        scale (float): Value of one int8 step
+
+    Returns:
+        Tensor: INT8 tensor of the same shape, t ~= result * scale
+    """
+    with no_grad():
+        scaled = fused(t, ("div", scale))
+    return Tensor(_round_int8(scaled.data), t.shape, DType.INT8)
+
+
+def quantize_per_channel(w: ITensor) -> tuple[Tensor, Tensor]:
+    """Quantize a weight matrix with one scale per output channel
+
+    Each column gets the scale of its own largest magnitude, so a channel
+    of small weights keeps its precision next to one of large weights.
+
+    Args:
+        w (ITensor): Weights of shape (inputs, outputs), as in Linear
+
+    Returns:
+        tuple[Tensor, Tensor]: INT8 weights of the same shape, and the
+            scale of every column with the dtype of 'w'
+    """
+    if w.rank != 2:
+        raise ValueError(f"Expected 2D weights, got shape {w.shape}")
+    with no_grad():
+        highest, lowest = tmax(w, axis=0), tmin(w, axis=0)
+        scales = Tensor.with_list(
+            [scale_for(max(hi, -lo)) for hi, lo in
+             zip(highest.data, lowest.data)], (w.shape[1],), w.dtype)
+        scaled = fused(w, ("div", scales))
+    return Tensor(_round_int8(scaled.data), w.shape, DType.INT8), scales
+
+
+def dequantize(q: ITensor, scale: 'ITensor | float') -> Tensor:
+    """Float values of a quantized tensor
+
+    Args:
+        q (ITensor): INT8 tensor
+        scale (ITensor | float): Its scale, or per channel scales that
+            broadcast against it
+
+    Returns:
+        Tensor: q * scale
+    """
+    with no_grad():
+        return fused(q, ("mul", scale))
+
+
+def _round_int8(values: Iterable[float]) -> array.array:
+    # Round half to even, like NumPy, then saturate
+    return array.array("b", map(min, map(max, map(round, values),
+                                         repeat(-QMAX)), repeat(QMAX)))
@@ -0,0 +1,241 @@
+import array
+import contextlib
+import contextvars
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import NamedTuple, Optional
+from lml_python.core.autograd import no_grad
+from lml_python.core.interfaces import ILayer, ITensor
+from lml_python.core.layer import CompiledModel
+from lml_python.core.tensor import Tensor
+from lml_python.serving.metrics import ServingMetrics
+
+# Tells a worker to exit, queued behind the requests already waiting
+_STOP = object()
+
+
+class _Request(NamedTuple):
+    sample: ITensor
+    future: Future
+    submitted_ns: int
+
+
+class DynamicBatcher:
+    """Coalesces single sample requests into batched forward passes
+
+    Every forward call carries a fixed overhead, per layer and per op,
+    that a single sample pays in full. Requests are queued instead and a
+    worker thread takes as many as arrived, up to 'max_batch_size',
+    waiting at most 'max_wait' seconds after the oldest one. They are
+    stacked into one batch, run through one forward and each request
+    gets its row of the output back.
+
+        with DynamicBatcher(model, max_batch_size=32) as batcher:
+            y = batcher.infer(x)               # blocking
+            future = batcher.submit(x)         # or asynchronous
+
+    Samples of different shapes or dtypes are never stacked together,
+    each group runs as its own batch. A model that raises fails every
+    request of that batch with the error. Outputs are copied out of the
+    model's result, so a CompiledModel reusing its arena is fine too,
+    its forward passes then run one at a time across workers.
+    """
+
+    def __init__(self,
+                 model: ILayer | CompiledModel,
+                 max_batch_size: int = 32,
+                 max_wait: float = 0.002,
+                 workers: int = 1,
+                 metrics: Optional[ServingMetrics] = None):
+        """Create a batcher, see `start`
+
+        Args:
+            model (ILayer | CompiledModel): Model taking a batch as its
+                first dimension
+            max_batch_size (int, optional): Most samples per forward.
+                Defaults to 32.
+            max_wait (float, optional): Seconds a request waits for others
+                to join its batch. Defaults to 0.002.
+            workers (int, optional): Threads running batches concurrently.
+                Defaults to 1.
+            metrics (Optional[ServingMetrics], optional): Where to record
+                latencies and batch sizes. Defaults to new metrics.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_wait < 0:
+            raise ValueError("max_wait must not be negative")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.workers = workers
+        self.metrics = metrics or ServingMetrics()
+        self._queue: queue.Queue = queue.Queue()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        # A compiled model writes every output into the same arena
+        self._forward_lock: Optional[threading.Lock] = (
+            threading.Lock() if isinstance(model, CompiledModel) else None)
+
+    def __enter__(self) -> 'DynamicBatcher':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads) and not self._closed
+
+    def start(self):
+        """Start the worker threads
+
+        They see the backend, memory pool and grad mode of the calling
+        thread.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Batcher is closed")
+            if self._threads:
+                return
+            for i in range(self.workers):
+                context = contextvars.copy_context()
+                thread = threading.Thread(target=context.run,
+                                          args=(self._work,),
+                                          name=f"DynamicBatcher-{i}",
+                                          daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def close(self):
+        """Stop accepting requests, finish the queued ones and stop"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads, self._threads = self._threads, []
+            for _ in threads:
+                self._queue.put(_STOP)
+        for thread in threads:
+            thread.join()
+
+    def submit(self, sample: ITensor) -> Future:
+        """Queue one sample
+
+        Args:
+            sample (ITensor): Input without the batch dimension
+
+        Returns:
+            Future: Resolves to the output for the sample, without the
+                batch dimension
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._closed or not self._threads:
+                raise RuntimeError("Batcher is not running, call start()")
+            self._queue.put(_Request(sample, future,
+                                     time.perf_counter_ns()))
+        return future
+
+    def infer(self,
+              sample: ITensor,
+              timeout: Optional[float] = None) -> ITensor:
+        """Run one sample and wait for its output
+
+        Args:
+            sample (ITensor): Input without the batch dimension
+            timeout (Optional[float], optional): Seconds to wait. Defaults
+                to None, no limit.
+
+        Returns:
+            ITensor: Output for the sample
+        """
+        return self.submit(sample).result(timeout)
+
+    def _work(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch, stop = self._collect(first)
+            groups: dict[tuple, list[_Request]] = {}
+            for request in batch:
+                key = (request.sample.shape, request.sample.dtype)
+                groups.setdefault(key, []).append(request)
+            for requests in groups.values():
+                self._run(requests)
+            if stop:
+                return
+
+    def _collect(self, first: _Request) -> tuple[list[_Request], bool]:
+        # Requests joining the first one's batch, and whether a stop was
+        # taken off the queue meanwhile
+        batch = [first]
+        deadline = first.submitted_ns + int(self.max_wait * 1e9)
+        while len(batch) < self.max_batch_size:
+            remaining = (deadline - time.perf_counter_ns()) / 1e9
+            try:
+                if remaining > 0:
+                    request = self._queue.get(timeout=remaining)
+                else:
+                    # Past the deadline, still take what already arrived
+                    request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self, requests: list[_Request]):
+        # Cancelled futures are dropped, the others can no longer be
+        requests = [r for r in requests
+                    if r.future.set_running_or_notify_cancel()]
+        if not requests:
+            return
+        failed = False
+        try:
+            batch = _stack([r.sample for r in requests])
+            with no_grad(), self._forward_lock or contextlib.nullcontext():
+                # Copied while no other forward can reuse the output, the
+                # rows handed out are views of the copy
+                y = _copy(self.model.forward(batch))
+            if y.shape[:1] != (len(requests),):
+                raise ValueError(f"Model output shape {y.shape} does not "
+                                 f"match the batch of {len(requests)}")
+            for i, request in enumerate(requests):
+                request.future.set_result(y[i])
+        except Exception as e:
+            failed = True
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+        done = time.perf_counter_ns()
+        self.metrics.record_batch([done - r.submitted_ns for r in requests],
+                                  failed)
+
+
+def _stack(samples: list[ITensor]) -> Tensor:
+    # Batch of same shape samples, their elements appended in C
+    first = samples[0]
+    n = math.prod(first.shape)
+    data = array.array(first.dtype.typecode)
+    for sample in samples:
+        sample = sample.contiguous()
+        data.extend(sample.data[sample.offset:sample.offset + n])
+    return Tensor(data, (len(samples), *first.shape), first.dtype)
+
+
+def _copy(t: ITensor) -> Tensor:
+    # Output in a buffer of its own, the model may reuse the one it
+    # returned, e.g. a CompiledModel's arena
+    t = t.contiguous()
+    n = math.prod(t.shape)
+    return Tensor(t.data[t.offset:t.offset + n], t.shape, t.dtype)
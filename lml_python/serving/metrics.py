@@ -0,0 +1,99 @@
+import math
+import threading
+import time
+from collections import Counter, deque
+from typing import NamedTuple
+
+
+class MetricsSnapshot(NamedTuple):
+    """Serving statistics at one point in time"""
+    requests: int
+    batches: int
+    errors: int
+    # Time from submission to result, over the most recent requests
+    latency_p50_ms: float
+    latency_p99_ms: float
+    # Requests completed per second since the metrics were created
+    throughput: float
+    mean_batch_size: float
+    # Batch size -> number of batches of that size
+    batch_sizes: dict[int, int]
+
+    def as_dict(self) -> dict:
+        """JSON serialisable form, e.g. for a /metrics endpoint"""
+        d = self._asdict()
+        d["batch_sizes"] = {str(k): v for k, v in
+                            sorted(self.batch_sizes.items())}
+        return d
+
+
+class ServingMetrics:
+    """Thread safe latency and batching statistics of a batcher
+
+    Latency percentiles are taken over a sliding window of the most
+    recent requests so they follow the current load; counts and the
+    batch size histogram cover every request.
+    """
+
+    def __init__(self, window: int = 10000):
+        """Create empty metrics
+
+        Args:
+            window (int, optional): Number of recent request latencies the
+                percentiles are computed from. Defaults to 10000.
+        """
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self._lock = threading.Lock()
+        self._latencies_ns: deque[int] = deque(maxlen=window)
+        self._batch_sizes: Counter[int] = Counter()
+        self._requests = 0
+        self._errors = 0
+        self._start_ns = time.perf_counter_ns()
+
+    def record_batch(self, latencies_ns: list[int], failed: bool = False):
+        """Record one batch that completed
+
+        Args:
+            latencies_ns (list[int]): Latency of each of its requests
+            failed (bool, optional): The batch raised and its requests got
+                the error. Defaults to False.
+        """
+        with self._lock:
+            self._latencies_ns.extend(latencies_ns)
+            self._batch_sizes[len(latencies_ns)] += 1
+            self._requests += len(latencies_ns)
+            if failed:
+                self._errors += len(latencies_ns)
+
+    def snapshot(self) -> MetricsSnapshot:
+        """Current statistics
+
+        Returns:
+            MetricsSnapshot: Copy of the statistics, safe to keep
+        """
+        with self._lock:
+            latencies = sorted(self._latencies_ns)
+            sizes = dict(self._batch_sizes)
+            requests, errors = self._requests, self._errors
+            elapsed = (time.perf_counter_ns() - self._start_ns) / 1e9
+        batches = sum(sizes.values())
+        return MetricsSnapshot(
+            requests=requests,
+            batches=batches,
+            errors=errors,
+            latency_p50_ms=_percentile(latencies, 50) / 1e6,
+            latency_p99_ms=_percentile(latencies, 99) / 1e6,
+            throughput=requests / elapsed if elapsed > 0 else 0.0,
+            mean_batch_size=requests / batches if batches else 0.0,
+            batch_sizes=sizes,
+        )
+
+
+def _percentile(ordered: list[int], q: float) -> float:
+    # Nearest rank: the smallest value at least q% of the values are at
+    # or below
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return float(ordered[rank - 1])
@@ -0,0 +1,234 @@
+import json
+import math
+import os
+import socket
+import socketserver
+import stat
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from lml_python.core.dtype import DType
+from lml_python.core.interfaces import ITensor, TensorShape
+from lml_python.core.tensor import Tensor
+from lml_python.serving.batcher import DynamicBatcher
+
+# (host, port) for TCP, a filesystem path for a Unix socket
+type Address = tuple[str, int] | str
+
+# Largest request body accepted, in bytes
+MAX_BODY = 16 * 1024 * 1024
+
+
+class InferenceServer:
+    """Local HTTP front end of a DynamicBatcher
+
+    Every connection is handled by its own thread, which submits its
+    sample to the batcher and blocks until the batch it joined has run,
+    so concurrent clients are batched together.
+
+        POST /predict   {"input": [[...], ...]}  -> {"output": [...]}
+        GET  /metrics   latency percentiles, throughput, batch sizes
+        GET  /health    {"status": "ok"}
+
+    The input is one sample as a (nested) JSON list, without the batch
+    dimension. Listens on TCP for a (host, port) address and on a Unix
+    domain socket for a path.
+
+        with DynamicBatcher(model) as batcher, \\
+                InferenceServer(batcher, ("127.0.0.1", 8000)) as server:
+            server.serve_forever()
+    """
+
+    def __init__(self,
+                 batcher: DynamicBatcher,
+                 address: Address = ("127.0.0.1", 0),
+                 dtype: Optional[DType] = None,
+                 timeout: Optional[float] = 30.0):
+        """Bind the server, see `start` and `serve_forever`
+
+        Args:
+            batcher (DynamicBatcher): Running batcher requests go to
+            address (Address, optional): Where to listen, port 0 picks a
+                free port. A socket left at the path is replaced. Defaults
+                to ("127.0.0.1", 0).
+            dtype (Optional[DType], optional): Element type inputs are
+                built with. Defaults to DEFAULT_DTYPE.
+            timeout (Optional[float], optional): Seconds a request waits
+                for its result before failing. Defaults to 30.0.
+        """
+        self.batcher = batcher
+        self.dtype = dtype
+        self.timeout = timeout
+        handler = _handler(self)
+        if isinstance(address, str):
+            _remove_stale_socket(address)
+            self._server: socketserver.BaseServer = _UnixHTTPServer(
+                address, handler)
+        else:
+            self._server = ThreadingHTTPServer(address, handler)
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'InferenceServer':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def address(self) -> Address:
+        """Bound address, with the actual port for port 0"""
+        return self._server.server_address
+
+    def serve_forever(self):
+        """Handle requests on the calling thread until `close`"""
+        self._server.serve_forever()
+
+    def start(self):
+        """Handle requests on a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.serve_forever,
+                                            name="InferenceServer",
+                                            daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Stop serving and release the socket, the batcher is left running"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def predict(self, body: dict) -> dict:
+        """Handle the JSON body of a /predict request
+
+        Args:
+            body (dict): Request with the sample under "input"
+
+        Returns:
+            dict: Response with the model output under "output"
+        """
+        if not isinstance(body, dict) or "input" not in body:
+            raise ValueError('Expected a JSON object with an "input"')
+        x = _from_json(body["input"], self.dtype)
+        y = self.batcher.infer(x, self.timeout)
+        return {"output": _to_json(y)}
+
+
+def _remove_stale_socket(path: str):
+    # Only ever a socket, anything else at the path is a mistake
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket")
+    os.unlink(path)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn,
+                      socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _handler(server: InferenceServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._reply(200, server.batcher.metrics.snapshot().as_dict())
+            elif self.path == "/health":
+                status = "ok" if server.batcher.running else "stopped"
+                self._reply(200 if server.batcher.running else 503,
+                            {"status": status})
+            else:
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            if length > MAX_BODY:
+                self._reply(413, {"error": "Request body too large"})
+                return
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError as e:
+                self._reply(400, {"error": f"Invalid JSON: {e}"})
+                return
+            try:
+                self._reply(200, server.predict(body))
+            except (ValueError, TypeError) as e:
+                self._reply(400, {"error": str(e)})
+            except Exception as e:
+                self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def _reply(self, status: int, payload: dict):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def address_string(self) -> str:
+            # Unix socket peers have no (host, port)
+            if isinstance(self.client_address, tuple):
+                return str(self.client_address[0])
+            return "unix"
+
+        def log_message(self, format: str, *args):
+            pass
+
+    return Handler
+
+
+def _from_json(value: list | float, dtype: Optional[DType]) -> Tensor:
+    # Sample tensor of a JSON (nested) list or number
+    if isinstance(value, (int, float)):
+        return Tensor.with_list([value], (), dtype)
+    if not isinstance(value, list):
+        raise TypeError(f"Expected a list or number, got "
+                        f"{type(value).__name__}")
+    shape: list[int] = []
+    row = value
+    while isinstance(row, list):
+        shape.append(len(row))
+        row = row[0] if row else None
+    return Tensor.with_list(value, tuple(shape), dtype)
+
+
+def _to_json(t: ITensor | float) -> list | float:
+    if not isinstance(t, ITensor):
+        return t
+    t = t.contiguous()
+    n = math.prod(t.shape)
+    return _nest(t.data[t.offset:t.offset + n].tolist(), t.shape)
+
+
+def _nest(values: list, shape: TensorShape) -> list | float:
+    if not shape:
+        return values[0]
+    for dim in reversed(shape[1:]):
+        values = [values[i:i + dim] for i in range(0, len(values), dim)]
+    return values
+
+
+def connect_unix(path: str) -> socket.socket:
+    """Socket connected to a server listening on a Unix socket
+
+    e.g. for `http.client.HTTPConnection.sock`.
+
+    Args:
+        path (str): Socket path the server was bound to
+
+    Returns:
+        socket.socket: Connected socket
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path)
+    return sock
@@ -0,0 +1,41 @@
+import json
+from lml_python.benchmarks.suite import compare, default_cases, main, run
+
+
+def _results(**best):
+    return {"results": {name: {"best": seconds, "median": seconds,
+                               "number": 1}
+                        for name, seconds in best.items()}}
+
+
+def test_compare_flags_only_regressions_past_threshold():
+    baseline = _results(a=1.0, b=1.0, c=1.0)
+    current = _results(a=1.2, b=1.3, c=0.5, new=9.0)
+    assert compare(current, baseline, threshold=0.25) == [("b", 1.3)]
+    assert [name for name, _ in compare(current, baseline, 0.1)] \
+        == ["a", "b"]
+
+
+def test_every_case_runs():
+    cases = default_cases(quick=True)
+    assert any(name.startswith("linear_forward/") for name in cases)
+    results = run(cases, repeats=1, min_time=0.0)
+    assert set(results["results"]) == set(cases)
+    for result in results["results"].values():
+        assert result["best"] <= result["median"]
+
+
+def test_main_writes_json_and_fails_on_regression(tmp_path, capsys):
+    output = tmp_path / "results.json"
+    args = ["--quick", "--filter", "dot/", "--repeats", "1",
+            "--min-time", "0"]
+    assert main(args + ["--output", str(output)]) == 0
+    results = json.loads(output.read_text())
+    assert list(results["results"]) == ["dot/64"]
+
+    # A baseline far faster than anything achievable must fail the run
+    results["results"]["dot/64"]["best"] = 1e-12
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(results))
+    assert main(args + ["--baseline", str(baseline)]) == 1
+    assert "REGRESSION dot/64" in capsys.readouterr().out
@@ -0,0 +1,273 @@
+import math
+import weakref
+import pytest
+from lml_python.core.autograd import no_grad, enable_grad, sum_to_shape
+from lml_python.core.dtype import DType
+from lml_python.core.layer import Linear, ReLU
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import (
+    cross_entropy,
+    exp,
+    fused,
+    hadamard,
+    linear,
+    log,
+    log_softmax,
+    matadd,
+    matdiv,
+    matmul,
+    matsub,
+    relu,
+    sigmoid,
+    softmax,
+    sqrt,
+    tanh,
+    tdot,
+    tmax,
+    tmean,
+    tmin,
+    tsum,
+)
+from lml_python.core.einsum import einsum
+
+
+def _param(shape, low=-1.0, high=1.0):
+    t = Tensor.with_uniform(shape, (low, high))
+    t.requires_grad = True
+    return t
+
+
+def _numeric_grad(fn, t, eps=1e-6):
+    # Central differences, one element at a time
+    grad = []
+    for i in range(len(t.data)):
+        old = t.data[i]
+        t.data[i] = old + eps
+        with no_grad():
+            up = fn()[()]
+        t.data[i] = old - eps
+        with no_grad():
+            down = fn()[()]
+        t.data[i] = old
+        grad.append((up - down) / (2 * eps))
+    return grad
+
+
+def _check_grads(fn, *params):
+    fn().backward()
+    for p in params:
+        assert p.grad.shape == p.shape
+        assert p.grad.data.tolist() == pytest.approx(_numeric_grad(fn, p),
+                                                     abs=1e-5)
+
+
+GRAD_CASES = [
+    ("matmul", [(3, 4), (4, 2)], lambda a, b: tsum(matmul(a, b))),
+    ("add_broadcast", [(3, 4), (4,)], lambda a, b: tsum(tanh(a + b))),
+    ("sub", [(2, 3), (2, 3)], lambda a, b: tsum(sigmoid(a - b))),
+    ("mul", [(2, 3), (3,)], lambda a, b: tsum(a * b)),
+    ("div", [(2, 3), (2, 1)], lambda a, b: tsum(matdiv(a, b + 3))),
+    ("relu", [(3, 3)], lambda a: tsum(relu(a) * a)),
+    ("mean", [(4, 2)], lambda a: tmean(hadamard(a, a))),
+    ("sqrt", [(2, 3)], lambda a: tsum(sqrt(fused(a, ("mul", a), ("add", 1))))),
+    ("fused", [(2, 3), (3,)],
+     lambda a, b: tsum(fused(a, ("mul", b), ("add", 1.0), "tanh"))),
+    ("linear", [(3, 4), (4, 2), (2,)],
+     lambda x, w, b: tsum(linear(x, w, b, "sigmoid"))),
+    ("transpose", [(3, 2), (3, 2)],
+     lambda a, b: tsum(matmul(a.T, b))),
+    ("slice", [(4, 3)], lambda a: tsum(tanh(a[1:3, ::2]))),
+    ("reshape_expand", [(2, 3), (1, 3)],
+     lambda a, b: tsum(a.reshape((3, 2)).T * b.expand((2, 3)))),
+    ("reused", [(2, 2)], lambda a: tsum(matmul(a, a) + a)),
+    ("batched_matmul", [(2, 3, 4), (4, 2)],
+     lambda a, b: tsum(tanh(matmul(a, b)))),
+    ("tdot", [(2, 3, 4), (4, 3)],
+     lambda a, b: tsum(tanh(tdot(a, b, ([1, 2], [1, 0]))))),
+    ("einsum", [(3, 3, 2), (2, 4), (4,)],
+     lambda a, b, c: tsum(tanh(einsum("iij,jk,k->i", a, b, c)))),
+    ("take", [(3, 4)], lambda a: tsum(tanh(a.take([5, 0, 5, -1])))),
+    ("take_axis", [(4, 3)],
+     lambda a: tsum(tanh(a.take([2, 0, 2, 3], axis=0)))),
+    ("gather", [(3, 4)],
+     lambda a: tsum(tanh(a.gather(1, Tensor.with_list(
+         [[1, 1], [3, 0], [0, 2]], (3, 2), DType.INT32))))),
+    ("exp_log", [(2, 3)],
+     lambda a: tsum(log(fused(exp(a), ("add", 1))) * a)),
+    ("sum_axis", [(3, 4)], lambda a: tsum(tanh(tsum(a, axis=1)))),
+    ("sum_keepdims", [(3, 4)],
+     lambda a: tsum(tanh(a * tsum(a, axis=0, keepdims=True)))),
+    ("mean_axes", [(2, 3, 4)],
+     lambda a: tsum(tanh(tmean(a.T, axis=(0, 2))))),
+    ("max_axis", [(3, 4)], lambda a: tsum(tanh(tmax(a, axis=0)))),
+    ("min_all", [(2, 3)], lambda a: tmin(a * a)),
+    ("softmax", [(3, 4), (3, 4)], lambda a, b: tsum(softmax(a) * b)),
+    ("softmax_axis0", [(3, 4), (3, 4)],
+     lambda a, b: tsum(softmax(a, axis=0) * b)),
+    ("log_softmax", [(2, 5), (2, 5)], lambda a, b: tsum(log_softmax(a) * b)),
+    ("cross_entropy", [(4, 3)],
+     lambda a: cross_entropy(a, [2, 0, 1, 2])),
+    ("cross_entropy_sum", [(3, 5)],
+     lambda a: cross_entropy(tanh(a), [4, 4, 0], reduction="sum")),
+    ("cross_entropy_none", [(3, 2), (3,)],
+     lambda a, w: tsum(cross_entropy(a, [1, 0, 1], reduction="none") * w)),
+]
+
+
+@pytest.mark.parametrize("fn,shapes", [(fn, shapes)
+                                       for _, shapes, fn in GRAD_CASES],
+                         ids=[name for name, _, _ in GRAD_CASES])
+def test_gradients_match_finite_differences(fn, shapes):
+    params = [_param(shape) for shape in shapes]
+    _check_grads(lambda: fn(*params), *params)
+
+
+def test_constant_operands_get_no_gradient():
+    a = _param((2, 2))
+    b = Tensor.with_uniform((2, 2), (-1.0, 1.0))
+    tsum(a * b).backward()
+    assert a.grad.data.tolist() == pytest.approx(b.data.tolist())
+    assert b.grad is None
+
+
+def test_gradients_accumulate_in_place():
+    a = _param((2, 2))
+    tsum(a * 2).backward()
+    buffer = a.grad
+    tsum(a * 3).backward()
+    assert a.grad is buffer
+    assert a.grad.data.tolist() == [5.0] * 4
+
+
+def test_no_grad_skips_recording():
+    a = _param((2, 2))
+    with no_grad():
+        b = tanh(a * 2)
+        assert b.grad_fn is None
+        assert not b.requires_grad
+        with enable_grad():
+            assert (a * 2).grad_fn is not None
+    assert (a * 2).grad_fn.name == "mul"
+
+
+def test_backward_frees_saved_tensors():
+    x = _param((4, 3))
+    w = _param((3, 2))
+    h = relu(matmul(x, w))
+    storage = weakref.ref(h.data)
+    loss = tsum(h)
+    del h
+    # Saved by the relu node for its backward
+    assert storage() is not None
+    loss.backward()
+    assert storage() is None
+
+    with pytest.raises(RuntimeError):
+        loss.backward()
+
+
+def test_retain_graph():
+    a = _param((3,))
+    loss = tsum(tanh(a))
+    loss.backward(retain_graph=True)
+    first = a.grad.data.tolist()
+    loss.backward()
+    assert a.grad.data.tolist() == pytest.approx([2 * g for g in first])
+
+
+def test_backward_errors():
+    with pytest.raises(TypeError):
+        Tensor.with_list([1, 2], (2,), DType.INT32).requires_grad = True
+
+    a = _param((2, 2))
+    with pytest.raises(RuntimeError):
+        (a * 2).backward()
+    with pytest.raises(RuntimeError):
+        Tensor.with_zeros((1,)).backward()
+    with pytest.raises(RuntimeError):
+        matadd(a, 1, out=Tensor.with_zeros((2, 2)))
+
+
+def test_explicit_output_gradient():
+    a = _param((2, 2))
+    g = Tensor.with_list([1.0, 2.0, 3.0, 4.0], (2, 2))
+    (a * 3).backward(g)
+    assert a.grad.data.tolist() == [3.0, 6.0, 9.0, 12.0]
+
+
+def test_sum_to_shape():
+    g = Tensor.with_list(list(range(12)), (2, 3, 2))
+    assert sum_to_shape(g, (3, 2)).data.tolist() == [6, 8, 10, 12, 14, 16]
+    assert sum_to_shape(g, (2, 1, 1)).data.tolist() == [15, 51]
+    assert sum_to_shape(g, (1, 3, 1)).data.tolist() == [14, 22, 30]
+    assert sum_to_shape(g, ()).data.tolist() == [66]
+
+
+def test_reductions():
+    a = Tensor.with_list([[1.0, 2.0], [3.0, 4.0]], (2, 2))
+    assert tsum(a).shape == ()
+    assert tsum(a)[()] == 10.0
+    assert tmean(a)[()] == 2.5
+    assert tmean(Tensor.with_list([1, 2], (2,), DType.INT32)).dtype \
+        == DType.FLOAT64
+    # fsum keeps the result exact where a naive sum would not
+    big = Tensor.with_list([1e16, 1.0, -1e16], (3,))
+    assert tsum(big)[()] == 1.0
+
+
+def test_linear_layer_backward_matches_autograd():
+    layer = Linear(3, 2, activation="tanh")
+    x = Tensor.with_uniform((4, 3), (-1.0, 1.0))
+
+    tsum(layer.forward(x)).backward()
+    w_grad = layer._weights.grad.data.tolist()
+    b_grad = layer._bias.grad.data.tolist()
+    for param in layer.parameters():
+        param.grad = None
+
+    y = layer.forward(x)
+    dx = layer.backward(Tensor.with_list([1.0] * 8, (4, 2)))
+    assert dx.shape == (4, 3)
+    assert layer._weights.grad.data.tolist() == pytest.approx(w_grad)
+    assert layer._bias.grad.data.tolist() == pytest.approx(b_grad)
+
+    weights = layer._weights.data.tolist()
+    layer.update(0.5)
+    assert layer._weights.data.tolist() == pytest.approx(
+        [w - 0.5 * g for w, g in zip(weights, w_grad)])
+    assert layer._weights.grad.data.tolist() == [0.0] * 6
+    assert y.shape == (4, 2)
+
+
+def test_layers_cache_nothing_under_no_grad():
+    layer = Linear(3, 2)
+    x = Tensor.with_uniform((4, 3), (-1.0, 1.0))
+    with no_grad():
+        y = layer.forward(x)
+    assert y.grad_fn is None
+    with pytest.raises(RuntimeError):
+        layer.backward(y)
+
+
+def test_relu_layer_backward():
+    layer = ReLU()
+    layer.forward(Tensor.with_list([-1.0, 2.0, 0.0, 3.0], (2, 2)))
+    g = Tensor.with_list([5.0, 6.0, 7.0, 8.0], (2, 2))
+    assert layer.backward(g).data.tolist() == [0.0, 6.0, 0.0, 8.0]
+
+
+def test_training_loop_reduces_loss():
+    layer = Linear(2, 1)
+    x = Tensor.with_list([[0.0, 1.0], [1.0, 0.0], [1.0, 1.0]], (3, 2))
+    target = Tensor.with_list([[1.0], [-1.0], [0.0]], (3, 1))
+
+    def loss():
+        diff = matsub(layer.forward(x), target)
+        return tmean(diff * diff)
+
+    first = loss()[()]
+    for _ in range(50):
+        loss().backward()
+        layer.update(0.1)
+    assert loss()[()] < first
+    assert math.isfinite(loss()[()])
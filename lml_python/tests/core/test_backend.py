@@ -0,0 +1,228 @@
+import os
+import pytest
+import random
+import subprocess
+import sys
+from lml_python.core.backend import (
+    ENV_VAR,
+    available_backends,
+    get_backend,
+    load_backend,
+    register_backend,
+    set_backend,
+    use_backend,
+)
+from lml_python.core.dtype import DType
+from lml_python.core.parallel import ParallelBackend
+from lml_python.core.python_backend import PythonBackend
+from lml_python.core.sparse import SparseTensor
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import (
+    argmax,
+    cross_entropy,
+    log_softmax,
+    softmax,
+    tmax,
+    tmean,
+    tmin,
+    tsum,
+    matmul,
+    matadd,
+    matsub,
+    hadamard,
+    matdiv,
+    relu,
+    tanh,
+    sigmoid,
+    sqrt,
+    fused,
+    linear,
+    tdot,
+)
+from lml_python.core.einsum import einsum
+from lml_python.core.vmath import dot
+
+
+def _tensor(shape, dtype=DType.FLOAT64, seed=0):
+    rng = random.Random(seed)
+    n = 1
+    for dim in shape:
+        n *= dim
+    if dtype.is_floating:
+        values = [rng.uniform(-2.0, 2.0) for _ in range(n)]
+    else:
+        values = [rng.randint(-5, 5) for _ in range(n)]
+    return Tensor.with_list(values, shape, dtype)
+
+
+# Every dispatched op, as (id, callable producing a tensor or scalar).
+# Each entry is run against every backend and compared to the reference.
+PARITY_OPS = [
+    ("matmul_2x3x4", lambda: matmul(_tensor((2, 3)), _tensor((3, 4), seed=1))),
+    ("matmul_17x9x5_f32", lambda: matmul(_tensor((17, 9), DType.FLOAT32),
+                                         _tensor((9, 5), DType.FLOAT32, 1))),
+    ("matmul_int32", lambda: matmul(_tensor((4, 4), DType.INT32),
+                                    _tensor((4, 3), DType.INT32, 1))),
+    ("matmul_int8_into_int32", lambda: matmul(
+        Tensor.with_list([100, -90, 120, 127] * 3, (3, 4), DType.INT8),
+        Tensor.with_list([127, 110, -100, 90] * 2, (4, 2), DType.INT8),
+        Tensor.empty((3, 2), DType.INT32))),
+    ("matmul_unpacked", lambda: matmul(_tensor((3, 3)),
+                                       _tensor((3, 3), seed=1),
+                                       pack_b=False)),
+    ("matmul_transposed", lambda: matmul(_tensor((3, 2)).T,
+                                         _tensor((4, 3), seed=1).T)),
+    ("matmul_sliced_out", lambda: matmul(_tensor((2, 3)),
+                                         _tensor((3, 2), seed=1),
+                                         Tensor.with_zeros((4, 4))[1:3, ::2])),
+    ("matmul_expanded", lambda: matmul(_tensor((1, 3)).expand((4, 3)),
+                                       _tensor((3, 2), seed=1))),
+    ("matmul_batched", lambda: matmul(_tensor((3, 2, 4)),
+                                      _tensor((3, 4, 5), seed=1))),
+    ("matmul_batched_broadcast", lambda: matmul(
+        _tensor((2, 1, 3, 4)), _tensor((5, 2, 4), seed=1).transpose())),
+    ("matmul_shared_rhs", lambda: matmul(_tensor((4, 3, 2)),
+                                         _tensor((2, 5), seed=1))),
+    ("spmm", lambda: matmul(SparseTensor.from_dense(
+        relu(_tensor((6, 5)))), _tensor((5, 3), seed=1))),
+    ("spmm_dense_left", lambda: matmul(_tensor((2, 6)), SparseTensor.from_dense(
+        relu(_tensor((6, 4), seed=1))))),
+    ("tdot", lambda: tdot(_tensor((3, 4, 5)), _tensor((5, 4, 2), seed=1),
+                          ([1, 2], [1, 0]))),
+    ("einsum_chain", lambda: einsum("ij,jk,kl->li", _tensor((2, 3)),
+                                    _tensor((3, 4), seed=1),
+                                    _tensor((4, 2), seed=2))),
+    ("matadd_2d", lambda: matadd(_tensor((3, 4)), _tensor((3, 4), seed=1))),
+    ("matadd_f32", lambda: matadd(_tensor((5,), DType.FLOAT32),
+                                  _tensor((5,), DType.FLOAT32, 1))),
+    ("matadd_views", lambda: matadd(_tensor((4, 3)).T,
+                                    _tensor((6, 4), seed=1)[::2])),
+    ("matadd_broadcast", lambda: matadd(_tensor((4, 1, 3)),
+                                        _tensor((2, 1), seed=1))),
+    ("matadd_scalar", lambda: matadd(2.5, _tensor((3, 2)))),
+    ("matsub_broadcast", lambda: matsub(_tensor((5, 3)), _tensor((3,), seed=1))),
+    ("hadamard_int32", lambda: hadamard(_tensor((3, 4), DType.INT32),
+                                        _tensor((4,), DType.INT32, 1))),
+    ("matdiv_int32", lambda: matdiv(_tensor((3, 4), DType.INT32),
+                                    _tensor((1, 4), DType.INT32, 1) * 0 + 3)),
+    ("matdiv_scalar", lambda: matdiv(_tensor((2, 2)).T, 4.0)),
+    ("relu", lambda: relu(_tensor((4, 5)))),
+    ("tanh_int32", lambda: tanh(_tensor((6,), DType.INT32))),
+    ("sigmoid_view", lambda: sigmoid(_tensor((3, 4)).T)),
+    ("sqrt", lambda: sqrt(hadamard(_tensor((3, 4)), _tensor((3, 4))))),
+    ("fused_chain", lambda: fused(_tensor((3, 4)),
+                                  ("mul", _tensor((4,), seed=1)),
+                                  ("add", 0.5), "relu", ("div", 2.0))),
+    ("fused_empty", lambda: fused(_tensor((2, 3)).T)),
+    ("linear", lambda: linear(_tensor((5, 3)), _tensor((3, 4), seed=1),
+                              _tensor((4,), seed=2))),
+    ("linear_relu", lambda: linear(_tensor((5, 3)), _tensor((4, 3), seed=1).T,
+                                   _tensor((4,), seed=2), "relu")),
+    ("tsum_all_f32", lambda: tsum(_tensor((7, 5), DType.FLOAT32))),
+    ("tsum_axis_view", lambda: tsum(_tensor((4, 6)).T[::2], axis=1)),
+    ("tsum_int32_axes", lambda: tsum(_tensor((2, 3, 4), DType.INT32),
+                                     axis=(0, 2), keepdims=True)),
+    ("tmean_axis", lambda: tmean(_tensor((3, 5)), axis=0)),
+    ("tmax_axis", lambda: tmax(_tensor((4, 3)), axis=-1)),
+    ("tmin_int32", lambda: tmin(_tensor((5, 2), DType.INT32), axis=0)),
+    ("argmax_axis", lambda: argmax(_tensor((3, 7)), axis=1)),
+    ("argmax_flat_view", lambda: argmax(_tensor((4, 5)).T)),
+    ("softmax", lambda: softmax(_tensor((3, 6)))),
+    ("softmax_axis0_f32", lambda: softmax(_tensor((4, 3), DType.FLOAT32),
+                                          axis=0)),
+    ("log_softmax_view", lambda: log_softmax(_tensor((5, 4)).T)),
+    ("cross_entropy", lambda: cross_entropy(_tensor((4, 3)), [0, 2, 1, 1])),
+    ("dot_list", lambda: dot([1.5, 2.5, -3.0], [3.5, 4.5, 2.0])),
+    ("dot_storage", lambda: dot(_tensor((8,)).data, _tensor((8,), seed=1).data)),
+]
+
+
+# Splits every op, however small, across two workers
+register_backend("parallel_eager", lambda: ParallelBackend(
+    workers=2, min_flops=1, min_elements=1))
+
+
+@pytest.fixture(params=["python", "numpy", "parallel_eager"])
+def backend_name(request):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    return request.param
+
+
+def _assert_close(result, expected):
+    if isinstance(expected, Tensor):
+        assert result.shape == expected.shape
+        assert result.dtype == expected.dtype
+        assert result._values().tolist() == pytest.approx(
+            expected._values().tolist(), rel=1e-6)
+    else:
+        assert result == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize("op", [op for _, op in PARITY_OPS],
+                         ids=[name for name, _ in PARITY_OPS])
+def test_backend_parity(backend_name, op):
+    with use_backend("python"):
+        expected = op()
+    with use_backend(backend_name) as active:
+        assert get_backend() is active
+        result = op()
+    _assert_close(result, expected)
+
+
+def test_numpy_backend_is_zero_copy():
+    pytest.importorskip("numpy")
+    from lml_python.core.numpy_backend import as_ndarray
+
+    t = _tensor((2, 3))
+    view = as_ndarray(t)
+    assert view.shape == (2, 3)
+    view[1, 2] = 42.0
+    assert t[1, 2] == 42.0
+
+
+def test_default_backend_is_python():
+    assert isinstance(get_backend(), PythonBackend)
+    assert get_backend().name == "python"
+
+
+def test_use_backend_nests_and_restores():
+    register_backend("other", lambda: PythonBackend())
+    with use_backend("other") as outer:
+        assert get_backend() is outer
+        with use_backend("python") as inner:
+            assert get_backend() is inner
+        assert get_backend() is outer
+    assert get_backend() is load_backend("python")
+
+
+def test_set_backend_is_process_wide():
+    register_backend("process", lambda: PythonBackend())
+    try:
+        set_backend("process")
+        assert get_backend() is load_backend("process")
+        with use_backend("python"):
+            assert get_backend() is load_backend("python")
+    finally:
+        set_backend(None)
+    assert get_backend() is load_backend("python")
+
+
+def test_env_var_selects_backend():
+    # The variable is read at import time so check it in a fresh process
+    code = ("from lml_python.core.backend import get_backend; "
+            "print(get_backend().name)")
+    env = dict(os.environ, **{ENV_VAR: "numpy"})
+    pytest.importorskip("numpy")
+    result = subprocess.run([sys.executable, "-c", code], env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "numpy"
+
+
+def test_unknown_backend():
+    assert "python" in available_backends()
+    with pytest.raises(ValueError):
+        set_backend("does-not-exist")
+    with pytest.raises(ValueError):
+        with use_backend("does-not-exist"):
+            pass
@@ -0,0 +1,128 @@
+import math
+import pytest
+from lml_python.core.checkpoint import (
+    Checkpoint,
+    activation_bytes,
+    measure_peak_bytes,
+    peak_activation_bytes,
+    plan_checkpoints,
+)
+from lml_python.core.layer import Linear, ReLU, Sequential
+from lml_python.core.rng import Generator
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import tsum
+
+
+def _values(t):
+    t = t.contiguous()
+    return t.data[t.offset:t.offset + math.prod(t.shape)].tolist()
+
+
+def _deep(gen, depth=8, width=16):
+    layers = []
+    for _ in range(depth):
+        layers += [Linear(width, width, "tanh", generator=gen)]
+    return Sequential(*layers)
+
+
+def _grads(model):
+    grads = [g for p in model.parameters() for g in _values(p.grad)]
+    for p in model.parameters():
+        p.grad = None
+    return grads
+
+
+def test_checkpoint_matches_plain_backward():
+    gen = Generator(0)
+    model = _deep(gen)
+    x = Tensor.with_uniform((4, 16), (-1.0, 1.0), generator=gen)
+    y = model.forward(x)
+    dx = model.backward(y)
+    expected = _grads(model)
+
+    layers = model.layers
+    checkpointed = Sequential(Checkpoint(*layers[:3]),
+                              Checkpoint(*layers[3:6]), *layers[6:])
+    y2 = checkpointed.forward(x)
+    assert y2 == y
+    # Nothing of the segments is cached until backward recomputes it
+    assert all(layer._input is None for layer in layers[:6])
+    assert checkpointed.backward(y2) == dx
+    assert _grads(model) == pytest.approx(expected)
+    with pytest.raises(RuntimeError):
+        checkpointed.layers[0].backward(y2)
+
+
+def test_checkpoint_with_autograd():
+    gen = Generator(1)
+    model = _deep(gen, depth=4)
+    x = Tensor.with_uniform((3, 16), (-1.0, 1.0), generator=gen)
+    x.requires_grad = True
+    tsum(model.forward(x)).backward()
+    expected, expected_dx = _grads(model), _values(x.grad)
+    x.grad = None
+
+    checkpointed = Sequential(Checkpoint(*model.layers[:2]),
+                              Checkpoint(*model.layers[2:]))
+    tsum(checkpointed.forward(x)).backward()
+    assert _values(x.grad) == pytest.approx(expected_dx)
+    assert _grads(model) == pytest.approx(expected)
+
+
+def test_checkpoint_update_and_parameters():
+    segment = Checkpoint(Linear(2, 3), ReLU(), Linear(3, 1))
+    assert len(segment.parameters()) == 4
+    y = segment.forward(Tensor.with_list([[1.0, 2.0]], (1, 2)))
+    segment.backward(Tensor.full(y.shape, 1.0))
+    segment.update(0.1)
+    assert all(_values(p.grad) == [0.0] * len(p.grad.data)
+               for p in segment.parameters())
+
+
+def test_peak_activation_bytes():
+    sizes = [10, 20, 20, 20, 20, 5]
+    assert peak_activation_bytes(sizes) == 95
+    # Segment [0, 3) keeps 20 bytes until its backward, which recomputes
+    # all 60 on top of the input
+    assert peak_activation_bytes(sizes, [(0, 3)]) == 10 + 60
+    assert peak_activation_bytes(sizes, [(1, 4)]) == 10 + 20 + 60
+    assert peak_activation_bytes(sizes, [(0, 2), (2, 4)]) == 10 + 20 + 40
+
+
+def test_plan_checkpoints_fits_budget():
+    gen = Generator(2)
+    model = _deep(gen, depth=16, width=8)
+    sizes = activation_bytes(model, (32, 8))
+    assert sizes == [32 * 8 * 8] * 17
+
+    unbounded = plan_checkpoints(model, (32, 8), 10 ** 9)
+    assert unbounded.segments == () and unbounded.recomputed_layers == 0
+    assert unbounded.peak_bytes == unbounded.baseline_bytes == 17 * 2048
+
+    plan = plan_checkpoints(model, (32, 8), 10 * 2048)
+    assert plan.peak_bytes <= 10 * 2048 < plan.baseline_bytes
+    assert plan.peak_bytes == peak_activation_bytes(sizes, plan.segments)
+    assert "MB with" in plan.summary()
+
+    # The plan applied trains like the original model
+    x = Tensor.with_uniform((32, 8), (-1.0, 1.0), generator=gen)
+    dx = model.backward(model.forward(x))
+    expected = _grads(model)
+    applied = plan.apply(model)
+    assert sum(isinstance(layer, Checkpoint)
+               for layer in applied.layers) == len(plan.segments)
+    assert applied.backward(applied.forward(x)) == dx
+    assert _grads(model) == pytest.approx(expected)
+
+    with pytest.raises(ValueError):
+        plan_checkpoints(model, (32, 8), 2048)
+
+
+def test_measured_peak_drops_with_checkpoints():
+    gen = Generator(3)
+    model = _deep(gen, depth=16, width=32)
+    x = Tensor.with_uniform((64, 32), (-1.0, 1.0), generator=gen)
+    plan = plan_checkpoints(model, (64, 32), 9 * 64 * 32 * 8)
+    baseline = measure_peak_bytes(model, x)
+    checkpointed = measure_peak_bytes(plan.apply(model), x)
+    assert checkpointed < 0.75 * baseline
@@ -0,0 +1,264 @@
+import itertools
+import math
+import pytest
+from lml_python.core.autograd import no_grad
+from lml_python.core.conv import (
+    Window,
+    avg_pool2d,
+    conv2d,
+    im2col,
+    max_pool2d,
+)
+from lml_python.core.layer import (
+    AvgPool2d,
+    Conv2d,
+    Flatten,
+    Linear,
+    MaxPool2d,
+    ReLU,
+    Sequential,
+)
+from lml_python.core.profiler import profile
+from lml_python.core.rng import Generator
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import tsum
+
+
+def _values(t):
+    t = t.contiguous()
+    return t.data[t.offset:t.offset + math.prod(t.shape)].tolist()
+
+
+def _direct_conv(x, w, b, stride, padding, dilation):
+    # Nested loop reference over plain lists
+    n, c, h, wd = x.shape
+    o, _, kh, kw = w.shape
+    xs, ws = _values(x), _values(w)
+    oh = (h + 2 * padding - dilation * (kh - 1) - 1) // stride + 1
+    ow = (wd + 2 * padding - dilation * (kw - 1) - 1) // stride + 1
+    out = []
+    for s, f, y, z in itertools.product(range(n), range(o), range(oh),
+                                        range(ow)):
+        acc = b[f] if b is not None else 0.0
+        for ch, i, j in itertools.product(range(c), range(kh), range(kw)):
+            r = y * stride - padding + i * dilation
+            q = z * stride - padding + j * dilation
+            if 0 <= r < h and 0 <= q < wd:
+                acc += (xs[((s * c + ch) * h + r) * wd + q]
+                        * ws[((f * c + ch) * kh + i) * kw + j])
+        out.append(acc)
+    return out, (n, o, oh, ow)
+
+
+def test_window_output_size():
+    window = Window.of(3, stride=2, padding=1)
+    assert window.kernel == (3, 3) and window.stride == (2, 2)
+    assert window.output_size(7, 8) == (4, 4)
+    assert Window.of((3, 1), dilation=(2, 1)).output_size(5, 5) == (1, 5)
+    with pytest.raises(ValueError):
+        Window.of(5).output_size(3, 3)
+    with pytest.raises(ValueError):
+        Window.of(3, stride=0)
+
+
+def test_im2col_is_a_view():
+    x = Tensor.arange(0, 16).reshape((1, 1, 4, 4))
+    cols = im2col(x, Window.of(2))
+    assert cols.shape == (1, 1, 2, 2, 3, 3)
+    assert cols.data is x.data
+    # Tap (1, 0) of the window at output (2, 1)
+    assert cols[0, 0, 1, 0, 2, 1] == 13
+
+
+@pytest.mark.parametrize("stride, padding, dilation",
+                         [(1, 0, 1), (2, 1, 1), (1, 2, 2), (3, 1, 1)])
+def test_conv2d_matches_direct_loop(stride, padding, dilation):
+    gen = Generator(0)
+    x = Tensor.with_uniform((2, 3, 7, 6), (-1.0, 1.0), generator=gen)
+    w = Tensor.with_uniform((4, 3, 3, 2), (-1.0, 1.0), generator=gen)
+    b = Tensor.with_uniform((4,), (-1.0, 1.0), generator=gen)
+
+    y = conv2d(x, w, b, stride, padding, dilation)
+    expected, shape = _direct_conv(x, w, _values(b), stride, padding,
+                                   dilation)
+    assert y.shape == shape
+    assert _values(y) == pytest.approx(expected)
+
+
+def test_conv2d_activation_and_out():
+    gen = Generator(1)
+    x = Tensor.with_uniform((1, 2, 4, 4), (-1.0, 1.0), generator=gen)
+    w = Tensor.with_uniform((3, 2, 3, 3), (-1.0, 1.0), generator=gen)
+    expected, shape = _direct_conv(x, w, None, 1, 1, 1)
+    out = Tensor.with_zeros(shape)
+    y = conv2d(x, w, padding=1, activation="relu", out=out)
+    assert y is out
+    assert _values(y) == pytest.approx([max(v, 0.0) for v in expected])
+
+
+def test_conv2d_validates_shapes():
+    x = Tensor.with_zeros((1, 2, 4, 4))
+    with pytest.raises(ValueError):
+        conv2d(x, Tensor.with_zeros((3, 1, 3, 3)))
+    with pytest.raises(ValueError):
+        conv2d(x, Tensor.with_zeros((3, 2, 3, 3)), Tensor.with_zeros((2,)))
+    with pytest.raises(ValueError):
+        conv2d(Tensor.with_zeros((2, 4, 4)), Tensor.with_zeros((3, 2, 3, 3)))
+
+
+def _numeric_grad(f, t, eps=1e-6):
+    # Central differences of the scalar f() w.r.t. every element of t
+    grads = []
+    for i in range(len(t.data)):
+        v = t.data[i]
+        t.data[i] = v + eps
+        high = f()
+        t.data[i] = v - eps
+        low = f()
+        t.data[i] = v
+        grads.append((high - low) / (2 * eps))
+    return grads
+
+
+@pytest.mark.parametrize("stride, padding, dilation",
+                         [(1, 0, 1), (2, 1, 1), (1, 1, 2)])
+def test_conv2d_gradients(stride, padding, dilation):
+    gen = Generator(2)
+    x = Tensor.with_uniform((2, 2, 5, 5), (-1.0, 1.0), generator=gen)
+    w = Tensor.with_uniform((3, 2, 2, 3), (-1.0, 1.0), generator=gen)
+    b = Tensor.with_uniform((3,), (-1.0, 1.0), generator=gen)
+    for t in (x, w, b):
+        t.requires_grad = True
+
+    def loss():
+        with no_grad():
+            y = conv2d(x, w, b, stride, padding, dilation, "tanh")
+            return tsum(y * y)[()]
+
+    y = conv2d(x, w, b, stride, padding, dilation, "tanh")
+    tsum(y * y).backward()
+    for t in (x, w, b):
+        assert _values(t.grad) == pytest.approx(_numeric_grad(loss, t),
+                                                abs=1e-6)
+
+
+def test_max_pool2d():
+    x = Tensor.with_list([[[[1.0, 5.0, 2.0, 0.0],
+                            [3.0, 4.0, 8.0, 1.0],
+                            [0.0, 2.0, 6.0, 7.0],
+                            [9.0, 1.0, 3.0, 2.0]]]], (1, 1, 4, 4))
+    assert _values(max_pool2d(x, 2)) == [5.0, 8.0, 9.0, 7.0]
+    assert max_pool2d(x, 3, 1).shape == (1, 1, 2, 2)
+    # Padding is never the maximum, even of negative inputs
+    neg = Tensor.full((1, 1, 2, 2), -3.0)
+    assert _values(max_pool2d(neg, 2, padding=1)) == [-3.0] * 4
+
+    y, positions = max_pool2d(x, 2, return_indices=True)
+    assert _values(positions) == [1, 2, 2, 1]
+
+    x.requires_grad = True
+    tsum(max_pool2d(x, 2)).backward()
+    assert _values(x.grad) == [0.0, 1.0, 0.0, 0.0,
+                               0.0, 0.0, 1.0, 0.0,
+                               0.0, 0.0, 0.0, 1.0,
+                               1.0, 0.0, 0.0, 0.0]
+
+
+def test_max_pool2d_overlapping_windows_accumulate():
+    x = Tensor.with_list([[[[0.0, 0.0, 0.0],
+                            [0.0, 9.0, 0.0],
+                            [0.0, 0.0, 0.0]]]], (1, 1, 3, 3))
+    x.requires_grad = True
+    tsum(max_pool2d(x, 2, 1)).backward()
+    assert _values(x.grad)[4] == 4.0
+
+
+def test_avg_pool2d_gradients():
+    gen = Generator(3)
+    x = Tensor.with_uniform((2, 2, 5, 5), (-1.0, 1.0), generator=gen)
+    y = avg_pool2d(x, 2, 1, 1)
+    assert y.shape == (2, 2, 6, 6)
+    assert _values(avg_pool2d(x, 5)) == pytest.approx(
+        [sum(_values(x[i, c])) / 25 for i in range(2) for c in range(2)])
+
+    x.requires_grad = True
+
+    def loss():
+        with no_grad():
+            y = avg_pool2d(x, 3, 2, 1)
+            return tsum(y * y)[()]
+
+    y = avg_pool2d(x, 3, 2, 1)
+    tsum(y * y).backward()
+    assert _values(x.grad) == pytest.approx(_numeric_grad(loss, x),
+                                            abs=1e-6)
+
+
+def _cnn(gen):
+    return Sequential(Conv2d(1, 4, 3, padding=1, activation="relu",
+                             generator=gen),
+                      MaxPool2d(2),
+                      Conv2d(4, 4, 3, generator=gen), ReLU(),
+                      AvgPool2d(2),
+                      Flatten(),
+                      Linear(4, 3, generator=gen))
+
+
+def test_conv_layers_manual_backward_matches_autograd():
+    gen = Generator(4)
+    model = _cnn(gen)
+    x = Tensor.with_uniform((2, 1, 8, 8), (-1.0, 1.0), generator=gen)
+    x.requires_grad = True
+
+    y = model.forward(x)
+    assert y.shape == (2, 3)
+    tsum(y * y).backward()
+    expected = [_values(p.grad) for p in model.parameters()]
+    expected_dx = _values(x.grad)
+    for p in model.parameters():
+        p.grad = None
+
+    y = model.forward(x)
+    dx = model.backward(y * 2.0)
+    assert _values(dx) == pytest.approx(expected_dx)
+    for p, grads in zip(model.parameters(), expected):
+        assert _values(p.grad) == pytest.approx(grads)
+
+    model.update(0.1)
+    assert all(_values(p.grad) == [0.0] * len(p.grad.data)
+               for p in model.parameters())
+
+
+def test_conv2d_layer_parameters():
+    layer = Conv2d(3, 8, (3, 5), bias=False)
+    assert [p.shape for p in layer.parameters()] == [(8, 3, 3, 5)]
+    assert Conv2d(3, 8, 3).parameters()[1].data.tolist() == [0.0] * 8
+    assert MaxPool2d(2).parameters() == [] and Flatten().parameters() == []
+
+
+def test_flatten():
+    x = Tensor.arange(0, 24).reshape((2, 3, 2, 2))
+    layer = Flatten()
+    y = layer.forward(x)
+    assert y.shape == (2, 12)
+    assert layer.backward(y).shape == (2, 3, 2, 2)
+
+
+def test_compiled_cnn_matches_eager():
+    gen = Generator(5)
+    model = _cnn(gen)
+    x = Tensor.with_uniform((2, 1, 8, 8), (-1.0, 1.0), generator=gen)
+    compiled = model.compile((2, 1, 8, 8))
+    with no_grad():
+        expected = _values(model.forward(x))
+    assert _values(compiled(x)) == pytest.approx(expected)
+    assert _values(compiled(x)) == pytest.approx(expected)
+
+
+def test_conv2d_profiled_flops():
+    x = Tensor.with_zeros((2, 3, 6, 6))
+    w = Tensor.with_zeros((4, 3, 3, 3))
+    with profile() as prof:
+        conv2d(x, w)
+    stats = prof.summary()["conv2d"]
+    assert stats.flops == 2 * 27 * 2 * 4 * 4 * 4
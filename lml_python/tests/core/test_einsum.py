@@ -0,0 +1,109 @@
+import itertools
+import math
+import pytest
+from lml_python.core.einsum import OPTIMAL_PATH_LIMIT, einsum, einsum_path
+from lml_python.core.tensor import Tensor
+
+
+def _tensor(shape, start=1.0):
+    n = math.prod(shape)
+    return Tensor.with_list([start + i % 7 - 3 for i in range(n)], shape)
+
+
+def _reference(subscripts, *operands):
+    # Direct loop over every assignment of the subscripts
+    lhs, output = subscripts.split("->")
+    inputs = lhs.split(",")
+    sizes = {}
+    for labels, t in zip(inputs, operands):
+        sizes.update(zip(labels, t.shape))
+    letters = sorted(sizes)
+    result = {}
+    for values in itertools.product(*(range(sizes[c]) for c in letters)):
+        env = dict(zip(letters, values))
+        term = 1.0
+        for labels, t in zip(inputs, operands):
+            term *= t[tuple(env[c] for c in labels)]
+        key = tuple(env[c] for c in output)
+        result[key] = result.get(key, 0.0) + term
+    shape = tuple(sizes[c] for c in output)
+    return Tensor.with_list(
+        [result[k] for k in itertools.product(*map(range, shape))] or [0.0],
+        shape)
+
+
+@pytest.mark.parametrize("subscripts, shapes", [
+    ("ij,jk->ik", [(2, 3), (3, 4)]),
+    ("ij,jk->ki", [(2, 3), (3, 4)]),
+    ("bij,bjk->bik", [(2, 3, 4), (2, 4, 5)]),
+    ("bhqd,bhkd->bhqk", [(2, 2, 3, 4), (2, 2, 5, 4)]),
+    ("i,i->", [(4,), (4,)]),
+    ("i,j->ij", [(2,), (3,)]),
+    ("ii->i", [(3, 3)]),
+    ("ii->", [(3, 3)]),
+    ("ij->", [(2, 3)]),
+    ("ij->j", [(2, 3)]),
+    ("ijk->kji", [(2, 3, 4)]),
+    ("iij,jk->ik", [(3, 3, 2), (2, 4)]),
+    ("ij,jk,kl->il", [(2, 3), (3, 4), (4, 5)]),
+    ("abc,cd,bd->a", [(2, 3, 4), (4, 5), (3, 5)]),
+    ("ab,bc,cd,de,ef->af", [(2, 3), (3, 4), (4, 2), (2, 5), (5, 3)]),
+])
+def test_einsum_matches_reference(subscripts, shapes):
+    operands = [_tensor(shape, i) for i, shape in enumerate(shapes)]
+    expected = _reference(subscripts, *operands)
+    for optimize in (True, False):
+        result = einsum(subscripts, *operands, optimize=optimize)
+        assert result.shape == expected.shape
+        assert result.contiguous().data.tolist() == pytest.approx(
+            expected.data.tolist())
+
+
+def test_einsum_implicit_output_and_views():
+    a = _tensor((3, 2)).T
+    b = _tensor((3, 4), 2.0)
+    assert einsum("ij,jk", a, b) == einsum("ij,jk->ik", a, b)
+
+    out = Tensor.with_zeros((4, 2))
+    einsum("ij,jk->ki", a, b, out=out)
+    assert out == _reference("ij,jk->ki", a, b)
+
+
+def test_einsum_path_picks_cheapest_order():
+    path, flops = einsum_path("ij,jk,k->i", (100, 100), (100, 100), (100,))
+    # Matrix-vector first, never the matrix-matrix product
+    assert path == [(1, 2), (0, 1)]
+    assert flops == 2 * 100 * 100
+
+    naive = 100 * 100 * 100 + 100 * 100
+    assert flops < naive
+
+
+def test_einsum_path_greedy_for_long_chains():
+    n = OPTIMAL_PATH_LIMIT + 2
+    letters = "abcdefghijklmnop"[:n + 1]
+    subscripts = ",".join(letters[i:i + 2] for i in range(n)) + \
+        f"->{letters[0]}{letters[-1]}"
+    shapes = [(2, 30) if i % 2 == 0 else (30, 2) for i in range(n)]
+    path, flops = einsum_path(subscripts, *shapes)
+    assert len(path) == n - 1
+    assert flops > 0
+
+    operands = [_tensor(shape, i) for i, shape in enumerate(shapes)]
+    assert einsum(subscripts, *operands).contiguous().data.tolist() == \
+        pytest.approx(einsum(subscripts, *operands, optimize=False)
+                      .contiguous().data.tolist())
+
+
+def test_einsum_errors():
+    a = _tensor((2, 3))
+    with pytest.raises(ValueError):
+        einsum("ij,jk->ik", a)
+    with pytest.raises(ValueError):
+        einsum("ij,jk->ik", a, a)
+    with pytest.raises(ValueError):
+        einsum("ijk->i", a)
+    with pytest.raises(ValueError):
+        einsum("ij->iz", a)
+    with pytest.raises(ValueError):
+        einsum("ii->i", a)
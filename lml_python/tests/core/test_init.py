@@ -0,0 +1,57 @@
+import math
+import pytest
+from lml_python.core import init
+from lml_python.core.layer import Linear
+from lml_python.core.rng import Generator
+from lml_python.core.tensor import Tensor
+
+
+def _std(t: Tensor) -> float:
+    values = t.data.tolist()
+    mean = math.fsum(values) / len(values)
+    return math.sqrt(math.fsum((v - mean) ** 2 for v in values)
+                     / len(values))
+
+
+@pytest.mark.parametrize("shape, expected", [
+    ((3, 5), (3, 5)),
+    ((8, 4, 3, 3), (36, 72)),
+])
+def test_fans(shape, expected):
+    assert init.fans(shape) == expected
+
+
+def test_fans_need_two_dims():
+    with pytest.raises(ValueError):
+        init.fans((3,))
+
+
+@pytest.mark.parametrize("initializer, activation, expected_std", [
+    # Uniform on [-a, a] has a standard deviation of a / sqrt(3)
+    (init.xavier_uniform, None, math.sqrt(2.0 / 300)),
+    (init.xavier_normal, "tanh", 5.0 / 3.0 * math.sqrt(2.0 / 300)),
+    (init.kaiming_uniform, "relu", math.sqrt(2.0 / 100)),
+    (init.kaiming_normal, "relu", math.sqrt(2.0 / 100)),
+])
+def test_initializer_scale(initializer, activation, expected_std):
+    w = initializer((100, 200), generator=Generator(0),
+                    activation=activation)
+    assert w.shape == (100, 200)
+    assert _std(w) == pytest.approx(expected_std, rel=0.03)
+
+
+def test_unknown_activation_gain():
+    with pytest.raises(ValueError):
+        init.gain("softplus")
+
+
+def test_linear_with_initializer():
+    a = Linear(4, 3, initializer=init.kaiming_uniform,
+               generator=Generator(1))
+    b = Linear(4, 3, initializer=init.kaiming_uniform,
+               generator=Generator(1))
+    bound = math.sqrt(2.0) * math.sqrt(3.0 / 4)
+    assert a._weights == b._weights
+    assert a._weights.requires_grad
+    assert all(abs(v) <= bound for v in a._weights.data)
+    assert a._bias.data.tolist() == [0.0, 0.0, 0.0]
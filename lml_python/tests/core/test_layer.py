@@ -0,0 +1,123 @@
+import pytest
+from lml_python.core.autograd import no_grad
+from lml_python.core.interfaces import ILayer
+from lml_python.core.layer import Linear, ReLU, Sequential
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import fused
+
+
+def test_linear_forward_adds_bias_per_row():
+    layer = Linear(3, 2)
+    layer._weights = Tensor.with_list([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]],
+                                      (3, 2))
+    layer._bias = Tensor.with_list([0.5, -0.5], (2,))
+    x = Tensor.with_list([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]], (2, 3))
+
+    y = layer.forward(x)
+    assert y.shape == (2, 2)
+    assert y.data.tolist() == pytest.approx([4.5, 4.5, 10.5, 10.5])
+
+
+def test_linear_fused_activation():
+    layer = Linear(2, 2, activation="relu")
+    layer._weights = Tensor.with_list([[1.0, -1.0], [1.0, -1.0]], (2, 2))
+    layer._bias = Tensor.with_list([0.0, 0.0], (2,))
+    x = Tensor.with_list([[1.0, 2.0]], (1, 2))
+    assert layer.forward(x).data.tolist() == [3.0, 0.0]
+
+
+def test_relu_forward():
+    x = Tensor.with_list([[-1.0, 2.0], [0.5, -3.0]], (2, 2))
+    assert ReLU().forward(x).data.tolist() == [0.0, 2.0, 0.5, 0.0]
+
+
+def _mlp():
+    return Sequential(Linear(4, 8), ReLU(),
+                      Sequential(Linear(8, 8, "tanh"), Linear(8, 3)),
+                      ReLU())
+
+
+def test_sequential_chains_layers():
+    model = _mlp()
+    x = Tensor.with_uniform((5, 4), (-1.0, 1.0))
+    y = model.forward(x)
+    assert y.shape == (5, 3)
+    assert len(model.parameters()) == 6
+
+    dx = model.backward(Tensor.with_list([1.0] * 15, (5, 3)))
+    assert dx.shape == (5, 4)
+    assert all(p.grad is not None for p in model.parameters())
+    model.update(0.1)
+    assert all(p.grad.data.tolist() == [0.0] * len(p.grad.data)
+               for p in model.parameters())
+
+
+def test_update_clears_overflowed_gradients():
+    layer = Linear(2, 1)
+    for p in layer.parameters():
+        p.grad = Tensor.full(p.shape, float("inf"))
+    layer.update(0.1)
+    assert all(p.grad.data.tolist() == [0.0] * len(p.grad.data)
+               for p in layer.parameters())
+
+
+def test_compiled_model_matches_eager():
+    model = _mlp()
+    x = Tensor.with_uniform((5, 4), (-1.0, 1.0))
+    compiled = model.compile((5, 4))
+    with no_grad():
+        expected = model.forward(x)
+    assert compiled(x) == expected
+    assert compiled(x).grad_fn is None
+
+    # Parameters are updated in place, the plan sees new values
+    with no_grad():
+        fused(model.layers[0]._weights, ("mul", 2.0),
+              out=model.layers[0]._weights)
+        expected = model.forward(x)
+    assert compiled(x) == expected
+
+
+def test_compiled_model_ping_pongs_two_buffers():
+    model = _mlp()
+    compiled = model.compile((5, 4))
+    outs = [step.out for step in compiled.steps]
+    # Linear layers alternate buffers, ReLU writes over its input
+    assert outs[1] is not None and outs[1].data is outs[0].data
+    assert outs[2].data is not outs[1].data
+    assert outs[3].data is outs[1].data
+    assert outs[4].data is outs[3].data
+    assert compiled.arena_bytes == 2 * 5 * 8 * 8
+
+    x = Tensor.with_uniform((5, 4), (-1.0, 1.0))
+    y = compiled(x)
+    assert compiled(x).data is y.data
+    before = x.data.tolist()
+    compiled(x)
+    assert x.data.tolist() == before
+
+
+def test_compiled_model_runs_layers_without_kernels():
+    class Double(ILayer):
+        def __init__(self):
+            pass
+
+        def forward(self, input):
+            return input * 2
+
+        def backward(self, gradient):
+            return gradient * 2
+
+        def parameters(self):
+            return []
+
+    model = Sequential(Double(), ReLU(), Linear(3, 2), Double(), ReLU())
+    x = Tensor.with_list([[-1.0, 2.0, 3.0]], (1, 3))
+    compiled = model.compile((1, 3))
+    assert compiled.steps[0].out is None
+    with no_grad():
+        assert compiled(x) == model.forward(x)
+    assert x.data.tolist() == [-1.0, 2.0, 3.0]
+
+    with pytest.raises(ValueError):
+        compiled(Tensor.with_zeros((2, 3)))
@@ -0,0 +1,151 @@
+import pytest
+from lml_python.core.dtype import DType
+from lml_python.core.lazy import LazyTensor, evaluate, lazy
+from lml_python.core.profiler import profile
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import (
+    exp,
+    log,
+    matdiv,
+    matmul,
+    relu,
+    sigmoid,
+    sqrt,
+    tanh,
+    tsum,
+)
+
+
+def _tensor(shape):
+    return Tensor.with_uniform(shape, (0.5, 2.0))
+
+
+def _ops(prof, name):
+    return [e for e in prof.events if e.name == name]
+
+
+def _close(a, b):
+    assert a.shape == b.shape
+    assert a.dtype == b.dtype
+    assert a._values().tolist() == pytest.approx(b._values().tolist())
+
+
+def test_matches_eager():
+    a, b = _tensor((3, 4)), _tensor((4,))
+    x = lazy(a)
+    cases = [
+        (((x * 2 + b).relu() - x) / 3, (relu(a * 2 + b) - a) / 3),
+        (1 - (x * 3).tanh(), 1 - tanh(a * 3)),
+        (2 / x + b * x, matdiv(2, a) + b * a),
+        ((-x).sigmoid().exp().log().sqrt(), sqrt(log(exp(sigmoid(-a))))),
+        (x.T @ x + 1, matmul(a.T, a) + 1),
+        (b - x, b - a),
+    ]
+    for expr, expected in cases:
+        _close(expr.realize(), expected)
+
+
+def test_dtypes_follow_eager_rules():
+    i = lazy(Tensor.with_list([1, 2, 3], (3,), DType.INT32))
+    assert (i + 1).dtype == DType.INT32
+    assert (i / 2).dtype == DType.FLOAT64
+    assert (i * 0.5).dtype == DType.FLOAT64
+    assert (i + 1).realize()._values().tolist() == [2, 3, 4]
+    assert (i + 1).realize().dtype == DType.INT32
+
+
+def test_element_wise_chain_is_one_pass():
+    x = lazy(_tensor((4, 5)))
+    y = (((x * 2) + 1).relu() - x).tanh() * 0.5
+    with profile() as prof:
+        y.realize()
+    assert [e.name for e in prof.events if e.depth == 1] == ["fused"]
+
+
+def test_fused_chain_reuses_intermediate_buffer():
+    a, b = lazy(_tensor((6, 3))), lazy(_tensor((3, 5)))
+    with profile() as prof:
+        y = ((a @ b) * 2 + 1).relu().realize()
+    (mm,), (f,) = _ops(prof, "matmul"), _ops(prof, "fused")
+    assert mm.bytes_allocated > 0
+    # Written into the product, nothing else reads it
+    assert f.bytes_allocated == 0
+    _close(y, relu(matmul(a.realize(), b.realize()) * 2 + 1))
+
+    # Leaves and outputs are never overwritten
+    x = lazy(_tensor((2, 2)))
+    before = x.realize()._values().tolist()
+    product = x @ x
+    doubled = product * 2
+    evaluate(product, doubled)
+    assert x.realize()._values().tolist() == before
+    _close(product.realize() * 2, doubled.realize())
+
+
+def test_matrix_chain_is_reassociated():
+    a, b, v = _tensor((30, 40)), _tensor((40, 50)), _tensor((50, 1))
+    with profile() as prof:
+        y = ((lazy(a) @ b) @ v).realize()
+    assert [e.inputs for e in _ops(prof, "matmul")] == [
+        ((40, 50), (50, 1)), ((30, 40), (40, 1))]
+    _close(y, matmul(matmul(a, b), v))
+
+    with profile() as prof:
+        lazy(v).T @ (lazy(b).T @ a.T)
+    assert not prof.events
+    with profile() as prof:
+        (lazy(v).T @ (lazy(b).T @ a.T)).realize()
+    assert _ops(prof, "matmul")[0].inputs == ((1, 50), (50, 40))
+
+
+def test_common_subexpressions_run_once():
+    a, b = _tensor((3, 3)), _tensor((3, 3))
+    x = lazy(a)
+    first = (x @ b).tanh()
+    second = (lazy(a) @ b).tanh() + 1
+    unused = (x @ x) * 4
+    with profile() as prof:
+        r1, r2 = evaluate(first, second)
+    assert len(_ops(prof, "matmul")) == 1
+    _close(r2, tanh(matmul(a, b)) + 1)
+    assert first.realize() is r1
+    assert not unused.is_realized
+
+
+def test_data_access_realizes():
+    a = _tensor((2, 3))
+    y = lazy(a) * 2
+    assert not y.is_realized
+    assert y[1, 2] == a[1, 2] * 2
+    assert y.is_realized
+    assert y.realize() is y.realize()
+    assert isinstance(a + y, LazyTensor)
+    assert isinstance(a @ lazy(a.T), LazyTensor)
+    assert (a - y).realize()._values().tolist() == pytest.approx(
+        [-v for v in a._values()])
+
+
+def test_gradients_flow_through_evaluation():
+    w = Tensor.with_uniform((3, 2), (-1.0, 1.0))
+    w.requires_grad = True
+    x = _tensor((4, 3))
+    tsum((lazy(x) @ w * 2 + 1).tanh().realize()).backward()
+    lazy_grad = w.grad._values().tolist()
+    w.grad = None
+    tsum(tanh(matmul(x, w) * 2 + 1)).backward()
+    assert lazy_grad == pytest.approx(w.grad._values().tolist())
+
+
+def test_long_chains_and_errors():
+    x = lazy(Tensor.with_zeros((2,)))
+    y = x
+    for _ in range(5000):
+        y = y + 1
+    assert y.realize()._values().tolist() == [5000.0, 5000.0]
+
+    with pytest.raises(ValueError):
+        lazy(Tensor.with_zeros((2, 3))) @ Tensor.with_zeros((2, 3))
+    with pytest.raises(ValueError):
+        lazy(Tensor.with_zeros((2, 3))) + Tensor.with_zeros((4,))
+    with pytest.raises(TypeError):
+        lazy(Tensor.with_zeros((2,))) + "1"
@@ -0,0 +1,137 @@
+import threading
+from lml_python.core.autograd import no_grad
+from lml_python.core.dtype import DType
+from lml_python.core.layer import Linear
+from lml_python.core.memory import (
+    Pooled,
+    TensorPool,
+    active_pool,
+    no_pool,
+)
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import matadd
+
+
+def test_pool_reuses_dead_buffers():
+    pool = TensorPool()
+    with pool:
+        a = Tensor.with_zeros((4, 4))
+        storage = id(a.data)
+        del a
+        b = Tensor.with_zeros((4, 4))
+    assert id(b.data) == storage
+    assert pool.hits == 1
+    assert pool.misses == 1
+
+
+def test_pool_never_hands_out_live_buffers():
+    pool = TensorPool()
+    with pool:
+        a = Tensor.with_zeros((3,))
+        view = a.T
+        del a
+        # The view keeps the storage alive
+        b = Tensor.with_zeros((3,))
+    assert b.data is not view.data
+    assert pool.misses == 2
+
+
+def test_pool_buckets_by_dtype_and_size():
+    pool = TensorPool()
+    with pool:
+        Tensor.with_zeros((2, 2), DType.FLOAT32)
+        Tensor.with_zeros((4,), DType.FLOAT64)
+        c = Tensor.with_zeros((2, 2), DType.FLOAT64)
+    assert c.dtype == DType.FLOAT64
+    assert pool.hits == 1
+    assert pool.misses == 2
+
+
+def test_pool_zeroes_reused_buffers():
+    pool = TensorPool()
+    with pool:
+        a = Tensor.with_list([1.0, 2.0, 3.0], (3,))
+        pool.allocate(DType.FLOAT64, 3)[:] = a.data
+        del a
+        assert Tensor.with_zeros((3,)).data.tolist() == [0.0, 0.0, 0.0]
+
+
+def test_pool_stats():
+    pool = TensorPool()
+    with pool:
+        a = Tensor.with_zeros((10,))
+        b = Tensor.with_zeros((10,))
+        stats = pool.stats()
+        assert stats.bytes_live == 160
+        assert stats.peak_bytes == 160
+        del a, b
+        stats = pool.stats()
+        assert stats.bytes_live == 0
+        assert stats.bytes_reserved == 160
+        assert stats.peak_bytes == 160
+
+    pool.release_cached()
+    assert pool.bytes_reserved == 0
+
+
+def test_pool_peak_counts_hits():
+    pool = TensorPool()
+    with pool:
+        a = Tensor.with_zeros((10,))
+        b = Tensor.with_zeros((20,))
+        buffers = {id(a.data), id(b.data)}
+        del a, b
+        pool.reset_stats()
+        # Both buffers are reused, the peak rises without any miss
+        a = Tensor.with_zeros((10,))
+        b = Tensor.with_zeros((20,))
+        assert {id(a.data), id(b.data)} == buffers
+        assert pool.hits == 2 and pool.misses == 0
+        assert pool.bytes_live == pool.peak_bytes == 240
+
+
+def test_steady_state_loop_stops_allocating():
+    layer = Linear(8, 4, activation="relu")
+    x = Tensor.with_uniform((16, 8), (-1.0, 1.0))
+    pool = TensorPool()
+    with pool:
+        for _ in range(3):
+            y = matadd(layer.forward(x), 1.0)
+        pool.reset_stats()
+        for _ in range(10):
+            y = matadd(layer.forward(x), 1.0)
+    assert y.shape == (16, 4)
+    assert pool.misses == 0
+    assert pool.hits == 20
+
+
+def test_pool_scoping():
+    pool = TensorPool()
+    assert active_pool() is None
+    with pool:
+        assert active_pool() is pool
+        with no_pool():
+            assert active_pool() is None
+        with TensorPool() as inner:
+            assert active_pool() is inner
+        assert active_pool() is pool
+    assert active_pool() is None
+
+    # Pools are context local, other threads do not see them
+    seen = []
+    with pool:
+        thread = threading.Thread(target=lambda: seen.append(active_pool()))
+        thread.start()
+        thread.join()
+    assert seen == [None]
+
+
+def test_pooled_layer():
+    pooled = Pooled(Linear(3, 2))
+    x = Tensor.with_uniform((5, 3), (-1.0, 1.0))
+    with no_grad():
+        pooled.forward(x)
+        pooled.forward(x)
+    assert pooled.pool.misses == 1
+    assert pooled.pool.hits == 1
+    assert active_pool() is None
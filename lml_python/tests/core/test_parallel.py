@@ -0,0 +1,102 @@
+import gc
+import sys
+from multiprocessing import shared_memory
+import pytest
+from lml_python.core.backend import use_backend, register_backend
+from lml_python.core.parallel import (
+    ParallelBackend,
+    _blocks,
+    _segments,
+    is_shared,
+    shared_empty,
+    to_shared,
+)
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import fused, linear, matadd, matmul
+
+
+@pytest.fixture(scope="module")
+def parallel():
+    backend = ParallelBackend(workers=3, min_flops=1000, min_elements=1000)
+    register_backend("parallel_test", lambda: backend)
+    yield backend
+    backend.close()
+
+
+def test_blocks_cover_range_evenly():
+    assert _blocks(10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert _blocks(2, 8) == [(0, 1), (1, 2)]
+
+
+def test_shared_tensors_round_trip():
+    t = Tensor.with_uniform((4, 5), (-1.0, 1.0))
+    shared = to_shared(t.T)
+    assert is_shared(shared)
+    assert not is_shared(t)
+    assert shared == t.T.contiguous()
+    assert to_shared(shared) is shared
+    # Views keep the segment alive
+    view = shared[1:3]
+    assert is_shared(view)
+
+    count = len(_segments)
+    del shared, view
+    gc.collect()
+    assert len(_segments) == count - 1
+
+
+def test_segment_unlinked_while_a_storage_slice_lives(monkeypatch):
+    # Closing the segment fails with a BufferError while the slice lives,
+    # neither the finalizer nor SharedMemory.__del__ may report it
+    unraisable = []
+    monkeypatch.setattr(sys, "unraisablehook", unraisable.append)
+    shared = shared_empty((8,))
+    name = _segments[id(shared.data)]
+    values = shared.data[2:6]
+    del shared
+    gc.collect()
+    assert unraisable == []
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+    # The slice still reads and writes its mapping
+    values[0] = 1.5
+    assert values[0] == 1.5
+
+
+def test_parallel_ops_match_serial(parallel):
+    a = Tensor.with_uniform((64, 32), (-1.0, 1.0))
+    b = Tensor.with_uniform((32, 48), (-1.0, 1.0))
+    bias = Tensor.with_uniform((48,), (-1.0, 1.0))
+    expected = [matmul(a, b), linear(a, b, bias, "tanh"),
+                matadd(a, a.T.T), fused(a, ("mul", 0.5), "sigmoid")]
+
+    with use_backend("parallel_test"):
+        results = [matmul(a, b), linear(a, b, bias, "tanh"),
+                   matadd(a, a.T.T), fused(a, ("mul", 0.5), "sigmoid")]
+    assert parallel._executor is not None
+    for result, reference in zip(results, expected):
+        assert result.data.tolist() == pytest.approx(reference.data.tolist())
+
+
+def test_shared_output_is_written_in_place(parallel):
+    a = to_shared(Tensor.with_uniform((40, 30), (-1.0, 1.0)))
+    b = to_shared(Tensor.with_uniform((30, 20), (-1.0, 1.0)))
+    out = shared_empty((40, 20))
+    storage = out.data
+    with use_backend("parallel_test"):
+        matmul(a, b, out=out)
+        # In place on a strided, shared view
+        matadd(out.T, 1.0, out=out.T)
+    assert out.data is storage
+    expected = matadd(matmul(a, b), 1.0)
+    assert out.data.tolist() == pytest.approx(expected.data.tolist())
+
+
+def test_small_ops_stay_serial():
+    backend = ParallelBackend(workers=2)
+    register_backend("parallel_lazy", lambda: backend)
+    a = Tensor.with_uniform((4, 4), (-1.0, 1.0))
+    with use_backend("parallel_lazy"):
+        matmul(a, a)
+        matadd(a, a)
+    assert backend._executor is None
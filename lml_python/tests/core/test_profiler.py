@@ -0,0 +1,113 @@
+import json
+import pytest
+from lml_python.core.autograd import no_grad
+from lml_python.core.einsum import einsum
+from lml_python.core.layer import Linear
+from lml_python.core.profiler import is_profiling, profile, profiled
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import linear, matadd, matmul, tdot
+
+
+def test_records_ops_with_shapes_flops_and_allocations():
+    a = Tensor.with_uniform((2, 3), (-1.0, 1.0))
+    b = Tensor.with_uniform((3, 4), (-1.0, 1.0))
+    out = Tensor.with_zeros((2, 4))
+    with profile() as prof:
+        matmul(a, b)
+        matadd(a, 1.0, out=Tensor.with_zeros((2, 3)))
+        linear(a, b, Tensor.with_zeros((4,)), "relu", out=out)
+        tdot(Tensor.with_zeros((2, 3, 5)), Tensor.with_zeros((3, 5, 4)),
+             ([1, 2], [0, 1]))
+
+    # tdot runs a matmul of its own, nested one level deeper
+    mm, add, lin, td = [e for e in prof.events if e.depth == 0]
+    assert (mm.name, mm.category) == ("matmul", "op")
+    assert mm.inputs == ((2, 3), (3, 4))
+    assert mm.output == (2, 4)
+    assert mm.flops == 2 * 3 * 8
+    assert mm.bytes_allocated == 8 * 8
+    # Written into 'out', nothing allocated
+    assert add.flops == 6 and add.bytes_allocated == 0
+    assert lin.flops == (2 * 3 + 2) * 8 and lin.bytes_allocated == 0
+    assert td.flops == 2 * 15 * 8
+    assert prof.events[-2].name == "matmul"
+    assert prof.events[-2].flops == td.flops
+
+
+def test_layer_calls_nest_ops():
+    layer = Linear(3, 2, activation="tanh")
+    x = Tensor.with_uniform((4, 3), (-1.0, 1.0))
+    with profile() as prof:
+        layer.forward(x)
+        layer.backward(Tensor.with_uniform((4, 2), (-1.0, 1.0)))
+
+    names = [e.name for e in prof.events]
+    assert "Linear.forward" in names and "Linear.backward" in names
+    forward = prof.events[names.index("Linear.forward")]
+    inner = prof.events[names.index("linear")]
+    assert forward.category == "layer"
+    assert inner.depth == forward.depth + 1
+    assert forward.children_ns == inner.duration_ns
+    # A layer does the work of the ops it calls
+    assert forward.flops == inner.flops
+
+    summary = prof.summary()
+    assert summary["Linear.forward"].calls == 1
+    assert summary["Linear.forward"].self_ns \
+        == forward.duration_ns - forward.children_ns
+    assert "Linear.backward" in prof.table()
+
+
+def test_composite_ops_count_nested_flops():
+    a = Tensor.with_zeros((2, 3))
+    b = Tensor.with_zeros((3, 4))
+    with profile() as prof, no_grad():
+        einsum("ij,jk->ik", a, b)
+    outer = prof.events[-1]
+    assert outer.name == "einsum"
+    assert outer.flops == 2 * 3 * 8
+
+
+def test_chrome_trace_export(tmp_path):
+    with profile() as prof:
+        matadd(Tensor.with_zeros((2,)), 1.0)
+    path = tmp_path / "trace.json"
+    prof.export_chrome_trace(str(path))
+    (event,) = json.loads(path.read_text())["traceEvents"]
+    assert event["name"] == "matadd"
+    assert event["ph"] == "X"
+    assert event["args"]["inputs"] == [[2]]
+
+
+def test_disabled_and_nested_contexts():
+    calls = []
+
+    @profiled()
+    def op(x):
+        calls.append(x)
+        return x
+
+    assert not is_profiling()
+    assert op(1) == 1
+    with profile() as outer:
+        op(2)
+        with profile() as inner:
+            op(3)
+        op(4)
+    assert not is_profiling()
+    assert calls == [1, 2, 3, 4]
+    assert [e.name for e in outer.events] == ["op", "op"]
+    assert len(inner.events) == 1
+    assert op.__name__ == "op"
+
+
+def test_failed_calls_leave_profile_consistent():
+    @profiled()
+    def fails():
+        raise ValueError()
+
+    with profile() as prof:
+        with pytest.raises(ValueError):
+            fails()
+        matadd(Tensor.with_zeros((2,)), 1.0)
+    assert [e.depth for e in prof.events] == [0]
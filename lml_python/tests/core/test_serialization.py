@@ -0,0 +1,114 @@
+import sys
+import pytest
+from lml_python.core.dtype import DType
+from lml_python.core.layer import Linear
+from lml_python.core.serialization import (
+    ALIGNMENT,
+    MAGIC,
+    load,
+    load_layer,
+    save,
+    save_layer,
+)
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import matmul
+
+
+def _arange(shape, dtype=DType.FLOAT64):
+    n = 1
+    for d in shape:
+        n *= d
+    return Tensor.with_list(list(range(n)), shape, dtype)
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_round_trip(tmp_path, lazy):
+    path = str(tmp_path / "model.lml")
+    tensors = {
+        "w": _arange((3, 4)),
+        "f32": _arange((5,), DType.FLOAT32),
+        "i32": _arange((2, 2), DType.INT32),
+        "scalar": Tensor.with_list([7.0], ()),
+        "empty": Tensor.with_zeros((0, 3)),
+    }
+    save(tensors, path, metadata={"epoch": 3})
+    loaded = load(path, lazy=lazy)
+
+    assert set(loaded) == set(tensors)
+    assert loaded.metadata == {"epoch": 3}
+    for name, t in tensors.items():
+        assert loaded[name].shape == t.shape
+        assert loaded[name].dtype == t.dtype
+        assert loaded[name] == t
+    assert loaded["w"] is loaded["w"]
+    assert isinstance(loaded["w"].data, memoryview)
+
+
+def test_views_share_one_block(tmp_path):
+    path = str(tmp_path / "views.lml")
+    base = _arange((4, 6))
+    save({"column": base[1:, 2], "transposed": base[:2].T}, path)
+    loaded = load(path)
+    assert loaded["column"]._values().tolist() == [8.0, 14.0, 20.0]
+    assert loaded["transposed"] == base[:2].T
+    assert loaded["column"].data is loaded["transposed"].data
+    # Only the reachable span, rows 0 to 3 up to column 2, is stored
+    assert len(loaded["column"].data) == 21
+
+
+def test_file_layout(tmp_path):
+    path = tmp_path / "layout.lml"
+    save({"a": _arange((3,)), "b": _arange((2,), DType.FLOAT32)}, str(path))
+    raw = path.read_bytes()
+    assert raw.startswith(MAGIC)
+    # Every block starts aligned
+    for t in (_arange((3,)), _arange((2,), DType.FLOAT32)):
+        assert raw.index(t.data.tobytes()) % ALIGNMENT == 0
+
+
+def test_loaded_tensors_are_copy_on_write(tmp_path):
+    path = tmp_path / "cow.lml"
+    save({"w": _arange((2, 2))}, str(path))
+    before = path.read_bytes()
+    w = load(str(path))["w"]
+    w[0, 0] = 42.0
+    assert matmul(w, w)[0, 0] == 42.0 * 42.0 + 2.0
+    assert path.read_bytes() == before
+    assert load(str(path))["w"][0, 0] == 0.0
+
+
+def test_byte_order_mismatch_is_converted(tmp_path):
+    path = tmp_path / "swapped.lml"
+    t = _arange((3,))
+    swapped = t.data[:]
+    swapped.byteswap()
+    save({"t": Tensor(swapped, (3,))}, str(path))
+    other = "big" if sys.byteorder == "little" else "little"
+    raw = path.read_bytes().replace(
+        f'"byteorder": "{sys.byteorder}"'.encode(),
+        f'"byteorder": "{other}"'.encode().ljust(
+            len(f'"byteorder": "{sys.byteorder}"')))
+    path.write_bytes(raw)
+    assert load(str(path))["t"] == t
+
+
+def test_layer_round_trip(tmp_path):
+    path = str(tmp_path / "linear.lml")
+    layer = Linear(3, 2, activation="tanh")
+    save_layer(layer, path)
+    x = Tensor.with_uniform((4, 3), (-1.0, 1.0))
+
+    restored = Linear(3, 2, activation="tanh")
+    load_layer(restored, path)
+    assert restored.forward(x) == layer.forward(x)
+    assert restored._weights.requires_grad
+
+    with pytest.raises(ValueError):
+        load_layer(Linear(2, 2), path)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a checkpoint")
+    with pytest.raises(ValueError):
+        load(str(path))
@@ -0,0 +1,183 @@
+import pytest
+from lml_python.core.autograd import no_grad
+from lml_python.core.backend import use_backend
+from lml_python.core.dtype import DType
+from lml_python.core.profiler import profile
+from lml_python.core.rng import Generator
+from lml_python.core.sparse import SparseTensor, spmm
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import matmul, tsum
+
+DENSE = [[0.0, 2.0, 0.0, 0.0],
+         [0.0, 0.0, 0.0, 0.0],
+         [1.0, 0.0, 0.0, -3.0]]
+
+
+def _sparse():
+    return SparseTensor.from_dense(Tensor.with_list(DENSE, (3, 4)))
+
+
+def test_from_dense_csr_layout():
+    s = _sparse()
+    assert s.shape == (3, 4)
+    assert s.nnz == 3
+    assert s.data.tolist() == [2.0, 1.0, -3.0]
+    assert s.indices.tolist() == [1, 0, 3]
+    assert s.indptr.tolist() == [0, 1, 1, 3]
+    assert s.density == 0.25
+
+
+def test_dense_round_trip():
+    assert _sparse().to_dense() == Tensor.with_list(DENSE, (3, 4))
+
+
+def test_from_coo_sorts_and_sums_duplicates():
+    s = SparseTensor.from_coo([2, 0, 2, 2], [3, 1, 0, 3],
+                              [-1.0, 2.0, 1.0, -2.0], (3, 4))
+    assert s.to_dense() == Tensor.with_list(DENSE, (3, 4))
+    rows, cols, values = s.to_coo()
+    assert rows.tolist() == [0, 2, 2]
+    assert cols.tolist() == [1, 0, 3]
+    assert values.tolist() == [2.0, 1.0, -3.0]
+
+
+@pytest.mark.parametrize("rows, cols, values", [
+    ([0], [4], [1.0]),
+    ([3], [0], [1.0]),
+    ([-1], [0], [1.0]),
+])
+def test_from_coo_out_of_range(rows, cols, values):
+    with pytest.raises(IndexError):
+        SparseTensor.from_coo(rows, cols, values, (3, 4))
+
+
+def test_invalid_csr_buffers():
+    with pytest.raises(ValueError):
+        SparseTensor([1.0], (2, 2), indices=[0], indptr=[0, 1])
+    with pytest.raises(ValueError):
+        SparseTensor([1.0], (2, 2), indices=[], indptr=[0, 1, 1])
+    with pytest.raises(ValueError):
+        SparseTensor([], (2, 2, 2))
+
+
+def test_element_and_row_access():
+    s = _sparse()
+    assert s[2, 3] == -3.0
+    assert s[2, 1] == 0.0
+    assert s[-1, -1] == -3.0
+    assert s[0] == Tensor.with_list(DENSE[0], (4,))
+    with pytest.raises(IndexError):
+        s[3, 0]
+    with pytest.raises(TypeError):
+        s[0:2]
+    with pytest.raises(TypeError):
+        s[0, 0] = 1.0
+
+
+def test_transpose():
+    s = _sparse()
+    t = s.T
+    assert t.shape == (4, 3)
+    assert t.to_dense() == Tensor.with_list(DENSE, (3, 4)).T
+    assert t.indptr.tolist() == [0, 1, 2, 2, 3]
+    assert s.permute(1, 0).to_dense() == t.to_dense()
+
+
+def test_scaling_keeps_sparsity():
+    s = _sparse() * 2
+    assert isinstance(s, SparseTensor)
+    assert s.nnz == 3
+    assert (-_sparse() / 2)[2, 3] == 1.5
+    assert (_sparse() + 1.0)[1, 1] == 1.0
+
+
+def test_dense_only_ops():
+    with pytest.raises(TypeError):
+        _sparse().reshape((4, 3))
+    with pytest.raises(TypeError):
+        _sparse().strides
+    with pytest.raises(ValueError):
+        _sparse().requires_grad = True
+
+
+def test_eye_and_zeros():
+    assert SparseTensor.eye(3, 2).to_dense() == Tensor.eye(3, 2)
+    assert SparseTensor.eye(2, 3).to_dense() == Tensor.eye(2, 3)
+    z = SparseTensor.with_zeros((2, 5))
+    assert z.nnz == 0 and z.to_dense() == Tensor.with_zeros((2, 5))
+
+
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+def test_matmul_dispatch_matches_dense(backend):
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+    gen = Generator(0)
+    s = SparseTensor.random((6, 5), 0.3, generator=gen)
+    d = Tensor.with_uniform((5, 4), (-1.0, 1.0), generator=gen)
+    left = Tensor.with_uniform((3, 6), (-1.0, 1.0), generator=gen)
+    dense = s.to_dense()
+    with use_backend(backend):
+        for result, expected in ((matmul(s, d), matmul(dense, d)),
+                                 (left @ s, matmul(left, dense)),
+                                 (s @ s.T, matmul(dense, dense.T))):
+            assert result.shape == expected.shape
+            assert result.data.tolist() == pytest.approx(
+                expected.data.tolist())
+
+
+def test_matmul_into_out_view():
+    s = _sparse()
+    out = Tensor.with_zeros((2, 3)).T
+    matmul(s, Tensor.eye(4, 2), out=out)
+    assert out == Tensor.with_list([[0.0, 2.0], [0.0, 0.0], [1.0, 0.0]],
+                                   (3, 2))
+
+
+def test_matmul_empty_rows_and_ints():
+    s = SparseTensor.from_coo([1], [0], [3], (3, 2), DType.INT32)
+    d = Tensor.with_list([[1, 2], [3, 4]], (2, 2), DType.INT32)
+    y = matmul(s, d)
+    assert y.dtype == DType.INT32
+    assert y.data.tolist() == [0, 0, 3, 6, 0, 0]
+
+
+def test_matmul_rejects_batches():
+    with pytest.raises(ValueError):
+        matmul(_sparse(), Tensor.with_zeros((2, 4, 1)))
+
+
+def test_gradient_flows_to_dense_operand():
+    s = _sparse()
+    w = Tensor.with_uniform((4, 2), (-1.0, 1.0))
+    w.requires_grad = True
+    tsum(matmul(s, w)).backward()
+    with no_grad():
+        expected = matmul(s.to_dense().T, Tensor.full((3, 2), 1.0))
+    assert w.grad == expected
+
+    x = Tensor.with_uniform((2, 3), (-1.0, 1.0))
+    x.requires_grad = True
+    tsum(matmul(x, s)).backward()
+    with no_grad():
+        expected = matmul(Tensor.full((2, 4), 1.0), s.to_dense().T)
+    assert x.grad == expected
+
+
+def test_random_density():
+    s = SparseTensor.random((100, 100), 0.05, generator=Generator(1))
+    assert 0.045 < s.density <= 0.05
+    assert all(-1.0 <= v <= 1.0 for v in s.data)
+
+
+def test_spmm_flops_count_nonzeros():
+    s = _sparse()
+    with profile() as p:
+        spmm(s, Tensor.with_zeros((4, 5)))
+    event = next(e for e in p.events if e.name == "spmm")
+    assert event.flops == 2 * 3 * 5
+
+
+def test_nbytes_proportional_to_nnz():
+    s = SparseTensor.random((1000, 1000), 0.01, generator=Generator(2))
+    dense_bytes = 1000 * 1000 * DType.FLOAT64.itemsize
+    assert s.nbytes < dense_bytes / 20
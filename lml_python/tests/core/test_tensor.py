@@ -1,6 +1,9 @@
 import pytest
 import math
+import array
 from lml_python.core.tensor import Tensor
+from lml_python.core.dtype import DType
+from lml_python.core.rng import Generator
 
 # TODO: Restructure this fixtures for redability, re-use and parametrization
 
@@ -26,7 +29,7 @@ def test_default_constructor_initialization(raw_tensor_data):
     data, shape, rank, strides = raw_tensor_data
 
     tensor = Tensor(data, shape)
-    assert tensor.data == data
+    assert tensor.data.tolist() == data
     assert tensor.shape == shape
     assert tensor._rank == rank
     assert tensor._strides == strides
@@ -90,7 +93,7 @@ def test_tensor_with_iterable(tensor_data):
     tensor = Tensor.with_list(data, shape)
     assert tensor._rank == rank
     assert tensor._strides == strides
-    assert tensor.data == expected_raw_data
+    assert tensor.data.tolist() == expected_raw_data
     assert tensor.shape == shape
 
 
@@ -104,7 +107,7 @@ def test_tensor_with_zeros():
     shape = (2, 3)
     tensor = Tensor.with_zeros(shape)
     expected_data = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
-    assert tensor.data == expected_data
+    assert tensor.data.tolist() == expected_data
     assert tensor.shape == shape
     assert tensor._rank == 2
     assert tensor._strides == [3, 1]
@@ -124,6 +127,90 @@ def test_tensor_with_uniform(shape, uniform_range):
                for value in tensor.data)
 
 
+def test_tensor_with_uniform_is_reproducible():
+    a = Tensor.with_uniform((4, 5), (-1.0, 1.0), generator=Generator(7))
+    b = Tensor.with_uniform((4, 5), (-1.0, 1.0), generator=Generator(7))
+    c = Tensor.with_uniform((4, 5), (-1.0, 1.0), generator=Generator(8))
+    assert a == b
+    assert a != c
+
+
+def test_tensor_with_normal():
+    tensor = Tensor.with_normal((100, 100), 2.0, 0.5, DType.FLOAT32,
+                                Generator(0))
+    values = tensor.data.tolist()
+    mean = sum(values) / len(values)
+    std = math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+    assert tensor.dtype == DType.FLOAT32
+    assert tensor.shape == (100, 100)
+    assert mean == pytest.approx(2.0, abs=0.02)
+    assert std == pytest.approx(0.5, abs=0.02)
+
+
+def test_tensor_full():
+    tensor = Tensor.full((2, 3), 7, DType.INT32)
+    assert tensor.data.tolist() == [7] * 6
+    assert tensor.dtype == DType.INT32
+
+
+@pytest.mark.parametrize("args, expected, dtype", [
+    ((4,), [0, 1, 2, 3], DType.INT32),
+    ((2, 8, 3), [2, 5], DType.INT32),
+    ((3, 0, -1), [3, 2, 1], DType.INT32),
+    ((0.0, 1.0, 0.25), [0.0, 0.25, 0.5, 0.75], DType.FLOAT64),
+    ((5, 2), [], DType.INT32),
+])
+def test_tensor_arange(args, expected, dtype):
+    tensor = Tensor.arange(*args)
+    assert tensor.data.tolist() == expected
+    assert tensor.shape == (len(expected),)
+    assert tensor.dtype == dtype
+
+
+def test_tensor_arange_zero_step():
+    with pytest.raises(ValueError):
+        Tensor.arange(0, 3, 0)
+
+
+@pytest.mark.parametrize("n, m, expected", [
+    (2, None, [[1.0, 0.0], [0.0, 1.0]]),
+    (2, 3, [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]]),
+    (3, 2, [[1.0, 0.0], [0.0, 1.0], [0.0, 0.0]]),
+])
+def test_tensor_eye(n, m, expected):
+    tensor = Tensor.eye(n, m)
+    assert tensor == Tensor.with_list(expected, (n, m or n))
+
+
+def test_tensor_with_list_trailing_dims():
+    tensor = Tensor.with_list([[1, 2, 3, 4], [5, 6, 7, 8]], (2, 2, 2))
+    assert tensor.data.tolist() == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0]
+
+
+@pytest.mark.parametrize("data", [
+    (0.0, 1.0, 2.0, 3.0),
+    range(4),
+    array.array("i", range(4)),
+    [(0, 1), range(2, 4)],
+    ((0.0, 1.0), [2.0, 3.0]),
+], ids=["tuple", "range", "array", "nested_tuple", "tuple_of_lists"])
+def test_tensor_with_list_takes_sequences(data):
+    tensor = Tensor.with_list(data, (2, 2))
+    assert tensor.data.tolist() == [0.0, 1.0, 2.0, 3.0]
+
+
+@pytest.mark.parametrize("data, shape", [
+    ([1.0, 2.0, 3.0], (2, 2)),
+    ([[1.0, 2.0], [3.0]], (2, 2)),
+    ([[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]], (2, 2)),
+    ([[1.0, 2.0], 3.0], (2, 2)),
+    ([[1.0, 2.0]], (2,)),
+], ids=["flat", "ragged", "rows", "mixed", "too_deep"])
+def test_tensor_with_list_validates_shape(data, shape):
+    with pytest.raises(ValueError):
+        Tensor.with_list(data, shape)
+
+
 @pytest.mark.parametrize("initial_shape, new_shape, old_index, new_index", [
     ((2, 3), (3, 2), (0, 2), (1, 0)),
     ((3, 3), (1, 9), (1, 1), (0, 4)),
@@ -155,9 +242,10 @@ def test_tensor_matmul(a_data, a_shape, b_data, b_shape, expected_data, expected
     a = Tensor(a_data, a_shape)
     b = Tensor(b_data, b_shape)
     result = a @ b
-    assert result.data == expected_data
+    assert result.data.tolist() == expected_data
     assert result.shape == expected_shape
 
+
 @pytest.mark.parametrize("a_data, a_shape, b_data, b_shape, expected_data, expected_shape", [
     ([1, 2, 3, 4], (2, 2), [5, 6, 7, 8], (2, 2), [6, 8, 10, 12], (2, 2)),
     ([1, 2, 3], (3,), [4, 5, 6], (3,), [5, 7, 9], (3,)),
@@ -167,5 +255,254 @@ def test_tensor_matadd(a_data, a_shape, b_data, b_shape, expected_data, expected
     a = Tensor(a_data, a_shape)
     b = Tensor(b_data, b_shape)
     result = a + b
-    assert result.data == expected_data
+    assert result.data.tolist() == expected_data
     assert result.shape == expected_shape
+
+
+@pytest.mark.parametrize("dtype, itemsize", [
+    (DType.FLOAT32, 4),
+    (DType.FLOAT64, 8),
+    (DType.INT32, 4),
+])
+def test_tensor_dtype_storage(dtype, itemsize):
+    tensor = Tensor.with_zeros((2, 3), dtype)
+    assert tensor.dtype == dtype
+    assert isinstance(tensor.data, array.array)
+    assert tensor.data.typecode == dtype.typecode
+    assert tensor.data.itemsize == itemsize
+    assert len(tensor.data) == 6
+
+
+def test_tensor_adopts_matching_buffer():
+    data = array.array("f", [1.0, 2.0, 3.0, 4.0])
+    tensor = Tensor(data, (2, 2))
+    assert tensor.dtype == DType.FLOAT32
+    assert tensor.data is data
+
+    converted = Tensor(data, (2, 2), DType.FLOAT64)
+    assert converted.dtype == DType.FLOAT64
+    assert converted.data is not data
+    assert converted.data.tolist() == data.tolist()
+
+
+def test_tensor_buffer_protocol():
+    tensor = Tensor.with_list([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]], (2, 3),
+                              DType.FLOAT32)
+    view = memoryview(tensor)
+    assert view.format == "f"
+    assert view.shape == (2, 3)
+    assert view.tolist() == [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]
+
+    # Views share the tensor storage
+    view[1, 2] = 9.0
+    assert tensor[1, 2] == 9.0
+
+
+def test_tensor_matmul_promotes_dtype():
+    a = Tensor.with_list([[1, 2], [3, 4]], (2, 2), DType.INT32)
+    b = Tensor.with_list([[0.5, 0.0], [0.0, 0.5]], (2, 2), DType.FLOAT32)
+    assert (a @ a).dtype == DType.INT32
+    assert (a @ a).data.tolist() == [7, 10, 15, 22]
+    assert (a @ b).dtype == DType.FLOAT32
+    assert (a @ b).data.tolist() == [0.5, 1.0, 1.5, 2.0]
+
+
+def _arange(shape):
+    return Tensor.with_list([float(i) for i in range(math.prod(shape))],
+                            shape)
+
+
+def test_tensor_transpose_is_view():
+    tensor = _arange((2, 3))
+    transposed = tensor.transpose()
+    assert transposed.shape == (3, 2)
+    assert transposed.strides == (1, 3)
+    assert transposed.data is tensor.data
+    assert not transposed.is_contiguous()
+    assert transposed[2, 1] == tensor[1, 2]
+    assert tensor.T == transposed
+
+    transposed[0, 1] = -1.0
+    assert tensor[1, 0] == -1.0
+
+
+def test_tensor_permute():
+    tensor = _arange((2, 3, 4))
+    permuted = tensor.permute(2, 0, 1)
+    assert permuted.shape == (4, 2, 3)
+    assert permuted.data is tensor.data
+    for i, j, k in [(0, 0, 0), (3, 1, 2), (1, 0, 2)]:
+        assert permuted[i, j, k] == tensor[j, k, i]
+
+    with pytest.raises(ValueError):
+        tensor.permute(0, 0, 1)
+
+
+@pytest.mark.parametrize("key, expected_shape, expected_values", [
+    ((1,), (4,), [4.0, 5.0, 6.0, 7.0]),
+    ((slice(None), 1), (3,), [1.0, 5.0, 9.0]),
+    ((slice(1, 3), slice(None, None, 2)), (2, 2), [4.0, 6.0, 8.0, 10.0]),
+    ((-1, slice(1, None)), (3,), [9.0, 10.0, 11.0]),
+    ((slice(0, 0),), (0, 4), []),
+])
+def test_tensor_slicing(key, expected_shape, expected_values):
+    tensor = _arange((3, 4))
+    view = tensor[key]
+    assert view.shape == expected_shape
+    assert view.data is tensor.data
+    assert view == Tensor(expected_values, expected_shape)
+
+
+def test_tensor_slice_assignment():
+    tensor = _arange((3, 4))
+    tensor[:, 0] = 0.0
+    tensor[1] = Tensor.with_list([1.0, 1.0, 1.0, 1.0], (4,))
+    assert tensor.data.tolist() == [0.0, 1.0, 2.0, 3.0,
+                                    1.0, 1.0, 1.0, 1.0,
+                                    0.0, 9.0, 10.0, 11.0]
+
+
+def test_tensor_index_out_of_bounds():
+    tensor = _arange((2, 2))
+    with pytest.raises(IndexError):
+        tensor[2, 0]
+    with pytest.raises(IndexError):
+        tensor[0, 0, 0]
+    # A view must not reach into the elements of its parent
+    with pytest.raises(IndexError):
+        tensor[0][2]
+
+
+def test_tensor_expand():
+    bias = Tensor.with_list([1.0, 2.0, 3.0], (3,))
+    expanded = bias.expand((4, 3))
+    assert expanded.shape == (4, 3)
+    assert expanded.strides == (0, 1)
+    assert expanded.data is bias.data
+    assert expanded[3, 2] == 3.0
+
+    column = Tensor.with_list([1.0, 2.0], (2, 1)).expand((2, 3))
+    assert column.contiguous().data.tolist() == [1.0, 1.0, 1.0,
+                                                 2.0, 2.0, 2.0]
+    with pytest.raises(ValueError):
+        bias.expand((4, 2))
+
+
+def test_tensor_contiguous_copies_only_when_needed():
+    tensor = _arange((2, 3))
+    assert tensor.contiguous() is tensor
+    assert tensor[1].is_contiguous()
+    assert tensor[1].contiguous() is not None
+
+    copy = tensor.T.contiguous()
+    assert copy.is_contiguous()
+    assert copy.data is not tensor.data
+    assert copy.data.tolist() == [0.0, 3.0, 1.0, 4.0, 2.0, 5.0]
+
+
+def test_tensor_reshape_is_view():
+    tensor = _arange((2, 3))
+    reshaped = tensor.reshape((3, -1))
+    assert reshaped.shape == (3, 2)
+    assert reshaped.data is tensor.data
+    assert tensor.shape == (2, 3)
+
+    # Non-contiguous tensors are copied before reshaping
+    flat = tensor.T.reshape((6,))
+    assert flat.data is not tensor.data
+    assert flat.data.tolist() == [0.0, 3.0, 1.0, 4.0, 2.0, 5.0]
+
+
+def test_tensor_matmul_with_views():
+    a = _arange((3, 2))
+    b = _arange((3, 4))
+    expected = Tensor.with_list([[40.0, 46.0, 52.0, 58.0],
+                                 [52.0, 61.0, 70.0, 79.0]], (2, 4))
+    assert a.T @ b == expected
+    assert a.T.contiguous() @ b == expected
+    assert a.T @ b.T.contiguous().T == expected
+
+
+@pytest.mark.parametrize("shape, key, expected", [
+    ((5,), 3, 3.0),
+    ((5,), -1, 4.0),
+    ((3, 4), (2, -1), 11.0),
+    ((2, 3, 4), (1, -2, 3), 19.0),
+    ((2, 2, 2, 2), (1, 0, 1, 0), 10.0),
+])
+def test_tensor_element_access_by_rank(shape, key, expected):
+    tensor = _arange(shape)
+    assert tensor[key] == expected
+    tensor[key] = -1.0
+    assert tensor[key] == -1.0
+    # Views go through the same path with their own strides and offset
+    assert _arange((4, 6))[1:, ::2].T[2, 1] == 16.0
+
+
+def test_tensor_take():
+    tensor = _arange((3, 4))
+    assert tensor.take([0, 5, -1]).data.tolist() == [0.0, 5.0, 11.0]
+    # Logical order, also for views
+    assert tensor.T.take([1, 3]).data.tolist() == [4.0, 1.0]
+
+    index = Tensor.with_list([[2, 0], [0, 0]], (2, 2), DType.INT32)
+    rows = tensor.take(index, axis=0)
+    assert rows.shape == (2, 2, 4)
+    assert rows[0, 0]._values().tolist() == [8.0, 9.0, 10.0, 11.0]
+    columns = tensor[1:].take([3, 1], axis=-1)
+    assert columns.shape == (2, 2)
+    assert columns.data.tolist() == [7.0, 5.0, 11.0, 9.0]
+
+    with pytest.raises(IndexError):
+        tensor.take([12])
+    with pytest.raises(IndexError):
+        tensor.take([0], axis=2)
+    with pytest.raises(TypeError):
+        tensor.take(Tensor.with_list([1.0], (1,)))
+    with pytest.raises(TypeError):
+        tensor.take([0.5])
+
+
+def test_tensor_put():
+    tensor = Tensor.with_zeros((2, 3))
+    tensor.put([0, -1], Tensor.with_list([1.0, 2.0], (2,)))
+    assert tensor.data.tolist() == [1.0, 0.0, 0.0, 0.0, 0.0, 2.0]
+    tensor.put([1, 1, 0], 1.0, accumulate=True)
+    assert tensor.data.tolist() == [2.0, 2.0, 0.0, 0.0, 0.0, 2.0]
+
+    transposed = Tensor.with_zeros((3, 2)).T
+    transposed.put([1], 5.0)
+    assert transposed[0, 1] == 5.0
+    with pytest.raises(ValueError):
+        tensor.put([0, 1], Tensor.with_list([1.0], (1,)))
+
+
+def test_tensor_gather_and_scatter():
+    scores = _arange((3, 4))
+    targets = Tensor.with_list([[1], [3], [0]], (3, 1), DType.INT32)
+    picked = scores.gather(1, targets)
+    assert picked.shape == (3, 1)
+    assert picked.data.tolist() == [1.0, 7.0, 8.0]
+    assert scores.gather(0, Tensor.with_list([[2, 0, 1, -1]], (1, 4),
+                                             DType.INT32)).data.tolist() \
+        == [8.0, 1.0, 6.0, 11.0]
+
+    one_hot = Tensor.with_zeros((3, 4))
+    one_hot.scatter(1, targets, 1.0)
+    assert one_hot.data.tolist() == [0.0, 1.0, 0.0, 0.0,
+                                     0.0, 0.0, 0.0, 1.0,
+                                     1.0, 0.0, 0.0, 0.0]
+    counts = Tensor.with_zeros((1, 2))
+    counts.scatter(1, Tensor.with_list([[1, 1, 0]], (1, 3), DType.INT32),
+                   Tensor.with_list([[1.0, 2.0, 4.0]], (1, 3)),
+                   accumulate=True)
+    assert counts.data.tolist() == [4.0, 3.0]
+
+    with pytest.raises(ValueError):
+        scores.gather(1, Tensor.with_list([1, 2], (2,), DType.INT32))
+    with pytest.raises(ValueError):
+        scores.gather(1, Tensor.with_list([0] * 4, (4, 1), DType.INT32))
+    with pytest.raises(IndexError):
+        scores.gather(1, Tensor.with_list([[4]], (1, 1), DType.INT32))
+    with pytest.raises(ValueError):
+        one_hot.scatter(1, targets, Tensor.with_zeros((1, 3)))
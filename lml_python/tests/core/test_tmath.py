@@ -1,6 +1,36 @@
+import itertools
+import math
 import pytest
+import tracemalloc
 from lml_python.core.tensor import Tensor
-from lml_python.core.tmath import matmul, matadd
+from lml_python.core.dtype import DType
+from lml_python.core.tmath import (
+    argmax,
+    argmin,
+    cross_entropy,
+    log_softmax,
+    softmax,
+    tmax,
+    tmean,
+    tmin,
+    tsum,
+    matmul,
+    matadd,
+    matsub,
+    hadamard,
+    matdiv,
+    relu,
+    tanh,
+    sigmoid,
+    fused,
+    linear,
+    tdot,
+)
+from lml_python.core.python_backend import (
+    _matmul_packed,
+    _matmul_ikj,
+    _matmul_generic,
+)
 
 
 @pytest.mark.parametrize("a, b, expected", [
@@ -22,6 +52,105 @@ def test_matmul(a, b, expected):
     assert expected == matmul(a, b, out)
     assert expected == out
     assert expected == matmul(a, b)
+    assert expected == matmul(a, b, pack_b=False)
+
+
+def test_matmul_overwrites_out():
+    a = Tensor.with_list([[1.0, 2.0], [3.0, 4.0]], (2, 2))
+    out = Tensor.with_list([[9.0, 9.0], [9.0, 9.0]], (2, 2))
+    assert matmul(a, a, out).data.tolist() == [7.0, 10.0, 15.0, 22.0]
+
+
+def _seq(shape, start=0.0):
+    n = math.prod(shape)
+    return Tensor.with_list([start + i for i in range(n)], shape)
+
+
+@pytest.mark.parametrize("a_shape, b_shape", [
+    ((3, 2, 4), (3, 4, 5)),
+    ((2, 1, 3, 4), (5, 4, 2)),
+    ((4, 3, 2), (2, 5)),
+    ((3, 2), (4, 2, 3)),
+])
+def test_batched_matmul_matches_per_batch_matmul(a_shape, b_shape):
+    a = _seq(a_shape)
+    b = _seq(b_shape, 1.0)
+    result = matmul(a, b)
+
+    batch = result.shape[:-2]
+    assert result.shape == (*batch, a_shape[-2], b_shape[-1])
+    for idx in itertools.product(*map(range, batch)):
+        a_idx = tuple(i if d > 1 else 0
+                      for i, d in zip(idx[len(idx) - a.rank + 2:],
+                                      a.shape[:-2]))
+        b_idx = tuple(i if d > 1 else 0
+                      for i, d in zip(idx[len(idx) - b.rank + 2:],
+                                      b.shape[:-2]))
+        assert result[idx] == matmul(a[a_idx] if a_idx else a,
+                                     b[b_idx] if b_idx else b)
+
+
+def test_batched_matmul_errors():
+    with pytest.raises(ValueError):
+        matmul(_seq((2, 3, 4)), _seq((3, 4, 5)))
+    with pytest.raises(ValueError):
+        matmul(_seq((3,)), _seq((3, 2)))
+    with pytest.raises(ValueError):
+        matmul(_seq((2, 3, 4)), _seq((2, 4, 5)), Tensor.with_zeros((3, 5)))
+
+
+def test_tdot():
+    a = _seq((3, 4, 5))
+    b = _seq((4, 5, 2))
+    result = tdot(a, b)
+    assert result.shape == (3, 2)
+    expected = matmul(a.reshape((3, 20)), b.reshape((20, 2)))
+    assert result == expected
+
+    # Axes out of order, on a transposed operand
+    c = b.permute(1, 0, 2)
+    assert tdot(a, c, ([2, 1], [0, 1])) == expected
+
+    # Strided output
+    out = Tensor.with_zeros((2, 3))
+    tdot(a, b, out=out.T)
+    assert out == expected.T.contiguous()
+
+    # Output whose free axes cannot be merged into a matrix
+    d, e = _seq((2, 3, 4)), _seq((4, 2))
+    out = Tensor.with_zeros((2, 2, 3)).permute(0, 2, 1)
+    assert tdot(d, e, 1, out=out) is out
+    assert out == tdot(d, e, 1)
+
+    assert tdot(_seq((2,)), _seq((3,)), 0) == matmul(
+        _seq((2, 1)), _seq((1, 3)))
+    with pytest.raises(ValueError):
+        tdot(a, b, ([0], [0]))
+    with pytest.raises(ValueError):
+        tdot(a, b, 4)
+    with pytest.raises(IndexError):
+        tdot(a, b, ([3], [0]))
+    with pytest.raises(IndexError):
+        tdot(a, b, ([0], [-4]))
+
+
+@pytest.mark.parametrize("kernel", [_matmul_packed, _matmul_ikj],
+                         ids=["packed", "ikj"])
+@pytest.mark.parametrize("m, k, n, dtype", [
+    (1, 1, 1, DType.FLOAT64),
+    (3, 5, 2, DType.FLOAT64),
+    (7, 4, 9, DType.FLOAT32),
+    (4, 6, 3, DType.INT32),
+])
+def test_matmul_kernels_match_generic(kernel, m, k, n, dtype):
+    a = Tensor.with_list([(i % 5) - 2 for i in range(m * k)], (m, k), dtype)
+    b = Tensor.with_list([(i % 3) + 1 for i in range(k * n)], (k, n), dtype)
+    expected = Tensor.with_zeros((m, n), dtype)
+    _matmul_generic(a, b, expected)
+
+    out = Tensor.with_zeros((m, n), dtype)
+    kernel(a, b, out)
+    assert out == expected
 
 
 @pytest.mark.parametrize("a, b, expected", [
@@ -41,3 +170,252 @@ def test_addition(a, b, expected):
     assert expected == matadd(b, a)
     assert expected == matadd(a, b, out)
     assert expected == out
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    (Tensor.with_list([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]], (2, 3)),
+     Tensor.with_list([10.0, 20.0, 30.0], (3,)),
+     Tensor.with_list([[11.0, 22.0, 33.0], [14.0, 25.0, 36.0]], (2, 3))),
+    (Tensor.with_list([[1.0], [2.0]], (2, 1)),
+     Tensor.with_list([10.0, 20.0, 30.0], (3,)),
+     Tensor.with_list([[11.0, 21.0, 31.0], [12.0, 22.0, 32.0]], (2, 3))),
+    (Tensor.with_list([[1.0, 2.0]], (1, 2)),
+     Tensor.with_list([[[1.0], [2.0]], [[3.0], [4.0]]], (2, 2, 1)),
+     Tensor.with_list([[[2.0, 3.0], [3.0, 4.0]], [[4.0, 5.0], [5.0, 6.0]]],
+                      (2, 2, 2))),
+    (Tensor.with_list([[1.0, 2.0], [3.0, 4.0]], (2, 2)),
+     0.5,
+     Tensor.with_list([[1.5, 2.5], [3.5, 4.5]], (2, 2))),
+])
+def test_addition_broadcast(a, b, expected):
+    assert expected == matadd(a, b)
+    assert expected == matadd(b, a)
+    out = Tensor.with_zeros(expected.shape)
+    assert matadd(a, b, out) is out
+    assert expected == out
+
+
+def test_elementwise_ops():
+    a = Tensor.with_list([[2.0, 4.0], [6.0, 8.0]], (2, 2))
+    b = Tensor.with_list([1.0, 2.0], (2,))
+    assert matsub(a, b) == Tensor.with_list([[1.0, 2.0], [5.0, 6.0]], (2, 2))
+    assert hadamard(a, b) == Tensor.with_list([[2.0, 8.0], [6.0, 16.0]],
+                                              (2, 2))
+    assert matdiv(a, b) == Tensor.with_list([[2.0, 2.0], [6.0, 4.0]], (2, 2))
+    assert 1.0 - b == Tensor.with_list([0.0, -1.0], (2,))
+    assert 8.0 / b == Tensor.with_list([8.0, 4.0], (2,))
+    assert -(b * 3) == Tensor.with_list([-3.0, -6.0], (2,))
+
+
+def test_elementwise_dtypes():
+    ints = Tensor.with_list([1, 2, 3], (3,), DType.INT32)
+    assert (ints + ints).dtype == DType.INT32
+    assert (ints + 1).dtype == DType.INT32
+    assert (ints + 0.5).dtype == DType.FLOAT64
+    assert (ints / ints).dtype == DType.FLOAT64
+    floats = Tensor.with_list([1.0, 2.0, 3.0], (3,), DType.FLOAT32)
+    assert (ints * floats).dtype == DType.FLOAT32
+
+
+def test_elementwise_strided_operands():
+    a = Tensor.with_list([float(i) for i in range(12)], (3, 4))
+    assert matadd(a.T, a.T) == hadamard(a, 2.0).T.contiguous()
+    out = Tensor.with_zeros((4, 4))
+    matadd(a[:, ::2], 1.0, out[1:, 1:3])
+    assert out[1:, 1:3] == Tensor.with_list([[1.0, 3.0], [5.0, 7.0],
+                                             [9.0, 11.0]], (3, 2))
+    assert out[0] == Tensor.with_zeros((4,))
+
+
+def test_elementwise_shape_mismatch():
+    with pytest.raises(ValueError):
+        matadd(Tensor.with_zeros((2, 3)), Tensor.with_zeros((2,)))
+    with pytest.raises(ValueError):
+        matadd(Tensor.with_zeros((2, 3)), Tensor.with_zeros((3,)),
+               Tensor.with_zeros((3,)))
+    with pytest.raises(TypeError):
+        matadd(1.0, 2.0)
+
+
+def test_bias_add_allocates_only_output():
+    x = Tensor.with_uniform((4096, 16), (-1.0, 1.0))
+    bias = Tensor.with_uniform((16,), (-1.0, 1.0))
+    out_bytes = 4096 * 16 * x.dtype.itemsize
+
+    tracemalloc.start()
+    try:
+        result = matadd(x, bias)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert result[4095, 15] == x[4095, 15] + bias[15]
+    assert peak < 1.25 * out_bytes
+
+
+def test_activations():
+    a = Tensor.with_list([-2.0, -0.5, 0.0, 0.5, 2.0], (5,))
+    assert relu(a).data.tolist() == [0.0, 0.0, 0.0, 0.5, 2.0]
+    assert tanh(a).data.tolist() == pytest.approx(
+        [math.tanh(v) for v in a.data])
+    assert sigmoid(a).data.tolist() == pytest.approx(
+        [1.0 / (1.0 + math.exp(-v)) for v in a.data])
+    # Large magnitudes must not overflow
+    extremes = sigmoid(Tensor.with_list([-1000.0, 1000.0], (2,)))
+    assert extremes.data.tolist() == [0.0, 1.0]
+
+    ints = Tensor.with_list([-1, 2], (2,), DType.INT32)
+    assert relu(ints).dtype == DType.INT32
+    assert sigmoid(ints).dtype == DType.FLOAT64
+
+
+def test_activation_in_place():
+    a = Tensor.with_list([[-1.0, 2.0], [3.0, -4.0]], (2, 2))
+    assert relu(a, a) is a
+    assert a.data.tolist() == [0.0, 2.0, 3.0, 0.0]
+
+
+def test_fused_matches_unfused():
+    x = Tensor.with_list([[-1.0, 2.0, -3.0], [4.0, -5.0, 6.0]], (2, 3))
+    scale = Tensor.with_list([2.0, 0.5, 1.0], (3,))
+    shift = Tensor.with_list([[1.0], [-1.0]], (2, 1))
+
+    expected = relu(matadd(hadamard(x, scale), shift))
+    assert fused(x, ("mul", scale), ("add", shift), "relu") == expected
+
+    out = Tensor.with_zeros((2, 3))
+    assert fused(x, ("sub", 1.0), "neg", out=out) is out
+    assert out == -(x - 1.0)
+    assert fused(x) == x
+
+
+def test_fused_rejects_unknown_ops():
+    x = Tensor.with_zeros((2,))
+    with pytest.raises(ValueError):
+        fused(x, "softplus")
+    with pytest.raises(ValueError):
+        fused(x, ("relu", 1.0))
+
+
+@pytest.mark.parametrize("activation", [None, "relu", "tanh", "sigmoid"])
+def test_linear_matches_unfused(activation):
+    x = Tensor.with_list([[1.0, -2.0, 3.0], [-4.0, 5.0, -6.0]], (2, 3))
+    w = Tensor.with_list([[0.5, -1.0], [1.0, 0.25], [-0.5, 1.0]], (3, 2))
+    b = Tensor.with_list([0.1, -0.2], (2,))
+
+    expected = matadd(matmul(x, w), b)
+    if activation is not None:
+        expected = fused(expected, activation)
+    result = linear(x, w, b, activation)
+    assert result.data.tolist() == pytest.approx(expected.data.tolist())
+    assert linear(x, w).data.tolist() == pytest.approx(
+        matmul(x, w).data.tolist())
+
+
+def test_linear_validation():
+    x = Tensor.with_zeros((2, 3))
+    w = Tensor.with_zeros((3, 4))
+    with pytest.raises(ValueError):
+        linear(x, w, Tensor.with_zeros((3,)))
+    with pytest.raises(ValueError):
+        linear(x, w, activation="softmax")
+    with pytest.raises(ValueError):
+        linear(x, Tensor.with_zeros((2, 4)))
+
+
+def test_reductions_over_axes():
+    t = _seq((2, 3, 4))
+    assert tsum(t)[()] == sum(range(24))
+    assert tsum(t, axis=2)._values().tolist() == [
+        sum(range(i, i + 4)) for i in range(0, 24, 4)]
+    assert tsum(t, axis=(0, 2)).shape == (3,)
+    assert tsum(t, axis=(0, 2))._values().tolist() == [
+        sum(t[i, j, k] for i in range(2) for k in range(4))
+        for j in range(3)]
+    assert tsum(t, axis=-1, keepdims=True).shape == (2, 3, 1)
+    assert tsum(t, keepdims=True).shape == (1, 1, 1)
+    assert tmean(t, axis=0)._values().tolist() == [
+        i + 6.0 for i in range(12)]
+    assert tmax(t, axis=1)._values().tolist() == [
+        8.0, 9.0, 10.0, 11.0, 20.0, 21.0, 22.0, 23.0]
+    assert tmin(t)[()] == 0.0
+    # Strided views reduce without being copied first
+    assert tsum(t.T, axis=0)._values().tolist() == [
+        sum(t[j, i, k] for k in range(4)) for i in range(3)
+        for j in range(2)]
+
+
+def test_argmax_argmin():
+    t = Tensor.with_list([[1.0, 5.0, 5.0], [7.0, -1.0, 2.0]], (2, 3))
+    # Ties resolve to the first position
+    assert argmax(t, axis=1)._values().tolist() == [1, 0]
+    assert argmax(t, axis=1).dtype == DType.INT32
+    assert argmin(t, axis=0)._values().tolist() == [0, 1, 1]
+    assert argmax(t)[()] == 3
+    assert argmax(t.T)[()] == 1
+    assert argmax(t, axis=0, keepdims=True).shape == (1, 3)
+    with pytest.raises(TypeError):
+        argmax(t, axis=(0, 1))
+
+    # Memoryview storage, as used by loaded checkpoints and shared tensors
+    view = Tensor(memoryview(t.data), t.shape)
+    assert isinstance(view.data, memoryview)
+    assert argmax(view, axis=1)._values().tolist() == [1, 0]
+    assert argmin(view.T, axis=1)._values().tolist() == [0, 1, 1]
+
+
+def test_reduction_validation():
+    t = Tensor.with_zeros((2, 3))
+    with pytest.raises(IndexError):
+        tsum(t, axis=2)
+    with pytest.raises(ValueError):
+        tsum(t, axis=(1, -1))
+    with pytest.raises(ValueError):
+        tmax(Tensor.with_zeros((2, 0)), axis=1)
+    with pytest.raises(ValueError):
+        tmean(Tensor.with_zeros((0,)))
+    assert tsum(Tensor.with_zeros((2, 0)), axis=1)._values().tolist() == [
+        0.0, 0.0]
+
+
+def test_float32_sum_stays_accurate():
+    # Naive float32 accumulation stalls once the sum dwarfs the terms
+    n = 1 << 20
+    t = Tensor.with_list([0.1] * n, (n,), DType.FLOAT32)
+    expected = n * t[0]
+    assert tsum(t)[()] == pytest.approx(expected, rel=1e-6)
+    assert tmean(t.reshape((1024, 1024)), axis=0)[0] == pytest.approx(
+        t[0], rel=1e-6)
+
+
+def test_softmax_is_stable():
+    t = Tensor.with_list([[1000.0, 1001.0, 1002.0], [-1e4, 0.0, 0.0]], (2, 3))
+    p = softmax(t)
+    e = [math.exp(-2), math.exp(-1), 1.0]
+    assert p._values().tolist()[:3] == pytest.approx([x / sum(e) for x in e])
+    assert p._values().tolist()[3:] == pytest.approx([0.0, 0.5, 0.5])
+    logp = log_softmax(t)
+    # Stays finite where log(softmax) would underflow to -inf
+    assert logp[1, 0] == pytest.approx(-1e4 - math.log(2))
+    assert tsum(softmax(t, axis=0), axis=0)._values().tolist() == \
+        pytest.approx([1.0, 1.0, 1.0])
+    assert softmax(Tensor.with_list([1, 1], (2,), DType.INT32)).dtype == \
+        DType.FLOAT64
+
+
+def test_cross_entropy():
+    logits = Tensor.with_list([[2.0, 0.5, -1.0], [0.0, 0.0, 3.0]], (2, 3))
+    target = [0, 2]
+    expected = [-log_softmax(logits)[i, c] for i, c in enumerate(target)]
+    assert cross_entropy(logits, target)[()] == pytest.approx(
+        sum(expected) / 2)
+    assert cross_entropy(logits, target, "sum")[()] == pytest.approx(
+        sum(expected))
+    assert cross_entropy(
+        logits, Tensor.with_list(target, (2,), DType.INT32),
+        "none")._values().tolist() == pytest.approx(expected)
+    with pytest.raises(IndexError):
+        cross_entropy(logits, [0, 3])
+    with pytest.raises(ValueError):
+        cross_entropy(logits, target, "max")
+    with pytest.raises(ValueError):
+        cross_entropy(Tensor.with_zeros((3,)), [0])
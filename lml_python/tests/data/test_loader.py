@@ -0,0 +1,127 @@
+import threading
+import pytest
+from lml_python.core.dtype import DType
+from lml_python.core.memory import TensorPool
+from lml_python.core.tensor import Tensor
+from lml_python.data.dataset import IDataset, TensorDataset
+from lml_python.data.loader import DataLoader
+
+
+def _dataset(n=10):
+    x = Tensor.with_list([[float(i), float(-i)] for i in range(n)], (n, 2))
+    y = Tensor.with_list(list(range(n)), (n,), DType.INT32)
+    return TensorDataset(x, y)
+
+
+class _Squares(IDataset):
+    # Builds every sample on access, like a dataset reading from disk
+    def __init__(self, n):
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        return (Tensor.with_list([float(index), float(index ** 2)], (2,)),
+                float(index))
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_batches_in_order(prefetch):
+    loader = DataLoader(_dataset(), batch_size=4, prefetch=prefetch)
+    batches = list(loader)
+    assert len(loader) == len(batches) == 3
+    xb, yb = batches[0]
+    assert xb.shape == (4, 2) and yb.shape == (4,)
+    assert yb.dtype == DType.INT32
+    assert xb.data.tolist() == [0.0, -0.0, 1.0, -1.0, 2.0, -2.0, 3.0, -3.0]
+    assert batches[-1][1].data.tolist() == [8, 9]
+    assert not xb.requires_grad
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_batch_dtypes_follow_the_dataset_tensors(prefetch):
+    x = Tensor.with_list([float(i) for i in range(6)], (6,), DType.FLOAT32)
+    y = Tensor.with_list([i - 3 for i in range(6)], (6,), DType.INT8)
+    dataset = TensorDataset(x, y)
+    assert dataset.fields() == [((), DType.FLOAT32), ((), DType.INT8)]
+    (xb, yb), _ = DataLoader(dataset, batch_size=3, prefetch=prefetch)
+    assert xb.dtype == DType.FLOAT32 and yb.dtype == DType.INT8
+    assert xb.data.tolist() == [0.0, 1.0, 2.0]
+    assert yb.data.tolist() == [-3, -2, -1]
+
+
+def test_drop_last_and_generic_dataset():
+    loader = DataLoader(_Squares(7), batch_size=3, drop_last=True)
+    batches = list(loader)
+    assert len(loader) == len(batches) == 2
+    features, targets = batches[1]
+    assert features.data.tolist() == [3.0, 9.0, 4.0, 16.0, 5.0, 25.0]
+    assert targets.dtype == DType.FLOAT64
+    assert targets.data.tolist() == [3.0, 4.0, 5.0]
+
+
+def test_shuffle_permutes_indices_every_epoch():
+    loader = DataLoader(_dataset(20), batch_size=5, shuffle=True, seed=0)
+    epochs = [[int(v) for _, yb in loader for v in yb.data]
+              for _ in range(2)]
+    for labels in epochs:
+        assert sorted(labels) == list(range(20))
+        assert labels != list(range(20))
+    assert epochs[0] != epochs[1]
+
+    # Features stay paired with their labels
+    xb, yb = next(iter(loader))
+    for row in range(5):
+        assert xb[row, 0] == yb[row]
+
+
+def test_views_and_non_contiguous_sources():
+    x = Tensor.with_list([float(i) for i in range(12)], (2, 6)).T
+    dataset = TensorDataset(x, x[:, 0])
+    (xb, first), = DataLoader(dataset, batch_size=6, prefetch=0)
+    assert xb.data.tolist() == x.contiguous().data.tolist()
+    assert first.data.tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_worker_errors_reach_the_consumer():
+    class Broken(_Squares):
+        def __getitem__(self, index):
+            if index == 5:
+                raise KeyError(index)
+            return super().__getitem__(index)
+
+    batches = iter(DataLoader(Broken(8), batch_size=2))
+    next(batches)
+    with pytest.raises(KeyError):
+        list(batches)
+
+
+def test_stopping_early_ends_the_worker():
+    before = threading.active_count()
+    loader = DataLoader(_dataset(100), batch_size=1, prefetch=1)
+    for i, _ in enumerate(loader):
+        if i == 2:
+            break
+    assert threading.active_count() == before
+
+
+def test_batches_come_from_the_active_pool():
+    pool = TensorPool()
+    loader = DataLoader(_dataset(8), batch_size=4)
+    with pool:
+        for _ in range(3):
+            for batch in loader:
+                del batch
+    # Storage of dropped batches is reused by later ones
+    assert pool.stats().hits > 0
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        DataLoader(_dataset(), batch_size=0)
+    with pytest.raises(ValueError):
+        TensorDataset(Tensor.with_zeros((2, 2)), Tensor.with_zeros((3,)))
+    with pytest.raises(IndexError):
+        _dataset().collate([10], [Tensor.with_zeros((1, 2)),
+                                  Tensor.with_zeros((1,), DType.INT32)])
@@ -0,0 +1,134 @@
+import math
+import pytest
+from lml_python.core.dtype import DType
+from lml_python.core.layer import Linear, ReLU, Sequential
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import matsub, tmean
+from lml_python.optim.adam import Adam
+from lml_python.optim.sgd import SGD
+
+
+def _param(values, shape, dtype=DType.FLOAT64):
+    t = Tensor.with_list(values, shape, dtype)
+    t.requires_grad = True
+    return t
+
+
+def _grad(p, values):
+    p.grad = Tensor.with_list(values, p.shape, p.dtype)
+
+
+def test_parameters_move_into_one_buffer():
+    a = _param([1.0, 2.0], (2,))
+    b = _param([[3.0], [4.0]], (2, 1))
+    c = _param([5.0], (1,), DType.FLOAT32)
+    optimizer = SGD([a, b, a, c], lr=0.1)
+
+    assert len(optimizer.groups) == 2
+    assert a.data is b.data and a.data is not c.data
+    assert a.data.tolist()[:4] == [1.0, 2.0, 3.0, 4.0]
+    assert b[1, 0] == 4.0 and b.offset == 2
+    assert a.grad.data is b.grad.data
+
+    with pytest.raises(TypeError):
+        SGD([Tensor.with_list([1], (1,), DType.INT32)], lr=0.1)
+    with pytest.raises(ValueError):
+        SGD([], lr=0.1)
+
+
+def test_sgd_step_and_zero_grad():
+    a = _param([1.0, 2.0], (2,))
+    b = _param([3.0], (1,))
+    optimizer = SGD([a, b], lr=0.5)
+    grad = a.grad
+    a.grad.data[:3] = Tensor.with_list([1.0, -2.0, 4.0], (3,)).data
+    optimizer.step()
+    assert a.data.tolist() == [0.5, 3.0, 1.0]
+
+    optimizer.zero_grad()
+    assert a.grad is grad
+    assert a.grad.data.tolist() == [0.0, 0.0, 0.0]
+
+
+def test_zero_grad_clears_overflowed_gradients():
+    a = _param([1.0, 2.0], (2,))
+    optimizer = SGD([a], lr=0.5)
+    a.grad.data[:2] = Tensor.with_list([math.inf, math.nan], (2,)).data
+    optimizer.zero_grad()
+    assert a.grad.data.tolist() == [0.0, 0.0]
+
+
+def test_replaced_gradients_are_picked_up():
+    a = _param([1.0, 2.0], (2,))
+    b = _param([3.0], (1,))
+    optimizer = SGD([a, b], lr=1.0)
+    _grad(a, [1.0, 1.0])
+    b.grad = None
+    optimizer.step()
+    assert a.data.tolist() == [0.0, 1.0, 3.0]
+    assert a.grad.data is b.grad.data
+
+
+def test_sgd_momentum_matches_reference():
+    p = _param([1.0, -1.0], (2,))
+    optimizer = SGD([p], lr=0.1, momentum=0.9)
+    expected, velocity = [1.0, -1.0], [0.0, 0.0]
+    for step in range(3):
+        g = [0.5 * (step + 1), -0.25]
+        _grad(p, g)
+        optimizer.step()
+        velocity = [0.9 * v + gi for v, gi in zip(velocity, g)]
+        expected = [e - 0.1 * v for e, v in zip(expected, velocity)]
+    assert p.data.tolist() == pytest.approx(expected)
+
+    nesterov = _param([1.0], (1,))
+    optimizer = SGD([nesterov], lr=0.1, momentum=0.5, nesterov=True)
+    _grad(nesterov, [2.0])
+    optimizer.step()
+    assert nesterov.data.tolist() == pytest.approx([1.0 - 0.1 * (2 + 1)])
+    with pytest.raises(ValueError):
+        SGD([p], lr=0.1, nesterov=True)
+
+
+def test_adam_matches_reference():
+    p = _param([0.5, -1.5, 2.0], (3,))
+    b1, b2, lr, eps = 0.9, 0.99, 0.01, 1e-8
+    optimizer = Adam([p], lr=lr, betas=(b1, b2), eps=eps)
+    expected = [0.5, -1.5, 2.0]
+    m = [0.0] * 3
+    v = [0.0] * 3
+    for t in range(1, 5):
+        g = [x * t for x in (0.1, -0.3, 0.2)]
+        _grad(p, g)
+        optimizer.step()
+        m = [b1 * mi + (1 - b1) * gi for mi, gi in zip(m, g)]
+        v = [b2 * vi + (1 - b2) * gi * gi for vi, gi in zip(v, g)]
+        expected = [e - lr * (mi / (1 - b1 ** t))
+                    / (math.sqrt(vi / (1 - b2 ** t)) + eps)
+                    for e, mi, vi in zip(expected, m, v)]
+    assert p.data.tolist() == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("make", [
+    lambda params: SGD(params, lr=0.05, momentum=0.9),
+    lambda params: Adam(params, lr=0.05),
+])
+def test_training_reduces_loss(make):
+    model = Sequential(Linear(2, 8), ReLU(), Linear(8, 1))
+    optimizer = make(model.parameters())
+    x = Tensor.with_list([[0.0, 1.0], [1.0, 0.0], [1.0, 1.0], [0.0, 0.0]],
+                         (4, 2))
+    y = Tensor.with_list([[1.0], [1.0], [0.0], [0.0]], (4, 1))
+
+    def loss():
+        diff = matsub(model.forward(x), y)
+        return tmean(diff * diff)
+
+    first = loss()[()]
+    for _ in range(100):
+        optimizer.zero_grad()
+        loss().backward()
+        optimizer.step()
+    assert loss()[()] < first
+    # Layers still see the moved parameters
+    assert model.layers[0]._weights.data is optimizer.groups[0].param.data
@@ -0,0 +1,124 @@
+import pytest
+from lml_python.core.dtype import DType
+from lml_python.core.layer import Linear, ReLU, Sequential
+from lml_python.core.serialization import load_layer, save_layer
+from lml_python.core.tensor import Tensor
+from lml_python.core.tmath import matmul
+from lml_python.quant.calibration import (
+    RangeObserver,
+    calibrate,
+    compare,
+    quantize_model,
+)
+from lml_python.quant.layer import QuantizedLinear
+from lml_python.quant.quantize import (
+    QMAX,
+    dequantize,
+    quantize,
+    quantize_per_channel,
+)
+
+
+def _model():
+    return Sequential(Linear(8, 16, activation="relu"),
+                      Sequential(Linear(16, 16), ReLU()), Linear(16, 4))
+
+
+def _batches(count=4):
+    return [Tensor.with_uniform((5, 8), (-1.0, 1.0)) for _ in range(count)]
+
+
+def test_quantize_rounds_and_saturates():
+    t = Tensor.with_list([0.0, 0.24, 0.26, -1.0, 100.0], (5,))
+    q = quantize(t, 0.5)
+    assert q.dtype == DType.INT8
+    assert q._values().tolist() == [0, 0, 1, -2, QMAX]
+
+
+def test_per_channel_scales():
+    w = Tensor.with_list([[1.0, 0.01], [-2.0, 0.02], [0.5, 0.0]], (3, 2))
+    q, scales = quantize_per_channel(w)
+    assert scales._values().tolist() == pytest.approx([2 / QMAX,
+                                                       0.02 / QMAX])
+    assert q[1, 0] == -QMAX and q[1, 1] == QMAX
+    # Within half a step of each column's own scale, the small column
+    # keeps its precision next to the large one
+    restored = dequantize(q, scales)
+    assert [restored[i, 0] for i in range(3)] == pytest.approx(
+        [1.0, -2.0, 0.5], abs=1 / QMAX)
+    assert [restored[i, 1] for i in range(3)] == pytest.approx(
+        [0.01, 0.02, 0.0], abs=0.01 / QMAX)
+    assert quantize_per_channel(Tensor.with_zeros((2, 2)))[1][0] == 1.0
+
+
+def test_int8_product_accumulates_in_int32():
+    a = Tensor.with_list([[100] * 8], (1, 8), DType.INT8)
+    b = Tensor.with_list([[120]] * 8, (8, 1), DType.INT8)
+    out = matmul(a, b, out=Tensor.empty((1, 1), DType.INT32))
+    assert out[0, 0] == 8 * 100 * 120
+
+
+def test_quantized_linear_matches_float():
+    layer = Linear(8, 4, activation="tanh")
+    qlayer = QuantizedLinear.from_linear(layer)
+    assert qlayer.weights.dtype == DType.INT8
+    x = Tensor.with_uniform((6, 8), (-1.0, 1.0))
+    expected = layer.forward(x)._values().tolist()
+    assert qlayer.forward(x)._values().tolist() == pytest.approx(
+        expected, abs=0.05)
+    # One byte per weight instead of eight, scales and bias add 2 * 8
+    # bytes per output channel
+    assert qlayer.nbytes == 8 * 4 + 2 * 8 * 4
+    with pytest.raises(RuntimeError):
+        qlayer.backward(x)
+
+
+def test_calibration_and_model_conversion():
+    model = _model()
+    batches = _batches()
+    observers = calibrate(model, batches)
+    assert len(observers) == 3
+    assert all(o.batches == 4 for o in observers)
+    assert observers[0].max_abs <= 1.0
+
+    qmodel = quantize_model(model, batches)
+    kinds = [type(layer) for layer in qmodel.layers]
+    assert kinds == [QuantizedLinear, QuantizedLinear, ReLU, QuantizedLinear]
+    assert [layer.input_scale for layer in qmodel.layers
+            if isinstance(layer, QuantizedLinear)] == [
+        o.scale for o in observers]
+    assert quantize_model(model).layers[0].input_scale is None
+
+    report = compare(model, qmodel, batches)
+    assert report.max_abs_error < 0.2
+    assert report.mean_abs_error <= report.max_abs_error
+    # Scales and biases dominate a model this small
+    assert report.compression > 3
+    assert report.float_seconds > 0 and report.quantized_seconds > 0
+
+    # Compiled inference runs the quantized kernels into the arena
+    compiled = qmodel.compile((5, 8))
+    x = batches[0]
+    assert compiled(x)._values().tolist() == pytest.approx(
+        qmodel.forward(x)._values().tolist())
+
+
+def test_range_observer_momentum():
+    observer = RangeObserver(momentum=0.5)
+    observer.observe(Tensor.with_list([-4.0, 1.0], (2,)))
+    observer.observe(Tensor.with_list([2.0], (1,)))
+    assert observer.max_abs == 3.0
+    assert observer.scale == 3.0 / QMAX
+    with pytest.raises(ValueError):
+        RangeObserver(momentum=1.0)
+
+
+def test_quantized_layer_saves_and_loads(tmp_path):
+    qlayer = QuantizedLinear.from_linear(Linear(3, 2))
+    path = str(tmp_path / "q.lml")
+    save_layer(qlayer, path)
+    other = QuantizedLinear.from_linear(Linear(3, 2))
+    load_layer(other, path)
+    assert other.weights._values().tolist() == \
+        qlayer.weights._values().tolist()
+    assert other.weights.dtype == DType.INT8
@@ -0,0 +1,178 @@
+import threading
+import time
+import pytest
+from lml_python.core.autograd import no_grad
+from lml_python.core.dtype import DType
+from lml_python.core.interfaces import ITensor
+from lml_python.core.layer import Linear, Sequential
+from lml_python.core.rng import Generator
+from lml_python.core.tensor import Tensor
+from lml_python.serving.batcher import DynamicBatcher
+from lml_python.serving.metrics import ServingMetrics
+
+
+class _Recording(Sequential):
+    # Remembers the batch size of every forward
+    def __init__(self, *layers):
+        super().__init__(*layers)
+        self.batches = []
+
+    def forward(self, input: ITensor) -> ITensor:
+        self.batches.append(input.shape[0])
+        return super().forward(input)
+
+
+class _Failing(Sequential):
+    def forward(self, input: ITensor) -> ITensor:
+        raise RuntimeError("broken model")
+
+
+def _model():
+    return _Recording(Linear(3, 4, "relu", generator=Generator(0)),
+                      Linear(4, 2, generator=Generator(1)))
+
+
+def _samples(n):
+    return [Tensor.with_list([float(i), -float(i), 0.5], (3,))
+            for i in range(n)]
+
+
+def test_outputs_match_unbatched_forward():
+    model = _model()
+    samples = _samples(10)
+    with DynamicBatcher(model, max_batch_size=4, max_wait=0.05) as batcher:
+        futures = [batcher.submit(x) for x in samples]
+        outputs = [f.result(5) for f in futures]
+    with no_grad():
+        for x, y in zip(samples, outputs):
+            expected = model.forward(x.reshape((1, 3)))
+            assert y.shape == (2,)
+            assert y.data[y.offset:y.offset + 2] == expected.data
+
+
+def test_requests_are_coalesced():
+    model = _model()
+    with DynamicBatcher(model, max_batch_size=8, max_wait=0.2) as batcher:
+        futures = [batcher.submit(x) for x in _samples(20)]
+        for f in futures:
+            f.result(5)
+    assert sum(model.batches) == 20
+    assert max(model.batches) == 8
+    assert len(model.batches) < 20
+
+
+def test_max_wait_bounds_a_lone_request():
+    with DynamicBatcher(_model(), max_batch_size=64,
+                        max_wait=0.01) as batcher:
+        start = time.perf_counter()
+        batcher.infer(_samples(1)[0], timeout=5)
+        assert time.perf_counter() - start < 1.0
+
+
+def test_concurrent_clients():
+    model = _model()
+    results = {}
+
+    with DynamicBatcher(model, max_batch_size=16, max_wait=0.01,
+                        workers=2) as batcher:
+        def client(i):
+            results[i] = batcher.infer(_samples(i + 1)[i], timeout=5)
+
+        threads = [threading.Thread(target=client, args=(i,))
+                   for i in range(24)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert len(results) == 24
+    assert all(y.shape == (2,) for y in results.values())
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_compiled_model_outputs_are_not_overwritten(workers):
+    model = _model()
+    compiled = model.compile((1, 3))
+    samples = _samples(8)
+    with no_grad():
+        expected = [model.forward(x.reshape((1, 3))).data.tolist()
+                    for x in samples]
+
+    with DynamicBatcher(compiled, max_batch_size=1,
+                        workers=workers) as batcher:
+        first = batcher.infer(samples[0], timeout=5)
+        futures = [batcher.submit(x) for x in samples[1:]]
+        outputs = [first] + [f.result(5) for f in futures]
+    for y, values in zip(outputs, expected):
+        assert y.data[y.offset:y.offset + 2].tolist() == values
+
+
+def test_shapes_are_batched_separately():
+    class Identity(Sequential):
+        pass
+
+    with DynamicBatcher(Identity(), max_wait=0.05) as batcher:
+        a = batcher.submit(Tensor.with_list([1.0, 2.0], (2,)))
+        b = batcher.submit(Tensor.with_list([1, 2, 3], (3,), DType.INT32))
+        assert a.result(5).shape == (2,)
+        assert b.result(5).dtype == DType.INT32
+
+
+def test_model_errors_reach_every_request():
+    with DynamicBatcher(_Failing(), max_wait=0.05) as batcher:
+        futures = [batcher.submit(x) for x in _samples(3)]
+        for f in futures:
+            with pytest.raises(RuntimeError, match="broken model"):
+                f.result(5)
+    assert batcher.metrics.snapshot().errors == 3
+
+
+def test_close_finishes_queued_requests():
+    batcher = DynamicBatcher(_model(), max_batch_size=2, max_wait=0.0)
+    batcher.start()
+    futures = [batcher.submit(x) for x in _samples(7)]
+    batcher.close()
+    assert all(f.done() and f.exception() is None for f in futures)
+    with pytest.raises(RuntimeError):
+        batcher.submit(_samples(1)[0])
+
+
+def test_submit_requires_start():
+    with pytest.raises(RuntimeError):
+        DynamicBatcher(_model()).submit(_samples(1)[0])
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"max_batch_size": 0}, {"max_wait": -1.0}, {"workers": 0},
+])
+def test_invalid_settings(kwargs):
+    with pytest.raises(ValueError):
+        DynamicBatcher(_model(), **kwargs)
+
+
+def test_metrics_snapshot():
+    metrics = ServingMetrics()
+    metrics.record_batch([1_000_000, 2_000_000, 3_000_000])
+    metrics.record_batch([100_000_000])
+    snapshot = metrics.snapshot()
+    assert snapshot.requests == 4
+    assert snapshot.batches == 2
+    assert snapshot.batch_sizes == {3: 1, 1: 1}
+    assert snapshot.mean_batch_size == 2.0
+    assert snapshot.latency_p50_ms == 2.0
+    assert snapshot.latency_p99_ms == 100.0
+    assert snapshot.throughput > 0
+    assert snapshot.as_dict()["batch_sizes"] == {"1": 1, "3": 1}
+
+
+def test_metrics_window():
+    metrics = ServingMetrics(window=2)
+    for ms in (50, 1, 1):
+        metrics.record_batch([ms * 1_000_000])
+    assert metrics.snapshot().latency_p99_ms == 1.0
+    assert metrics.snapshot().requests == 3
+
+
+def test_empty_metrics():
+    snapshot = ServingMetrics().snapshot()
+    assert snapshot.latency_p50_ms == 0.0
+    assert snapshot.mean_batch_size == 0.0
@@ -0,0 +1,102 @@
+import http.client
+import json
+import socket
+import pytest
+from lml_python.core.autograd import no_grad
+from lml_python.core.layer import Linear, Sequential
+from lml_python.core.rng import Generator
+from lml_python.core.tensor import Tensor
+from lml_python.serving.batcher import DynamicBatcher
+from lml_python.serving.server import InferenceServer, connect_unix
+
+
+@pytest.fixture
+def model():
+    return Sequential(Linear(2, 3, "relu", generator=Generator(0)))
+
+
+@pytest.fixture
+def server(model):
+    with DynamicBatcher(model, max_wait=0.001) as batcher, \
+            InferenceServer(batcher) as server:
+        server.start()
+        yield server
+
+
+def _request(conn, method, path, body=None):
+    conn.request(method, path, body=json.dumps(body) if body else None,
+                 headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def _connect(server):
+    host, port = server.address
+    return http.client.HTTPConnection(host, port, timeout=5)
+
+
+def test_predict(server, model):
+    status, body = _request(_connect(server), "POST", "/predict",
+                            {"input": [0.5, -1.0]})
+    with no_grad():
+        expected = model.forward(Tensor.with_list([[0.5, -1.0]], (1, 2)))
+    assert status == 200
+    assert body["output"] == pytest.approx(expected.data.tolist())
+
+
+def test_keep_alive_and_metrics(server):
+    conn = _connect(server)
+    for i in range(3):
+        status, _ = _request(conn, "POST", "/predict",
+                             {"input": [float(i), 1.0]})
+        assert status == 200
+    status, metrics = _request(conn, "GET", "/metrics")
+    assert status == 200
+    assert metrics["requests"] == 3
+    assert sum(metrics["batch_sizes"].values()) == metrics["batches"]
+    assert metrics["latency_p99_ms"] >= metrics["latency_p50_ms"] > 0
+
+
+@pytest.mark.parametrize("body, status", [
+    ({"input": [1.0, 2.0, 3.0]}, 400),
+    ({"input": [[1.0, 2.0], [3.0]]}, 400),
+    ({"sample": [1.0, 2.0]}, 400),
+])
+def test_bad_requests(server, body, status):
+    assert _request(_connect(server), "POST", "/predict", body)[0] == status
+
+
+def test_unknown_path(server):
+    assert _request(_connect(server), "GET", "/nothing")[0] == 404
+
+
+def test_health(server):
+    assert _request(_connect(server), "GET", "/health") == (
+        200, {"status": "ok"})
+
+
+def test_unix_socket(tmp_path, model):
+    path = str(tmp_path / "lml.sock")
+    with DynamicBatcher(model, max_wait=0.001) as batcher, \
+            InferenceServer(batcher, path) as server:
+        server.start()
+        conn = http.client.HTTPConnection("localhost", timeout=5)
+        conn.sock = connect_unix(path)
+        status, body = _request(conn, "POST", "/predict",
+                                {"input": [1.0, 2.0]})
+    assert status == 200
+    assert len(body["output"]) == 3
+
+
+def test_unix_socket_path_must_be_a_socket(tmp_path, model):
+    stale = tmp_path / "stale.sock"
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(str(stale))
+    sock.close()
+    regular = tmp_path / "model.json"
+    regular.write_text("{}")
+    with DynamicBatcher(model) as batcher:
+        InferenceServer(batcher, str(stale)).close()
+        with pytest.raises(FileExistsError):
+            InferenceServer(batcher, str(regular))
+    assert regular.read_text() == "{}"